@@ -1,11 +1,39 @@
+import time
+
+STARTED = time.perf_counter()
+
 import sys
-from PyQt5.QtWidgets import QApplication
-from src.ui.main_window import MainWindow
+from src.ui.startup import StartupTimeline
+
+PROFILE_FLAG = "--profile-startup"
+
+
+def profile_output(argv):
+    """Return (profiling, output path or None) for `--profile-startup[=PATH]` in argv."""
+    for arg in argv[1:]:
+        if arg == PROFILE_FLAG:
+            return True, None
+        if arg.startswith(PROFILE_FLAG + "="):
+            return True, arg.split("=", 1)[1]
+    return False, None
+
 
 def run_editor():
     """Entry point to start the LoL_CodeEditor editor."""
-    app = QApplication(sys.argv)
-    main_window = MainWindow()
+    profiling, output = profile_output(sys.argv)
+    timeline = StartupTimeline(STARTED) if profiling else None
+    from PyQt5.QtWidgets import QApplication
+    from src.ui.main_window import MainWindow
+    if timeline:
+        timeline.mark("import")
+
+    app = QApplication([arg for arg in sys.argv if not arg.startswith(PROFILE_FLAG)])
+    main_window = MainWindow(timeline)
+    if timeline:
+        timeline.mark("construct")
+        # Report once every deferred panel has been built, then exit
+        main_window.startup_finished.connect(lambda: timeline.write(output))
+        main_window.startup_finished.connect(main_window.close)
     main_window.show()
     sys.exit(app.exec_())
 
@@ -0,0 +1,218 @@
+# src/ai/completion.py
+
+import bisect
+import heapq
+import itertools
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+
+IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+MIN_PREFIX = 2  # Characters typed before completions are offered
+MAX_RESULTS = 20
+MAX_CANDIDATES = 500  # Prefix matches scored per request
+PROXIMITY_WINDOW = 300  # Lines searched around the cursor for nearby uses
+CACHE_SIZE = 256
+MAX_PROJECT_FILE_SIZE = 1024 * 1024
+
+
+class SortedWords:
+    """Word counts plus a sorted array of the distinct words for prefix lookups."""
+    def __init__(self):
+        self.counts = Counter()
+        self.words = []
+
+    def add(self, words):
+        counts = self.counts
+        for word in words:
+            if not counts[word]:
+                bisect.insort(self.words, word)
+            counts[word] += 1
+
+    def remove(self, words):
+        counts = self.counts
+        for word in words:
+            counts[word] -= 1
+            if counts[word] <= 0:
+                del counts[word]
+                index = bisect.bisect_left(self.words, word)
+                del self.words[index]
+
+    def merge(self, counts, sign=1):
+        """Add (or with sign=-1, remove) a {word: count} mapping."""
+        for word, count in counts.items():
+            current = self.counts.get(word, 0)
+            total = current + sign * count
+            if total > 0:
+                if not current:
+                    bisect.insort(self.words, word)
+                self.counts[word] = total
+            elif current:
+                del self.counts[word]
+                del self.words[bisect.bisect_left(self.words, word)]
+
+    def with_prefix(self, prefix, limit=MAX_CANDIDATES):
+        """Return up to `limit` distinct words starting with `prefix`, in sorted order."""
+        words = self.words
+        start = bisect.bisect_left(words, prefix)
+        result = []
+        for word in itertools.islice(words, start, start + limit):
+            if not word.startswith(prefix):
+                break
+            result.append(word)
+        return result
+
+
+class DocumentIndex:
+    """Identifiers of one open document, kept per line and updated from line deltas.
+
+    `update_lines` replaces a range of lines with their new text, so an edit
+    costs time proportional to the lines it touched, not to the document.
+    `version` increases on every update and keys the completion cache.
+    """
+    _ids = itertools.count(1)
+
+    def __init__(self, text=""):
+        self.uid = next(self._ids)
+        self.version = 0
+        self.lines = []  # Tuple of identifiers per line
+        self.words = SortedWords()
+        self.lock = threading.Lock()  # Edits happen on the GUI thread, queries on a worker
+        if text:
+            self.update_lines(0, 0, text.split("\n"))
+
+    def update_lines(self, first, removed_count, new_lines):
+        """Replace `removed_count` lines starting at `first` with `new_lines`."""
+        new_words = [tuple(IDENTIFIER.findall(line)) for line in new_lines]
+        with self.lock:
+            for words in self.lines[first:first + removed_count]:
+                self.words.remove(words)
+            for words in new_words:
+                self.words.add(words)
+            self.lines[first:first + removed_count] = new_words
+            self.version += 1
+
+    def line_count(self):
+        return len(self.lines)
+
+    def nearby_words(self, line, prefix):
+        """Map words starting with `prefix` on lines near `line` to their closest distance."""
+        lines = self.lines
+        nearest = {}
+        for distance in range(1, PROXIMITY_WINDOW + 1):
+            for number in (line - distance, line + distance):
+                if 0 <= number < len(lines):
+                    for word in lines[number]:
+                        if word not in nearest and word.startswith(prefix):
+                            nearest[word] = distance
+        return nearest
+
+
+class ProjectIndex:
+    """Identifier counts across project files, replaced per file as they are re-read."""
+    def __init__(self):
+        self.words = SortedWords()
+        self._files = {}
+        self.lock = threading.Lock()
+
+    def add_text(self, path, text):
+        counts = Counter(IDENTIFIER.findall(text))
+        with self.lock:
+            previous = self._files.pop(path, None)
+            if previous:
+                self.words.merge(previous, -1)
+            self.words.merge(counts)
+            self._files[path] = counts
+
+    def add_file(self, path, encoding="utf-8"):
+        """Index a source file; oversized or unreadable files are skipped."""
+        try:
+            with open(path, encoding=encoding, errors="replace") as f:
+                text = f.read(MAX_PROJECT_FILE_SIZE + 1)
+        except OSError:
+            return False
+        if len(text) > MAX_PROJECT_FILE_SIZE:
+            return False
+        self.add_text(path, text)
+        return True
+
+    def remove(self, path):
+        with self.lock:
+            previous = self._files.pop(path, None)
+            if previous:
+                self.words.merge(previous, -1)
+
+    def __len__(self):
+        return len(self._files)
+
+
+class Completion:
+    """A ranked completion candidate."""
+    __slots__ = ("word", "score")
+
+    def __init__(self, word, score):
+        self.word = word
+        self.score = score
+
+    def __repr__(self):
+        return f"Completion({self.word!r}, {self.score:.2f})"
+
+
+class CompletionEngine:
+    """Ranks identifiers from the current document and the project for a prefix.
+
+    Words used often score higher, and words used near the cursor score
+    higher still; project words fill in names the document has not used yet.
+    Results are cached by (document, version, prefix, line).
+    """
+    def __init__(self, project=None, cache_size=CACHE_SIZE):
+        self.project = project or ProjectIndex()
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def complete(self, document, prefix, line=0, limit=MAX_RESULTS):
+        """Return up to `limit` Completions for `prefix` typed on `line` of `document`."""
+        if len(prefix) < MIN_PREFIX:
+            return []
+        key = (document.uid, document.version, prefix, line)  # Proximity depends on the line
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached[:limit]
+
+        with document.lock:
+            local = document.words.with_prefix(prefix)
+            local_counts = {word: document.words.counts[word] for word in local}
+            proximity = document.nearby_words(line, prefix)
+        with self.project.lock:
+            remote = self.project.words.with_prefix(prefix)
+            remote_counts = {word: self.project.words.counts[word] for word in remote}
+
+        scored = []
+        for word in set(local_counts) | set(remote_counts):
+            if word == prefix:
+                continue  # The word being typed
+            score = 2.0 * math.log1p(local_counts.get(word, 0)) + math.log1p(remote_counts.get(word, 0))
+            distance = proximity.get(word)
+            if distance is not None:
+                score += 8.0 / (1 + distance / 8)
+            scored.append(Completion(word, score))
+        result = heapq.nlargest(MAX_RESULTS, scored, key=lambda c: (c.score, -len(c.word)))
+
+        with self._cache_lock:
+            self._cache[key] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result[:limit]
+
+
+def prefix_at(text, column):
+    """Return the identifier fragment that ends at `column` of a line."""
+    start = column
+    while start > 0 and (text[start - 1].isalnum() or text[start - 1] == "_"):
+        start -= 1
+    fragment = text[start:column]
+    return fragment if fragment and not fragment[0].isdigit() else ""
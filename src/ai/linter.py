@@ -0,0 +1,436 @@
+# src/ai/linter.py
+
+import ast
+import builtins
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from src.fileio import atomic_write
+
+CACHE_VERSION = 2  # 2: columns count characters rather than UTF-8 bytes
+MAX_CACHED_FILES = 50000  # Results kept in the on-disk cache
+MAX_CACHED_CHUNKS = 20000  # Per-process cache of analysed top-level definitions
+BATCH_SIZE = 32  # Files per pool task when linting a project
+BUILTINS = frozenset(dir(builtins)) | {"__file__", "__name__", "__doc__", "__builtins__", "__spec__",
+                                       "__loader__", "__package__", "__path__", "__annotations__"}
+
+
+class Diagnostic:
+    """One problem found in a file. Lines are zero-based, columns are characters."""
+    __slots__ = ("line", "column", "end_column", "severity", "code", "message")
+
+    def __init__(self, line, column, end_column, severity, code, message):
+        self.line = line
+        self.column = column
+        self.end_column = end_column
+        self.severity = severity  # "error" or "warning"
+        self.code = code
+        self.message = message
+
+    def shifted(self, lines):
+        return Diagnostic(self.line + lines, self.column, self.end_column, self.severity, self.code, self.message)
+
+    def to_list(self):
+        return [self.line, self.column, self.end_column, self.severity, self.code, self.message]
+
+    def __eq__(self, other):
+        return isinstance(other, Diagnostic) and self.to_list() == other.to_list()
+
+    def __repr__(self):
+        return f"Diagnostic({self.line}:{self.column} {self.code} {self.message!r})"
+
+
+def content_hash(source):
+    return hashlib.blake2b(source.encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
+
+
+def _char_column(line, byte_column):
+    """ast reports UTF-8 byte offsets; diagnostics count characters."""
+    if line.isascii():
+        return byte_column
+    return len(line.encode("utf-8")[:byte_column].decode("utf-8", "replace"))
+
+
+def _node_diagnostic(node, lines, offset, severity, code, message, name=None):
+    line = lines[node.lineno - 1] if node.lineno <= len(lines) else ""
+    column = _char_column(line, node.col_offset)
+    if name is not None:
+        end = column + len(name)
+    elif getattr(node, "end_lineno", None) == node.lineno:
+        end = _char_column(line, node.end_col_offset)
+    else:
+        end = column + 1
+    return Diagnostic(node.lineno - 1 - offset, column, end, severity, code, message)
+
+
+def _bound_names(node):
+    """Names a top-level statement binds in the module namespace."""
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        names = {node.name}
+        for child in ast.walk(node):
+            if isinstance(child, ast.Global):
+                names.update(child.names)  # Module globals created inside a function
+        return names
+    if isinstance(node, (ast.Import, ast.ImportFrom)):
+        return {(alias.asname or alias.name).split(".")[0] for alias in node.names}  # "*" disables F821
+    names = set()
+    for child in ast.walk(node):
+        if isinstance(child, ast.Name) and isinstance(child.ctx, ast.Store):
+            names.add(child.id)
+        elif isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(child.name)
+        elif isinstance(child, (ast.Import, ast.ImportFrom)):
+            names |= {(alias.asname or alias.name).split(".")[0] for alias in child.names if alias.name != "*"}
+        elif isinstance(child, ast.Global):
+            names.update(child.names)
+    return names
+
+
+class _ScopeChecker(ast.NodeVisitor):
+    """Per-chunk checks: undefined names, unused locals and a few common mistakes."""
+    def __init__(self, module_names, lines, offset):
+        self.module_names = module_names
+        self.lines = lines
+        self.offset = offset
+        self.diagnostics = []
+        self.loaded = set()  # Every name read anywhere in the chunk
+        self.scopes = []  # (bound, assigned {name: node}, used, global/nonlocal names) per scope
+
+    def report(self, node, severity, code, message, name=None):
+        self.diagnostics.append(_node_diagnostic(node, self.lines, self.offset, severity, code, message, name))
+
+    def _defined(self, name):
+        if name in self.module_names or name in BUILTINS or "*" in self.module_names:
+            return True
+        return any(name in scope[0] for scope in self.scopes)
+
+    def _function(self, node):
+        for default in node.args.defaults + [d for d in node.args.kw_defaults if d is not None]:
+            if isinstance(default, (ast.List, ast.Dict, ast.Set)):
+                self.report(default, "warning", "B006", "Mutable default argument")
+        for decorator in node.decorator_list:
+            self.visit(decorator)
+        for default in node.args.defaults + [d for d in node.args.kw_defaults if d is not None]:
+            self.visit(default)
+        if node.returns is not None:
+            self.visit(node.returns)
+
+        args = node.args
+        bound = {arg.arg for arg in args.posonlyargs + args.args + args.kwonlyargs}
+        bound |= {arg.arg for arg in (args.vararg, args.kwarg) if arg is not None}
+        nonlocal_names = set()
+        for child in ast.walk(node):
+            if child is node:
+                continue
+            if isinstance(child, ast.Name) and isinstance(child.ctx, (ast.Store, ast.Del)):
+                bound.add(child.id)
+            elif isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                bound.add(child.name)
+            elif isinstance(child, (ast.Import, ast.ImportFrom)):
+                bound |= {(alias.asname or alias.name).split(".")[0] for alias in child.names}
+            elif isinstance(child, ast.ExceptHandler) and child.name:
+                bound.add(child.name)
+            elif isinstance(child, (ast.Global, ast.Nonlocal)):
+                nonlocal_names.update(child.names)
+            elif isinstance(child, ast.arg):
+                bound.add(child.arg)  # Lambda and nested function parameters
+        self.scopes.append((bound, {}, set(), nonlocal_names))
+        for statement in node.body:
+            self.visit(statement)
+        _, assigned, used, _ = self.scopes.pop()
+        for name, target in assigned.items():
+            if name not in used and name not in nonlocal_names and name != "_" and not name.startswith("__"):
+                self.report(target, "warning", "F841", f"Local variable '{name}' is assigned but never used", name)
+
+    visit_FunctionDef = visit_AsyncFunctionDef = _function
+
+    def visit_Lambda(self, node):
+        args = node.args
+        bound = {arg.arg for arg in args.posonlyargs + args.args + args.kwonlyargs}
+        bound |= {arg.arg for arg in (args.vararg, args.kwarg) if arg is not None}
+        for default in args.defaults + [d for d in args.kw_defaults if d is not None]:
+            self.visit(default)
+        self.scopes.append((bound, {}, set(), set()))
+        self.visit(node.body)
+        self.scopes.pop()
+
+    def visit_ClassDef(self, node):
+        for child in node.bases + node.keywords + node.decorator_list:
+            self.visit(child)
+        bound = set()
+        for statement in node.body:
+            bound |= _bound_names(statement)
+        self.scopes.append((bound, {}, set(), set()))  # Class attributes are never "unused"
+        for statement in node.body:
+            self.visit(statement)
+        self.scopes.pop()
+
+    def visit_Name(self, node):
+        if isinstance(node.ctx, ast.Load):
+            self.loaded.add(node.id)
+            for scope in self.scopes:
+                scope[2].add(node.id)
+            if not self._defined(node.id):
+                self.report(node, "error", "F821", f"Undefined name '{node.id}'", node.id)
+
+    def visit_Assign(self, node):
+        if self.scopes:
+            for target in node.targets:
+                if isinstance(target, ast.Name):  # Like pyflakes, unpacking and loop targets are exempt
+                    self.scopes[-1][1].setdefault(target.id, target)
+        self.generic_visit(node)
+
+    def visit_AugAssign(self, node):
+        if isinstance(node.target, ast.Name) and self.scopes:
+            self.scopes[-1][2].add(node.target.id)  # x += 1 reads x
+        self.generic_visit(node)
+
+    def visit_Compare(self, node):
+        for op, comparator in zip(node.ops, node.comparators):
+            if isinstance(op, (ast.Eq, ast.NotEq)) and isinstance(comparator, ast.Constant) \
+                    and comparator.value is None:
+                self.report(node, "warning", "E711", "Comparison to None should use 'is' or 'is not'")
+        self.generic_visit(node)
+
+    def visit_ExceptHandler(self, node):
+        if node.type is None:
+            self.report(node, "warning", "E722", "Bare 'except:' also catches KeyboardInterrupt")
+        self.generic_visit(node)
+
+    def visit_Attribute(self, node):
+        self.visit(node.value)
+
+
+class ChunkResult:
+    """Cached analysis of one top-level statement, positioned relative to its first line."""
+    __slots__ = ("diagnostics", "loaded")
+
+    def __init__(self, diagnostics, loaded):
+        self.diagnostics = diagnostics
+        self.loaded = loaded
+
+
+class LintSession:
+    """Lints source text, re-analysing only top-level definitions whose text changed.
+
+    Every top-level statement is analysed on its own and cached by a hash
+    of its lines and its columns on them (statements can share a line) plus
+    the module's top-level names (which decide what counts as undefined).
+    Diagnostics are stored relative to the chunk, so typing above a
+    function that did not change still hits the cache.
+    """
+    def __init__(self, max_chunks=MAX_CACHED_CHUNKS):
+        self.max_chunks = max_chunks
+        self.chunks = {}
+        self.analysed = 0  # Chunks analysed (cache misses), for tests and stats
+
+    def lint(self, source):
+        try:
+            return self._lint(source)
+        except (RecursionError, MemoryError) as e:
+            return [_too_complex(e)]
+
+    def _lint(self, source):
+        try:
+            tree = ast.parse(source)
+        except SyntaxError as e:
+            line = max((e.lineno or 1) - 1, 0)
+            column = max((e.offset or 1) - 1, 0)
+            return [Diagnostic(line, column, column + 1, "error", "E999", f"SyntaxError: {e.msg}")]
+        except ValueError as e:
+            return [Diagnostic(0, 0, 1, "error", "E999", str(e))]
+
+        lines = source.splitlines(True)
+        module_names = set()
+        for node in tree.body:
+            module_names |= _bound_names(node)
+        names_digest = hashlib.blake2b("\0".join(sorted(module_names)).encode(), digest_size=8).digest()
+
+        diagnostics, loaded, imports = [], set(), []
+        for node in tree.body:
+            start = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", ())]) - 1
+            segment = "".join(lines[start:node.end_lineno])
+            span = f"\0{node.col_offset}:{node.end_col_offset}".encode()
+            key = hashlib.blake2b(segment.encode("utf-8", "surrogatepass") + span + names_digest,
+                                  digest_size=16).digest()
+            result = self.chunks.get(key)
+            if result is None:
+                result = self._analyse(node, module_names, lines, start)
+                self.analysed += 1
+                if len(self.chunks) >= self.max_chunks:
+                    self.chunks.pop(next(iter(self.chunks)))
+                self.chunks[key] = result
+            diagnostics.extend(diagnostic.shifted(start) for diagnostic in result.diagnostics)
+            loaded |= result.loaded
+            if isinstance(node, (ast.Import, ast.ImportFrom)):
+                imports.append(node)
+
+        exported = _dunder_all(tree)
+        for node in imports:
+            for alias in node.names:
+                name = (alias.asname or alias.name).split(".")[0]
+                if alias.name == "*" or name in loaded or name in exported or name == "__future__":
+                    continue
+                if isinstance(node, ast.ImportFrom) and node.module == "__future__":
+                    continue
+                diagnostics.append(_node_diagnostic(node, lines, 0, "warning", "F401",
+                                                    f"'{alias.name}' imported but unused"))
+        diagnostics.sort(key=lambda d: (d.line, d.column))
+        return diagnostics
+
+    def _analyse(self, node, module_names, lines, start):
+        checker = _ScopeChecker(module_names, lines, start)
+        checker.visit(node)
+        return ChunkResult(checker.diagnostics, frozenset(checker.loaded))
+
+
+def _too_complex(error):
+    """E999 for source nested too deeply for ast, such as long generated expressions."""
+    reason = "too deeply nested" if isinstance(error, RecursionError) else "too large"
+    return Diagnostic(0, 0, 1, "error", "E999", f"Source is {reason} to analyse")
+
+
+def _dunder_all(tree):
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(isinstance(t, ast.Name) and t.id == "__all__" for t in node.targets):
+            try:
+                return set(ast.literal_eval(node.value))
+            except ValueError:
+                return set()
+    return set()
+
+
+_session = None
+
+
+def _worker_session():
+    global _session
+    if _session is None:
+        _session = LintSession()
+    return _session
+
+
+def lint_source(source):
+    """Pool task: lint source text with this process's chunk cache; returns diagnostic lists."""
+    return [diagnostic.to_list() for diagnostic in _worker_session().lint(source)]
+
+
+def lint_files(paths):
+    """Pool task: lint files from disk; returns [(path, content hash, diagnostic lists)]."""
+    results = []
+    for path in paths:
+        try:
+            with open(path, encoding="utf-8") as f:
+                source = f.read()
+        except (OSError, UnicodeDecodeError):
+            continue
+        try:
+            diagnostics = lint_source(source)
+        except (RecursionError, MemoryError) as e:
+            diagnostics = [_too_complex(e).to_list()]
+        results.append((path, content_hash(source), diagnostics))
+    return results
+
+
+class LintCache:
+    """On-disk lint results: file stats map to a content hash, hashes map to diagnostics."""
+    def __init__(self, path="config/lint_cache.json"):
+        self.path = path
+        self.files = {}  # path -> [mtime_ns, size, content hash]
+        self.results = {}  # content hash -> diagnostic lists
+        self.dirty = False
+        self.lock = threading.Lock()  # Shared by the project lint thread and the GUI
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == CACHE_VERSION:
+            self.files = data.get("files", {})
+            self.results = data.get("results", {})
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            while len(self.results) > MAX_CACHED_FILES:
+                self.results.pop(next(iter(self.results)))
+            live = set(self.results)
+            self.files = {path: entry for path, entry in self.files.items() if entry[2] in live}
+            data = {"version": CACHE_VERSION, "files": dict(self.files), "results": dict(self.results)}
+            self.dirty = False
+        atomic_write(self.path, lambda f: json.dump(data, f), fsync=False)
+
+    def lookup_path(self, path):
+        """Return cached diagnostics when the file's mtime and size are unchanged."""
+        entry = self.files.get(path)
+        if entry is None:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if [stat.st_mtime_ns, stat.st_size] != entry[:2]:
+            return None
+        return self.results.get(entry[2])
+
+    def lookup_source(self, source):
+        return self.results.get(content_hash(source))
+
+    def store(self, path, digest, diagnostics, on_disk=True):
+        """Cache diagnostics for `digest`; `on_disk` says the file at `path` holds that content."""
+        stat = None
+        if path is not None and on_disk:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                pass
+        with self.lock:
+            if stat is not None:
+                self.files[path] = [stat.st_mtime_ns, stat.st_size, digest]
+            self.results.pop(digest, None)  # Re-inserting keeps recently used entries at the end
+            self.results[digest] = diagnostics
+            self.dirty = True
+
+
+class ProjectLinter:
+    """Lints many files on every core, skipping files whose stats match the cache."""
+    _pool = None
+
+    @classmethod
+    def pool(cls):
+        if cls._pool is None:
+            context = multiprocessing.get_context("spawn")  # Forking a threaded Qt process can deadlock
+            cls._pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 2, mp_context=context)
+        return cls._pool
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def lint(self, paths, on_result, should_stop=lambda: False):
+        """Call `on_result(path, diagnostics)` for every file; return how many were analysed."""
+        stale = []
+        for path in paths:
+            cached = self.cache.lookup_path(path)
+            if cached is None:
+                stale.append(path)
+            else:
+                on_result(path, [Diagnostic(*item) for item in cached])
+        futures = [self.pool().submit(lint_files, stale[i:i + BATCH_SIZE])
+                   for i in range(0, len(stale), BATCH_SIZE)]
+        for future in as_completed(futures):
+            if should_stop():
+                for pending in futures:
+                    pending.cancel()
+                break
+            for path, digest, diagnostics in future.result():
+                self.cache.store(path, digest, diagnostics)
+                on_result(path, [Diagnostic(*item) for item in diagnostics])
+        return len(stale)
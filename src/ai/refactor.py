@@ -0,0 +1,610 @@
+# src/ai/refactor.py
+
+import ast
+import hashlib
+import multiprocessing
+import os
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from src.fileio import atomic_write
+
+SCHEMA_VERSION = 2  # 2: receivers of attribute references and class bases
+BATCH_SIZE = 64  # Files per pool task when (re)indexing
+IDENTIFIER_CHARS = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY, path TEXT UNIQUE, module TEXT, mtime_ns INTEGER, size INTEGER, hash TEXT);
+CREATE TABLE IF NOT EXISTS symbols (
+    file_id INTEGER, name TEXT, kind TEXT, scope TEXT, line INTEGER, col INTEGER);
+CREATE TABLE IF NOT EXISTS refs (
+    file_id INTEGER, name TEXT, kind TEXT, scope TEXT, line INTEGER, col INTEGER, receiver TEXT);
+CREATE TABLE IF NOT EXISTS imports (
+    file_id INTEGER, module TEXT, name TEXT, alias TEXT, line INTEGER, col INTEGER);
+CREATE TABLE IF NOT EXISTS bases (
+    file_id INTEGER, scope TEXT, name TEXT);
+CREATE INDEX IF NOT EXISTS symbols_name ON symbols (name);
+CREATE INDEX IF NOT EXISTS symbols_file ON symbols (file_id);
+CREATE INDEX IF NOT EXISTS refs_name ON refs (name);
+CREATE INDEX IF NOT EXISTS refs_file_line ON refs (file_id, line);
+CREATE INDEX IF NOT EXISTS imports_name ON imports (name, module);
+CREATE INDEX IF NOT EXISTS imports_file ON imports (file_id);
+CREATE INDEX IF NOT EXISTS bases_name ON bases (name);
+CREATE INDEX IF NOT EXISTS bases_file ON bases (file_id);
+CREATE INDEX IF NOT EXISTS files_module ON files (module);
+"""
+
+
+class Location:
+    """A name occurrence: zero-based line, character column and the name's length."""
+    __slots__ = ("path", "line", "column", "length", "kind", "scope")
+
+    def __init__(self, path, line, column, length, kind=""):
+        self.path = path
+        self.line = line
+        self.column = column
+        self.length = length
+        self.kind = kind
+        self.scope = ""
+
+    def key(self):
+        return (self.path, self.line, self.column)
+
+    def __eq__(self, other):
+        return isinstance(other, Location) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def __repr__(self):
+        return f"Location({self.path}:{self.line}:{self.column} {self.kind})"
+
+
+def module_name(root, path):
+    """Dotted module name of `path` relative to the project root."""
+    relative = os.path.splitext(os.path.relpath(path, root))[0]
+    parts = [part for part in relative.replace("\\", "/").split("/") if part not in ("", ".")]
+    if parts and parts[-1] == "__init__":
+        parts.pop()
+    return ".".join(parts)
+
+
+def _char_column(line, byte_column):
+    """ast reports UTF-8 byte offsets; editors count characters."""
+    if line.isascii():
+        return byte_column
+    return len(line.encode("utf-8")[:byte_column].decode("utf-8", "replace"))
+
+
+def _name_column(line, start, name):
+    """Column of `name` at or after `start` on a line (for def/class/alias/attribute names)."""
+    column = line.find(name, start)
+    while column >= 0:
+        before = line[column - 1] if column else " "
+        after = line[column + len(name)] if column + len(name) < len(line) else " "
+        if before not in IDENTIFIER_CHARS and after not in IDENTIFIER_CHARS:
+            return column
+        column = line.find(name, column + 1)
+    return -1
+
+
+class _Collector(ast.NodeVisitor):
+    """Collects definitions, references, imports and class bases with character positions.
+
+    Scopes are dotted qualified names ("Class.method"); module level is "".
+    Attribute references keep the name they were accessed on ("self" in
+    self.size, "super" in super().run()), or "" for any other expression.
+    """
+    def __init__(self, lines):
+        self.lines = lines
+        self.scope = []
+        self.in_class = False
+        self.symbols = []  # (name, kind, scope, line, col)
+        self.refs = []  # (name, kind, scope, line, col, receiver)
+        self.imports = []  # (module, name or None, alias, line, col)
+        self.bases = []  # (class scope, base class name)
+
+    def _text(self, line):
+        return self.lines[line] if 0 <= line < len(self.lines) else ""
+
+    def _position(self, node, name=None):
+        line = node.lineno - 1
+        text = self._text(line)
+        column = _char_column(text, node.col_offset)
+        if name is not None:
+            found = _name_column(text, column, name)
+            if found >= 0:
+                column = found
+        return line, column
+
+    def _scope(self):
+        return ".".join(self.scope)
+
+    def _body(self, node, in_class):
+        previous, self.in_class = self.in_class, in_class
+        self.scope.append(node.name)
+        for statement in node.body:
+            self.visit(statement)
+        self.scope.pop()
+        self.in_class = previous
+
+    def _function(self, node):
+        for decorator in node.decorator_list:
+            self.visit(decorator)
+        line, column = self._position(node, node.name)
+        self.symbols.append((node.name, "method" if self.in_class else "function", self._scope(), line, column))
+        args = node.args
+        for default in args.defaults + [d for d in args.kw_defaults if d is not None]:
+            self.visit(default)
+        inner = ".".join(self.scope + [node.name])
+        for arg in args.posonlyargs + args.args + args.kwonlyargs + [a for a in (args.vararg, args.kwarg) if a]:
+            arg_line, arg_column = self._position(arg, arg.arg)
+            self.symbols.append((arg.arg, "parameter", inner, arg_line, arg_column))
+            if arg.annotation is not None:
+                self.visit(arg.annotation)
+        if node.returns is not None:
+            self.visit(node.returns)
+        self._body(node, False)
+
+    visit_FunctionDef = visit_AsyncFunctionDef = _function
+
+    def visit_ClassDef(self, node):
+        for decorator in node.decorator_list:
+            self.visit(decorator)
+        line, column = self._position(node, node.name)
+        self.symbols.append((node.name, "class", self._scope(), line, column))
+        for base in node.bases:
+            if isinstance(base, (ast.Name, ast.Attribute)):
+                self.bases.append((".".join(self.scope + [node.name]), getattr(base, "id", None) or base.attr))
+        for base in node.bases + node.keywords:
+            self.visit(base)
+        self._body(node, True)
+
+    def visit_Name(self, node):
+        line, column = self._position(node)
+        if isinstance(node.ctx, ast.Store):
+            self.symbols.append((node.id, "attribute" if self.in_class else "variable", self._scope(), line, column))
+        self.refs.append((node.id, "name", self._scope(), line, column, ""))
+
+    def visit_Attribute(self, node):
+        self.visit(node.value)
+        line = node.end_lineno - 1
+        text = self._text(line)
+        end = _char_column(text, node.end_col_offset)
+        column = end - len(node.attr)
+        if text[column:end] != node.attr:
+            return  # Attribute split across lines in an unusual way
+        receiver = node.value
+        if isinstance(receiver, ast.Call) and isinstance(receiver.func, ast.Name) and receiver.func.id == "super":
+            receiver = "super"
+        else:
+            receiver = receiver.id if isinstance(receiver, ast.Name) else ""
+        self.refs.append((node.attr, "attribute", self._scope(), line, column, receiver))
+        if isinstance(node.ctx, ast.Store) and isinstance(node.value, ast.Name) and node.value.id == "self" \
+                and len(self.scope) >= 2:
+            self.symbols.append((node.attr, "attribute", ".".join(self.scope[:-1]), line, column))
+
+    def _import(self, node, module):
+        search = {}
+        if module is not None:  # Names follow the "import" keyword, not the module path
+            text = self._text(node.lineno - 1)
+            search[node.lineno - 1] = max(0, text.find("import", _char_column(text, node.col_offset) + 4))
+        for alias in node.names:
+            if alias.name == "*":
+                continue
+            line = getattr(alias, "lineno", node.lineno) - 1
+            text = self._text(line)
+            first = alias.name.split(".")[0]
+            column = _name_column(text, search.get(line, 0), alias.name if module is not None else first)
+            if column >= 0:
+                search[line] = column + len(alias.name)
+            if module is not None:
+                self.imports.append((module, alias.name, alias.asname or alias.name, line, column))
+                if column >= 0:
+                    self.refs.append((alias.name, "import", self._scope(), line, column, ""))
+            else:
+                self.imports.append((alias.name, None, alias.asname or first, line, column))
+            if alias.asname:
+                alias_column = _name_column(text, search.get(line, 0), alias.asname)
+                if alias_column >= 0:
+                    search[line] = alias_column + len(alias.asname)
+                self.symbols.append((alias.asname, "import", self._scope(), line, alias_column))
+
+    def visit_Import(self, node):
+        self._import(node, None)
+
+    def visit_ImportFrom(self, node):
+        self._import(node, "." * node.level + (node.module or ""))
+
+
+def _resolve_relative(module, current):
+    """Turn a relative import such as '..ui.editor' into an absolute module name."""
+    if not module or not module.startswith("."):
+        return module
+    level = len(module) - len(module.lstrip("."))
+    base = current.split(".")[:-level] if level <= current.count(".") + 1 else []
+    rest = module[level:]
+    return ".".join(base + ([rest] if rest else []))
+
+
+def extract_symbols(source, module=""):
+    """Return (symbols, refs, imports, bases) rows for Python source, or None if it cannot be parsed.
+
+    Source nested too deeply for ast, such as a long generated expression,
+    is treated like a syntax error.
+    """
+    try:
+        tree = ast.parse(source)
+        collector = _Collector(source.splitlines())
+        collector.visit(tree)
+    except (SyntaxError, ValueError, RecursionError, MemoryError):
+        return None
+    imports = [(_resolve_relative(mod, module), name, alias, line, col)
+               for mod, name, alias, line, col in collector.imports]
+    return collector.symbols, collector.refs, imports, collector.bases
+
+
+def index_files(items):
+    """Pool task: [(path, module)] -> [(path, mtime, size, hash, rows or None)]."""
+    results = []
+    for path, module in items:
+        try:
+            stat = os.stat(path)
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            continue
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        rows = extract_symbols(data.decode("utf-8", "replace"), module)
+        results.append((path, stat.st_mtime_ns, stat.st_size, digest, rows))
+    return results
+
+
+class SymbolIndex:
+    """Project-wide definitions, references and imports stored in SQLite.
+
+    `update` only re-parses files whose mtime or size changed and whose
+    content hash differs, so reopening a large project costs one stat per
+    file. Name lookups are served from indexed tables. Resolution is
+    syntactic: a name resolves to a definition in its own file, then to
+    the module it was imported from, then to any definition of that name.
+    A member accessed on self, cls, super() or a class name resolves to
+    that class or the nearest base defining it.
+    """
+    _pool = None
+
+    @classmethod
+    def pool(cls):
+        if cls._pool is None:
+            context = multiprocessing.get_context("spawn")  # Forking a threaded Qt process can deadlock
+            cls._pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 2, mp_context=context)
+        return cls._pool
+
+    def __init__(self, db_path, root):
+        self.db_path = db_path
+        self.root = os.path.abspath(root)
+        self.lock = threading.RLock()
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        version = None
+        try:
+            row = self.db.execute("SELECT value FROM meta WHERE key = 'schema'").fetchone()
+            version = int(row[0]) if row else None
+        except sqlite3.Error:
+            pass
+        if version != SCHEMA_VERSION:
+            for table in ("meta", "files", "symbols", "refs", "imports", "bases"):
+                self.db.execute(f"DROP TABLE IF EXISTS {table}")
+        self.db.executescript(SCHEMA)
+        self.db.execute("INSERT OR REPLACE INTO meta VALUES ('schema', ?)", (str(SCHEMA_VERSION),))
+        self.db.commit()
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+    # Indexing
+
+    def update(self, paths, should_stop=lambda: False, prune=True):
+        """Bring the index in line with `paths`; return the number of files re-parsed.
+
+        With `prune`, indexed files missing from `paths` are dropped; pass
+        False to refresh just a few files.
+        """
+        paths = [os.path.abspath(path) for path in paths]
+        with self.lock:
+            known = {path: (file_id, mtime, size)
+                     for file_id, path, mtime, size in self.db.execute("SELECT id, path, mtime_ns, size FROM files")}
+        stale = []
+        for path in paths:
+            entry = known.pop(path, None)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if entry is None or entry[1] != stat.st_mtime_ns or entry[2] != stat.st_size:
+                stale.append((path, module_name(self.root, path)))
+        if prune:
+            with self.lock:
+                for path, (file_id, _, _) in known.items():  # Files that disappeared from the project
+                    self._delete_file(file_id)
+                self.db.commit()
+
+        batches = [stale[i:i + BATCH_SIZE] for i in range(0, len(stale), BATCH_SIZE)]
+        if len(batches) > 1:
+            results = self.pool().map(index_files, batches)
+        else:
+            results = map(index_files, batches)
+        parsed = 0
+        for batch in results:
+            if should_stop():
+                break
+            with self.lock:
+                for path, mtime, size, digest, rows in batch:
+                    parsed += self._store(path, mtime, size, digest, rows)
+                self.db.commit()
+        return parsed
+
+    def update_source(self, path, source):
+        """Index unsaved editor text for `path` so queries see what the user sees."""
+        path = os.path.abspath(path)
+        digest = hashlib.blake2b(source.encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
+        with self.lock:
+            row = self.db.execute("SELECT hash FROM files WHERE path = ?", (path,)).fetchone()
+            if row and row[0] == digest:
+                return False
+            rows = extract_symbols(source, module_name(self.root, path))
+            self._store(path, -1, -1, digest, rows)  # -1 forces a re-read of the file on disk later
+            self.db.commit()
+        return True
+
+    def _delete_file(self, file_id):
+        for table in ("symbols", "refs", "imports", "bases"):
+            self.db.execute(f"DELETE FROM {table} WHERE file_id = ?", (file_id,))
+        self.db.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+    def _store(self, path, mtime, size, digest, rows):
+        row = self.db.execute("SELECT id, hash FROM files WHERE path = ?", (path,)).fetchone()
+        if row and row[1] == digest:
+            self.db.execute("UPDATE files SET mtime_ns = ?, size = ? WHERE id = ?", (mtime, size, row[0]))
+            return 0  # Touched but unchanged
+        if row:
+            for table in ("symbols", "refs", "imports", "bases"):
+                self.db.execute(f"DELETE FROM {table} WHERE file_id = ?", (row[0],))
+            file_id = row[0]
+            self.db.execute("UPDATE files SET mtime_ns = ?, size = ?, hash = ? WHERE id = ?",
+                            (mtime, size, digest if rows is not None else None, file_id))
+        else:
+            file_id = self.db.execute(
+                "INSERT INTO files (path, module, mtime_ns, size, hash) VALUES (?, ?, ?, ?, ?)",
+                (path, module_name(self.root, path), mtime, size, digest if rows is not None else None)).lastrowid
+        if rows is None:
+            return 1  # Syntax error: keep the file known, retry when it changes
+        symbols, refs, imports, bases = rows
+        self.db.executemany("INSERT INTO symbols VALUES (?, ?, ?, ?, ?, ?)", [(file_id,) + r for r in symbols])
+        self.db.executemany("INSERT INTO refs VALUES (?, ?, ?, ?, ?, ?, ?)", [(file_id,) + r for r in refs])
+        self.db.executemany("INSERT INTO imports VALUES (?, ?, ?, ?, ?, ?)", [(file_id,) + r for r in imports])
+        self.db.executemany("INSERT INTO bases VALUES (?, ?, ?)", [(file_id,) + r for r in bases])
+        return 1
+
+    def file_count(self):
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    # Queries
+
+    _SYMBOLS = "SELECT f.path, s.name, s.kind, s.line, s.col, s.scope FROM symbols s JOIN files f ON f.id = s.file_id "
+    _REFS = "SELECT f.path, r.name, r.kind, r.line, r.col, r.scope FROM refs r JOIN files f ON f.id = r.file_id "
+
+    def _file(self, path):
+        return self.db.execute("SELECT id, module FROM files WHERE path = ?", (os.path.abspath(path),)).fetchone()
+
+    def _locations(self, query, args):
+        locations = []
+        for path, name, kind, line, col, scope in self.db.execute(query, args):
+            location = Location(path, line, col, len(name), kind)
+            location.scope = scope
+            locations.append(location)
+        return locations
+
+    def name_at(self, path, line, column):
+        """Return (name, kind, scope) of the identifier under a position, or None."""
+        found = self._name_at(path, line, column)
+        return found[:3] if found is not None else None
+
+    def _name_at(self, path, line, column):
+        """(name, kind, scope, receiver) of the identifier under a position, or None."""
+        with self.lock:
+            row = self._file(path)
+            if row is None:
+                return None
+            for name, kind, scope, col, receiver in self.db.execute(
+                    "SELECT name, kind, scope, col, receiver FROM refs WHERE file_id = ? AND line = ? "
+                    "UNION ALL SELECT name, kind, scope, col, '' FROM symbols WHERE file_id = ? AND line = ?",
+                    (row[0], line, row[0], line)):
+                if col <= column <= col + len(name):
+                    return name, kind, scope, receiver
+        return None
+
+    # Classes are (file_id, qualified name) pairs; bases are matched by name
+
+    def _classes_named(self, name):
+        return self.db.execute("SELECT file_id, CASE WHEN scope = '' THEN name ELSE scope || '.' || name END "
+                               "FROM symbols WHERE name = ? AND kind = 'class'", (name,)).fetchall()
+
+    def _enclosing_class(self, file_id, scope):
+        """The innermost class of a file that encloses `scope`, or None."""
+        classes = {f"{outer}.{name}" if outer else name for outer, name in self.db.execute(
+            "SELECT scope, name FROM symbols WHERE file_id = ? AND kind = 'class'", (file_id,))}
+        parts = scope.split(".") if scope else []
+        for depth in range(len(parts), 0, -1):
+            if ".".join(parts[:depth]) in classes:
+                return file_id, ".".join(parts[:depth])
+        return None
+
+    def _superclasses(self, cls):
+        found = []
+        for (base,) in self.db.execute("SELECT name FROM bases WHERE file_id = ? AND scope = ?", cls).fetchall():
+            found += self._classes_named(base)
+        return found
+
+    def _class_family(self, cls):
+        """A class and every class that derives from it, directly or not."""
+        family, pending = [cls], [cls]
+        while pending:
+            name = pending.pop()[1].rsplit(".", 1)[-1]
+            for subclass in self.db.execute("SELECT file_id, scope FROM bases WHERE name = ?", (name,)).fetchall():
+                if subclass not in family:
+                    family.append(subclass)
+                    pending.append(subclass)
+        return family
+
+    def _members(self, cls, name):
+        return self._locations(self._SYMBOLS + "WHERE s.file_id = ? AND s.scope = ? AND s.name = ? "
+                               "AND s.kind IN ('method', 'attribute') ORDER BY s.line", cls + (name,))
+
+    def definitions(self, path, line, column):
+        """Go to definition: the most specific definitions of the name under a position."""
+        found = self._name_at(path, line, column)
+        if found is None:
+            return []
+        name, kind, scope, receiver = found
+        with self.lock:
+            file_id, module = self._file(path)
+            if kind == "attribute" and receiver:
+                # self.name, cls.name, super().name and Class.name: the class, then its bases
+                if receiver in ("self", "cls", "super"):
+                    owner = self._enclosing_class(file_id, scope)
+                    classes = [] if owner is None else self._superclasses(owner) if receiver == "super" else [owner]
+                else:
+                    classes = self._classes_named(receiver)
+                seen = set()
+                while classes:
+                    cls = classes.pop(0)
+                    if cls in seen:
+                        continue
+                    seen.add(cls)
+                    members = self._members(cls, name)
+                    if members:
+                        return members[:1]
+                    classes += self._superclasses(cls)
+            if kind != "attribute":
+                # The innermost enclosing scope of this file that defines the name wins
+                local = self._locations(self._SYMBOLS + "WHERE s.file_id = ? AND s.name = ? AND s.kind != 'import'",
+                                        (file_id, name))
+                parts = scope.split(".") if scope else []
+                for depth in range(len(parts), -1, -1):
+                    enclosing = ".".join(parts[:depth])
+                    matches = [location for location in local if location.scope == enclosing]
+                    if matches:
+                        return matches[:1]
+                for source_module, source_name in self.db.execute(
+                        "SELECT module, name FROM imports WHERE file_id = ? AND alias = ?", (file_id, name)).fetchall():
+                    source_module = _resolve_relative(source_module, module)
+                    if source_name is None:
+                        rows = [Location(row[0], 0, 0, 0, "module") for row in self.db.execute(
+                            "SELECT path FROM files WHERE module = ?", (source_module,))]
+                    else:
+                        rows = self._locations(self._SYMBOLS + "WHERE f.module = ? AND s.name = ? AND s.scope = '' "
+                                               "AND s.kind != 'import'", (source_module, source_name))
+                    if rows:
+                        return rows[:1]
+            # Attributes (and unresolved names): every member or module-level definition of the name
+            return self._locations(
+                self._SYMBOLS + "WHERE s.name = ? AND (s.kind IN ('method', 'attribute') OR "
+                "(s.scope = '' AND s.kind IN ('function', 'class', 'variable'))) ORDER BY f.path, s.line", (name,))
+
+    def references(self, path, line, column):
+        """Find references: every occurrence that resolves to the same definition."""
+        targets = self.definitions(path, line, column)
+        if not targets:
+            return []
+        target = targets[0]
+        name = self.name_at(path, line, column)[0]
+        with self.lock:
+            file_id, module = self._file(target.path)
+            if target.kind in ("method", "attribute"):
+                # Members of the class and its subclasses: their definitions, self/cls/super accesses and
+                # bare uses inside those classes, and accesses on the class names. Other receivers are
+                # left alone, so renaming Job.run never touches subprocess.run.
+                family = self._class_family((file_id, target.scope))
+                found = []
+                for cls in family:
+                    found += self._members(cls, name)
+                    class_file, class_scope = cls
+                    found += self._locations(
+                        self._REFS + "WHERE r.file_id = ? AND r.name = ? AND ((r.kind = 'attribute' "
+                        "AND r.receiver IN ('self', 'cls', 'super') AND (r.scope = ? OR substr(r.scope, 1, ?) = ?)) "
+                        "OR (r.kind = 'name' AND r.scope = ?))",
+                        (class_file, name, class_scope, len(class_scope) + 1, class_scope + ".", class_scope))
+                for class_name in {class_scope.rsplit(".", 1)[-1] for _, class_scope in family}:
+                    found += self._locations(self._REFS + "WHERE r.name = ? AND r.kind = 'attribute' AND r.receiver = ?",
+                                             (name, class_name))
+            elif target.scope:
+                # Locals and parameters: uses within the defining function and its nested scopes
+                found = self._locations(self._REFS + "WHERE r.file_id = ? AND r.name = ? AND r.kind = 'name' "
+                                        "AND (r.scope = ? OR r.scope LIKE ?)",
+                                        (file_id, name, target.scope, target.scope + ".%"))
+            else:
+                # Module level: the defining file, files importing the name, and module.name accesses
+                found = self._locations(self._REFS + "WHERE r.file_id = ? AND r.name = ? AND r.kind != 'attribute'",
+                                        (file_id, name))
+                module_tail = module.rsplit(".", 1)[-1]
+                for importer_id, importer_module, import_module, import_name in self.db.execute(
+                        "SELECT i.file_id, f.module, i.module, i.name FROM imports i JOIN files f ON f.id = i.file_id "
+                        "WHERE i.name = ? OR i.name = ? OR (i.name IS NULL AND i.module LIKE ?)",
+                        (name, module_tail, "%" + module_tail)).fetchall():
+                    source = _resolve_relative(import_module, importer_module)
+                    if import_name == name and source == module:  # from module import name
+                        kinds = "r.kind != 'attribute'"
+                    elif (import_name is None and source == module) or \
+                            (import_name == module_tail and f"{source}.{import_name}".lstrip(".") == module):
+                        kinds = "r.kind = 'attribute'"  # import module / from package import module
+                    else:
+                        continue
+                    found += self._locations(self._REFS + f"WHERE r.file_id = ? AND r.name = ? AND {kinds}",
+                                             (importer_id, name))
+            found.append(target)
+        return sorted(set(found), key=lambda location: (location.path, location.line, location.column))
+
+    def rename_edits(self, path, line, column, new_name):
+        """Return {path: [(line, column, length, new_name)]} for renaming the symbol under a position."""
+        if not new_name.isidentifier():
+            raise ValueError(f"Not a valid identifier: {new_name}")
+        targets = self.definitions(path, line, column)
+        if len(targets) > 1:
+            raise ValueError(f"'{self.name_at(path, line, column)[0]}' has {len(targets)} possible definitions; "
+                             "rename it where it is defined")
+        edits = {}
+        for location in self.references(path, line, column):
+            if location.kind == "module" or location.column < 0:
+                continue
+            edits.setdefault(location.path, []).append((location.line, location.column, location.length, new_name))
+        return edits
+
+
+def apply_edits_to_text(text, edits):
+    """Apply (line, column, length, new_text) edits to text, returning the new text."""
+    lines = text.split("\n")
+    for line, column, length, new_text in sorted(edits, reverse=True):
+        lines[line] = lines[line][:column] + new_text + lines[line][column + length:]
+    return "\n".join(lines)
+
+
+def apply_edits_to_files(edits, skip=()):
+    """Write edits to files on disk atomically; paths in `skip` are left to the caller."""
+    changed = []
+    for path, file_edits in edits.items():
+        if path in skip:
+            continue
+        with open(path, encoding="utf-8", newline="") as f:
+            text = f.read()
+        newline = "\r\n" if "\r\n" in text else "\n"
+        updated = apply_edits_to_text(text.replace("\r\n", "\n"), file_edits)
+        atomic_write(path, lambda f: f.write(updated.replace("\n", newline)))
+        changed.append(path)
+    return changed
@@ -0,0 +1,82 @@
+# src/collab/binding.py
+
+from PyQt5.QtGui import QTextCursor
+from src.ui.text_units import char_index, utf16_len
+
+
+class EditorBinding:
+    """Keeps a CodeEditor document and a TextCRDT in sync.
+
+    Local edits arrive through `contentsChange` and become CRDT operations;
+    remote changes reported by the CRDT are applied as ranged edits that
+    leave the rest of the document (and its highlighting) untouched and are
+    kept out of the editor's undo history.
+    Qt positions count UTF-16 units and CRDT positions count characters;
+    the two only differ once the text holds an astral character, so the
+    conversion is skipped until one is seen.
+    """
+    def __init__(self, editor, crdt):
+        self.editor = editor
+        self.crdt = crdt
+        self._applying_remote = False
+        self._wide = False  # Set once the text may contain surrogate pairs
+        document = editor.document()
+
+        if len(crdt):
+            self._applying_remote = True
+            try:
+                text = crdt.text()
+                self._wide = utf16_len(text) != len(text)
+                editor.setPlainText(text)
+            finally:
+                self._applying_remote = False
+        elif document.characterCount() > 1:
+            text = editor.toPlainText()
+            self._wide = utf16_len(text) != len(text)
+            crdt.insert(0, text)
+
+        document.contentsChange.connect(self._local_change)
+        crdt.observe(self._remote_change)
+
+    def _local_change(self, position, removed, added):
+        if self._applying_remote:
+            return
+        document = self.editor.document()
+        # Qt may over-report by the implicit trailing paragraph separator, so clamp both sides
+        added = min(added, document.characterCount() - 1 - position)
+        inserted = ""
+        if added > 0:
+            cursor = QTextCursor(document)
+            cursor.setPosition(position)
+            cursor.setPosition(position + added, QTextCursor.KeepAnchor)
+            inserted = cursor.selectedText().replace("\u2029", "\n")
+        if self._wide:
+            # The text before `position` is unchanged, so the CRDT's old text maps both ends
+            old = self.crdt.text()
+            start = char_index(old, position)
+            removed = char_index(old, position + removed) - start
+            position = start
+        removed = min(removed, len(self.crdt) - position)
+        if removed > 0:
+            self.crdt.delete(position, removed)
+        if inserted:
+            self._wide = self._wide or utf16_len(inserted) != len(inserted)
+            self.crdt.insert(position, inserted)
+
+    def _remote_change(self, kind, position, value):
+        if kind == "insert":
+            self._wide = self._wide or utf16_len(value) != len(value)
+        self._applying_remote = True
+        try:
+            if self._wide:
+                # Events arrive before the document changes, so its text maps the CRDT positions
+                text = self.editor.toPlainText()
+                if kind != "insert":
+                    value = utf16_len(text[position:position + value])
+                position = utf16_len(text[:position])
+            if kind == "insert":
+                self.editor.apply_foreign_edit(position, 0, value)
+            else:
+                self.editor.apply_foreign_edit(position, value, "")
+        finally:
+            self._applying_remote = False
@@ -0,0 +1,606 @@
+# src/collab/crdt.py
+
+import random
+from bisect import bisect_right
+
+BLOCK_SIZE = 64  # Items per position-index block before it is split
+UPDATE_VERSION = 1
+
+_HAS_ORIGIN = 1
+_HAS_RIGHT_ORIGIN = 2
+_DELETED = 4
+
+
+class Item:
+    """A run of consecutive characters inserted by one client.
+
+    Character `i` of the run has id (client, clock + i). `origin` is the id of
+    the character that was immediately left of the run when it was inserted,
+    `right_origin` the id of the character immediately right. Deleted runs keep
+    only their length (content is None) so they cost a few words each.
+    """
+    __slots__ = ("client", "clock", "length", "content", "origin", "right_origin", "block")
+
+    def __init__(self, client, clock, length, content, origin, right_origin):
+        self.client = client
+        self.clock = clock
+        self.length = length
+        self.content = content
+        self.origin = origin
+        self.right_origin = right_origin
+        self.block = None
+
+    @property
+    def deleted(self):
+        return self.content is None
+
+    @property
+    def visible_length(self):
+        return 0 if self.content is None else self.length
+
+    @property
+    def last_id(self):
+        return (self.client, self.clock + self.length - 1)
+
+    def __repr__(self):
+        return f"Item({self.client}:{self.clock}+{self.length}, {self.content!r})"
+
+
+class _Block:
+    __slots__ = ("items", "index", "visible")
+
+    def __init__(self, index, items=None):
+        self.items = items or []
+        self.index = index
+        self.visible = sum(item.visible_length for item in self.items)
+
+
+def write_varint(out, value):
+    """Append `value` to a bytearray as an unsigned LEB128 varint."""
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+class ByteReader:
+    """Sequential reader for varints and length-prefixed strings."""
+    def __init__(self, data):
+        self.data = data
+        self.position = 0
+
+    def varint(self):
+        result, shift = 0, 0
+        while True:
+            byte = self.data[self.position]
+            self.position += 1
+            result |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return result
+            shift += 7
+
+    def byte(self):
+        value = self.data[self.position]
+        self.position += 1
+        return value
+
+    def raw(self):
+        length = self.varint()
+        start = self.position
+        self.position += length
+        return bytes(self.data[start:self.position])
+
+    def string(self):
+        return self.raw().decode("utf-8")
+
+
+def encode_update(structs, deletes):
+    """Encode structs [(client, clock, origin, right_origin, length, content)] and
+    delete ranges [(client, clock, length)] into the compact binary update format.
+
+    Client ids are written once into a table and referenced by index, and all
+    integers are LEB128 varints, so typical structs take a handful of bytes.
+    """
+    clients = {}
+
+    def client_index(client):
+        if client not in clients:
+            clients[client] = len(clients)
+        return clients[client]
+
+    body = bytearray()
+    write_varint(body, len(structs))
+    for client, clock, origin, right_origin, length, content in structs:
+        flags = (_HAS_ORIGIN if origin else 0) | (_HAS_RIGHT_ORIGIN if right_origin else 0)
+        flags |= _DELETED if content is None else 0
+        write_varint(body, client_index(client))
+        write_varint(body, clock)
+        body.append(flags)
+        for reference in (origin, right_origin):
+            if reference:
+                write_varint(body, client_index(reference[0]))
+                write_varint(body, reference[1])
+        if content is None:
+            write_varint(body, length)
+        else:
+            encoded = content.encode("utf-8")
+            write_varint(body, len(encoded))
+            body.extend(encoded)
+    write_varint(body, len(deletes))
+    for client, clock, length in deletes:
+        write_varint(body, client_index(client))
+        write_varint(body, clock)
+        write_varint(body, length)
+
+    header = bytearray([UPDATE_VERSION])
+    write_varint(header, len(clients))
+    for client in clients:
+        write_varint(header, client)
+    return bytes(header + body)
+
+
+def decode_update(data):
+    """Decode an update into (structs, deletes); the inverse of `encode_update`."""
+    reader = ByteReader(data)
+    if reader.byte() != UPDATE_VERSION:
+        raise ValueError("Unsupported CRDT update version")
+    clients = [reader.varint() for _ in range(reader.varint())]
+    structs = []
+    for _ in range(reader.varint()):
+        client = clients[reader.varint()]
+        clock = reader.varint()
+        flags = reader.byte()
+        origin = (clients[reader.varint()], reader.varint()) if flags & _HAS_ORIGIN else None
+        right_origin = (clients[reader.varint()], reader.varint()) if flags & _HAS_RIGHT_ORIGIN else None
+        if flags & _DELETED:
+            content, length = None, reader.varint()
+        else:
+            content = reader.string()
+            length = len(content)
+        structs.append((client, clock, origin, right_origin, length, content))
+    deletes = [(clients[reader.varint()], reader.varint(), reader.varint()) for _ in range(reader.varint())]
+    return structs, deletes
+
+
+def write_state_vector(out, state):
+    """Append a {client: clock} state vector to a bytearray as varints."""
+    write_varint(out, len(state))
+    for client, clock in state.items():
+        write_varint(out, client)
+        write_varint(out, clock)
+
+
+def read_state_vector(reader):
+    """Read a state vector written by `write_state_vector` from a ByteReader."""
+    return {reader.varint(): reader.varint() for _ in range(reader.varint())}
+
+
+def _merge_ranges(ranges):
+    """Sort and coalesce (clock, length) ranges."""
+    merged = []
+    for clock, length in sorted(ranges):
+        if merged and clock <= merged[-1][0] + merged[-1][1]:
+            last_clock, last_length = merged[-1]
+            merged[-1] = (last_clock, max(last_length, clock + length - last_clock))
+        else:
+            merged.append((clock, length))
+    return merged
+
+
+class TextCRDT:
+    """Sequence CRDT for plain text, using YATA ordering for concurrent inserts.
+
+    Items are kept in document order inside blocks of about BLOCK_SIZE items.
+    A Fenwick tree over the blocks' visible lengths finds the item at a
+    position in O(log blocks + BLOCK_SIZE). Per-client sorted clock arrays
+    resolve a character id to its item by bisection. Consecutive inserts by
+    one client are merged into a single item, and deletions turn items into
+    length-only tombstones.
+
+    Observers registered with `observe` receive ("insert", position, text) and
+    ("delete", position, length) events for remote changes. Update listeners
+    receive the encoded update of every local change.
+    """
+    def __init__(self, client_id=None):
+        self.client = client_id if client_id is not None else random.getrandbits(32)
+        self.state = {}  # client -> next unseen clock
+        self.delete_set = {}  # client -> [(clock, length)]
+        self._blocks = [_Block(0)]
+        self._tree = [0, 0]
+        self._client_starts = {}  # client -> sorted item clocks
+        self._client_items = {}  # client -> items, parallel to _client_starts
+        self._pending_structs = []
+        self._pending_deletes = []
+        self._observers = []
+        self._update_listeners = []
+
+    # Position index -------------------------------------------------------
+
+    def _rebuild_tree(self):
+        size = len(self._blocks)
+        tree = [0] * (size + 1)
+        for index, block in enumerate(self._blocks, 1):
+            tree[index] += block.visible
+            parent = index + (index & -index)
+            if parent <= size:
+                tree[parent] += tree[index]
+        self._tree = tree
+
+    def _tree_add(self, block, delta):
+        block.visible += delta
+        index, tree = block.index + 1, self._tree
+        while index < len(tree):
+            tree[index] += delta
+            index += index & -index
+
+    def _tree_prefix(self, block_index):
+        total, tree = 0, self._tree
+        while block_index > 0:
+            total += tree[block_index]
+            block_index -= block_index & -block_index
+        return total
+
+    def _locate(self, position):
+        """Return (item, offset) for the visible character at `position`."""
+        tree, index, remaining = self._tree, 0, position
+        step = 1 << (len(tree) - 1).bit_length()
+        while step:
+            candidate = index + step
+            if candidate < len(tree) and tree[candidate] <= remaining:
+                index = candidate
+                remaining -= tree[candidate]
+            step >>= 1
+        if index >= len(self._blocks):
+            raise IndexError(position)
+        for item in self._blocks[index].items:
+            if item.content is not None:
+                if remaining < item.length:
+                    return item, remaining
+                remaining -= item.length
+        raise IndexError(position)
+
+    def _position_of(self, item):
+        """Return the number of visible characters before `item`."""
+        block = item.block
+        position = self._tree_prefix(block.index)
+        for other in block.items:
+            if other is item:
+                return position
+            position += other.visible_length
+        raise ValueError("item is not in its block")
+
+    def _successor(self, item):
+        block = item.block
+        index = block.items.index(item) + 1
+        if index < len(block.items):
+            return block.items[index]
+        for block in self._blocks[block.index + 1:]:
+            if block.items:
+                return block.items[0]
+        return None
+
+    def _first(self):
+        for block in self._blocks:
+            if block.items:
+                return block.items[0]
+        return None
+
+    def _insert_after(self, left, item):
+        if left is None:
+            block = self._blocks[0]
+            block.items.insert(0, item)
+        else:
+            block = left.block
+            block.items.insert(block.items.index(left) + 1, item)
+        item.block = block
+        if item.content is not None:
+            self._tree_add(block, item.length)
+        if len(block.items) > 2 * BLOCK_SIZE:
+            self._split_block(block)
+
+    def _split_block(self, block):
+        half = len(block.items) // 2
+        moved = block.items[half:]
+        del block.items[half:]
+        new_block = _Block(block.index + 1, moved)
+        for item in moved:
+            item.block = new_block
+        block.visible -= new_block.visible
+        self._blocks.insert(block.index + 1, new_block)
+        for index in range(block.index + 2, len(self._blocks)):
+            self._blocks[index].index = index
+        self._rebuild_tree()
+
+    # Id index --------------------------------------------------------------
+
+    def _register(self, item):
+        starts = self._client_starts.setdefault(item.client, [])
+        items = self._client_items.setdefault(item.client, [])
+        index = bisect_right(starts, item.clock)
+        starts.insert(index, item.clock)
+        items.insert(index, item)
+
+    def _find(self, char_id):
+        client, clock = char_id
+        starts = self._client_starts[client]
+        return self._client_items[client][bisect_right(starts, clock) - 1]
+
+    def _split_item(self, item, offset):
+        """Split `item` after `offset` characters and return the right half."""
+        right = Item(item.client, item.clock + offset, item.length - offset,
+                     None if item.content is None else item.content[offset:],
+                     (item.client, item.clock + offset - 1), item.right_origin)
+        if item.content is not None:
+            item.content = item.content[:offset]
+        item.length = offset
+        block = item.block
+        block.items.insert(block.items.index(item) + 1, right)
+        right.block = block
+        self._register(right)
+        if len(block.items) > 2 * BLOCK_SIZE:
+            self._split_block(block)
+        return right
+
+    def _item_ending_at(self, char_id):
+        item = self._find(char_id)
+        offset = char_id[1] - item.clock + 1
+        if offset < item.length:
+            self._split_item(item, offset)
+        return item
+
+    def _item_starting_at(self, char_id):
+        item = self._find(char_id)
+        offset = char_id[1] - item.clock
+        return self._split_item(item, offset) if offset else item
+
+    @staticmethod
+    def _can_extend(left, client, clock, right_origin, deleted):
+        return (left is not None and left.client == client and left.clock + left.length == clock
+                and left.right_origin == right_origin and left.deleted == deleted)
+
+    # Local edits -------------------------------------------------------------
+
+    def __len__(self):
+        return self._tree_prefix(len(self._blocks))
+
+    def text(self):
+        """Return the visible document text."""
+        return "".join(item.content for block in self._blocks for item in block.items
+                       if item.content is not None)
+
+    def insert(self, position, text):
+        """Insert `text` at a visible `position` on behalf of the local client."""
+        if not text:
+            return
+        if position > 0:
+            left, offset = self._locate(position - 1)
+            if offset < left.length - 1:
+                self._split_item(left, offset + 1)
+            right = self._successor(left)
+        else:
+            left, right = None, self._first()
+        origin = left.last_id if left is not None else None
+        right_origin = (right.client, right.clock) if right is not None else None
+        clock = self.state.get(self.client, 0)
+
+        if self._can_extend(left, self.client, clock, right_origin, False):
+            # Typing continues the previous run: grow it instead of adding an item
+            left.content += text
+            left.length += len(text)
+            self._tree_add(left.block, len(text))
+        else:
+            item = Item(self.client, clock, len(text), text, origin, right_origin)
+            self._insert_after(left, item)
+            self._register(item)
+        self.state[self.client] = clock + len(text)
+        if self._update_listeners:
+            self._emit_update([(self.client, clock, origin, right_origin, len(text), text)], [])
+
+    def delete(self, position, length):
+        """Delete `length` visible characters starting at `position`."""
+        if length <= 0:
+            return
+        item, offset = self._locate(position)
+        if offset:
+            item = self._split_item(item, offset)
+        deleted = []
+        while item is not None and length > 0:
+            if item.content is not None:
+                if item.length > length:
+                    self._split_item(item, length)
+                length -= item.length
+                self._mark_deleted(item)
+                deleted.append((item.client, item.clock, item.length))
+            item = self._successor(item)
+        if self._update_listeners and deleted:
+            self._emit_update([], deleted)
+
+    def _mark_deleted(self, item):
+        self._tree_add(item.block, -item.length)
+        item.content = None
+        self.delete_set.setdefault(item.client, []).append((item.clock, item.length))
+
+    # Remote updates ---------------------------------------------------------
+
+    def apply_update(self, data):
+        """Integrate an encoded update; unknown dependencies are kept pending."""
+        structs, deletes = decode_update(data)
+        self._pending_structs.extend(structs)
+        self._pending_deletes.extend(deletes)
+        progress = True
+        while progress and self._pending_structs:
+            progress = False
+            waiting = []
+            for struct in sorted(self._pending_structs, key=lambda s: (s[0], s[1])):
+                if self._integrate(*struct):
+                    progress = True
+                else:
+                    waiting.append(struct)
+            self._pending_structs = waiting
+        self._pending_deletes = [remaining for delete in self._pending_deletes
+                                 for remaining in self._apply_delete(*delete)]
+
+    def has_pending(self):
+        """Return True if some received changes still wait for their dependencies."""
+        return bool(self._pending_structs or self._pending_deletes)
+
+    def _known(self, char_id):
+        return char_id is None or char_id[1] < self.state.get(char_id[0], 0)
+
+    def _integrate(self, client, clock, origin, right_origin, length, content):
+        known = self.state.get(client, 0)
+        if clock > known:
+            return False
+        if clock + length <= known:
+            return True  # Already integrated
+        if clock < known:
+            skip = known - clock
+            origin = (client, known - 1)
+            content = None if content is None else content[skip:]
+            clock, length = known, length - skip
+        if not (self._known(origin) and self._known(right_origin)):
+            return False
+
+        left = self._item_ending_at(origin) if origin else None
+        right = self._item_starting_at(right_origin) if right_origin else None
+        # YATA: skip over concurrent items that must stay left of the new one
+        candidate = self._successor(left) if left is not None else self._first()
+        before_origin, conflicting = set(), set()
+        while candidate is not None and candidate is not right:
+            before_origin.add(candidate)
+            conflicting.add(candidate)
+            if candidate.origin == origin:
+                if candidate.client < client:
+                    left = candidate
+                    conflicting.clear()
+                elif candidate.right_origin == right_origin:
+                    break
+            else:
+                candidate_origin = self._find(candidate.origin) if candidate.origin else None
+                if candidate_origin is not None and candidate_origin in before_origin:
+                    if candidate_origin not in conflicting:
+                        left = candidate
+                        conflicting.clear()
+                else:
+                    break
+            candidate = self._successor(candidate)
+
+        deleted = content is None
+        if (self._can_extend(left, client, clock, right_origin, deleted)
+                and origin == left.last_id):
+            item = left
+            offset = item.length
+            if not deleted:
+                item.content += content
+                self._tree_add(item.block, length)
+            item.length += length
+        else:
+            item = Item(client, clock, length, content, origin, right_origin)
+            self._insert_after(left, item)
+            self._register(item)
+            offset = 0
+        self.state[client] = clock + length
+        if deleted:
+            self.delete_set.setdefault(client, []).append((clock, length))
+        elif self._observers:
+            self._notify("insert", self._position_of(item) + offset, content)
+        return True
+
+    def _apply_delete(self, client, clock, length):
+        """Delete a range of character ids, returning the part that is not known yet."""
+        known = self.state.get(client, 0)
+        end = clock + length
+        start = max(clock, known)
+        remaining = [(client, start, end - start)] if end > start else []
+        end = min(end, known)
+        while clock < end:
+            item = self._item_starting_at((client, clock))
+            if item.clock + item.length > end:
+                self._split_item(item, end - item.clock)
+            if item.content is not None:
+                position = self._position_of(item) if self._observers else 0
+                self._mark_deleted(item)
+                if self._observers:
+                    self._notify("delete", position, item.length)
+            clock = item.clock + item.length
+        return remaining
+
+    # Encoding ---------------------------------------------------------------
+
+    def encode_state_vector(self):
+        """Return {client: clock} describing everything this replica has seen."""
+        return dict(self.state)
+
+    def encode_state_as_update(self, state_vector=None):
+        """Encode everything missing from a peer with `state_vector` (all of it by default)."""
+        state_vector = state_vector or {}
+        structs = []
+        for client, items in self._client_items.items():
+            since = state_vector.get(client, 0)
+            start = max(0, bisect_right(self._client_starts[client], since) - 1)
+            for item in items[start:]:
+                if item.clock + item.length <= since:
+                    continue
+                skip = max(0, since - item.clock)
+                origin = (client, item.clock + skip - 1) if skip else item.origin
+                content = None if item.content is None else item.content[skip:]
+                structs.append((client, item.clock + skip, origin, item.right_origin,
+                                item.length - skip, content))
+        deletes = [(client, clock, length) for client, ranges in self.delete_set.items()
+                   for clock, length in _merge_ranges(ranges)]
+        return encode_update(structs, deletes)
+
+    # Garbage collection -----------------------------------------------------
+
+    def gc(self):
+        """Compact tombstones: merge adjacent deleted runs and coalesce the delete set.
+
+        Tombstones cannot be dropped outright because concurrent inserts may
+        still name them as origins; merged, they cost one item per run.
+        Returns the number of items removed.
+        """
+        removed = 0
+        for block in self._blocks:
+            kept = []
+            for item in block.items:
+                previous = kept[-1] if kept else None
+                if (item.content is None and previous is not None
+                        and self._can_extend(previous, item.client, item.clock, item.right_origin, True)
+                        and item.origin == previous.last_id):
+                    previous.length += item.length
+                    self._unregister(item)
+                    removed += 1
+                else:
+                    kept.append(item)
+            block.items = kept
+        self.delete_set = {client: _merge_ranges(ranges) for client, ranges in self.delete_set.items()}
+        return removed
+
+    def _unregister(self, item):
+        starts = self._client_starts[item.client]
+        index = bisect_right(starts, item.clock) - 1
+        del starts[index]
+        del self._client_items[item.client][index]
+
+    def item_count(self):
+        """Return the number of items, a proxy for memory use."""
+        return sum(len(block.items) for block in self._blocks)
+
+    # Events -----------------------------------------------------------------
+
+    def observe(self, callback):
+        """Call `callback(kind, position, value)` for every remote change."""
+        self._observers.append(callback)
+
+    def on_update(self, callback):
+        """Call `callback(update_bytes)` for every local change."""
+        self._update_listeners.append(callback)
+
+    def _notify(self, kind, position, value):
+        for callback in self._observers:
+            callback(kind, position, value)
+
+    def _emit_update(self, structs, deletes):
+        update = encode_update(structs, deletes)
+        for callback in self._update_listeners:
+            callback(update)
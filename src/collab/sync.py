@@ -0,0 +1,358 @@
+# src/collab/sync.py
+
+import asyncio
+import logging
+import struct
+import zlib
+
+from src.collab.crdt import ByteReader, TextCRDT, read_state_vector, write_state_vector, write_varint
+
+FLUSH_INTERVAL = 0.02  # Seconds local edits are batched before a frame is sent
+COMPRESS_THRESHOLD = 256  # Payloads smaller than this are never compressed
+RECONNECT_DELAYS = (0.1, 0.5, 1.0, 2.0, 5.0)
+PEER_QUEUE_FRAMES = 256  # Frames queued for a relay peer before it is dropped as too slow to keep up
+MAX_FRAME_BYTES = 64 * 1024 * 1024  # Largest payload accepted, on the wire and after decompression
+
+MSG_HELLO = 1  # client -> server: document name and client state vector
+MSG_SYNC = 2  # server -> client: server state vector and the structs the client lacks
+MSG_UPDATE = 3  # both ways: a sequence number and a batch of CRDT updates
+MSG_ACK = 4  # server -> client: acknowledged sequence number and server state vector
+
+_HEADER = struct.Struct(">IBB")  # payload length, message type, flags
+_FLAG_ZLIB = 1
+_DECODE_ERRORS = (IndexError, KeyError, ValueError, zlib.error)  # What a malformed payload raises
+
+log = logging.getLogger(__name__)
+
+
+class SyncStats:
+    """Byte and frame counters for one side of a connection."""
+    def __init__(self):
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.frames_sent = 0
+        self.frames_received = 0
+        self.frames_dropped = 0  # Malformed frames skipped, or frames for peers that fell behind
+
+
+def encode_frame(kind, payload, compress=False):
+    """Return a length-prefixed frame, zlib-compressed when that makes it smaller."""
+    flags = 0
+    if compress and len(payload) >= COMPRESS_THRESHOLD:
+        compressed = zlib.compress(payload, 1)
+        if len(compressed) < len(payload):
+            payload, flags = compressed, _FLAG_ZLIB
+    return _HEADER.pack(len(payload), kind, flags) + payload
+
+
+async def read_frame(reader):
+    """Read one frame and return (kind, payload, wire_size).
+
+    A length over MAX_FRAME_BYTES raises ConnectionError, as the stream
+    cannot be resynchronised without reading it. A payload that fails to
+    decompress, or would decompress past MAX_FRAME_BYTES, has been read in
+    full and raises one of _DECODE_ERRORS, so callers can drop just that frame.
+    """
+    header = await reader.readexactly(_HEADER.size)
+    length, kind, flags = _HEADER.unpack(header)
+    if length > MAX_FRAME_BYTES:
+        raise ConnectionError(f"Frame of {length} bytes exceeds the {MAX_FRAME_BYTES} byte limit")
+    payload = await reader.readexactly(length)
+    if flags & _FLAG_ZLIB:
+        decompressor = zlib.decompressobj()
+        payload = decompressor.decompress(payload, MAX_FRAME_BYTES)
+        if decompressor.unconsumed_tail:
+            raise ValueError(f"Frame decompresses past the {MAX_FRAME_BYTES} byte limit")
+        if not decompressor.eof:
+            raise zlib.error("Truncated compressed frame")
+    return kind, payload, _HEADER.size + length
+
+
+def _update_payload(sequence, updates):
+    out = bytearray()
+    write_varint(out, sequence)
+    write_varint(out, len(updates))
+    for update in updates:
+        write_varint(out, len(update))
+        out.extend(update)
+    return bytes(out)
+
+
+def _read_updates(reader):
+    return [reader.raw() for _ in range(reader.varint())]
+
+
+class _Peer:
+    """A relay connection whose frames go through a bounded queue, drained by its own task."""
+    def __init__(self, writer):
+        self.writer = writer
+        self.queue = asyncio.Queue(PEER_QUEUE_FRAMES)
+        self.task = asyncio.ensure_future(self._pump())
+
+    async def _pump(self):
+        try:
+            while True:
+                self.writer.write(await self.queue.get())
+                await self.writer.drain()
+        except ConnectionError:
+            pass  # The reading side sees the same failure and ends the session
+
+    def send(self, frame):
+        """Queue `frame`; return False, and disconnect the peer, if its queue is full."""
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            self.writer.transport.abort()  # It resyncs from its state vector on reconnect
+            return False
+        return True
+
+    def close(self):
+        self.task.cancel()
+        self.writer.close()
+
+
+class RelayServer:
+    """In-process stand-in for the collaboration backend.
+
+    Keeps an authoritative TextCRDT per document so a connecting client gets
+    exactly the structs its state vector is missing, and relays each update
+    frame unchanged to the document's other peers. Each peer has a bounded
+    send queue, so one slow reader cannot grow the relay's buffers without
+    limit; a peer whose queue fills up is disconnected instead.
+    """
+    def __init__(self, compress=False):
+        self.compress = compress
+        self.documents = {}
+        self.peers = {}  # document name -> set of _Peer
+        self.stats = SyncStats()
+        self.server = None
+
+    async def start(self, host="127.0.0.1", port=0):
+        """Listen on TCP and return the bound port."""
+        self.server = await asyncio.start_server(self._handle, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def start_unix(self, path):
+        """Listen on a Unix domain socket."""
+        self.server = await asyncio.start_unix_server(self._handle, path)
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        for peers in self.peers.values():
+            for peer in list(peers):
+                peer.close()
+
+    def _send(self, peer, frame):
+        if peer.send(frame):
+            self.stats.bytes_sent += len(frame)
+            self.stats.frames_sent += 1
+        else:
+            self.stats.frames_dropped += 1
+
+    async def _handle(self, reader, writer):
+        name = None
+        client = _Peer(writer)
+        try:
+            kind, payload, size = await read_frame(reader)
+            self.stats.bytes_received += size
+            if kind != MSG_HELLO:
+                return
+            hello = ByteReader(payload)
+            name = hello.string()
+            client_state = read_state_vector(hello)
+            document = self.documents.setdefault(name, TextCRDT(0))
+
+            out = bytearray()
+            write_state_vector(out, document.encode_state_vector())
+            missing = document.encode_state_as_update(client_state)
+            write_varint(out, len(missing))
+            out.extend(missing)
+            self._send(client, encode_frame(MSG_SYNC, bytes(out), self.compress))
+            self.peers.setdefault(name, set()).add(client)
+
+            while True:
+                try:
+                    kind, payload, size = await read_frame(reader)
+                    self.stats.bytes_received += size
+                    self.stats.frames_received += 1
+                    if kind != MSG_UPDATE:
+                        continue
+                    message = ByteReader(payload)
+                    sequence = message.varint()
+                    for update in _read_updates(message):
+                        document.apply_update(update)
+                except _DECODE_ERRORS as e:
+                    self.stats.frames_dropped += 1
+                    log.warning("Dropped a malformed frame from a %s peer: %r", name, e)
+                    continue
+                frame = encode_frame(MSG_UPDATE, payload, self.compress)  # Encoded once for every peer
+                for peer in list(self.peers[name]):
+                    if peer is not client:
+                        self._send(peer, frame)
+                ack = bytearray()
+                write_varint(ack, sequence)
+                write_state_vector(ack, document.encode_state_vector())
+                self._send(client, encode_frame(MSG_ACK, bytes(ack), self.compress))
+        except (asyncio.IncompleteReadError, ConnectionError, *_DECODE_ERRORS):
+            pass  # A malformed hello ends the connection before it joins the document
+        finally:
+            if name is not None:
+                self.peers.get(name, set()).discard(client)
+            client.close()
+
+
+class SyncClient:
+    """Keeps a TextCRDT in sync with a relay over TCP or a Unix socket.
+
+    Connecting starts with a state-vector handshake, so only missing structs
+    travel in either direction, including after a reconnect. Local updates
+    are queued and flushed as one frame every `flush_interval` seconds.
+    `acked_state` holds the server state vector from the last acknowledgement.
+    """
+    def __init__(self, crdt, document, host="127.0.0.1", port=None, path=None,
+                 compress=False, flush_interval=FLUSH_INTERVAL, apply_remote=None):
+        self.crdt = crdt
+        self.document = document
+        self.host = host
+        self.port = port
+        self.path = path
+        self.compress = compress
+        self.flush_interval = flush_interval
+        self.apply_remote = apply_remote or crdt.apply_update
+        self.acked_state = {}
+        self.stats = SyncStats()
+        self.synced = asyncio.Event()
+        self._outbox = []
+        self._sequence = 0
+        self._writer = None
+        self._task = None
+        self._closed = False
+        crdt.on_update(self._outbox.append)
+
+    def start(self):
+        """Run the connection loop, reconnecting with backoff, in a background task."""
+        self._task = asyncio.ensure_future(self._run())
+        return self._task
+
+    async def close(self):
+        self._closed = True
+        if self._writer is not None:
+            self._writer.close()
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def drop_connection(self):
+        """Abort the current connection; the client reconnects and resumes."""
+        if self._writer is not None:
+            self._writer.transport.abort()
+
+    async def _open(self):
+        if self.path is not None:
+            return await asyncio.open_unix_connection(self.path)
+        return await asyncio.open_connection(self.host, self.port)
+
+    async def _run(self):
+        attempt = 0
+        while not self._closed:
+            try:
+                reader, writer = await self._open()
+            except OSError:
+                await asyncio.sleep(RECONNECT_DELAYS[min(attempt, len(RECONNECT_DELAYS) - 1)])
+                attempt += 1
+                continue
+            attempt = 0
+            if self._closed:  # Closed while connecting
+                writer.close()
+                break
+            self._writer = writer
+            flusher = asyncio.ensure_future(self._flush_loop())
+            try:
+                await self._session(reader)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                pass
+            finally:
+                self.synced.clear()
+                flusher.cancel()
+                writer.close()
+                self._writer = None
+
+    def _send(self, kind, payload):
+        frame = encode_frame(kind, payload, self.compress)
+        self._writer.write(frame)
+        self.stats.bytes_sent += len(frame)
+        self.stats.frames_sent += 1
+
+    async def _session(self, reader):
+        hello = bytearray()
+        encoded_name = self.document.encode("utf-8")
+        write_varint(hello, len(encoded_name))
+        hello.extend(encoded_name)
+        write_state_vector(hello, self.crdt.encode_state_vector())
+        self._send(MSG_HELLO, bytes(hello))
+
+        try:
+            kind, payload, size = await read_frame(reader)
+        except _DECODE_ERRORS as e:
+            raise ConnectionError(f"Malformed sync reply from relay: {e!r}") from e  # Reconnect and ask again
+        self.stats.bytes_received += size
+        if kind != MSG_SYNC:
+            raise ConnectionError("Expected sync reply from relay")
+        message = ByteReader(payload)
+        try:
+            server_state = read_state_vector(message)
+        except _DECODE_ERRORS as e:
+            raise ConnectionError(f"Malformed sync reply from relay: {e!r}") from e
+        self.acked_state = server_state
+        try:
+            self.apply_remote(message.raw())
+        except _DECODE_ERRORS as e:
+            self._drop_frame(e)  # The next handshake asks for those structs again
+
+        # Everything the server lacks, including edits made while offline, in one frame
+        self._outbox.clear()
+        missing = self.crdt.encode_state_as_update(server_state)
+        self._sequence += 1
+        self._send(MSG_UPDATE, _update_payload(self._sequence, [missing]))
+        self.synced.set()
+
+        while True:
+            try:
+                kind, payload, size = await read_frame(reader)
+            except _DECODE_ERRORS as e:
+                self._drop_frame(e)
+                continue
+            self.stats.bytes_received += size
+            self.stats.frames_received += 1
+            message = ByteReader(payload)
+            try:
+                if kind == MSG_UPDATE:
+                    message.varint()
+                    for update in _read_updates(message):
+                        self.apply_remote(update)
+                elif kind == MSG_ACK:
+                    message.varint()
+                    self.acked_state = read_state_vector(message)
+            except _DECODE_ERRORS as e:
+                self._drop_frame(e)
+
+    def _drop_frame(self, error):
+        """Skip a malformed frame; the connection and the rest of the stream stay usable."""
+        self.stats.frames_dropped += 1
+        log.warning("Dropped a malformed frame for %s: %r", self.document, error)
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self):
+        """Send queued local updates as a single frame."""
+        if not self._outbox or self._writer is None or not self.synced.is_set():
+            return
+        updates = self._outbox[:]
+        self._outbox.clear()
+        self._sequence += 1
+        self._send(MSG_UPDATE, _update_payload(self._sequence, updates))
+        await self._writer.drain()
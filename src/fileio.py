@@ -0,0 +1,34 @@
+import os
+import tempfile
+
+# mkstemp creates files as 0600; new files should get the usual umask-derived mode
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def atomic_write(path, write, binary=False, fsync=True, encoding="utf-8"):
+    """Write a file via a temp file in the same folder and os.replace it into place.
+
+    `write` receives the open temp file. Readers see either the old or the new
+    contents, never a partial file, and the original permissions are kept.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with (os.fdopen(fd, "wb") if binary else os.fdopen(fd, "w", encoding=encoding)) as f:
+            write(f)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        try:
+            mode = os.stat(path).st_mode & 0o7777
+        except FileNotFoundError:
+            mode = 0o666 & ~_UMASK
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
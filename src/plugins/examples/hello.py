@@ -0,0 +1,29 @@
+# src/plugins/examples/hello.py
+"""Reference plugin.
+
+The host reads MANIFEST without importing this file, so it must stay a
+plain literal. `activate(api)` runs the first time one of the activation
+events fires; everything it registers is timed against the host's budgets.
+"""
+
+MANIFEST = {
+    "name": "hello",
+    "version": "1.0.0",
+    "activation_events": ["onCommand:hello.greet", "onLanguage:python"],
+    "commands": ["hello.greet", "hello.count_lines"],
+    "isolated": False,  # Set to True to run in a worker process instead
+}
+
+
+def greet(name="world"):
+    return f"Hello, {name}!"
+
+
+def count_lines(text):
+    return text.count("\n") + 1
+
+
+def activate(api):
+    api.register_command("hello.greet", greet)
+    api.register_command("hello.count_lines", count_lines)
+    api.on("onLanguage:python", lambda language: api.post("status", "Hello from the Python plugin"))
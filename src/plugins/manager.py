@@ -0,0 +1,525 @@
+# src/plugins/manager.py
+
+import ast
+import importlib.util
+import json
+import multiprocessing
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import Future
+
+from src.fileio import atomic_write
+
+INDEX_VERSION = 1
+ACTIVATION_BUDGET_MS = 250  # Activations slower than this count as a strike
+CALLBACK_BUDGET_MS = 50  # Commands and event handlers slower than this count as a strike
+THROTTLE_STRIKES = 3  # Strikes before a plugin's event handlers are rate limited
+DISABLE_STRIKES = 10  # Strikes before a plugin is disabled for the session
+THROTTLE_INTERVAL = 1.0  # Seconds between event deliveries to a throttled plugin
+HANG_TIMEOUT = 5.0  # Seconds an isolated call may run before its worker is restarted
+WORKER_COUNT = 2
+
+
+class PluginError(Exception):
+    """Raised when a plugin cannot be activated or a call into it fails."""
+
+
+def read_manifest(path):
+    """Return the literal MANIFEST dict of a plugin file without importing it."""
+    with open(path, "rb") as f:
+        tree = ast.parse(f.read(), path)
+    for node in tree.body:
+        if (isinstance(node, ast.Assign) and len(node.targets) == 1
+                and isinstance(node.targets[0], ast.Name) and node.targets[0].id == "MANIFEST"):
+            try:
+                manifest = ast.literal_eval(node.value)
+            except ValueError:
+                return None
+            return manifest if isinstance(manifest, dict) and manifest.get("name") else None
+    return None
+
+
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(f"lol_plugin_{name}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _settled(result=None, exception=None):
+    """Return a Future that is already resolved."""
+    future = Future()
+    if exception is not None:
+        future.set_exception(exception)
+    else:
+        future.set_result(result)
+    return future
+
+
+def _when_done(futures, callback):
+    """Call `callback()` once every Future in `futures` is done; at once if they already are."""
+    for future in futures:
+        if not future.done():
+            future.add_done_callback(lambda _: _when_done(futures, callback))
+            return
+    callback()
+
+
+class PluginStats:
+    """Timing and budget state for one plugin."""
+    def __init__(self):
+        self.activation_ms = None
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.strikes = 0
+        self.errors = 0
+        self.last_error = None
+
+    def record(self, elapsed_ms, budget_ms):
+        self.calls += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        if elapsed_ms > budget_ms:
+            self.strikes += 1
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+
+class PluginAPI:
+    """What an in-process plugin's `activate(api)` gets to work with."""
+    def __init__(self, host, name):
+        self._host = host
+        self.name = name
+        self.commands = {}
+        self.handlers = {}
+
+    def register_command(self, command, callback):
+        self.commands[command] = callback
+
+    def on(self, event, callback):
+        self.handlers.setdefault(event, []).append(callback)
+
+    def post(self, kind, payload=None):
+        """Send a message, such as a status line, to the editor."""
+        self._host.post(self.name, kind, payload)
+
+
+class _WorkerAPI(PluginAPI):
+    """PluginAPI inside a worker process; posts travel back over the pipe."""
+    def __init__(self, connection, name):
+        super().__init__(None, name)
+        self._connection = connection
+
+    def post(self, kind, payload=None):
+        self._connection.send(("post", self.name, kind, payload))
+
+
+def _worker_main(connection):
+    """Worker process loop: host plugins and answer (request_id, op, name, *args) messages."""
+    plugins = {}
+    while True:
+        try:
+            message = connection.recv()
+        except EOFError:
+            return
+        request_id, op, name = message[:3]
+        args = message[3:]
+        try:
+            if op == "activate":
+                path, = args
+                api = _WorkerAPI(connection, name)
+                module = load_module(name, path)
+                if hasattr(module, "activate"):
+                    module.activate(api)
+                plugins[name] = api
+                result = (sorted(api.commands), sorted(api.handlers))
+            elif op == "command":
+                command, call_args = args
+                result = plugins[name].commands[command](*call_args)
+            elif op == "event":
+                event, payload = args
+                for handler in plugins[name].handlers.get(event, ()):
+                    handler(payload)
+                result = None
+            else:
+                raise PluginError(f"Unknown worker operation: {op}")
+            connection.send(("reply", request_id, True, result))
+        except Exception:
+            connection.send(("reply", request_id, False, traceback.format_exc(limit=5)))
+
+
+class WorkerProcess:
+    """One out-of-process plugin host; calls return Futures resolved by a reader thread."""
+    def __init__(self, on_post):
+        self._on_post = on_post
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self.pending = {}  # request_id -> (future, started, plugin name)
+        context = multiprocessing.get_context("spawn")  # Forking a Qt process is unsafe
+        self._connection, child = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+        self._reader = threading.Thread(target=self._read_replies, daemon=True)
+        self._reader.start()
+
+    def call(self, op, name, *args):
+        future = Future()
+        with self._lock:
+            self._next_id += 1
+            request_id = self._next_id
+            self.pending[request_id] = (future, time.perf_counter(), name)
+            try:
+                self._connection.send((request_id, op, name) + args)
+            except (OSError, ValueError) as e:
+                del self.pending[request_id]
+                future.set_exception(PluginError(f"Plugin worker is gone: {e}"))
+        return future
+
+    def _read_replies(self):
+        while True:
+            try:
+                message = self._connection.recv()
+            except (EOFError, OSError):
+                break
+            if message[0] == "post":
+                self._on_post(*message[1:])
+                continue
+            _, request_id, ok, result = message
+            with self._lock:
+                future = self.pending.pop(request_id, (None,))[0]
+            if future is None:
+                continue
+            if ok:
+                future.set_result(result)
+            else:
+                future.set_exception(PluginError(result))
+        with self._lock:
+            pending, self.pending = self.pending, {}
+        for future, _, _ in pending.values():
+            if not future.done():
+                future.set_exception(PluginError("Plugin worker exited"))
+
+    def oldest_call(self):
+        """Return (age in seconds, plugin name) of the longest outstanding call."""
+        with self._lock:
+            calls = [(started, name) for _, started, name in self.pending.values()]
+        if not calls:
+            return 0.0, None
+        started, name = min(calls)
+        return time.perf_counter() - started, name
+
+    def stop(self):
+        self.process.kill()
+        self.process.join(1)
+        self._connection.close()
+
+
+class Plugin:
+    """A discovered plugin: its manifest, runtime state and statistics."""
+    def __init__(self, path, manifest):
+        self.path = path
+        self.manifest = manifest
+        self.name = manifest["name"]
+        self.version = manifest.get("version", "0")
+        self.activation_events = list(manifest.get("activation_events", ["*"]))
+        self.isolated = bool(manifest.get("isolated", False))
+        self.state = "inactive"  # inactive, activating, active, throttled, disabled or failed
+        self.stats = PluginStats()
+        self.commands = {}  # command -> callable (in-process) or None (isolated)
+        self.handlers = {}
+        self.worker = None
+        self.activation = None  # Future of the activation in progress or done, resolving to usability
+        self.last_delivery = 0.0
+
+
+class PluginHost:
+    """Discovers plugins from a cached manifest index and activates them on demand.
+
+    Startup only stats plugin files; a file is parsed again only when its
+    mtime or size changed, and nothing is imported until one of its
+    `activation_events` fires ("*" for startup, "onCommand:<id>",
+    "onLanguage:<language>" or "onEvent:<name>"; the editor fires "opened",
+    "saved" and "closed" with the file path as payload). Plugins declaring
+    "isolated": True run in a spawned worker process and are called by
+    message passing, and their activation completes in the background: the
+    caller never waits for the worker, and events or commands that arrive
+    meanwhile are delivered once it is done. Each activation and callback is
+    timed against a budget; repeat offenders are throttled, then disabled.
+    """
+    def __init__(self, plugin_folder="src/plugins", index_path="config/plugin_index.json",
+                 worker_count=WORKER_COUNT):
+        self.plugin_folder = plugin_folder
+        self.index_path = index_path
+        self.worker_count = worker_count
+        self.plugins = {}
+        self.listeners = []  # callback(plugin_name, kind, payload); may run off the GUI thread
+        self._workers = []
+        self._next_worker = 0
+        self._lock = threading.RLock()
+
+    # Discovery
+
+    def _load_index(self):
+        try:
+            with open(self.index_path) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return index.get("files", {}) if index.get("version") == INDEX_VERSION else {}
+
+    def scan(self):
+        """Refresh the manifest index, parsing only files that changed since the last scan."""
+        cached = self._load_index()
+        files = {}
+        for root, dirs, names in os.walk(self.plugin_folder):
+            dirs[:] = [d for d in dirs if d != "__pycache__"]
+            for file_name in names:
+                if not file_name.endswith(".py"):
+                    continue
+                path = os.path.join(root, file_name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entry = cached.get(path)
+                if entry is None or entry["mtime"] != stat.st_mtime_ns or entry["size"] != stat.st_size:
+                    try:
+                        manifest = read_manifest(path)
+                    except (OSError, SyntaxError, ValueError):
+                        manifest = None
+                    entry = {"mtime": stat.st_mtime_ns, "size": stat.st_size, "manifest": manifest}
+                files[path] = entry
+
+        if files != cached:
+            try:
+                atomic_write(self.index_path, lambda f: json.dump(
+                    {"version": INDEX_VERSION, "files": files}, f, indent=1), fsync=False)
+            except OSError:
+                pass  # A read-only config folder only costs a re-parse next time
+
+        with self._lock:
+            previous = self.plugins
+            self.plugins = {}
+            for path, entry in sorted(files.items()):
+                manifest = entry["manifest"]
+                if not manifest:
+                    continue
+                old = previous.get(manifest["name"])
+                if old is not None and old.path == path and old.manifest == manifest:
+                    self.plugins[old.name] = old  # Keep running plugins across rescans
+                else:
+                    self.plugins[manifest["name"]] = Plugin(path, manifest)
+        return list(self.plugins.values())
+
+    def commands(self):
+        """Commands contributed by every plugin's manifest, available before activation."""
+        return {command: plugin.name for plugin in self.plugins.values()
+                for command in plugin.manifest.get("commands", ())}
+
+    # Activation
+
+    def _plugins_for(self, event):
+        return [plugin for plugin in self.plugins.values() if event in plugin.activation_events]
+
+    def activate_startup(self):
+        """Activate plugins that declared the "*" startup event."""
+        for plugin in self._plugins_for("*"):
+            self.activate(plugin.name)
+
+    def activate(self, name):
+        """Activate a plugin if it is not running yet; return a Future that resolves to whether it is usable.
+
+        In-process plugins are activated before this returns. Isolated ones
+        resolve from the worker's reader thread, so nothing here blocks on them.
+        """
+        plugin = self.plugins.get(name)
+        if plugin is None:
+            raise PluginError(f"Unknown plugin: {name}")
+        with self._lock:
+            if plugin.state == "activating":
+                return plugin.activation
+            if plugin.state != "inactive":
+                return _settled(plugin.state in ("active", "throttled"))
+            activation = plugin.activation = Future()
+            plugin.state = "activating"
+        if plugin.isolated:
+            plugin.worker = self._worker()  # Spawning is not charged to the plugin
+            started = time.perf_counter()
+            plugin.worker.call("activate", name, plugin.path).add_done_callback(
+                lambda remote: self._finish_activation(plugin, activation, started, remote))
+            return activation
+        started = time.perf_counter()
+        try:
+            api = PluginAPI(self, name)
+            module = load_module(name, plugin.path)
+            if hasattr(module, "activate"):
+                module.activate(api)
+        except Exception as e:
+            self._finish_activation(plugin, activation, started, _settled(exception=e))
+        else:
+            self._finish_activation(plugin, activation, started, _settled((api.commands, api.handlers)))
+        return activation
+
+    def _finish_activation(self, plugin, activation, started, outcome):
+        """Record an activation's outcome, then resolve its `activation` Future."""
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            current = plugin.activation is activation and plugin.state == "activating"
+            error = outcome.exception()
+            if not current:
+                pass  # Disabled, or reset by a worker restart, while it was activating
+            elif error is not None:
+                plugin.state = "failed"
+                plugin.stats.errors += 1
+                plugin.stats.last_error = str(error)
+            else:
+                commands, handlers = outcome.result()
+                if plugin.isolated:
+                    commands, handlers = dict.fromkeys(commands), dict.fromkeys(handlers)
+                plugin.commands = commands
+                plugin.handlers = handlers
+                plugin.stats.activation_ms = elapsed_ms
+                if elapsed_ms > ACTIVATION_BUDGET_MS:
+                    plugin.stats.strikes += 1
+                plugin.state = "active"
+                self._apply_budget(plugin)
+            usable = current and plugin.state in ("active", "throttled")
+        activation.set_result(usable)
+
+    def _worker(self):
+        if len(self._workers) < self.worker_count:
+            self._workers.append(WorkerProcess(self.post))
+        worker = self._workers[self._next_worker % len(self._workers)]
+        self._next_worker += 1
+        return worker
+
+    # Calls
+
+    def _apply_budget(self, plugin):
+        if plugin.stats.strikes >= DISABLE_STRIKES:
+            self.disable(plugin.name)
+        elif plugin.stats.strikes >= THROTTLE_STRIKES and plugin.state == "active":
+            plugin.state = "throttled"
+
+    def _finish_call(self, plugin, started, error=None):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:  # Isolated calls finish on a worker's reader thread
+            plugin.stats.record(elapsed_ms, CALLBACK_BUDGET_MS)
+            if error is not None:
+                plugin.stats.errors += 1
+                plugin.stats.strikes += 1
+                plugin.stats.last_error = str(error)
+            self._apply_budget(plugin)
+
+    def execute_command(self, command, *args):
+        """Run a plugin command, activating its plugin first; return a Future."""
+        event = f"onCommand:{command}"
+        activations = [self.activate(plugin.name) for plugin in self._plugins_for(event)]
+        future = Future()
+        _when_done(activations, lambda: self._run_command(command, args, future))
+        return future
+
+    def _run_command(self, command, args, future):
+        plugin = next((p for p in self.plugins.values()
+                       if command in p.commands and p.state in ("active", "throttled")), None)
+        if plugin is None:
+            future.set_exception(PluginError(f"No active plugin provides {command}"))
+            return
+
+        started = time.perf_counter()
+        if plugin.isolated:
+            def settle(remote):
+                error = remote.exception()
+                self._finish_call(plugin, started, error)  # Before waiters see the result
+                if error is None:
+                    future.set_result(remote.result())
+                else:
+                    future.set_exception(error)
+            plugin.worker.call("command", plugin.name, command, args).add_done_callback(settle)
+            return
+        try:
+            future.set_result(plugin.commands[command](*args))
+        except Exception as e:
+            future.set_exception(e)
+            self._finish_call(plugin, started, e)
+        else:
+            self._finish_call(plugin, started)
+
+    def fire(self, event, payload=None):
+        """Activate plugins waiting for `event`, then deliver it to every handler.
+
+        Plugins still activating get the event once their activation is done.
+        """
+        for activation in (f"onEvent:{event}", event):
+            for plugin in self._plugins_for(activation):
+                self.activate(plugin.name)
+        now = time.perf_counter()
+        for plugin in list(self.plugins.values()):
+            if plugin.state == "activating":
+                plugin.activation.add_done_callback(
+                    lambda _, plugin=plugin: self._deliver(plugin, event, payload, time.perf_counter()))
+            else:
+                self._deliver(plugin, event, payload, now)
+
+    def _deliver(self, plugin, event, payload, now):
+        if event not in plugin.handlers or plugin.state not in ("active", "throttled"):
+            return
+        if plugin.state == "throttled" and now - plugin.last_delivery < THROTTLE_INTERVAL:
+            return  # Dropped; a throttled plugin sees at most one event per interval
+        plugin.last_delivery = now
+        started = time.perf_counter()
+        if plugin.isolated:
+            remote = plugin.worker.call("event", plugin.name, event, payload)
+            remote.add_done_callback(lambda done: self._finish_call(plugin, started, done.exception()))
+            return
+        for handler in plugin.handlers[event]:
+            try:
+                handler(payload)
+            except Exception as e:
+                self._finish_call(plugin, started, e)
+                break
+        else:
+            self._finish_call(plugin, started)
+
+    def language_opened(self, language):
+        self.fire(f"onLanguage:{language}", language)
+
+    def post(self, name, kind, payload=None):
+        for listener in self.listeners:
+            listener(name, kind, payload)
+
+    # Lifecycle
+
+    def disable(self, name):
+        plugin = self.plugins[name]
+        plugin.state = "disabled"
+        plugin.commands = {}
+        plugin.handlers = {}
+
+    def check_workers(self):
+        """Restart workers stuck on a call and disable the plugins that hung them."""
+        for index, worker in enumerate(self._workers):
+            age, culprit = worker.oldest_call()
+            if age < HANG_TIMEOUT and worker.process.is_alive():
+                continue
+            worker.stop()
+            self._workers[index] = WorkerProcess(self.post)
+            for plugin in self.plugins.values():
+                if plugin.worker is not worker:
+                    continue
+                plugin.worker = None
+                if plugin.name == culprit or culprit is None:
+                    plugin.stats.last_error = "Worker stopped responding"
+                    self.disable(plugin.name)
+                elif plugin.state != "disabled":
+                    plugin.state = "inactive"  # Reactivated on the new worker when next needed
+
+    def shutdown(self):
+        for worker in self._workers:
+            worker.stop()
+        self._workers = []
@@ -1,21 +1,162 @@
 import json
 import os
+import threading
+from src.fileio import atomic_write
+
+SAVE_DELAY = 0.5  # Seconds of quiet before pending changes are written as one file
+
+DEFAULTS = {
+    "theme": "dark",
+    "autosave_interval": 30,  # Seconds
+    "font_size": 12,
+    "terminal_scrollback": 10000,  # Lines
+    "tab_memory_budget_mb": 512,
+    "large_file_mb": 8,  # Files at least this large open in the read-only viewer; editing copies the whole file into Qt
+    "perf_hud": False,  # Show the performance HUD, which also turns on slot timing
+    "undo_memory_mb": 8,  # Undo history kept in memory per document; older steps go to config/undo
+}
+
+
+def _coerce(key, value):
+    """Return `value` converted to the type of the key's default, or the default if it does not fit."""
+    default = DEFAULTS.get(key)
+    if default is None or value is None:
+        return value if value is not None else default
+    if isinstance(default, bool):
+        return value if isinstance(value, bool) else default
+    if isinstance(default, (int, float)) and not isinstance(value, bool):
+        try:
+            return type(default)(value)
+        except (TypeError, ValueError):
+            return default
+    return value if isinstance(value, type(default)) else default
+
 
 class SettingsManager:
-    """Manage editor settings."""
-    def __init__(self, config_path="config/settings.json"):
+    """Manage editor settings.
+
+    Settings are read from disk once and then served from memory. Changes
+    notify observers of the changed key, and are written back by a
+    background timer as a single atomic write once changes stop for
+    SAVE_DELAY seconds. `reload_if_changed` picks up edits made to the file
+    by something else.
+    """
+    def __init__(self, config_path="config/settings.json", save_delay=SAVE_DELAY):
         self.config_path = config_path
+        self.save_delay = save_delay
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # One writer at a time: the save timer or a final flush
+        self._observers = {}  # key -> [callback(key, value)]; the key None observes every key
+        self._timer = None
+        self._dirty = False
+        self._disk_state = None  # (mtime_ns, size) of the file as last read or written
         self.settings = self.load_settings()
 
     def load_settings(self):
-        """Load settings from JSON."""
-        if os.path.exists(self.config_path):
+        """Load settings from JSON, filling in typed defaults."""
+        settings = dict(DEFAULTS)
+        try:
             with open(self.config_path, "r") as f:
-                return json.load(f)
-        return {}
+                stored = json.load(f)
+            self._disk_state = self._stat()
+        except (OSError, ValueError):
+            return settings
+        if isinstance(stored, dict):
+            for key, value in stored.items():
+                settings[key] = _coerce(key, value)
+        return settings
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.config_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    # Reading and observing
+
+    def get(self, key, default=None):
+        """Return a setting from memory."""
+        value = self.settings.get(key)
+        return value if value is not None else (default if default is not None else DEFAULTS.get(key))
+
+    def observe(self, key, callback):
+        """Call `callback(key, value)` whenever `key` changes; key None observes every setting."""
+        self._observers.setdefault(key, []).append(callback)
+
+    def unobserve(self, key, callback):
+        callbacks = self._observers.get(key, [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+
+    def _notify(self, changed):
+        for key, value in changed.items():
+            for callback in self._observers.get(key, []) + self._observers.get(None, []):
+                callback(key, value)
+
+    # Writing
+
+    def set(self, key, value):
+        self.update({key: value})
+
+    def update(self, new_settings):
+        """Apply changes in memory, notify observers and schedule one coalesced save."""
+        changed = {}
+        with self._lock:  # The save timer copies the dict on its own thread
+            for key, value in new_settings.items():
+                value = _coerce(key, value)
+                if self.settings.get(key) != value:
+                    self.settings[key] = value
+                    changed[key] = value
+        if changed:
+            self._schedule_save()
+            self._notify(changed)
+        return changed
 
     def save_settings(self, new_settings):
         """Save settings to JSON."""
-        self.settings.update(new_settings)
-        with open(self.config_path, "w") as f:
-            json.dump(self.settings, f, indent=4)
+        self.update(new_settings)
+
+    def _schedule_save(self):
+        with self._lock:
+            self._dirty = True
+            if self._timer is not None:
+                self._timer.cancel()  # Restart the quiet period
+            self._timer = threading.Timer(self.save_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Write pending changes now; called by the save timer and on shutdown."""
+        with self._write_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return False
+                self._dirty = False
+                snapshot = dict(self.settings)
+            # Written outside the lock so the GUI thread never waits on the disk
+            folder = os.path.dirname(self.config_path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            atomic_write(self.config_path, lambda f: json.dump(snapshot, f, indent=4))
+            with self._lock:
+                self._disk_state = self._stat()
+        return True
+
+    # External edits
+
+    def reload_if_changed(self):
+        """Re-read the file if something else changed it; return the settings that changed."""
+        state = self._stat()
+        with self._lock:
+            if state is None or state == self._disk_state or self._dirty:
+                return {}  # Our own write, or local changes that are about to overwrite it
+        stored = self.load_settings()
+        changed = {key: value for key, value in stored.items() if self.settings.get(key) != value}
+        with self._lock:
+            self.settings.update(changed)
+        self._notify(changed)
+        return changed
@@ -0,0 +1,88 @@
+# src/ui/autosave.py
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from PyQt5.QtCore import QObject, pyqtSignal
+from src.fileio import atomic_write
+
+MAX_WRITERS = 4  # Threads writing files concurrently
+MAX_IN_FLIGHT = 8  # Saves queued or running before new ones are deferred
+
+
+class AutosaveService(QObject):
+    """Saves modified editors in the background with atomic, coalesced writes.
+
+    Only documents whose `isModified()` flag is set are saved. A snapshot of the
+    piece table is taken on the GUI thread in O(pieces) and written by a small
+    thread pool. A document edited while its previous save is still running is
+    saved once more when that write finishes, however many edits arrive. When
+    too many writes are in flight the remaining saves wait for the next round.
+    """
+    status = pyqtSignal(str)
+    saved = pyqtSignal(str)  # Path of each file written successfully
+    _write_finished = pyqtSignal(str, object, float)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = ThreadPoolExecutor(max_workers=MAX_WRITERS, thread_name_prefix="autosave")
+        self.in_flight = {}  # path -> editor being written
+        self.resave = {}  # path -> editor edited again while its write was running
+        self._write_finished.connect(self._on_write_finished)
+
+    def save_modified(self, editors):
+        """Queue a save for every modified editor that has a file on disk."""
+        deferred = 0
+        for editor in editors:
+            path = editor.file_path
+            if not path or editor.is_loading() or not editor.document().isModified():
+                continue
+            if path in self.in_flight:
+                self.resave[path] = editor  # Coalesce: one follow-up save covers all edits
+            elif len(self.in_flight) >= MAX_IN_FLIGHT:
+                deferred += 1
+            else:
+                self._submit(path, editor)
+        if deferred:
+            self.status.emit(f"Autosave: disk busy, {deferred} files deferred")
+
+    def _submit(self, path, editor):
+        snapshot = editor.buffer.snapshot()
+        encoding = editor.buffer.encoding
+        editor.document().setModified(False)
+        self.in_flight[path] = editor
+        self.pool.submit(self._write, path, snapshot, encoding)
+
+    def _write(self, path, snapshot, encoding):
+        """Worker thread: write one snapshot and report back through a queued signal."""
+        started = time.perf_counter()
+        try:
+            atomic_write(path, snapshot.write_to, encoding=encoding)
+            error = None
+        except Exception as e:
+            error = e
+        self._write_finished.emit(path, error, time.perf_counter() - started)
+
+    def _on_write_finished(self, path, error, seconds):
+        editor = self.in_flight.pop(path, None)
+        if error is not None:
+            try:
+                editor.document().setModified(True)  # Try again next round
+            except (AttributeError, RuntimeError):
+                pass
+            self.status.emit(f"Autosave failed: {os.path.basename(path)}: {error}")
+        else:
+            self.status.emit(f"Autosaved: {path} ({seconds * 1000:.0f} ms)")
+            self.saved.emit(path)
+
+        editor = self.resave.pop(path, None)
+        if editor is not None:
+            try:
+                if editor.document().isModified():
+                    self._submit(path, editor)
+            except RuntimeError:
+                pass  # The tab was closed in the meantime
+
+    def shutdown(self):
+        """Wait for running writes to finish."""
+        self.pool.shutdown(wait=True)
@@ -0,0 +1,112 @@
+# src/ui/chat_history.py
+
+import json
+import os
+import time
+from array import array
+from collections import OrderedDict
+
+PAGE_SIZE = 64  # Messages read from disk at a time
+CACHED_PAGES = 8  # Pages kept in memory, so history costs the same however long it is
+SCAN_CHUNK = 1024 * 1024
+
+
+class ChatMessage:
+    """One chat message; `index` is its position in the log."""
+    __slots__ = ("index", "role", "text", "time")
+
+    def __init__(self, index, role, text, timestamp=None):
+        self.index = index
+        self.role = role
+        self.text = text
+        self.time = timestamp if timestamp is not None else time.time()
+
+    def __repr__(self):
+        return f"ChatMessage({self.index}, {self.role!r}, {self.text[:20]!r})"
+
+
+class ChatLog:
+    """Append-only JSON-lines message log with random access by message index.
+
+    Only the byte offset of each record stays in memory. Messages are read
+    back a page at a time and a few recent pages are cached. A record left
+    incomplete by a crash is cut off when the log is reopened.
+    """
+    def __init__(self, path, page_size=PAGE_SIZE, cached_pages=CACHED_PAGES):
+        self.path = path
+        self.page_size = page_size
+        self.cached_pages = cached_pages
+        self.offsets = array("Q")  # Byte offset where each record starts
+        self._pages = OrderedDict()  # page number -> [ChatMessage]
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._file = open(path, "a+b")
+        self._scan()
+
+    def _scan(self):
+        """Index record offsets, truncating a trailing partial record."""
+        f = self._file
+        f.seek(0)
+        position, start = 0, 0
+        while True:
+            chunk = f.read(SCAN_CHUNK)
+            if not chunk:
+                break
+            newline = chunk.find(b"\n")
+            while newline >= 0:
+                self.offsets.append(start)
+                start = position + newline + 1
+                newline = chunk.find(b"\n", newline + 1)
+            position += len(chunk)
+        if start < position:
+            f.truncate(start)
+        self._end = start
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def append(self, role, text, timestamp=None):
+        """Write a finished message and return it."""
+        message = ChatMessage(len(self.offsets), role, text, timestamp)
+        record = json.dumps({"role": role, "text": text, "time": message.time}, ensure_ascii=False)
+        data = record.encode("utf-8") + b"\n"
+        self._file.seek(0, os.SEEK_END)
+        self._file.write(data)
+        self._file.flush()
+        self.offsets.append(self._end)
+        self._end += len(data)
+        self._pages.pop(message.index // self.page_size, None)  # The last page grew
+        return message
+
+    def message(self, index):
+        """Return the message at `index`, reading its page from disk if needed."""
+        if not 0 <= index < len(self.offsets):
+            raise IndexError(index)
+        number = index // self.page_size
+        page = self._pages.get(number)
+        if page is None:
+            page = self._pages[number] = self._read_page(number)
+            if len(self._pages) > self.cached_pages:
+                self._pages.popitem(last=False)
+        else:
+            self._pages.move_to_end(number)
+        return page[index - number * self.page_size]
+
+    def _read_page(self, number):
+        first = number * self.page_size
+        last = min(first + self.page_size, len(self.offsets))
+        end = self.offsets[last] if last < len(self.offsets) else self._end
+        self._file.seek(self.offsets[first])
+        data = self._file.read(end - self.offsets[first])
+        page = []
+        for index, line in enumerate(data.split(b"\n")[:last - first], first):
+            try:
+                record = json.loads(line)
+                page.append(ChatMessage(index, record.get("role", ""), record.get("text", ""), record.get("time")))
+            except ValueError:
+                page.append(ChatMessage(index, "", "", 0))  # Unreadable record: keep indices stable
+        return page
+
+    def close(self):
+        self._file.close()
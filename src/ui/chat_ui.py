@@ -1,12 +1,148 @@
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QTextBrowser, QLineEdit, QPushButton, QSizePolicy
-from PyQt5.QtCore import Qt
+import html
+from collections import OrderedDict
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QLineEdit, QPushButton, QSizePolicy, QListView, QStyledItemDelegate, QStyle,
+    QAbstractItemView
+)
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, QSize, QTimer
+from PyQt5.QtGui import QTextDocument
+from src.ui.chat_history import ChatLog, ChatMessage
+from src.ui.markdown import MarkdownRenderer
+
+MESSAGE_ROLE = Qt.UserRole + 1
+INITIAL_ROWS = 200  # Most recent messages shown on open; older pages load when scrolling up
+LOAD_ROWS = 100
+STREAM_FLUSH_MS = 33  # Streamed tokens are applied to the tail message at most once per frame
+HEIGHT_CACHE_SIZE = 4096
+MESSAGE_PADDING = 6
+
+
+class ChatModel(QAbstractListModel):
+    """Rows over a ChatLog window plus the message currently being streamed.
+
+    Rows hold no text: `data` reads messages through the log's page cache.
+    The window starts at the most recent messages and grows upwards through
+    `load_older`.
+    """
+    def __init__(self, log, parent=None):
+        super().__init__(parent)
+        self.log = log
+        self.first = max(0, len(log) - INITIAL_ROWS)  # Log index of row 0
+        self.tail = None  # ChatMessage being streamed, not yet in the log
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.log) - self.first + (1 if self.tail is not None else 0)
+
+    def message(self, row):
+        index = self.first + row
+        if self.tail is not None and index == self.tail.index:
+            return self.tail
+        return self.log.message(index)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == MESSAGE_ROLE:
+            return self.message(index.row())
+        if role == Qt.DisplayRole:
+            message = self.message(index.row())
+            return f"{message.role}: {message.text}"
+        return None
+
+    def load_older(self, count=LOAD_ROWS):
+        """Prepend up to `count` older messages; return how many were added."""
+        count = min(count, self.first)
+        if count:
+            self.beginInsertRows(QModelIndex(), 0, count - 1)
+            self.first -= count
+            self.endInsertRows()
+        return count
+
+    def add(self, role, text):
+        row = self.rowCount()
+        self.beginInsertRows(QModelIndex(), row, row)
+        message = self.log.append(role, text)
+        self.endInsertRows()
+        return message
+
+    def begin_stream(self, role):
+        row = self.rowCount()
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.tail = ChatMessage(len(self.log), role, "")
+        self.endInsertRows()
+        return self.tail
+
+    def extend_stream(self, text):
+        self.tail.text += text
+        index = self.index(self.rowCount() - 1)
+        self.dataChanged.emit(index, index)
+
+    def end_stream(self):
+        """Write the streamed message to the log; its row now reads from disk."""
+        tail, self.tail = self.tail, None
+        self.log.append(tail.role, tail.text, tail.time)
+        index = self.index(self.rowCount() - 1)
+        self.dataChanged.emit(index, index)
+
+
+class ChatDelegate(QStyledItemDelegate):
+    """Paints messages as rendered Markdown; only visible rows are ever laid out."""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.renderer = MarkdownRenderer()
+        self._heights = OrderedDict()  # (index, text length, width) -> height
+
+    def _document(self, message, width):
+        document = QTextDocument()
+        document.setDocumentMargin(MESSAGE_PADDING)
+        document.setHtml(f"<b>{html.escape(message.role)}:</b>" + self.renderer.render(message.text))
+        document.setTextWidth(width)
+        return document
+
+    def paint(self, painter, option, index):
+        message = index.data(MESSAGE_ROLE)
+        if option.state & QStyle.State_Selected:
+            painter.fillRect(option.rect, option.palette.highlight())
+        painter.save()
+        painter.translate(option.rect.topLeft())
+        self._document(message, option.rect.width()).drawContents(painter)
+        painter.restore()
+
+    def sizeHint(self, option, index):
+        message = index.data(MESSAGE_ROLE)
+        width = max(option.rect.width(), 100)
+        key = (message.index, len(message.text), width)
+        height = self._heights.get(key)
+        if height is None:
+            height = self._heights[key] = int(self._document(message, width).size().height())
+            if len(self._heights) > HEIGHT_CACHE_SIZE:
+                self._heights.popitem(last=False)
+        return QSize(width, height)
+
 
 class ChatUI(QWidget):
-    """Chat interface for interacting with the code editor."""
-    def __init__(self):
+    """Chat interface for interacting with the code editor.
+
+    Messages live in an append-only log on disk and are shown in a list
+    view that only paints visible rows. Streamed replies are coalesced and
+    applied to the last row once per frame.
+    """
+    def __init__(self, log_path="config/chat_history.jsonl"):
         super().__init__()
+        self.log = ChatLog(log_path)
+        self.model = ChatModel(self.log, self)
+        self._pending_tokens = []
+
+        self.chat_view = QListView()
+        self.chat_view.setModel(self.model)
+        self.chat_view.setItemDelegate(ChatDelegate(self.chat_view))
+        self.chat_view.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.chat_view.setResizeMode(QListView.Adjust)
+        self.chat_view.setSelectionMode(QAbstractItemView.NoSelection)
+        self.chat_view.verticalScrollBar().valueChanged.connect(self._scrolled)
 
-        self.chat_browser = QTextBrowser()
         self.chat_input = QLineEdit()
         self.chat_input.setPlaceholderText("Type your message...")
 
@@ -15,16 +151,77 @@ class ChatUI(QWidget):
         send_button.clicked.connect(self.send_message)
 
         layout = QVBoxLayout()
-        layout.addWidget(self.chat_browser)
+        layout.addWidget(self.chat_view)
         layout.addWidget(self.chat_input)
         layout.addWidget(send_button, alignment=Qt.AlignRight)
         self.setLayout(layout)
 
         self.chat_input.returnPressed.connect(self.send_message)  # Send on Enter key press
 
+        self.stream_timer = QTimer(self)
+        self.stream_timer.setInterval(STREAM_FLUSH_MS)
+        self.stream_timer.timeout.connect(self._flush_stream)
+        QTimer.singleShot(0, self.chat_view.scrollToBottom)
+
     def send_message(self):
         """Display the message in the chat."""
         message = self.chat_input.text().strip()
         if message:
-            self.chat_browser.append(f"<b>You:</b> {message}")
+            self.add_message("You", message)
             self.chat_input.clear()
+
+    def _at_bottom(self):
+        bar = self.chat_view.verticalScrollBar()
+        return bar.value() >= bar.maximum() - 4
+
+    def add_message(self, role, text):
+        """Append a finished message and follow it if the view was at the bottom."""
+        follow = self._at_bottom()
+        message = self.model.add(role, text)
+        if follow:
+            self.chat_view.scrollToBottom()
+        return message
+
+    def begin_response(self, role="Assistant"):
+        """Start a streamed message; feed it with `stream_token` and close it with `end_response`."""
+        if self.model.tail is not None:
+            self.end_response()
+        follow = self._at_bottom()
+        self.model.begin_stream(role)
+        if follow:
+            self.chat_view.scrollToBottom()
+        self.stream_timer.start()
+
+    def stream_token(self, text):
+        self._pending_tokens.append(text)
+
+    def _flush_stream(self):
+        if not self._pending_tokens or self.model.tail is None:
+            return
+        follow = self._at_bottom()
+        text, self._pending_tokens = "".join(self._pending_tokens), []
+        self.model.extend_stream(text)
+        # The tail row grew; this relayouts just that row instead of resetting the view
+        self.chat_view.itemDelegate().sizeHintChanged.emit(self.model.index(self.model.rowCount() - 1))
+        if follow:
+            self.chat_view.scrollToBottom()
+
+    def end_response(self):
+        self._flush_stream()
+        self.stream_timer.stop()
+        if self.model.tail is not None:
+            self.model.end_stream()
+
+    def _scrolled(self, value):
+        """Page in older history when the view reaches the top, keeping the visible rows in place."""
+        bar = self.chat_view.verticalScrollBar()
+        if value != bar.minimum() or not self.model.first:
+            return
+        old_maximum = bar.maximum()
+        if self.model.load_older():
+            QTimer.singleShot(0, lambda: bar.setValue(bar.maximum() - old_maximum + value))
+
+    def shutdown(self):
+        """Finish any streamed reply and close the log."""
+        self.end_response()
+        self.log.close()
@@ -0,0 +1,175 @@
+# src/ui/completer.py
+
+import os
+import threading
+from PyQt5.QtWidgets import QCompleter
+from PyQt5.QtCore import Qt, QObject, QStringListModel, QThread, QTimer, pyqtSignal
+from PyQt5.QtGui import QTextCursor
+from src.ai.completion import MIN_PREFIX, DocumentIndex, prefix_at
+from src.ui.lexer import language_for_path
+
+DEBOUNCE_MS = 8  # Coalesces keystrokes delivered in the same burst
+POPUP_KEYS = (Qt.Key_Enter, Qt.Key_Return, Qt.Key_Escape, Qt.Key_Tab, Qt.Key_Backtab)
+
+
+class CompletionRequest:
+    """One completion request; results for stale requests are dropped."""
+    __slots__ = ("controller", "document", "prefix", "line", "version")
+
+    def __init__(self, controller, document, prefix, line):
+        self.controller = controller
+        self.document = document
+        self.prefix = prefix
+        self.line = line
+        self.version = document.version
+
+
+class CompletionWorker(QThread):
+    """Serves completion requests off the GUI thread, always the newest one first."""
+    completed = pyqtSignal(object, object)  # CompletionRequest, [Completion]
+
+    def __init__(self, engine):
+        super().__init__()
+        self.engine = engine
+        self._condition = threading.Condition()
+        self._request = None
+        self._stopping = False
+
+    def submit(self, request):
+        with self._condition:
+            self._request = request  # An unserved older request is simply replaced
+            self._condition.notify()
+
+    def run(self):
+        while True:
+            with self._condition:
+                while self._request is None and not self._stopping:
+                    self._condition.wait()
+                if self._stopping:
+                    return
+                request, self._request = self._request, None
+            items = self.engine.complete(request.document, request.prefix, request.line)
+            self.completed.emit(request, items)
+
+    def stop(self):
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        self.wait()
+
+
+class ProjectIndexWorker(QThread):
+    """Feeds the source files of a FileIndex into the completion engine's project index."""
+    def __init__(self, project, file_index):
+        super().__init__()
+        self.project = project
+        self.file_index = file_index
+        self._cancelled = False
+
+    def run(self):
+        for file_id in range(len(self.file_index)):
+            if self._cancelled:
+                return
+            path = self.file_index.path(file_id)
+            if language_for_path(path):
+                self.project.add_file(os.path.join(self.file_index.root, path))
+
+    def cancel(self):
+        self._cancelled = True
+
+
+class CompletionController(QObject):
+    """Keeps a DocumentIndex in step with a CodeEditor and shows ranked completions."""
+    def __init__(self, editor, worker):
+        super().__init__(editor)
+        self.editor = editor
+        self.worker = worker
+        self.index = DocumentIndex()
+        self._block_count = 1
+        self._pending_request = None
+
+        self.model = QStringListModel(self)
+        self.completer = QCompleter(self.model, self)
+        self.completer.setWidget(editor)
+        self.completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.completer.activated[str].connect(self.insert_completion)
+
+        self.debounce = QTimer(self)
+        self.debounce.setSingleShot(True)
+        self.debounce.setInterval(DEBOUNCE_MS)
+        self.debounce.timeout.connect(self.request)
+
+        document = editor.document()
+        self._reindex_all()
+        document.contentsChange.connect(self._contents_changed)
+        worker.completed.connect(self._show)
+        editor.completion = self
+
+    def _reindex_all(self):
+        document = self.editor.document()
+        self.index.update_lines(0, self.index.line_count(), document.toPlainText().split("\n"))
+        self._block_count = document.blockCount()
+
+    def _contents_changed(self, position, removed, added):
+        """Re-tokenize only the lines an edit touched."""
+        document = self.editor.document()
+        end = min(position + added, document.characterCount() - 1)
+        first = document.findBlock(position).blockNumber()
+        last = document.findBlock(end).blockNumber()
+        block_count = document.blockCount()
+        removed_lines = (last - first + 1) - (block_count - self._block_count)
+        self._block_count = block_count
+        if first < 0 or last < 0 or removed_lines < 0:
+            self._reindex_all()
+            return
+        lines = []
+        block = document.findBlockByNumber(first)
+        while block.isValid() and block.blockNumber() <= last:
+            lines.append(block.text())
+            block = block.next()
+        self.index.update_lines(first, removed_lines, lines)
+
+    def handles_key(self, event):
+        """True when the popup should consume `event` instead of the editor."""
+        return self.completer.popup().isVisible() and event.key() in POPUP_KEYS
+
+    def key_pressed(self, event):
+        """Schedule a request after typing, and hide the popup once there is no prefix."""
+        if event.text() and (event.text().isalnum() or event.text() == "_"):
+            self.debounce.start()
+        elif event.key() == Qt.Key_Backspace and self.completer.popup().isVisible():
+            self.debounce.start()
+        else:
+            self.completer.popup().hide()
+
+    def request(self):
+        cursor = self.editor.textCursor()
+        prefix = prefix_at(cursor.block().text(), cursor.positionInBlock())
+        if len(prefix) < MIN_PREFIX:
+            self.completer.popup().hide()
+            return
+        self._pending_request = CompletionRequest(self, self.index, prefix, cursor.blockNumber())
+        self.worker.submit(self._pending_request)
+
+    def _show(self, request, items):
+        if request is not self._pending_request:
+            return  # Another editor's request, or superseded by a newer one
+        cursor = self.editor.textCursor()
+        current = prefix_at(cursor.block().text(), cursor.positionInBlock())
+        if request.version != self.index.version or current != request.prefix or not items:
+            self.completer.popup().hide()
+            return
+        self.model.setStringList([item.word for item in items])
+        self.completer.setCompletionPrefix("")
+        popup = self.completer.popup()
+        popup.setCurrentIndex(self.model.index(0, 0))
+        rect = self.editor.cursorRect()
+        rect.setWidth(popup.sizeHintForColumn(0) + popup.verticalScrollBar().sizeHint().width())
+        self.completer.complete(rect)
+
+    def insert_completion(self, word):
+        cursor = self.editor.textCursor()
+        prefix = prefix_at(cursor.block().text(), cursor.positionInBlock())
+        cursor.movePosition(QTextCursor.Left, QTextCursor.KeepAnchor, len(prefix))
+        cursor.insertText(word)
+        self.editor.setTextCursor(cursor)
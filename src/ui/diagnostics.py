@@ -0,0 +1,106 @@
+# src/ui/diagnostics.py
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from PyQt5.QtCore import QObject, QThread, QTimer, pyqtSignal
+from src.ai.linter import Diagnostic, LintCache, ProjectLinter, content_hash, lint_source
+from src.ui.lexer import language_for_path
+
+LINT_DELAY_MS = 300  # Idle time after the last edit before the document is re-linted
+
+
+class LintController(QObject):
+    """Lints a CodeEditor in a background process whenever typing pauses.
+
+    All editors share one single-process pool, so its per-process chunk cache
+    stays warm and only definitions that changed are analysed again.
+    Results for text that has since changed are discarded.
+    """
+    message = pyqtSignal(str)
+    _finished = pyqtSignal(int, str, object)  # generation, content hash, diagnostic lists
+    _pool = None
+
+    @classmethod
+    def pool(cls):
+        if cls._pool is None:
+            context = multiprocessing.get_context("spawn")  # Forking a threaded Qt process can deadlock
+            cls._pool = ProcessPoolExecutor(max_workers=1, mp_context=context)
+        return cls._pool
+
+    def __init__(self, editor, cache=None):
+        super().__init__(editor)
+        self.editor = editor
+        self.cache = cache
+        self.generation = 0
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(LINT_DELAY_MS)
+        self.timer.timeout.connect(self.lint_now)
+        self._finished.connect(self._apply)
+        editor.document().contentsChange.connect(self._schedule)
+        editor.cursorPositionChanged.connect(self._describe_cursor_line)
+        editor.loaded.connect(lambda _: self.lint_now())
+
+    def _schedule(self, *_):
+        if self.editor.is_loading():
+            return
+        self.generation += 1  # Results in flight now describe stale text
+        self.timer.start()
+
+    def lint_now(self):
+        if self.editor.file_path and language_for_path(self.editor.file_path) != "python":
+            return
+        self.generation += 1
+        generation = self.generation
+        source = self.editor.toPlainText()
+        digest = content_hash(source)
+        cached = self.cache.lookup_source(source) if self.cache is not None else None
+        if cached is not None:
+            self._apply(generation, digest, cached)
+            return
+        future = self.pool().submit(lint_source, source)
+        # Runs on an executor thread; the signal hands the result to the GUI thread
+        future.add_done_callback(
+            lambda done: self._finished.emit(generation, digest, done.result()) if not done.exception() else None)
+
+    def _apply(self, generation, digest, diagnostics):
+        if generation != self.generation:
+            return
+        if self.cache is not None:
+            self.cache.store(self.editor.file_path, digest, diagnostics,
+                             on_disk=not self.editor.document().isModified())
+        self.editor.set_diagnostics([Diagnostic(*item) for item in diagnostics])
+        self._describe_cursor_line()
+
+    def _describe_cursor_line(self):
+        line = self.editor.textCursor().blockNumber()
+        for diagnostic in self.editor.diagnostics:
+            if diagnostic.line == line:
+                self.message.emit(f"{diagnostic.code} {diagnostic.message}")
+                return
+
+
+class ProjectLintWorker(QThread):
+    """Lints every Python file of a FileIndex on all cores, reusing the on-disk cache."""
+    lint_finished = pyqtSignal(int, int, int)  # files, problems, files analysed
+    lint_failed = pyqtSignal(str)
+
+    def __init__(self, file_index, cache):
+        super().__init__()
+        self.file_index = file_index
+        self.cache = cache
+
+    def run(self):
+        root = self.file_index.root
+        paths = [os.path.join(root, self.file_index.path(file_id)) for file_id in range(len(self.file_index))]
+        paths = [path for path in paths if language_for_path(path) == "python"]
+        problems = []
+        try:
+            analysed = ProjectLinter(self.cache).lint(
+                paths, lambda path, diagnostics: problems.append(len(diagnostics)), self.isInterruptionRequested)
+        except Exception as e:  # An exception leaving QThread.run aborts the whole application
+            self.lint_failed.emit(str(e) or type(e).__name__)
+            return
+        self.cache.save()
+        self.lint_finished.emit(len(problems), sum(problems), analysed)
@@ -1,7 +1,26 @@
-from PyQt5.QtWidgets import QPlainTextEdit, QWidget
-from PyQt5.QtGui import QFont, QPainter, QColor
-from PyQt5.QtCore import QRect, QSize, Qt
+import time
+
+from PyQt5.QtWidgets import QApplication, QPlainTextEdit, QWidget, QTextEdit, QShortcut
+from PyQt5.QtGui import QFont, QPainter, QColor, QTextCursor, QTextCharFormat, QTextDocument, QKeySequence
+from PyQt5.QtCore import QPoint, QRect, QSize, Qt, QTimer, pyqtSignal
+from src.ui.file_diff import text_edits
+from src.ui.multi_cursor import CursorSet
+from src.ui.perf_monitor import timed
+from src.ui.structure import StructureIndex, is_pair
 from src.ui.syntax_highlighter import MultiLanguageHighlighter  # Correct import
+from src.ui.text_buffer import TextBuffer
+from src.ui.text_units import utf16_len
+from src.ui.undo_journal import DEFAULT_MEMORY_MB, UndoJournal, text_digest
+
+LOAD_BATCH_CHARS = 256 * 1024  # Characters streamed into the document per event-loop tick
+DIAGNOSTIC_COLORS = {"error": QColor(220, 40, 40), "warning": QColor(220, 160, 0)}
+STRUCTURE_BATCH_LINES = 500  # Lines added to the structure index at a time while it is built
+STRUCTURE_BUDGET_MS = 8  # Time spent building the structure index per event-loop tick
+STRUCTURE_SYNC_LINES = 5000  # Larger changes, such as setPlainText, rebuild the index in the background
+BRACKET_COLORS = {True: QColor(200, 230, 255), False: QColor(255, 200, 200)}  # Matched, mismatched
+SECONDARY_CARET_COLOR = QColor(60, 60, 60)
+SECONDARY_SELECTION_COLOR = QColor(100, 150, 255, 70)  # Translucent, painted over the text
+SEARCH_MATCH_COLOR = QColor(255, 235, 120)
 
 class LineNumberArea(QWidget):
     """Line number area for the code editor."""
@@ -12,6 +31,7 @@ class LineNumberArea(QWidget):
     def sizeHint(self):
         return QSize(self.editor.line_number_area_width(), 0)
 
+    @timed("LineNumberArea.paintEvent")
     def paintEvent(self, event):
         painter = QPainter(self)
         painter.fillRect(event.rect(), QColor(240, 240, 240))
@@ -21,21 +41,55 @@ class LineNumberArea(QWidget):
         top = self.editor.blockBoundingGeometry(block).translated(self.editor.contentOffset()).top()
         bottom = top + self.editor.blockBoundingRect(block).height()
 
+        height = self.editor.fontMetrics().height()
+        structure = self.editor.structure if self.editor.structure_ready() else None
         while block.isValid() and top <= event.rect().bottom():
             if block.isVisible() and bottom >= event.rect().top():
                 number = str(block_number + 1)
-                painter.drawText(0, int(top), self.width() - 5,
-                                 self.editor.fontMetrics().height(), Qt.AlignRight, number)
+                painter.drawText(0, int(top), self.width() - 5 - height, height, Qt.AlignRight, number)
+                # Fold markers come straight from the structure index
+                if structure is not None and structure.span(block_number):
+                    marker = "\u25b8" if not block.next().isVisible() else "\u25be"
+                    painter.drawText(self.width() - height, int(top), height, height, Qt.AlignCenter, marker)
             block = block.next()
             top = bottom
             bottom = top + self.editor.blockBoundingRect(block).height()
             block_number += 1
 
+    def mousePressEvent(self, event):
+        """Clicking a fold marker collapses or expands its fold."""
+        if event.x() >= self.width() - self.editor.fontMetrics().height():
+            block = self.editor.cursorForPosition(QPoint(0, event.y())).block()
+            self.editor.toggle_fold(block.blockNumber())
+
 class CodeEditor(QPlainTextEdit):
     """Custom code editor with syntax highlighting and line numbers."""
+    loaded = pyqtSignal(str)
+
     def __init__(self, language="python"):
         super().__init__()
         self.line_number_area = LineNumberArea(self)
+        self.file_path = None
+        self.completion = None  # CompletionController, once attached
+        self.keep_alive = False  # Set by views that follow this editor, so its tab is never hibernated
+        self.diagnostics = []
+        self._diagnostic_selections = []
+        self._bracket_selections = []
+        self._search_selections = []
+
+        # The piece table is the source of truth; the document mirrors it for display
+        self.buffer = TextBuffer()
+        self._buffer_sync_paused = False
+        self._pending_chunks = None
+        self._load_generation = 0  # Bumped by every load_file, so batches of a superseded load stop
+        self.document().contentsChange.connect(self._sync_buffer)
+
+        # Undo history is kept in a bounded journal instead of the document's own stack
+        self.undo_memory_cap = DEFAULT_MEMORY_MB * 1024 * 1024
+        self.journal = UndoJournal(None, self.undo_memory_cap)
+        self._journal_paused = False
+        self.document().setUndoRedoEnabled(False)
+        self.document().modificationChanged.connect(self._modification_changed)
 
         # Set font for the editor
         font = QFont("Fira Code", 12)
@@ -44,16 +98,525 @@ class CodeEditor(QPlainTextEdit):
 
         # Initialize syntax highlighter
         self.highlighter = MultiLanguageHighlighter(self.document(), language)
+        self.highlighter.set_viewport_range(0, 0)  # Until the first paint reports the real one
+
+        # Folds and bracket pairs, kept current from contentsChange and built in slices after a load
+        self.structure = StructureIndex(language, lambda line: self.document().findBlockByNumber(line).text())
+        self.structure.replace_lines(0, 0, [""])
+        self._structure_blocks = 1  # Block count the index was last brought in line with
+        self._structure_sync_paused = False
+        self._structure_timer = QTimer(self)
+        self._structure_timer.setInterval(0)
+        self._structure_timer.timeout.connect(self._build_structure_step)
+        self.document().contentsChange.connect(self._sync_structure)
+        self.cursorPositionChanged.connect(self.highlight_matching_bracket)
+        for keys, slot in (("Ctrl+Shift+[", self.toggle_fold_at_cursor), ("Alt+Up", self.go_to_enclosing_block),
+                           ("Ctrl+Shift+\\", self.go_to_matching_bracket)):
+            QShortcut(QKeySequence(keys), self, slot, context=Qt.WidgetShortcut)
+
+        # Extra cursors; None while the editor has only its own QTextCursor
+        self.multi_cursor = None
+        self._cursor_history = {}  # Undo step -> (cursors before, cursors after) of multi-cursor edits
+        self._applying_cursor_edits = False
+        self.document().contentsChange.connect(self._remap_cursors)
+        for keys, slot in (("Ctrl+Alt+Up", lambda: self.add_cursor_vertically(-1)),
+                           ("Ctrl+Alt+Down", lambda: self.add_cursor_vertically(1)),
+                           ("Ctrl+D", self.add_next_occurrence), ("Ctrl+Shift+L", self.select_all_occurrences)):
+            QShortcut(QKeySequence(keys), self, slot, context=Qt.WidgetShortcut)
 
         # Connect signals for line numbers
         self.blockCountChanged.connect(self.update_line_number_area_width)
         self.updateRequest.connect(self.update_line_number_area)
+        self.updateRequest.connect(self.update_highlight_viewport)
         self.verticalScrollBar().valueChanged.connect(self.line_number_area.update)
 
+    def set_font_size(self, size):
+        """Change the editor font size; the line number margin follows."""
+        font = self.font()
+        font.setPointSize(size)
+        self.setFont(font)
+        self.update_line_number_area_width()
+
+    def keyPressEvent(self, event):
+        """Let an open completion popup take the keys that accept or dismiss it."""
+        if self.completion is not None and self.completion.handles_key(event):
+            event.ignore()
+            return
+        if self.multi_cursor is not None:
+            if self._multi_cursor_key(event):
+                return
+            self.clear_cursors()
+        if event.matches(QKeySequence.Undo):
+            self.undo()
+            return
+        if event.matches(QKeySequence.Redo):
+            self.redo()
+            return
+        super().keyPressEvent(event)
+        if self.completion is not None:
+            self.completion.key_pressed(event)
+
+    def mousePressEvent(self, event):
+        """Alt+click adds a cursor; a plain click goes back to a single cursor."""
+        if event.button() == Qt.LeftButton and event.modifiers() & Qt.AltModifier:
+            position = self.cursorForPosition(event.pos()).position()
+            self.add_cursor(position, position)
+            return
+        if self.multi_cursor is not None:
+            self.clear_cursors()
+        super().mousePressEvent(event)
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.multi_cursor is not None:
+            self._paint_cursors()
+
+    # Multiple cursors
+
+    def set_cursors(self, cursors, primary=0):
+        """Replace the cursors with (anchor, position) pairs; overlapping ones are merged."""
+        self.multi_cursor = CursorSet()
+        self.multi_cursor.set(list(cursors), primary)
+        self._cursors_moved()
+
+    def add_cursor(self, anchor, position):
+        """Add a cursor and make it the primary one."""
+        if self.multi_cursor is None:
+            cursor = self.textCursor()
+            self.multi_cursor = CursorSet(cursor.anchor(), cursor.position())
+        self.multi_cursor.add(anchor, position)
+        self._cursors_moved()
+
+    def clear_cursors(self):
+        """Keep only the primary cursor."""
+        if self.multi_cursor is not None:
+            self.multi_cursor = None
+            self.viewport().update()
+
+    def add_cursor_vertically(self, step):
+        """Add a caret on the line above the first cursor or below the last one."""
+        cursor = self.textCursor()
+        cursors = self.multi_cursor.cursors if self.multi_cursor is not None else [(cursor.anchor(), cursor.position())]
+        position = cursors[0 if step < 0 else -1][1]
+        target = self._vertical_target(step)(position)
+        if target != position:
+            self.add_cursor(target, target)
+
+    def _word_or_selection(self):
+        """The primary selection, after selecting the word under the caret if it was empty."""
+        cursor = self.textCursor()
+        if not cursor.hasSelection():
+            cursor.select(QTextCursor.WordUnderCursor)
+            if self.multi_cursor is None:
+                self.setTextCursor(cursor)
+            else:
+                cursors = list(self.multi_cursor.cursors)
+                cursors[self.multi_cursor.primary] = (cursor.anchor(), cursor.position())
+                self.set_cursors(cursors, self.multi_cursor.primary)
+        return cursor.selectedText()
+
+    def add_next_occurrence(self):
+        """Select the next occurrence of the primary selection with an extra cursor, wrapping around."""
+        text = self._word_or_selection()
+        if not text:
+            return
+        document = self.document()
+        start = self.multi_cursor.cursors[-1] if self.multi_cursor is not None else (0, self.textCursor().selectionEnd())
+        found = document.find(text, max(start), QTextDocument.FindCaseSensitively)
+        if found.isNull():
+            found = document.find(text, 0, QTextDocument.FindCaseSensitively)
+        taken = self.multi_cursor.selections() if self.multi_cursor is not None else []
+        if not found.isNull() and (found.selectionStart(), found.selectionEnd()) not in taken:
+            self.add_cursor(found.selectionStart(), found.selectionEnd())
+
+    def select_all_occurrences(self):
+        """Put a cursor on every occurrence of the primary selection."""
+        text = self._word_or_selection()
+        if not text:
+            return
+        document = self.document()
+        cursors = []
+        primary = 0
+        current = self.textCursor().selectionStart()
+        found = document.find(text, 0, QTextDocument.FindCaseSensitively)
+        while not found.isNull():
+            if found.selectionStart() == current:
+                primary = len(cursors)
+            cursors.append((found.selectionStart(), found.selectionEnd()))
+            found = document.find(text, found, QTextDocument.FindCaseSensitively)
+        if len(cursors) > 1:
+            self.set_cursors(cursors, primary)
+
+    def _vertical_target(self, step):
+        """Map a position to the same column on the next visible line above or below."""
+        document = self.document()
+
+        def target(position):
+            block = document.findBlock(position)
+            other = block.next() if step > 0 else block.previous()
+            while other.isValid() and not other.isVisible():
+                other = other.next() if step > 0 else other.previous()
+            if not other.isValid():
+                return position
+            return other.position() + min(position - block.position(), other.length() - 1)
+        return target
+
+    def _multi_cursor_key(self, event):
+        """Apply a key to every cursor; return False for keys that drop back to a single cursor."""
+        cursors = self.multi_cursor
+        document = self.document()
+        length = document.characterCount() - 1
+        key, modifiers, text = event.key(), event.modifiers(), event.text()
+        select = bool(modifiers & Qt.ShiftModifier)
+        before = (cursors.cursors, cursors.primary)
+        if key == Qt.Key_Escape:
+            self.clear_cursors()
+        elif event.matches(QKeySequence.Undo) or event.matches(QKeySequence.Redo):
+            self._undo_cursor_edit(redo=event.matches(QKeySequence.Redo))
+        elif event.matches(QKeySequence.Copy):
+            QApplication.clipboard().setText("\n".join(self._selected_texts()))
+        elif event.matches(QKeySequence.Paste):
+            pasted = QApplication.clipboard().text()
+            lines = pasted.split("\n")
+            self._edit_cursors(before, cursors.insert(lines if len(lines) == len(cursors) else pasted))
+        elif key in (Qt.Key_Backspace, Qt.Key_Delete):
+            self._edit_cursors(before, cursors.delete(length, forward=key == Qt.Key_Delete))
+        elif key in (Qt.Key_Return, Qt.Key_Enter):
+            self._edit_cursors(before, cursors.insert("\n"))
+        elif key == Qt.Key_Left:
+            cursors.move(lambda position: max(position - 1, 0), select, "start")
+        elif key == Qt.Key_Right:
+            cursors.move(lambda position: min(position + 1, length), select, "end")
+        elif key in (Qt.Key_Up, Qt.Key_Down):
+            cursors.move(self._vertical_target(1 if key == Qt.Key_Down else -1), select)
+        elif key == Qt.Key_Home:
+            cursors.move(lambda position: document.findBlock(position).position(), select)
+        elif key == Qt.Key_End:
+            cursors.move(lambda position: document.findBlock(position).position()
+                         + document.findBlock(position).length() - 1, select)
+        elif text and not modifiers & (Qt.ControlModifier | Qt.AltModifier) and (text.isprintable() or text == "\t"):
+            self._edit_cursors(before, cursors.insert(text))
+        else:
+            return False
+        if self.multi_cursor is not None:
+            self._cursors_moved()
+        return True
+
+    def _selected_texts(self):
+        document = self.document()
+        texts = []
+        for start, end in self.multi_cursor.selections():
+            cursor = QTextCursor(document)
+            cursor.setPosition(start)
+            cursor.setPosition(end, QTextCursor.KeepAnchor)
+            texts.append(cursor.selectedText().replace("\u2029", "\n"))
+        return texts
+
+    def _edit_cursors(self, before, edits):
+        """Apply one keystroke's edits for every cursor as a single undo step, last edit first."""
+        edits = [edit for edit in edits if edit[0] != edit[1] or edit[2]]
+        if not edits:
+            return
+        steps = self.journal.undo_count()
+        self.journal.seal()
+        self._applying_cursor_edits = True
+        cursor = QTextCursor(self.document())
+        cursor.beginEditBlock()
+        for start, end, text in reversed(edits):
+            cursor.setPosition(start)
+            cursor.setPosition(end, QTextCursor.KeepAnchor)
+            cursor.insertText(text)
+        cursor.endEditBlock()
+        self._applying_cursor_edits = False
+        self.journal.seal()  # The next keystroke is a step of its own
+        for step in [step for step in self._cursor_history if step >= steps]:
+            del self._cursor_history[step]  # Redo history that this edit replaced
+        self._cursor_history[steps] = (before, (self.multi_cursor.cursors, self.multi_cursor.primary))
+
+    def _undo_cursor_edit(self, redo=False):
+        """Undo or redo through the journal, restoring the cursors recorded for that step."""
+        steps = self.journal.undo_count()
+        self._applying_cursor_edits = True
+        if redo:
+            self.redo()
+            recorded = self._cursor_history.get(steps)
+        else:
+            self.undo()
+            recorded = self._cursor_history.get(steps - 1)
+        self._applying_cursor_edits = False
+        if recorded is None:
+            self.clear_cursors()
+            return
+        cursors, primary = recorded[1] if redo else recorded[0]
+        self.multi_cursor.set(cursors, primary)
+
+    def _remap_cursors(self, position, removed, added):
+        """Keep the cursors in place across changes made by anything but a multi-cursor edit."""
+        if self.multi_cursor is not None and not self._applying_cursor_edits:
+            self.multi_cursor.adjust(position, removed, added)
+            self.viewport().update()
+
+    def _cursors_moved(self):
+        """Make the editor's own cursor follow the primary one and repaint the others."""
+        if len(self.multi_cursor) < 2:
+            anchor, position = self.multi_cursor.primary_cursor()
+            self.multi_cursor = None
+        else:
+            anchor, position = self.multi_cursor.primary_cursor()
+        cursor = self.textCursor()
+        cursor.setPosition(anchor)
+        cursor.setPosition(position, QTextCursor.KeepAnchor)
+        self.setTextCursor(cursor)
+        self.viewport().update()
+
+    def _caret_rect(self, position):
+        cursor = QTextCursor(self.document())
+        cursor.setPosition(position)
+        return self.cursorRect(cursor) if cursor.block().isVisible() else None
+
+    def _paint_cursors(self):
+        """Paint the secondary carets and selections, visiting only the cursors in view."""
+        first_block = self.firstVisibleBlock()
+        last_block = self.cursorForPosition(self.viewport().rect().bottomRight()).block()
+        first = first_block.position()
+        last = last_block.position() + last_block.length()
+        primary = self.multi_cursor.primary_cursor()
+        width = self.viewport().width()
+        painter = QPainter(self.viewport())
+        for anchor, position in self.multi_cursor.in_range(first, last):
+            if (anchor, position) == primary:
+                continue  # Drawn by QPlainTextEdit itself
+            if anchor != position:
+                start = self._caret_rect(max(min(anchor, position), first))
+                end = self._caret_rect(min(max(anchor, position), last - 1))
+                if start is not None and end is not None:
+                    if start.top() == end.top():
+                        painter.fillRect(QRect(start.left(), start.top(), end.left() - start.left(), start.height()),
+                                         SECONDARY_SELECTION_COLOR)
+                    else:
+                        painter.fillRect(QRect(start.left(), start.top(), width - start.left(), start.height()),
+                                         SECONDARY_SELECTION_COLOR)
+                        painter.fillRect(QRect(0, start.bottom(), width, end.top() - start.bottom()),
+                                         SECONDARY_SELECTION_COLOR)
+                        painter.fillRect(QRect(0, end.top(), end.left(), end.height()), SECONDARY_SELECTION_COLOR)
+            caret = self._caret_rect(position)
+            if caret is not None:
+                painter.fillRect(QRect(caret.left(), caret.top(), 2, caret.height()), SECONDARY_CARET_COLOR)
+
+    def set_diagnostics(self, diagnostics):
+        """Underline linter diagnostics with ExtraSelections, leaving the text untouched."""
+        self.diagnostics = diagnostics
+        document = self.document()
+        selections = []
+        for diagnostic in diagnostics:
+            block = document.findBlockByNumber(diagnostic.line)
+            if not block.isValid():
+                continue
+            text = block.text()
+            length = len(text)
+            start = min(diagnostic.column, length)
+            end = min(max(diagnostic.end_column, start + 1), max(length, start + 1))
+            # Columns count characters, block positions count UTF-16 units
+            start, end = utf16_len(text[:start]), utf16_len(text[:end]) + max(end - length, 0)
+            selection = QTextEdit.ExtraSelection()
+            selection.format = QTextCharFormat()
+            selection.format.setUnderlineStyle(QTextCharFormat.SpellCheckUnderline)
+            selection.format.setUnderlineColor(DIAGNOSTIC_COLORS.get(diagnostic.severity, DIAGNOSTIC_COLORS["warning"]))
+            selection.cursor = QTextCursor(document)
+            selection.cursor.setPosition(block.position() + start)
+            selection.cursor.setPosition(min(block.position() + end, document.characterCount() - 1),
+                                         QTextCursor.KeepAnchor)
+            selections.append(selection)
+        self._diagnostic_selections = selections
+        self.update_extra_selections()
+
+    def set_search_matches(self, spans):
+        """Highlight search hits, given as (start, end) UTF-16 positions, without moving the cursor."""
+        document = self.document()
+        end_of_text = document.characterCount() - 1
+        selections = []
+        for start, end in spans:
+            selection = QTextEdit.ExtraSelection()
+            selection.format = QTextCharFormat()
+            selection.format.setBackground(SEARCH_MATCH_COLOR)
+            selection.cursor = QTextCursor(document)
+            selection.cursor.setPosition(min(start, end_of_text))
+            selection.cursor.setPosition(min(end, end_of_text), QTextCursor.KeepAnchor)
+            selections.append(selection)
+        self._search_selections = selections
+        self.update_extra_selections()
+
+    def update_extra_selections(self):
+        """Combine the ExtraSelections contributed by editor features."""
+        self.setExtraSelections(self._search_selections + self._diagnostic_selections + self._bracket_selections)
+
+    # Structure: folding and brackets
+
+    def structure_ready(self):
+        """True once the structure index covers the whole document."""
+        return not self._structure_timer.isActive() and not self.is_loading()
+
+    def _rebuild_structure(self):
+        self.structure.truncate(0)
+        self._structure_blocks = self.document().blockCount()
+        self._structure_timer.start()
+
+    def _build_structure_step(self):
+        """Index more lines of the document within a small per-tick time budget."""
+        document = self.document()
+        structure = self.structure
+        deadline = time.perf_counter() + STRUCTURE_BUDGET_MS / 1000
+        while len(structure) < document.blockCount() and time.perf_counter() < deadline:
+            first = len(structure)
+            block = document.findBlockByNumber(first)
+            texts = []
+            while block.isValid() and len(texts) < STRUCTURE_BATCH_LINES:
+                texts.append(block.text())
+                block = block.next()
+            structure.replace_lines(first, 0, texts)
+        if len(structure) >= document.blockCount():
+            self._structure_timer.stop()
+            self.line_number_area.update()
+
+    def _sync_structure(self, position, removed, added):
+        """Bring the structure index up to date with the lines a document change touched."""
+        if self._structure_sync_paused or self.is_loading():
+            return  # A finished load rebuilds the index
+        document = self.document()
+        blocks = document.blockCount()
+        first = document.findBlock(position).blockNumber()
+        last_block = document.findBlock(position + added)
+        last = last_block.blockNumber() if last_block.isValid() else blocks - 1
+        old_count = (last - first + 1) - (blocks - self._structure_blocks)
+        self._structure_blocks = blocks
+        structure = self.structure
+        if old_count < 0 or first + old_count > len(structure) or last - first >= STRUCTURE_SYNC_LINES:
+            # Past the part indexed so far, or too large to do now: index the rest in the background
+            structure.truncate(min(first, len(structure)))
+            self._structure_timer.start()
+            return
+        block = document.findBlockByNumber(first)
+        texts = []
+        for _ in range(last - first + 1):
+            texts.append(block.text())
+            block = block.next()
+        structure.replace_lines(first, old_count, texts)
+        if block.isValid() and not block.isVisible():
+            self._show_blocks(document.findBlockByNumber(last), None)  # The header of a collapsed fold was edited
+
+    def _show_blocks(self, header, last):
+        """Make the hidden blocks after `header` visible again, up to block number `last` (None: all of them)."""
+        block = header.next()
+        end = block
+        while block.isValid() and not block.isVisible() and (last is None or block.blockNumber() <= last):
+            block.setVisible(True)
+            end = block
+            block = block.next()
+        self._relayout(header, end)
+
+    def _relayout(self, first, last):
+        """Tell the layout that block visibility changed between two blocks."""
+        paused = self._buffer_sync_paused
+        self._buffer_sync_paused = self._structure_sync_paused = True
+        try:
+            self.document().markContentsDirty(first.position(), last.position() + last.length() - first.position())
+        finally:
+            self._buffer_sync_paused = paused
+            self._structure_sync_paused = False
+        self.viewport().update()
+        self.line_number_area.update()
+
+    def toggle_fold(self, line):
+        """Collapse or expand the fold starting at `line`; hidden blocks cost no layout or painting."""
+        if not self.structure_ready() or not 0 <= line < len(self.structure):
+            return False
+        span = self.structure.span(line)
+        if not span:
+            return False
+        document = self.document()
+        header = document.findBlockByNumber(line)
+        collapse = header.next().isVisible()
+        block, number = header.next(), line + 1
+        while block.isValid() and number <= line + span:
+            block.setVisible(not collapse)
+            nested = self.structure.span(number)
+            if not collapse and nested and not block.next().isVisible():
+                number += nested  # A nested fold that was collapsed stays collapsed
+                block = document.findBlockByNumber(number)
+            last = block
+            block, number = block.next(), number + 1
+        if collapse and line < self.textCursor().blockNumber() <= line + span:
+            cursor = self.textCursor()
+            cursor.setPosition(header.position() + header.length() - 1)
+            self.setTextCursor(cursor)
+        self._relayout(header, last)
+        return True
+
+    def toggle_fold_at_cursor(self):
+        fold = self.structure.enclosing_fold(self.textCursor().blockNumber()) if self.structure_ready() else None
+        if fold is not None:
+            self.toggle_fold(fold[0])
+
+    def go_to_enclosing_block(self):
+        """Move the cursor to the header line of the innermost block around it."""
+        if not self.structure_ready():
+            return
+        folds = self.structure.folds_containing(self.textCursor().blockNumber())
+        if folds:
+            block = self.document().findBlockByNumber(folds[-1][0])
+            cursor = self.textCursor()
+            cursor.setPosition(block.position() + max(self.structure.indent(folds[-1][0]), 0))
+            self.setTextCursor(cursor)
+
+    def _bracket_at_cursor(self):
+        """(line, column, char) of a bracket just before or after the cursor, or None."""
+        if not self.structure_ready():
+            return None
+        cursor = self.textCursor()
+        line, column = cursor.blockNumber(), cursor.positionInBlock()
+        brackets = dict(self.structure.brackets(line))
+        for candidate in (column, column - 1):
+            if candidate in brackets:
+                return line, candidate, brackets[candidate]
+        return None
+
+    def highlight_matching_bracket(self):
+        """Highlight the bracket at the cursor and its partner from the structure index."""
+        selections = []
+        found = self._bracket_at_cursor()
+        if found is not None:
+            line, column, char = found
+            match = self.structure.match_bracket(line, column)
+            positions = [(line, column)]
+            matched = False
+            if match is not None:
+                positions.append(match)
+                matched = is_pair(char, dict(self.structure.brackets(match[0]))[match[1]])
+            document = self.document()
+            for bracket_line, bracket_column in positions:
+                selection = QTextEdit.ExtraSelection()
+                selection.format = QTextCharFormat()
+                selection.format.setBackground(BRACKET_COLORS[matched])
+                selection.cursor = QTextCursor(document)
+                selection.cursor.setPosition(document.findBlockByNumber(bracket_line).position() + bracket_column)
+                selection.cursor.movePosition(QTextCursor.NextCharacter, QTextCursor.KeepAnchor)
+                selections.append(selection)
+        if selections or self._bracket_selections:
+            self._bracket_selections = selections
+            self.update_extra_selections()
+
+    def go_to_matching_bracket(self):
+        found = self._bracket_at_cursor()
+        match = self.structure.match_bracket(found[0], found[1]) if found is not None else None
+        if match is not None:
+            cursor = self.textCursor()
+            cursor.setPosition(self.document().findBlockByNumber(match[0]).position() + match[1])
+            self.setTextCursor(cursor)
+
     def line_number_area_width(self):
-        """Calculate the width of the line number area."""
+        """Calculate the width of the line number area, including the fold marker column."""
         digits = len(str(max(1, self.blockCount())))
-        return 10 + self.fontMetrics().horizontalAdvance('9') * digits
+        return 10 + self.fontMetrics().horizontalAdvance('9') * digits + self.fontMetrics().height()
 
     def resizeEvent(self, event):
         """Handle resize events."""
@@ -69,6 +632,225 @@ class CodeEditor(QPlainTextEdit):
         else:
             self.line_number_area.update(0, rect.y(), self.line_number_area.width(), rect.height())
 
+    def update_highlight_viewport(self, *_):
+        """Tell the highlighter which blocks are visible so it can defer the rest."""
+        first = self.firstVisibleBlock().blockNumber()
+        last = self.cursorForPosition(self.viewport().rect().bottomLeft()).blockNumber()
+        if self.highlighter.viewport_range != (first, last):
+            self.highlighter.set_viewport_range(first, last)
+
     def update_line_number_area_width(self):
         """Adjust the margin for the line number area."""
         self.setViewportMargins(self.line_number_area_width(), 0, 0, 0)
+
+    def load_file(self, path):
+        """Open `path` through a memory-mapped piece table and stream it into the document.
+
+        The document still ends up holding the whole text, since a
+        QTextDocument cannot be backed by the buffer; files too big for that
+        open in the LargeFileViewer instead (the `large_file_mb` setting).
+
+        Calling it again while a load is still streaming restarts the load;
+        batches already queued for the earlier one find themselves stale and stop.
+        """
+        buffer = TextBuffer.from_file(path)
+        self._load_generation += 1
+        self._pending_chunks = None  # Drop the stream over the old buffer before closing it
+        self.buffer.close()
+        self.buffer = buffer
+        self.file_path = path
+        self.clear_cursors()
+
+        self._buffer_sync_paused = True
+        self.setReadOnly(True)
+        self.document().clear()
+        self._pending_chunks = self._batched_chunks(buffer)
+        self._load_next_batch(self._load_generation)
+
+    @staticmethod
+    def _batched_chunks(buffer):
+        """Group buffer pieces into batches large enough to amortise layout work."""
+        batch, batch_size = [], 0
+        for chunk in buffer.iter_chunks():
+            batch.append(chunk)
+            batch_size += len(chunk)
+            if batch_size >= LOAD_BATCH_CHARS:
+                yield "".join(batch)
+                batch, batch_size = [], 0
+        if batch:
+            yield "".join(batch)
+
+    def _load_next_batch(self, generation):
+        """Append one batch, yielding to the event loop between batches."""
+        if generation != self._load_generation or self._pending_chunks is None:
+            return  # Queued by a load that a later load_file superseded
+        batch = next(self._pending_chunks, None)
+        if batch is None:
+            self._pending_chunks = None
+            self.open_journal()
+            self.document().setModified(False)
+            self.setReadOnly(False)
+            self.moveCursor(QTextCursor.Start)
+            self._buffer_sync_paused = False
+            self._rebuild_structure()
+            self.loaded.emit(self.file_path)
+            return
+        cursor = QTextCursor(self.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(batch)
+        QTimer.singleShot(0, lambda: self._load_next_batch(generation))
+
+    def is_loading(self):
+        """Return True while a file is still being streamed into the document."""
+        return self._pending_chunks is not None
+
+    def reload_from_disk(self):
+        """Bring the document up to date with its file using ranged edits; return how many were applied.
+
+        Only the changed lines are replaced, so the cursor, scroll position
+        and highlighting of untouched lines survive. The edits form a single
+        undo step, and the piece table is swapped for one mapping the new file.
+        """
+        buffer = TextBuffer.from_file(self.file_path, self.buffer.encoding)
+        old_text = self.buffer.text()
+        edits = text_edits(old_text, buffer.text())
+        if not edits:
+            buffer.close()
+            return 0
+        # Edits come last first, so the text before each one is still the old text
+        to_utf16 = self.buffer.to_utf16  # Document positions count UTF-16 units, the edits count characters
+        positions = [(to_utf16(offset), to_utf16(offset + length)) for offset, length, _ in edits]
+        self.journal.record_step([[start, old_text[offset:offset + length], text]
+                                  for (start, _), (offset, length, text) in zip(positions, edits)])
+        self._buffer_sync_paused = True
+        cursor = QTextCursor(self.document())
+        cursor.beginEditBlock()
+        for (start, end), (_, _, text) in zip(positions, edits):
+            cursor.setPosition(start)
+            cursor.setPosition(end, QTextCursor.KeepAnchor)
+            cursor.insertText(text)
+        cursor.endEditBlock()
+        self._buffer_sync_paused = False
+        self.buffer.close()
+        self.buffer = buffer
+        self.document().setModified(False)
+        return len(edits)
+
+    def _sync_buffer(self, position, removed, added):
+        """Mirror a document change into the piece table and the undo journal."""
+        if self._buffer_sync_paused:
+            return
+        # Qt may over-report by the implicit trailing paragraph separator, so clamp both sides.
+        # Positions count UTF-16 units; the buffer converts them, the journal keeps them as they are.
+        removed = min(removed, self.buffer.utf16_length() - position)
+        added = min(added, self.document().characterCount() - 1 - position)
+        inserted_text = ""
+        if added > 0:
+            cursor = QTextCursor(self.document())
+            cursor.setPosition(position)
+            cursor.setPosition(position + added, QTextCursor.KeepAnchor)
+            inserted_text = cursor.selectedText().replace("\u2029", "\n")
+        removed_text = self.buffer.replace_utf16(position, removed, inserted_text)
+        if not self._journal_paused and (removed_text or inserted_text):
+            self.journal.record(position, removed_text, inserted_text)
+
+    # Undo journal
+
+    def undo(self):
+        """Undo the latest step in the journal."""
+        step = self.journal.undo()
+        if step is not None:
+            self._apply_journal_step([(offset, inserted, removed) for offset, removed, inserted in reversed(step)])
+
+    def redo(self):
+        """Redo the step undone last."""
+        step = self.journal.redo()
+        if step is not None:
+            self._apply_journal_step(step)
+
+    def _apply_journal_step(self, deltas):
+        """Replace `old` with `new` at each (offset, old, new) in one edit block, without recording it.
+
+        Journal offsets are document positions, so `old` spans utf16_len(old) of them.
+        """
+        self._journal_paused = True
+        cursor = QTextCursor(self.document())
+        cursor.beginEditBlock()
+        try:
+            for offset, old, new in deltas:
+                cursor.setPosition(offset)
+                cursor.setPosition(offset + utf16_len(old), QTextCursor.KeepAnchor)
+                cursor.insertText(new)
+        finally:
+            cursor.endEditBlock()
+            self._journal_paused = False
+        self.setTextCursor(cursor)
+        self.document().setModified(not self.journal.is_saved())
+
+    def _modification_changed(self, modified):
+        if not modified and not self.is_loading():
+            self.journal.mark_saved()
+
+    def set_undo_memory(self, megabytes):
+        """Cap the undo history kept in memory; older steps go to the on-disk journal."""
+        self.undo_memory_cap = int(megabytes * 1024 * 1024)
+        self.journal.set_memory_cap(self.undo_memory_cap)
+
+    def open_journal(self):
+        """Start the undo journal for `file_path`, taking back saved history if it was saved for this text."""
+        self.journal = UndoJournal(self.file_path, self.undo_memory_cap)
+        if self.journal.saved_digest() is None:
+            self.journal.discard()  # Frames left behind by a crash
+        else:
+            self.journal.restore(text_digest(self.buffer.iter_chunks()))
+
+    def close_journal(self):
+        """Write the undo history to disk, for an editor that is about to go away."""
+        if self.journal.can_undo() or self.journal.can_redo():
+            self.journal.save(text_digest(self.buffer.iter_chunks()))
+        else:
+            self.journal.discard()
+
+    def _set_text_unrecorded(self, text):
+        self._journal_paused = True
+        try:
+            super().setPlainText(text)
+        finally:
+            self._journal_paused = False
+
+    def load_text(self, text):
+        """Show `text` without recording an undo step, then open the journal for `file_path`."""
+        self._set_text_unrecorded(text)
+        self.open_journal()
+
+    def setPlainText(self, text):
+        """Replace the whole text and start a fresh undo history, as QPlainTextEdit does."""
+        self._set_text_unrecorded(text)
+        self.journal.discard()
+        self.journal = UndoJournal(self.file_path, self.undo_memory_cap)
+        self._cursor_history.clear()
+
+    def apply_foreign_edit(self, position, length, text):
+        """Replace `length` units at `position` with `text` for an edit made elsewhere, such as by a collaborator.
+
+        The edit is not an undo step of this editor; the undo history is
+        rebased past it, so undo keeps reverting only the edits made here.
+        """
+        self._journal_paused = True
+        try:
+            cursor = QTextCursor(self.document())
+            cursor.setPosition(position)
+            cursor.setPosition(position + length, QTextCursor.KeepAnchor)
+            cursor.insertText(text)
+        finally:
+            self._journal_paused = False
+        if self.journal.rebase(position, length, utf16_len(text)):
+            self._cursor_history.clear()  # Keyed by undo step numbers, which just shifted
+
+    def iter_text_chunks(self):
+        """Stream the editor contents without building one large string."""
+        return self.buffer.iter_chunks()
+
+    def write_to(self, stream):
+        """Write the editor contents to a text-mode file object."""
+        self.buffer.write_to(stream)
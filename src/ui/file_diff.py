@@ -0,0 +1,124 @@
+# src/ui/file_diff.py
+
+from bisect import bisect_left
+from collections import Counter
+from difflib import SequenceMatcher
+
+MAX_DIFF_CELLS = 250_000  # Beyond old x new lines without a unique anchor, replace the region in one edit
+
+
+def _runs(indices):
+    """Group ascending indices into (first, last) runs of consecutive values."""
+    runs = []
+    for index in indices:
+        if runs and runs[-1][1] == index - 1:
+            runs[-1][1] = index
+        else:
+            runs.append([index, index])
+    return [tuple(run) for run in runs]
+
+
+def diff_entries(old, new):
+    """Compare two sorted folder listings.
+
+    Returns (removed, inserted): `removed` is a list of (first, last) row
+    runs of `old`, last run first, and `inserted` a list of (row, entries)
+    runs of `new`, first run first. Removing and then inserting in that
+    order turns `old` into `new` while leaving unchanged rows untouched.
+    """
+    removed, inserted = [], []
+    i = j = 0
+    while i < len(old) or j < len(new):
+        if i < len(old) and j < len(new) and old[i] == new[j]:
+            i += 1
+            j += 1
+        elif j >= len(new) or (i < len(old) and old[i] < new[j]):
+            removed.append(i)
+            i += 1
+        else:
+            inserted.append(j)
+            j += 1
+    return (list(reversed(_runs(removed))),
+            [(first, new[first:last + 1]) for first, last in _runs(inserted)])
+
+
+def _unique_anchors(a, b, a_lo, a_hi, b_lo, b_hi):
+    """Longest run of lines that occur exactly once on both sides, in the same order (patience diff)."""
+    a_counts = Counter(a[a_lo:a_hi])
+    b_counts = Counter(b[b_lo:b_hi])
+    b_rows = {line: j for j, line in enumerate(b[b_lo:b_hi], b_lo)}
+    pairs = [(i, b_rows[line]) for i, line in enumerate(a[a_lo:a_hi], a_lo)
+             if a_counts[line] == 1 and b_counts.get(line) == 1]
+    rows = [pair[1] for pair in pairs]
+    if rows == sorted(rows):
+        return pairs  # No lines moved, the usual case
+    # Longest increasing subsequence of the b positions
+    tails, tail_pairs, previous = [], [], {}
+    for pair in pairs:
+        k = bisect_left(tails, pair[1])
+        previous[pair] = tail_pairs[k - 1] if k else None
+        if k == len(tails):
+            tails.append(pair[1])
+            tail_pairs.append(pair)
+        else:
+            tails[k] = pair[1]
+            tail_pairs[k] = pair
+    anchors = []
+    pair = tail_pairs[-1] if tail_pairs else None
+    while pair is not None:
+        anchors.append(pair)
+        pair = previous[pair]
+    anchors.reverse()
+    return anchors
+
+
+def _changed_ranges(a, b):
+    """(a_lo, a_hi, b_lo, b_hi) line ranges that differ between `a` and `b`, in order."""
+    ranges = []
+    stack = [(0, len(a), 0, len(b))]
+    while stack:
+        a_lo, a_hi, b_lo, b_hi = stack.pop()
+        # Lines shared at both ends are common after a checkout and cost nothing to skip
+        while a_lo < a_hi and b_lo < b_hi and a[a_lo] == b[b_lo]:
+            a_lo += 1
+            b_lo += 1
+        while a_lo < a_hi and b_lo < b_hi and a[a_hi - 1] == b[b_hi - 1]:
+            a_hi -= 1
+            b_hi -= 1
+        if a_lo == a_hi or b_lo == b_hi:
+            if a_lo < a_hi or b_lo < b_hi:
+                ranges.append((a_lo, a_hi, b_lo, b_hi))
+            continue
+        anchors = _unique_anchors(a, b, a_lo, a_hi, b_lo, b_hi)
+        if anchors:
+            for a_next, b_next in anchors + [(a_hi, b_hi)]:
+                if a_next > a_lo or b_next > b_lo:
+                    stack.append((a_lo, a_next, b_lo, b_next))
+                a_lo, b_lo = a_next + 1, b_next + 1
+        elif (a_hi - a_lo) * (b_hi - b_lo) <= MAX_DIFF_CELLS:
+            matcher = SequenceMatcher(None, a[a_lo:a_hi], b[b_lo:b_hi], autojunk=False)
+            ranges.extend((i1 + a_lo, i2 + a_lo, j1 + b_lo, j2 + b_lo)
+                          for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != "equal")
+        else:
+            ranges.append((a_lo, a_hi, b_lo, b_hi))
+    ranges.sort()
+    return ranges
+
+
+def text_edits(old, new):
+    """Line-level (offset, length, text) edits that turn `old` into `new`, last edit first.
+
+    Offsets are character positions in `old`; applying the edits in the
+    returned order keeps every earlier offset valid.
+    """
+    if old == new:
+        return []
+    a = old.splitlines(keepends=True)
+    b = new.splitlines(keepends=True)
+    starts = [0]
+    for line in a:
+        starts.append(starts[-1] + len(line))
+    edits = [(starts[a_lo], starts[a_hi] - starts[a_lo], "".join(b[b_lo:b_hi]))
+             for a_lo, a_hi, b_lo, b_hi in _changed_ranges(a, b)]
+    edits.reverse()
+    return edits
@@ -1,109 +1,359 @@
 # src/ui/file_explorer.py
 
 import os
+from concurrent.futures import ThreadPoolExecutor
 from PyQt5.QtWidgets import (
-    QWidget, QVBoxLayout, QLineEdit, QTreeWidget, QTreeWidgetItem, QLabel, QMenu, QAction, QMessageBox
+    QWidget, QVBoxLayout, QLineEdit, QTreeView, QListWidget, QListWidgetItem, QLabel, QMenu,
+    QAction, QMessageBox, QShortcut
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QAbstractItemModel, QModelIndex, QThread, pyqtSignal
+from PyQt5.QtGui import QKeySequence
+from src.ui.file_diff import diff_entries
+from src.ui.file_index import FileIndex
+from src.ui.perf_monitor import timed
+
+
+class _Node:
+    """A file or folder in the lazy tree model."""
+    __slots__ = ("name", "path", "is_dir", "parent", "row", "children")
+
+    def __init__(self, name, path, is_dir, parent=None, row=0):
+        self.name = name
+        self.path = path
+        self.is_dir = is_dir
+        self.parent = parent
+        self.row = row
+        self.children = None  # None until the folder has been listed
+
+
+def _list_folder(path):
+    """Return (sorted (name, path, is_dir) entries or None if unreadable, permission denied)."""
+    entries = []
+    try:
+        with os.scandir(path) as scanner:
+            for entry in scanner:
+                try:
+                    entries.append((entry.name, entry.path, entry.is_dir()))
+                except OSError:
+                    continue
+    except PermissionError:
+        return None, True
+    except OSError:
+        return None, False
+    entries.sort()
+    return entries, False
+
+
+class FileSystemModel(QAbstractItemModel):
+    """Tree model that lists a folder's entries only when the view asks for them.
+
+    Folders are listed on a background thread, so a slow or network drive
+    never blocks the GUI; rows are inserted when the listing comes back.
+    Listed folders are announced through `folder_listed` so they can be
+    watched; `refresh_folder` re-lists one of them and applies only the
+    rows that changed, keeping the expansion state of everything else.
+    """
+    access_denied = pyqtSignal(str)
+    folder_listed = pyqtSignal(str)
+    folder_dropped = pyqtSignal(str)
+    folder_refreshed = pyqtSignal(str)
+    _folder_scanned = pyqtSignal(str, object, bool)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.root = _Node("", "", True)
+        self.root.children = []
+        self.listed = {}  # path -> _Node of every folder whose children are loaded
+        self.requested = {}  # path -> _Node of folders whose first listing is still running
+        self.pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="explorer")
+        self._folder_scanned.connect(self._apply_listing)
+
+    def set_root_path(self, path):
+        """Reset the model to show `path` as its single top-level item."""
+        self.beginResetModel()
+        for folder in list(self.listed):
+            self.folder_dropped.emit(folder)
+        self.listed = {}
+        self.requested = {}  # Late listings for the old tree are ignored
+        self.root = _Node("", "", True)
+        self.root.children = [_Node(os.path.basename(os.path.abspath(path)), path, True, self.root, 0)]
+        self.endResetModel()
+        return self.index(0, 0)
+
+    def node(self, index):
+        return index.internalPointer() if index.isValid() else self.root
+
+    def index(self, row, column, parent=QModelIndex()):
+        children = self.node(parent).children
+        if children is None or not 0 <= row < len(children) or column != 0:
+            return QModelIndex()
+        return self.createIndex(row, column, children[row])
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        parent = index.internalPointer().parent
+        if parent is None or parent is self.root:
+            return QModelIndex()
+        return self.createIndex(parent.row, 0, parent)
+
+    def rowCount(self, parent=QModelIndex()):
+        children = self.node(parent).children
+        return len(children) if children is not None else 0
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def hasChildren(self, parent=QModelIndex()):
+        node = self.node(parent)
+        return node.is_dir and (node.children is None or len(node.children) > 0)
+
+    def canFetchMore(self, parent):
+        node = self.node(parent)
+        return node.is_dir and node.children is None and node.path not in self.requested
+
+    @timed("explorer.fetchMore")
+    def fetchMore(self, parent):
+        """Ask the lister thread for a folder's entries when it is first expanded; rows arrive later."""
+        node = self.node(parent)
+        if node.children is not None or node.path in self.requested:
+            return
+        self.requested[node.path] = node
+        self.pool.submit(self._scan, node.path)
+
+    def refresh_folder(self, path):
+        """Re-list a folder that changed on disk; only the rows that differ are applied. Return True if queued."""
+        if path not in self.listed:
+            return False
+        self.pool.submit(self._scan, path)
+        return True
+
+    def _scan(self, path):
+        """Lister thread: list one folder and report back through a queued signal."""
+        try:
+            self._folder_scanned.emit(path, *_list_folder(path))
+        except RuntimeError:
+            pass  # The model was deleted while the folder was being listed
+
+    @timed("explorer.apply_listing")
+    def _apply_listing(self, path, entries, denied):
+        node = self.requested.pop(path, None)
+        if node is not None:
+            if denied:
+                self.access_denied.emit(path)
+            self._populate(node, entries or [])
+            return
+        node = self.listed.get(path)
+        if node is None or entries is None:
+            return  # Dropped meanwhile, or gone or unreadable: its parent folder's refresh removes it
+        removed, inserted = diff_entries([(child.name, child.path, child.is_dir) for child in node.children],
+                                         entries)
+        if not removed and not inserted:
+            return
+        parent = self.createIndex(node.row, 0, node)
+        for first, last in removed:
+            self.beginRemoveRows(parent, first, last)
+            for child in node.children[first:last + 1]:
+                self._drop(child)
+            del node.children[first:last + 1]
+            self._renumber(node, first)
+            self.endRemoveRows()
+        for first, run in inserted:
+            self.beginInsertRows(parent, first, first + len(run) - 1)
+            node.children[first:first] = [_Node(name, child_path, is_dir, node, first + offset)
+                                          for offset, (name, child_path, is_dir) in enumerate(run)]
+            self._renumber(node, first + len(run))
+            self.endInsertRows()
+        self.folder_refreshed.emit(path)
+
+    def _populate(self, node, entries):
+        node.children = []
+        self.listed[node.path] = node
+        self.folder_listed.emit(node.path)
+        if not entries:
+            return
+        self.beginInsertRows(self.createIndex(node.row, 0, node), 0, len(entries) - 1)
+        node.children = [_Node(name, path, is_dir, node, row)
+                         for row, (name, path, is_dir) in enumerate(entries)]
+        self.endInsertRows()
+
+    def _renumber(self, node, start):
+        for row in range(start, len(node.children)):
+            node.children[row].row = row
+
+    def _drop(self, node):
+        """Forget the listed folders under a removed node."""
+        if node.children is None:
+            return
+        self.listed.pop(node.path, None)
+        self.folder_dropped.emit(node.path)
+        for child in node.children:
+            self._drop(child)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        node = index.internalPointer()
+        if role == Qt.DisplayRole:
+            return node.name
+        if role == Qt.UserRole:
+            return node.path
+        return None
+
+
+class IndexWorker(QThread):
+    """Builds a FileIndex for a folder off the GUI thread."""
+    progress = pyqtSignal(int)
+    index_ready = pyqtSignal(object)
+
+    def __init__(self, root):
+        super().__init__()
+        self.root = root
+
+    def run(self):
+        index = FileIndex.build(self.root, should_stop=self.isInterruptionRequested,
+                                progress=self.progress.emit)
+        if index is not None:
+            self.index_ready.emit(index)
 
 
 class FileExplorer(QWidget):
     """Improved File Explorer with dynamic search and optimized folder loading."""
-    def __init__(self, open_file_callback):
+    index_ready = pyqtSignal(object)
+
+    def __init__(self, open_file_callback, watcher=None):
         super().__init__()
         self.open_file_callback = open_file_callback
+        self.watcher = watcher  # FileWatcher that keeps listed folders current
+        self.root_path = None
+        self.index = None
+        self.index_worker = None
 
-        # Search bar for filtering files and folders
+        # Search bar for fuzzy file search over the background index
         self.search_bar = QLineEdit()
-        self.search_bar.setPlaceholderText("Search files...")
+        self.search_bar.setPlaceholderText("Search files... (Ctrl+P)")
         self.search_bar.textChanged.connect(self.filter_tree)
+        self.search_bar.returnPressed.connect(self.open_first_result)
+        QShortcut(QKeySequence("Ctrl+P"), self, self.search_bar.setFocus, context=Qt.WindowShortcut)
 
-        # Tree widget to display files and folders
-        self.tree = QTreeWidget()
+        # Lazy tree of files and folders
+        self.model = FileSystemModel(self)
+        self.model.access_denied.connect(
+            lambda path: QMessageBox.warning(self, "Permission Denied", f"Cannot access: {path}"))
+        self.model.folder_refreshed.connect(lambda path: self.status_label.setText(f"Updated {path}"))
+        if watcher is not None:
+            self.model.folder_listed.connect(watcher.watch_folder)
+            self.model.folder_dropped.connect(watcher.unwatch_folder)
+            watcher.folders_changed.connect(self.refresh_folders)
+        self.tree = QTreeView()
+        self.tree.setModel(self.model)
         self.tree.setHeaderHidden(True)  # Hide the header for simplicity
         self.tree.setContextMenuPolicy(Qt.CustomContextMenu)
         self.tree.customContextMenuRequested.connect(self.open_context_menu)
-        self.tree.itemDoubleClicked.connect(self.open_item)
+        self.tree.doubleClicked.connect(self.open_item)
+
+        # Ranked search results replace the tree while a query is active
+        self.results = QListWidget()
+        self.results.itemActivated.connect(self.open_result)
+        self.results.hide()
+
+        self.status_label = QLabel()
 
         # Layout setup
         layout = QVBoxLayout()
         layout.addWidget(QLabel("File Explorer"))
         layout.addWidget(self.search_bar)
         layout.addWidget(self.tree)
+        layout.addWidget(self.results)
+        layout.addWidget(self.status_label)
         self.setLayout(layout)
 
         # Load the initial directory structure
         self.load_directory(".")
 
     def load_directory(self, path):
-        """Load the root directory into the tree."""
-        self.tree.clear()  # Clear the tree before loading
-        root_item = QTreeWidgetItem(self.tree, [os.path.basename(path)])
-        root_item.setData(0, Qt.UserRole, path)  # Store the full path
-        self.add_children(root_item, path)  # Add child files/folders recursively
-        root_item.setExpanded(True)  # Expand the root folder
-
-    def add_children(self, parent_item, path):
-        """Recursively add child files and folders."""
-        try:
-            for entry in sorted(os.listdir(path)):
-                entry_path = os.path.join(path, entry)
-                child_item = QTreeWidgetItem(parent_item, [entry])
-                child_item.setData(0, Qt.UserRole, entry_path)
-
-                if os.path.isdir(entry_path):
-                    # Mark as expandable for lazy loading
-                    child_item.setChildIndicatorPolicy(QTreeWidgetItem.ShowIndicator)
-                else:
-                    child_item.setChildIndicatorPolicy(QTreeWidgetItem.DontShowIndicatorWhenChildless)
-        except PermissionError:
-            QMessageBox.warning(self, "Permission Denied", f"Cannot access: {path}")
-
-    def open_item(self, item, column):
+        """Show `path` in the tree and (re)build its search index in the background."""
+        self.root_path = path
+        root_index = self.model.set_root_path(path)
+        self.tree.expand(root_index)  # Expand the root folder
+        self.start_indexing()
+
+    def refresh_folders(self, paths):
+        """Re-list a batch of changed folders; the tree applies each listing as it arrives."""
+        for path in paths:
+            self.model.refresh_folder(path)
+
+    def start_indexing(self):
+        """Start a worker thread that indexes the whole tree for fuzzy search."""
+        if self.index_worker is not None:
+            self.index_worker.requestInterruption()
+            self.index_worker.wait()
+        self.index_worker = IndexWorker(self.root_path)
+        self.index_worker.progress.connect(
+            lambda count: self.status_label.setText(f"Indexing... {count} entries"))
+        self.index_worker.index_ready.connect(self._set_index)
+        self.index_worker.start()
+
+    def _set_index(self, index):
+        self.index = index
+        self.status_label.setText(f"{len(index)} files indexed")
+        if self.search_bar.text():
+            self.filter_tree()
+        self.index_ready.emit(index)
+
+    def open_item(self, index, column=0):
         """Handle double-clicks to open files or expand folders."""
-        full_path = item.data(0, Qt.UserRole)
-
-        if os.path.isdir(full_path):
-            # Check if the folder is already loaded
-            if item.childCount() == 0:
-                # Lazy load the folder's contents
-                self.add_children(item, full_path)
-            item.setExpanded(True)  # Expand the folder on double-click
+        node = self.model.node(index)
+        if node.is_dir:
+            self.tree.expand(index)  # Expanding fetches the folder's contents lazily
         else:
-            # If it's a file, open it in the editor
-            try:
-                with open(full_path, 'r') as f:
-                    content = f.read()
-                    self.open_file_callback(full_path, content)
-            except FileNotFoundError:
-                QMessageBox.warning(self, "Error", f"File not found: {full_path}")
-            except Exception as e:
-                QMessageBox.critical(self, "Error", str(e))
+            self.open_path(node.path)
+
+    def open_path(self, full_path):
+        """Open a file in the editor, reporting failures."""
+        # The editor maps the file lazily
+        try:
+            self.open_file_callback(full_path)
+        except FileNotFoundError:
+            QMessageBox.warning(self, "Error", f"File not found: {full_path}")
+        except Exception as e:
+            QMessageBox.critical(self, "Error", str(e))
 
     def open_context_menu(self, position):
         """Open the context menu with file operations."""
-        item = self.tree.itemAt(position)
-        if item:
+        index = self.tree.indexAt(position)
+        if index.isValid():
             menu = QMenu(self)
             open_action = QAction("Open", self)
-            open_action.triggered.connect(lambda: self.open_item(item, 0))
+            open_action.triggered.connect(lambda: self.open_item(index, 0))
             menu.addAction(open_action)
             menu.exec_(self.tree.viewport().mapToGlobal(position))
 
     def filter_tree(self):
-        """Filter the tree view based on search input."""
-        search_text = self.search_bar.text().lower()
-        root = self.tree.invisibleRootItem()
-        self._filter_items(root, search_text)
-
-    def _filter_items(self, parent_item, search_text):
-        """Recursively filter tree items based on search input."""
-        for i in range(parent_item.childCount()):
-            child = parent_item.child(i)
-            item_text = child.text(0).lower()
-            match = search_text in item_text
-
-            # Show or hide the item based on the search match
-            child.setHidden(not match)
-            if not match:
-                self._filter_items(child, search_text)  # Continue filtering children
+        """Show ranked fuzzy matches from the index for the search input."""
+        search_text = self.search_bar.text()
+        if not search_text:
+            self.results.hide()
+            self.tree.show()
+            return
+        self.tree.hide()
+        self.results.show()
+        self.results.clear()
+        if self.index is None:
+            self.results.addItem("Indexing...")
+            return
+        for _, relative_path in self.index.query(search_text):
+            item = QListWidgetItem(relative_path)
+            item.setData(Qt.UserRole, os.path.join(self.root_path, relative_path))
+            self.results.addItem(item)
+
+    def open_result(self, item):
+        """Open the file behind a search result."""
+        full_path = item.data(Qt.UserRole)
+        if full_path:
+            self.open_path(full_path)
+
+    def open_first_result(self):
+        """Open the best match when Enter is pressed in the search bar."""
+        if self.results.isVisible() and self.results.count():
+            self.open_result(self.results.item(0))
@@ -0,0 +1,293 @@
+# src/ui/file_index.py
+
+import heapq
+import os
+import re
+import time
+from array import array
+
+ALWAYS_SKIPPED = {".git", ".hg", ".svn", "__pycache__"}
+QUERY_BUDGET_MS = 6  # Time allowed for candidate verification in a single query
+FUZZY_MIN_MS = 2  # Subsequence matching always gets at least this long
+
+
+def _glob_to_regex(pattern):
+    """Translate one gitignore glob into a regex over '/'-separated relative paths."""
+    parts, i = [], 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+            continue
+        if char == "*":
+            parts.append("[^/]*")
+        elif char == "?":
+            parts.append("[^/]")
+        elif char == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                parts.append(re.escape(char))
+            else:
+                body = pattern[i + 1:end].replace("\\", "\\\\")
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                parts.append(f"[{body}]")
+                i = end
+        else:
+            parts.append(re.escape(char))
+        i += 1
+    return "".join(parts)
+
+
+class IgnoreRules:
+    """The .gitignore rules in effect for one directory, chained to its parent's rules."""
+    def __init__(self, parent=None):
+        self.parent = parent
+        self.rules = []
+
+    @classmethod
+    def load(cls, parent, directory, base):
+        """Return rules for `directory`, adding its .gitignore if it has one."""
+        path = os.path.join(directory, ".gitignore")
+        try:
+            with open(path, "r", errors="replace") as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return parent
+        rules = cls(parent)
+        for line in lines:
+            line = line.rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            anchored = "/" in line
+            line = line.lstrip("/")
+            regex = _glob_to_regex(line)
+            if not anchored:
+                regex = "(?:.*/)?" + regex
+            rules.rules.append((re.compile(regex + "$"), negate, dir_only, base))
+        return rules
+
+    def ignored(self, relative_path, is_dir):
+        """Return True if the last matching rule (deepest file first) ignores the path."""
+        rules = self
+        while rules is not None:
+            for regex, negate, dir_only, base in reversed(rules.rules):
+                if dir_only and not is_dir:
+                    continue
+                if base:
+                    if not relative_path.startswith(base + "/"):
+                        continue
+                    target = relative_path[len(base) + 1:]
+                else:
+                    target = relative_path
+                if regex.match(target):
+                    return not negate
+            rules = rules.parent
+        return False
+
+
+class FileIndex:
+    """Compact, query-optimised index of every file below a root directory.
+
+    Path segments are interned, so each file costs two integers (directory id,
+    name id). Trigram and character postings are kept per unique lowercase
+    file name, which is far smaller than the file count in large repositories.
+    """
+    def __init__(self, root):
+        self.root = root
+        self.segments = []
+        self._segment_ids = {}
+        self.dir_parent = array("i")
+        self.dir_name = array("i")
+        self.file_dir = array("i")
+        self.file_name = array("i")
+        self.names = []  # Unique lowercase file names
+        self._name_ids = {}
+        self.name_files = []  # name id -> array of file ids
+        self.trigrams = {}  # trigram -> array of name ids
+        self.chars = {}  # character -> array of name ids
+        self._dir_paths = {}
+
+    def _intern(self, segment):
+        segment_id = self._segment_ids.get(segment)
+        if segment_id is None:
+            segment_id = self._segment_ids[segment] = len(self.segments)
+            self.segments.append(segment)
+        return segment_id
+
+    def _add_dir(self, parent, name):
+        self.dir_parent.append(parent)
+        self.dir_name.append(self._intern(name) if name else -1)
+        return len(self.dir_parent) - 1
+
+    def _add_file(self, dir_id, name):
+        file_id = len(self.file_dir)
+        self.file_dir.append(dir_id)
+        self.file_name.append(self._intern(name))
+
+        lower = name.lower()
+        name_id = self._name_ids.get(lower)
+        if name_id is None:
+            name_id = self._name_ids[lower] = len(self.names)
+            self.names.append(lower)
+            self.name_files.append(array("I"))
+            for trigram in {lower[i:i + 3] for i in range(len(lower) - 2)}:
+                self.trigrams.setdefault(trigram, array("I")).append(name_id)
+            for char in set(lower):
+                self.chars.setdefault(char, array("I")).append(name_id)
+        self.name_files[name_id].append(file_id)
+
+    @classmethod
+    def build(cls, root, should_stop=lambda: False, progress=None):
+        """Walk `root` with os.scandir, honouring .gitignore files, and return the index."""
+        index = cls(root)
+        stack = [(root, "", index._add_dir(-1, ""), IgnoreRules.load(None, root, ""))]
+        scanned = 0
+        while stack:
+            if should_stop():
+                return None
+            directory, relative, dir_id, rules = stack.pop()
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                name = entry.name
+                if name in ALWAYS_SKIPPED:
+                    continue
+                entry_relative = f"{relative}/{name}" if relative else name
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    continue
+                if rules is not None and rules.ignored(entry_relative, is_dir):
+                    continue
+                if is_dir:
+                    child_id = index._add_dir(dir_id, name)
+                    child_rules = IgnoreRules.load(rules, entry.path, entry_relative)
+                    stack.append((entry.path, entry_relative, child_id, child_rules))
+                else:
+                    index._add_file(dir_id, name)
+            scanned += len(entries)
+            if progress is not None:
+                progress(scanned)
+        return index
+
+    def __len__(self):
+        return len(self.file_dir)
+
+    def dir_path(self, dir_id):
+        """Return the relative path of a directory, memoised per directory."""
+        path = self._dir_paths.get(dir_id)
+        if path is None:
+            if dir_id <= 0:
+                path = ""
+            else:
+                parent = self.dir_path(self.dir_parent[dir_id])
+                name = self.segments[self.dir_name[dir_id]]
+                path = f"{parent}/{name}" if parent else name
+            self._dir_paths[dir_id] = path
+        return path
+
+    def path(self, file_id):
+        """Return the relative path of a file."""
+        directory = self.dir_path(self.file_dir[file_id])
+        name = self.segments[self.file_name[file_id]]
+        return f"{directory}/{name}" if directory else name
+
+    def _rarest_posting(self, keys, postings):
+        """Return the shortest posting list among `keys`, or None if any key is absent."""
+        best = None
+        for key in keys:
+            posting = postings.get(key)
+            if posting is None:
+                return None
+            if best is None or len(posting) < len(best):
+                best = posting
+        return best
+
+    def query(self, text, limit=50):
+        """Return up to `limit` (score, relative_path) pairs for a fuzzy Ctrl+P style query.
+
+        Candidates come from the rarest trigram (substring pass) or the rarest
+        character (subsequence pass) and are verified with C-level string and
+        regex checks. Both passes share a time budget, so a query on a huge
+        index returns the best results found so far instead of stalling.
+        """
+        text = text.strip().lower()
+        if not text:
+            return []
+        directory_query, _, name_query = text.rpartition("/")
+        if not name_query:
+            return []
+
+        names = self.names
+        scored = {}
+        deadline = time.perf_counter() + QUERY_BUDGET_MS / 1000
+
+        if len(name_query) >= 3:
+            keys = {name_query[i:i + 3] for i in range(len(name_query) - 2)}
+            candidates = self._rarest_posting(keys, self.trigrams)
+        else:
+            candidates = self._rarest_posting(set(name_query), self.chars)
+        for count, name_id in enumerate(candidates or ()):
+            if count & 255 == 0 and time.perf_counter() > deadline:
+                break
+            name = names[name_id]
+            position = name.find(name_query)
+            if position < 0:
+                continue
+            score = 200 - position - len(name) * 0.1
+            if position == 0:
+                score += 50
+            elif not name[position - 1].isalnum():
+                score += 20
+            scored[name_id] = score
+
+        # Subsequence pass for queries like "fxpl" -> file_explorer.py
+        matcher = re.compile(".*?".join(re.escape(char) for char in name_query))
+        deadline = max(deadline, time.perf_counter() + FUZZY_MIN_MS / 1000)
+        for count, name_id in enumerate(self._rarest_posting(set(name_query), self.chars) or ()):
+            if count & 255 == 0 and time.perf_counter() > deadline:
+                break
+            if name_id in scored:
+                continue
+            match = matcher.search(names[name_id])
+            if match is not None:
+                start, end = match.span()
+                gaps = end - start - len(name_query)
+                scored[name_id] = 100 - gaps * 2 - start - len(names[name_id]) * 0.1
+
+        directory_matcher = None
+        if directory_query:
+            directory_matcher = re.compile(".*?".join(re.escape(char) for char in directory_query))
+        # Walk names best first, filtering on the directory before anything is cut; a path never
+        # scores above its name, so once `limit` results beat the next name the rest cannot enter
+        results = []  # Min-heap of the best `limit` (score, path) pairs
+        for name_id, score in sorted(scored.items(), key=lambda item: -item[1]):
+            if len(results) >= limit and score <= results[0][0]:
+                break
+            files = self.name_files[name_id]
+            if directory_matcher is None:
+                files = files[:limit]  # Without a directory filter, `limit` files of one name fill the results
+            for file_id in files:
+                path = self.path(file_id)
+                if directory_matcher is not None and not directory_matcher.search(path.lower()):
+                    continue
+                # Prefer shallow paths when names tie
+                entry = (score - path.count("/") * 0.5, path)
+                if len(results) < limit:
+                    heapq.heappush(results, entry)
+                elif entry > results[0]:
+                    heapq.heapreplace(results, entry)
+        return sorted(results, key=lambda item: (-item[0], item[1]))
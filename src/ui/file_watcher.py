@@ -0,0 +1,84 @@
+# src/ui/file_watcher.py
+
+import os
+from PyQt5.QtCore import QObject, QFileSystemWatcher, QTimer, pyqtSignal
+
+COALESCE_MS = 100  # Changes reported within this window after the first one are delivered together
+
+
+class FileWatcher(QObject):
+    """Coalesced change feed over a QFileSystemWatcher.
+
+    Only folders the explorer has listed and files open in tabs are
+    watched. A burst of notifications, such as a branch switch touching
+    thousands of files, is collected for COALESCE_MS and delivered as one
+    batch of distinct paths. Files replaced by an atomic rename drop out
+    of the underlying watcher, so they are re-added after every batch.
+    """
+    folders_changed = pyqtSignal(list)
+    files_changed = pyqtSignal(list)
+
+    def __init__(self, parent=None, delay_ms=COALESCE_MS):
+        super().__init__(parent)
+        self.watcher = QFileSystemWatcher(self)
+        self.files = set()  # Files that should be watched, whether or not they exist right now
+        self._folders = set()
+        self._changed_folders = set()
+        self._changed_files = set()
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay_ms)
+        self.timer.timeout.connect(self._flush)
+        self.watcher.directoryChanged.connect(self._folder_changed)
+        self.watcher.fileChanged.connect(self._file_changed)
+
+    def watch_folder(self, path):
+        if path not in self._folders and os.path.isdir(path):
+            self._folders.add(path)
+            self.watcher.addPath(path)
+
+    def unwatch_folder(self, path):
+        if path in self._folders:
+            self._folders.discard(path)
+            self.watcher.removePath(path)
+
+    def watch_file(self, path):
+        self.files.add(path)
+        if os.path.exists(path) and path not in self.watcher.files():
+            self.watcher.addPath(path)
+
+    def unwatch_file(self, path):
+        self.files.discard(path)
+        if path in self.watcher.files():
+            self.watcher.removePath(path)
+
+    def clear_folders(self):
+        if self._folders:
+            self.watcher.removePaths(list(self._folders))
+        self._folders.clear()
+        self._changed_folders.clear()
+
+    def _folder_changed(self, path):
+        self._changed_folders.add(path)
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def _file_changed(self, path):
+        self._changed_files.add(path)
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def _flush(self):
+        folders, self._changed_folders = sorted(self._changed_folders), set()
+        files, self._changed_files = sorted(self._changed_files), set()
+        watched = set(self.watcher.files())
+        missing = [path for path in self.files if path not in watched and os.path.exists(path)]
+        if missing:
+            self.watcher.addPaths(missing)
+        for path in [path for path in self._folders if not os.path.isdir(path)]:
+            self._folders.discard(path)  # Deleted folders drop out of the watcher by themselves
+        if folders:
+            self.folders_changed.emit(folders)
+        if files:
+            self.files_changed.emit(files)
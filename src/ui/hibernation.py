@@ -0,0 +1,102 @@
+# src/ui/hibernation.py
+
+import zlib
+from collections import OrderedDict
+
+DEFAULT_BUDGET_MB = 512  # Used when config/settings.json has no tab_memory_budget_mb
+CHAR_BYTES = 4  # QString (UTF-16) in the document plus the piece table's copy of edits
+BLOCK_BYTES = 320  # Per-line layout, user data and highlighter formats
+WIDGET_BYTES = 256 * 1024  # Editor widget, viewport, highlighter and controllers
+COMPRESSION_LEVEL = 1  # Fast: hibernation runs on the GUI thread
+
+
+def estimate_editor_bytes(characters, blocks):
+    """Rough resident cost of a live editor showing `characters` in `blocks` lines."""
+    return WIDGET_BYTES + characters * CHAR_BYTES + blocks * BLOCK_BYTES
+
+
+def format_bytes(size):
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+class HibernatedTab:
+    """Everything needed to rebuild an editor: compressed text plus view and undo metadata.
+
+    The undo history itself is saved to the editor's on-disk UndoJournal and
+    taken back by the restored editor; `undo_steps` and `modified` record
+    how far the document had moved from its last save, and a restored
+    document keeps the modified flag.
+    """
+    __slots__ = ("path", "encoding", "data", "characters", "cursor", "anchor", "scroll",
+                 "modified", "undo_steps")
+
+    def __init__(self, path, text, encoding="utf-8", cursor=0, anchor=0, scroll=(0, 0),
+                 modified=False, undo_steps=0):
+        self.path = path
+        self.encoding = encoding
+        self.data = zlib.compress(text.encode("utf-8", "surrogatepass"), COMPRESSION_LEVEL)
+        self.characters = len(text)
+        self.cursor = cursor
+        self.anchor = anchor
+        self.scroll = scroll
+        self.modified = modified
+        self.undo_steps = undo_steps
+
+    def text(self):
+        return zlib.decompress(self.data).decode("utf-8", "surrogatepass")
+
+    def size(self):
+        return len(self.data)
+
+
+class TabBudget:
+    """Least-recently-used bookkeeping of live tabs against a memory budget."""
+    def __init__(self, budget_bytes=DEFAULT_BUDGET_MB * 1024 * 1024):
+        self.budget_bytes = budget_bytes
+        self._live = OrderedDict()  # key -> estimated bytes, least recently used first
+
+    def touch(self, key, estimate=None):
+        """Mark `key` as just used, optionally updating its estimate."""
+        if estimate is None:
+            estimate = self._live.get(key, 0)
+        self._live[key] = estimate
+        self._live.move_to_end(key)
+
+    def update(self, key, estimate):
+        if key in self._live:
+            self._live[key] = estimate
+
+    def remove(self, key):
+        self._live.pop(key, None)
+
+    def estimate(self, key):
+        return self._live.get(key, 0)
+
+    def total(self):
+        return sum(self._live.values())
+
+    def keys(self):
+        return list(self._live)
+
+    def __contains__(self, key):
+        return key in self._live
+
+    def __len__(self):
+        return len(self._live)
+
+    def victims(self, keep=()):
+        """Least recently used keys to hibernate until the live total fits the budget."""
+        excess = self.total() - self.budget_bytes
+        victims = []
+        for key, estimate in self._live.items():
+            if excess <= 0:
+                break
+            if key in keep:
+                continue
+            victims.append(key)
+            excess -= estimate
+        return victims
@@ -0,0 +1,161 @@
+# src/ui/large_file_viewer.py
+
+from PyQt5.QtWidgets import QAbstractScrollArea, QWidget, QInputDialog, QShortcut
+from PyQt5.QtGui import QFont, QPainter, QColor, QKeySequence
+from PyQt5.QtCore import QRect, QSize, Qt, QTimer, pyqtSignal
+from src.ui.line_index import LineIndex
+
+TAIL_POLL_MS = 1000  # How often a growing file is checked for new data
+MAX_DRAW_CHARS = 4096  # Characters of a line drawn at most; the index already caps the bytes read
+
+
+class ViewerLineNumberArea(QWidget):
+    """Line number gutter for the large file viewer, painted from the visible range only."""
+    def __init__(self, viewer):
+        super().__init__(viewer)
+        self.viewer = viewer
+
+    def sizeHint(self):
+        return QSize(self.viewer.line_number_area_width(), 0)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(event.rect(), QColor(240, 240, 240))
+        height = self.viewer.fontMetrics().height()
+        first = self.viewer.first_visible_line()
+        count = min(self.viewer.visible_line_count(), self.viewer.index.line_count() - first)
+        for row in range(max(count, 0)):
+            painter.drawText(0, row * height, self.width() - 5, height, Qt.AlignRight, str(first + row + 1))
+
+
+class LargeFileViewer(QAbstractScrollArea):
+    """Read-only view of a file too large to edit.
+
+    The file is memory-mapped and indexed by a LineIndex a step per
+    event-loop tick, so the first screen shows at once. Only the visible
+    lines are decoded and painted, and memory stays flat whatever the file
+    size. Ctrl+G jumps to a line; scrolling to the end follows a growing
+    file like `tail -f`.
+    """
+    progress = pyqtSignal(str)
+
+    def __init__(self, path):
+        super().__init__()
+        self.file_path = path
+        self.index = LineIndex(path)
+        self.index.scan()
+        self.follow = False  # Keep the last line in view as the file grows
+        self._pending_line = None  # Jump target not indexed yet
+        self._widest = 0
+
+        font = QFont("Fira Code", 12)
+        font.setStyleHint(QFont.Monospace)
+        self.setFont(font)
+        self.line_number_area = ViewerLineNumberArea(self)
+        self.verticalScrollBar().valueChanged.connect(self._scrolled)
+        self.horizontalScrollBar().valueChanged.connect(self.viewport().update)
+        QShortcut(QKeySequence("Ctrl+G"), self, self.go_to_line_dialog)
+
+        self.scan_timer = QTimer(self)
+        self.scan_timer.timeout.connect(self._scan_step)
+        self.scan_timer.start(0)
+        self.tail_timer = QTimer(self)
+        self.tail_timer.timeout.connect(self._poll)
+        self.tail_timer.start(TAIL_POLL_MS)
+        self._update_scroll_range()
+
+    def line_number_area_width(self):
+        digits = len(str(max(1, self.index.line_count())))
+        return 10 + self.fontMetrics().horizontalAdvance('9') * max(digits, 4)
+
+    def first_visible_line(self):
+        return self.verticalScrollBar().value()
+
+    def visible_line_count(self):
+        return self.viewport().height() // max(1, self.fontMetrics().height()) + 1
+
+    def _update_scroll_range(self):
+        bar = self.verticalScrollBar()
+        rows = max(1, self.visible_line_count() - 1)
+        bar.setRange(0, max(0, self.index.line_count() - rows))
+        bar.setPageStep(rows)
+        self.setViewportMargins(self.line_number_area_width(), 0, 0, 0)
+
+    def _scan_step(self):
+        """Index one more step of the file, then repaint if new lines became visible."""
+        complete = self.index.scan()
+        self._update_scroll_range()
+        if self._pending_line is not None and (self._pending_line < self.index.line_count() or complete):
+            self.go_to_line(self._pending_line + 1)
+        if self.follow:
+            self.verticalScrollBar().setValue(self.verticalScrollBar().maximum())
+        if complete:
+            self.scan_timer.stop()
+            self.progress.emit(f"{self.file_path}: {self.index.line_count():,} lines")
+        else:
+            self.progress.emit(f"Indexing {self.file_path}: {self.index.scanned * 100 // self.index.size}%")
+        self.line_number_area.update()
+        self.viewport().update()
+
+    def _poll(self):
+        if self.index.refresh() and not self.scan_timer.isActive():
+            self.scan_timer.start(0)
+
+    def _scrolled(self, value):
+        self.follow = value >= self.verticalScrollBar().maximum()
+        self.viewport().update()
+        self.line_number_area.update()
+
+    def go_to_line(self, number):
+        """Scroll so that 1-based line `number` is at the top, waiting for the index if needed."""
+        line = max(0, number - 1)
+        if line >= self.index.line_count() and not self.index.complete:
+            self._pending_line = line
+            self.progress.emit(f"Indexing up to line {number:,}...")
+            return
+        self._pending_line = None
+        self.verticalScrollBar().setValue(min(line, self.verticalScrollBar().maximum()))
+
+    def go_to_line_dialog(self):
+        number, ok = QInputDialog.getInt(self, "Go to Line", "Line:", self.first_visible_line() + 1, 1,
+                                         2 ** 31 - 1)
+        if ok:
+            self.go_to_line(number)
+
+    def keyPressEvent(self, event):
+        bar = self.verticalScrollBar()
+        if event.modifiers() & Qt.ControlModifier and event.key() == Qt.Key_Home:
+            bar.setValue(0)
+        elif event.modifiers() & Qt.ControlModifier and event.key() == Qt.Key_End:
+            bar.setValue(bar.maximum())
+        else:
+            super().keyPressEvent(event)
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        painter.fillRect(event.rect(), self.palette().base())
+        painter.setPen(self.palette().text().color())
+        metrics = self.fontMetrics()
+        height = metrics.height()
+        offset = self.horizontalScrollBar().value()
+        widest = self._widest
+        for row, text in enumerate(self.index.lines(self.first_visible_line(), self.visible_line_count())):
+            text = text[:MAX_DRAW_CHARS].expandtabs(4)
+            widest = max(widest, len(text))
+            painter.drawText(4 - offset, row * height + metrics.ascent(), text)
+        if widest != self._widest:
+            self._widest = widest
+            self.horizontalScrollBar().setRange(
+                0, max(0, widest * metrics.horizontalAdvance('9') - self.viewport().width() + 8))
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._update_scroll_range()
+        cr = self.contentsRect()
+        self.line_number_area.setGeometry(QRect(cr.left(), cr.top(), self.line_number_area_width(), cr.height()))
+
+    def close_file(self):
+        """Stop indexing and release the memory map."""
+        self.scan_timer.stop()
+        self.tail_timer.stop()
+        self.index.close()
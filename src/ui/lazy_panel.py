@@ -0,0 +1,66 @@
+# src/ui/lazy_panel.py
+
+import time
+from PyQt5.QtWidgets import QWidget, QVBoxLayout
+from PyQt5.QtCore import QEvent, QObject, QTimer, pyqtSignal
+
+
+class LazyPanel(QWidget):
+    """Placeholder that builds its real widget on first use or when the GUI is idle.
+
+    `ensure()` builds the widget synchronously for callers that need it now;
+    until then the empty placeholder costs nothing to lay out and paint.
+    """
+    created = pyqtSignal(object)
+
+    def __init__(self, name, factory):
+        super().__init__()
+        self.name = name
+        self.factory = factory
+        self.widget = None
+        self.build_ms = None
+        self._layout = QVBoxLayout(self)
+        self._layout.setContentsMargins(0, 0, 0, 0)
+
+    def ensure(self):
+        """Return the real widget, building it first if needed."""
+        if self.widget is None:
+            started = time.perf_counter()
+            self.widget = self.factory()
+            self._layout.addWidget(self.widget)
+            self.build_ms = (time.perf_counter() - started) * 1000
+            self.created.emit(self.widget)
+        return self.widget
+
+
+class FirstPaintWatcher(QObject):
+    """Emits `painted` once, after the watched widget's first paint event."""
+    painted = pyqtSignal()
+
+    def __init__(self, widget):
+        super().__init__(widget)
+        self.widget = widget
+        widget.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if obj is self.widget and event.type() == QEvent.Paint:
+            self.widget.removeEventFilter(self)
+            # Queued so the signal fires once the paint has actually been flushed
+            QTimer.singleShot(0, self.painted.emit)
+        return False
+
+
+def build_when_idle(panels, on_done=None):
+    """Build the given LazyPanels one per event-loop pass, keeping the GUI responsive."""
+    pending = [panel for panel in panels if panel.widget is None]
+
+    def build_next():
+        while pending and pending[0].widget is not None:
+            pending.pop(0)  # Already built because it was viewed or needed
+        if pending:
+            pending.pop(0).ensure()
+            QTimer.singleShot(0, build_next)
+        elif on_done is not None:
+            on_done()
+
+    QTimer.singleShot(0, build_next)
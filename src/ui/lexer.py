@@ -0,0 +1,144 @@
+# src/ui/lexer.py
+
+import keyword
+import os
+import re
+
+NORMAL = 0  # Block state for text that starts outside any multi-line construct
+
+
+class Lexer:
+    """Single-pass tokenizer built from one alternation regex per language.
+
+    `rules` is a list of (kind, pattern) pairs combined into a single regex
+    with named groups. `multiline` maps an opening rule kind to a
+    (closing_pattern, token_kind) pair; an opener without its closer on the
+    same line leaves the lexer in that construct's state for the next block.
+    `openers` are literals that every multi-line opener contains, which lets
+    `end_state` skip tokenizing most lines.
+    """
+    def __init__(self, rules, multiline=None, openers=()):
+        self.pattern = re.compile("|".join(f"(?P<{kind}>{pattern})" for kind, pattern in rules))
+        self.multiline = []
+        self.state_of = {}
+        for opener, (closing, kind) in (multiline or {}).items():
+            self.multiline.append((re.compile(closing), kind))
+            self.state_of[opener] = len(self.multiline)
+        self.openers = tuple(openers)
+
+    def tokenize(self, text, state=NORMAL):
+        """Return ([(start, length, kind), ...], end_state) for one line of text."""
+        tokens = []
+        position = 0
+        if state != NORMAL:
+            position, state = self._close(text, 0, state, tokens)
+        search = self.pattern.search
+        while state == NORMAL:
+            match = search(text, position)
+            if match is None:
+                break
+            kind = match.lastgroup
+            start, end = match.span()
+            if end == start:
+                position = end + 1
+                continue
+            if kind in self.state_of:
+                position, state = self._close(text, end, self.state_of[kind], tokens, start)
+            else:
+                tokens.append((start, end - start, kind))
+                position = end
+        return tokens, state
+
+    def end_state(self, text, state=NORMAL):
+        """Return the state after `text`, the same as tokenize's, without building tokens when possible."""
+        if state != NORMAL:
+            if self.multiline[state - 1][0].search(text) is None:
+                return state  # Still inside the construct
+        elif not any(opener in text for opener in self.openers):
+            return NORMAL
+        return self.tokenize(text, state)[1]
+
+    def _close(self, text, position, state, tokens, start=None):
+        """Consume a multi-line construct, returning (next_position, state)."""
+        closing, kind = self.multiline[state - 1]
+        start = position if start is None else start
+        match = closing.search(text, position)
+        if match is None:
+            if len(text) > start:
+                tokens.append((start, len(text) - start, kind))
+            return len(text), state
+        tokens.append((start, match.end() - start, kind))
+        return match.end(), NORMAL
+
+
+def _words(words):
+    return r"\b(?:" + "|".join(sorted(words, key=len, reverse=True)) + r")\b"
+
+
+PYTHON_BUILTINS = ["self", "print", "len", "range", "super", "isinstance", "open", "str", "int",
+                   "list", "dict", "set", "tuple", "object", "Exception"]
+JAVASCRIPT_KEYWORDS = ["function", "const", "let", "var", "if", "else", "return", "import", "export",
+                       "for", "while", "class", "new", "this", "async", "await", "try", "catch",
+                       "throw", "switch", "case", "break", "continue", "default", "from", "of",
+                       "in", "typeof", "instanceof", "null", "undefined", "true", "false"]
+
+LEXERS = {
+    "python": Lexer(
+        [
+            ("comment", r"#.*"),
+            ("docstring_double", r'[rRbBuUfF]{0,2}"""'),
+            ("docstring_single", r"[rRbBuUfF]{0,2}'''"),
+            ("string", r'[rRbBuUfF]{0,2}"(?:[^"\\]|\\.)*"?|[rRbBuUfF]{0,2}\'(?:[^\'\\]|\\.)*\'?'),
+            ("decorator", r"@[\w.]+"),
+            ("keyword", _words(keyword.kwlist)),
+            ("builtin", _words(PYTHON_BUILTINS)),
+            ("number", r"\b(?:0[xXoObB][\da-fA-F_]+|\d[\d_]*\.?[\d_]*(?:[eE][+-]?\d+)?j?)\b"),
+        ],
+        {
+            "docstring_double": (r'(?:[^"\\]|\\.|"(?!""))*"""', "string"),
+            "docstring_single": (r"(?:[^'\\]|\\.|'(?!''))*'''", "string"),
+        },
+        ['"""', "'''"],
+    ),
+    "javascript": Lexer(
+        [
+            ("comment", r"//.*"),
+            ("block_comment", r"/\*"),
+            ("string", r'"(?:[^"\\]|\\.)*"?|\'(?:[^\'\\]|\\.)*\'?|`(?:[^`\\]|\\.)*`?'),
+            ("keyword", _words(JAVASCRIPT_KEYWORDS)),
+            ("number", r"\b\d[\d_]*\.?\d*(?:[eE][+-]?\d+)?\b"),
+        ],
+        {"block_comment": (r"\*/", "comment")},
+        ["/*"],
+    ),
+    "markdown": Lexer(
+        [
+            ("fence", r"^\s*```.*"),
+            ("heading", r"^#{1,6}\s.*"),
+            ("quote", r"^>.*"),
+            ("code", r"`[^`]+`"),
+            ("keyword", r"\*\*[^*]+\*\*|__[^_]+__"),
+            ("emphasis", r"\*[^*\s][^*]*\*|_[^_\s][^_]*_"),
+            ("link", r"\[[^\]]*\]\([^)]*\)"),
+        ],
+        {"fence": (r"^\s*```\s*$", "code")},
+        ["```"],
+    ),
+}
+
+
+def lexer_for(language):
+    """Return the lexer for a language name, defaulting to Markdown like the highlighter does."""
+    return LEXERS.get(language, LEXERS["markdown"])
+
+
+EXTENSIONS = {
+    ".py": "python", ".pyw": "python",
+    ".js": "javascript", ".mjs": "javascript", ".jsx": "javascript",
+    ".md": "markdown", ".markdown": "markdown",
+}
+
+
+def language_for_path(path):
+    """Guess a language name from a file extension; None when unknown."""
+    return EXTENSIONS.get(os.path.splitext(path)[1].lower())
@@ -0,0 +1,133 @@
+# src/ui/line_index.py
+
+import mmap
+import os
+import re
+from array import array
+
+STRIDE = 64  # Lines per stored offset, so the index costs 8 bytes per 64 lines
+SCAN_BYTES = 16 * 1024 * 1024  # Bytes indexed per step, a few tens of milliseconds
+MAX_LINE_BYTES = 16 * 1024  # Longer lines are cut off for display
+
+
+class LineIndex:
+    """Sparse line-offset index over a memory-mapped file.
+
+    Only the byte offset of every `stride`-th line is stored, in an
+    array('Q'); a line is found by jumping to its checkpoint and skipping
+    at most `stride - 1` newlines. The file is indexed a step at a time by
+    `scan`, so lines near the top can be read before the rest is known.
+    `refresh` follows a file that grows, and starts over when the file is
+    truncated or replaced.
+    """
+    def __init__(self, path, stride=STRIDE):
+        self.path = path
+        self.stride = stride
+        self._pattern = re.compile(rb"(?:[^\n]*\n){%d}" % stride)
+        self._file = None
+        self._map = None
+        self._open()
+
+    def _open(self):
+        self._file = open(self.path, "rb")
+        self.size = 0
+        self._map = None
+        self.offsets = array("Q", [0])  # Byte offset of lines 0, stride, 2 * stride, ...
+        self.scanned = 0  # Bytes searched for newlines so far
+        self.tail_lines = 0  # Complete lines after the last checkpoint
+        self._remap()
+
+    def _remap(self):
+        size = os.fstat(self._file.fileno()).st_size
+        if size == self.size:
+            return False
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self.size = size
+        if size:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return True
+
+    @property
+    def complete(self):
+        return self.scanned >= self.size
+
+    def scan(self, max_bytes=SCAN_BYTES):
+        """Index up to `max_bytes` more of the file; return True once all of it is indexed."""
+        if self.complete:
+            return True
+        end = min(self.size, self.scanned + max_bytes)
+        data = self._map
+        if data.find(b"\n", self.scanned, end) >= 0:
+            match = self._pattern.match
+            position = self.offsets[-1]
+            while True:
+                found = match(data, position, end)
+                if found is None:
+                    break
+                position = found.end()
+                self.offsets.append(position)
+        self.scanned = end
+        self.tail_lines = 0
+        position = data.find(b"\n", self.offsets[-1], end)
+        while position >= 0:
+            self.tail_lines += 1
+            position = data.find(b"\n", position + 1, end)
+        return self.complete
+
+    def line_count(self):
+        """Lines known so far; the last line counts once the whole file is indexed."""
+        count = (len(self.offsets) - 1) * self.stride + self.tail_lines
+        if self.complete and self.size and self._map[self.size - 1:self.size] != b"\n":
+            count += 1
+        return count
+
+    def line_start(self, number):
+        checkpoint, skip = divmod(number, self.stride)
+        position = self.offsets[checkpoint]
+        for _ in range(skip):
+            position = self._map.find(b"\n", position) + 1
+        return position
+
+    def lines(self, first, count):
+        """Decode up to `count` lines starting at line `first`."""
+        last = min(first + count, self.line_count())
+        if first >= last:
+            return []
+        data = self._map
+        position = self.line_start(first)
+        lines = []
+        for _ in range(first, last):
+            end = data.find(b"\n", position)
+            next_position = end + 1 if end >= 0 else self.size
+            if end < 0:
+                end = self.size
+            raw = data[position:min(end, position + MAX_LINE_BYTES)]
+            lines.append(raw.decode("utf-8", "replace").rstrip("\r"))
+            position = next_position
+        return lines
+
+    def line(self, number):
+        return self.lines(number, 1)[0]
+
+    def refresh(self):
+        """Pick up appended data; a truncated or replaced file is indexed again from the start."""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        current = os.fstat(self._file.fileno())
+        if (stat.st_ino, stat.st_dev) != (current.st_ino, current.st_dev) or stat.st_size < self.size:
+            self.close()
+            self._open()
+            return True
+        return self._remap()
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
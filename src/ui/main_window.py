@@ -1,64 +1,68 @@
+import os
 from PyQt5.QtWidgets import (
     QMainWindow, QSplitter, QTabWidget, QStatusBar, QToolBar, QAction,
-    QFileDialog, QMessageBox, QVBoxLayout, QWidget, QStyleFactory, QDialog,
-    QLabel, QTextBrowser, QLineEdit, QPushButton
+    QFileDialog, QMessageBox, QVBoxLayout, QWidget, QStyleFactory,
+    QLabel, QInputDialog, QDockWidget
 )
-from PyQt5.QtCore import Qt, QSize, QTimer
+from PyQt5.QtCore import Qt, QFileSystemWatcher, QSize, QTimer, pyqtSignal
 from PyQt5.QtGui import QIcon
+from src.settings_manager import SettingsManager
 from src.ui.editor import CodeEditor
-from src.ui.chat_ui import ChatUI
-from src.ui.file_explorer import FileExplorer
-from src.ui.plugin_manager import PluginManager
-from src.ui.terminal import TerminalWidget
-
-class SearchReplaceDialog(QDialog):
-    """Advanced Search & Replace Dialog."""
-    def __init__(self, editor):
-        super().__init__()
-        self.editor = editor
-        self.setWindowTitle("Search & Replace")
-        layout = QVBoxLayout()
-
-        self.search_input = QLineEdit(self)
-        self.search_input.setPlaceholderText("Search...")
-        layout.addWidget(self.search_input)
-
-        self.replace_input = QLineEdit(self)
-        self.replace_input.setPlaceholderText("Replace with...")
-        layout.addWidget(self.replace_input)
-
-        replace_button = QPushButton("Replace All", self)
-        replace_button.clicked.connect(self.replace_all)
-        layout.addWidget(replace_button)
-
-        self.setLayout(layout)
-
-    def replace_all(self):
-        """Replace all occurrences of the search text."""
-        search_text = self.search_input.text()
-        replace_text = self.replace_input.text()
-        content = self.editor.toPlainText()
-        updated_content = content.replace(search_text, replace_text)
-        self.editor.setPlainText(updated_content)
+from src.ui.file_watcher import FileWatcher
+from src.ui.lazy_panel import FirstPaintWatcher, LazyPanel, build_when_idle
+from src.ui.lexer import language_for_path
+from src.ui.perf_monitor import monitor, timed
+from src.ui.tab_manager import TabManager
+from src.ui.text_units import char_index, utf16_len
 
 class MainWindow(QMainWindow):
-    """Main window for LoL_CodeEditor."""
-    def __init__(self):
+    """Main window for LoL_CodeEditor.
+
+    Only the editor shell is built before the first paint. The side panels,
+    terminal and chat are LazyPanels: each is built when first viewed, when
+    code needs it, or in idle time right after the window has painted, and
+    their modules are imported at that point. Completion, linting and
+    autosave start in that idle time too, or with the first editor opened
+    before it.
+    """
+    startup_finished = pyqtSignal()  # The window has painted and every panel is built
+
+    def __init__(self, timeline=None):
         super().__init__()
+        self.timeline = timeline
         self.setWindowTitle("LoL_CodeEditor - AI-powered Code Editor")
         self.setGeometry(100, 100, 1400, 900)
+        self.settings_manager = SettingsManager()
+
+        # Completion requests are ranked on a worker thread shared by every editor, started after first paint
+        self.completion_engine = None
+        self.completion_worker = None
+        self.project_index_worker = None
+        self.lint_cache = None
+        self.project_lint_worker = None
+        self.autosave = None
+        self.symbol_index = None  # Opened with the first project index
+        self.symbol_index_worker = None
+        self.markdown_worker = None  # Started with the first preview
+        self.perf_dock = None  # Built the first time the performance HUD is shown
+        self.plugin_events = []  # (event, payload) fired before the plugin panel was built, replayed by it
 
         self.initialize_ui()
-        self.start_autosave()
+        self._observe_settings()
+        if self.settings_manager.get("perf_hud"):
+            self.perf_hud_action.setChecked(True)
 
     def initialize_ui(self):
         """Initialize UI components."""
-        # Left Panel: File Explorer + Plugins
+        # Left Panel: File Explorer + Plugins + Search, each built on demand
         self.left_panel = QTabWidget()
-        self.file_explorer = FileExplorer(self._open_file_in_tab)
-        self.plugin_manager = PluginManager()
-        self.left_panel.addTab(self.file_explorer, "Explorer")
-        self.left_panel.addTab(self.plugin_manager, "Plugins")
+        self.explorer_panel = LazyPanel("Explorer", self._create_file_explorer)
+        self.plugins_panel = LazyPanel("Plugins", self._create_plugin_manager)
+        self.search_panel = LazyPanel("Search", self._create_project_search)
+        self.left_panel.addTab(self.explorer_panel, "Explorer")
+        self.left_panel.addTab(self.plugins_panel, "Plugins")
+        self.left_panel.addTab(self.search_panel, "Search")
+        self.left_panel.currentChanged.connect(lambda i: self.left_panel.widget(i).ensure())
 
         # Center: Tabbed Editor
         self.tabs = QTabWidget()
@@ -66,10 +70,10 @@ class MainWindow(QMainWindow):
         self.tabs.tabCloseRequested.connect(self.confirm_tab_close)
 
         # Right Panel: Chat UI
-        self.chat_widget = ChatUI()
+        self.chat_panel = LazyPanel("Chat", self._create_chat)
         chat_container = QWidget()
         chat_layout = QVBoxLayout(chat_container)
-        chat_layout.addWidget(self.chat_widget)
+        chat_layout.addWidget(self.chat_panel)
 
         # Horizontal Splitter
         self.horizontal_splitter = QSplitter(Qt.Horizontal)
@@ -79,30 +83,267 @@ class MainWindow(QMainWindow):
         self.horizontal_splitter.setSizes([300, 800, 300])
 
         # Terminal at the Bottom
-        self.terminal = TerminalWidget()
+        self.terminal_panel = LazyPanel("Terminal", self._create_terminal)
         self.vertical_splitter = QSplitter(Qt.Vertical)
         self.vertical_splitter.addWidget(self.horizontal_splitter)
-        self.vertical_splitter.addWidget(self.terminal)
+        self.vertical_splitter.addWidget(self.terminal_panel)
         self.vertical_splitter.setSizes([700, 200])
 
         self.setCentralWidget(self.vertical_splitter)
         self._create_toolbar()
         self.status_bar = QStatusBar()
         self.setStatusBar(self.status_bar)
+        self.memory_label = QLabel()
+        self.status_bar.addPermanentWidget(self.memory_label)
+
+        # Least recently used tabs are hibernated once open editors exceed the budget
+        self.tab_manager = TabManager(
+            self.tabs, self._attach_editor, lambda editor: self.autosave.save_modified([editor]),
+            self.settings_manager.get("tab_memory_budget_mb"))
+        self.tab_manager.status.connect(self.memory_label.setText)
+
+        # Listed folders and open files follow changes made outside the editor, e.g. a branch switch
+        self.file_watcher = FileWatcher(self)
+        self.file_watcher.files_changed.connect(self._files_changed)
         self.setStyle(QStyleFactory.create("Fusion"))
 
-    def _open_file_in_tab(self, file_path, content):
-        """Add a new tab with the opened file content."""
-        editor = CodeEditor()
-        editor.setPlainText(content)
-
-        container = QWidget()
-        layout = QVBoxLayout(container)
-        layout.addWidget(editor)
+        # Whatever was not viewed yet is built once the window has painted
+        self.first_paint = FirstPaintWatcher(self)
+        self.first_paint.painted.connect(self._first_painted)
+
+    def _lazy_panels(self):
+        return [self.explorer_panel, self.terminal_panel, self.chat_panel, self.plugins_panel, self.search_panel]
+
+    def _first_painted(self):
+        if self.timeline is not None:
+            self.timeline.mark("first_paint")
+        QTimer.singleShot(0, self.start_services)
+        build_when_idle(self._lazy_panels(), self._panels_built)
+
+    def start_services(self):
+        """Start completion, linting and autosave; runs once, after the first paint or for the first editor."""
+        if self.completion_worker is not None:
+            return
+        from src.ai.completion import CompletionEngine
+        from src.ai.linter import LintCache
+        from src.ui.completer import CompletionWorker
+        self.completion_engine = CompletionEngine()
+        self.completion_worker = CompletionWorker(self.completion_engine)
+        self.completion_worker.start()
+        self.lint_cache = LintCache()
+        self.start_autosave()
 
-        self.tabs.addTab(container, file_path)
-        self.tabs.setCurrentWidget(container)
-        self.status_bar.showMessage(f"Opened: {file_path}")
+    def _panels_built(self):
+        if self.timeline is not None:
+            self.timeline.mark("deferred_panels")
+            for panel in self._lazy_panels():
+                self.timeline.note(f"panel_{panel.name.lower()}", panel.build_ms or 0.0)
+        self.startup_finished.emit()
+
+    def _create_file_explorer(self):
+        from src.ui.file_explorer import FileExplorer
+        explorer = FileExplorer(self._open_file_in_tab, self.file_watcher)
+        explorer.index_ready.connect(self._index_project_words)
+        explorer.index_ready.connect(self._lint_project)
+        explorer.index_ready.connect(self._index_project_symbols)
+        return explorer
+
+    def _create_plugin_manager(self):
+        from src.ui.plugin_manager import PluginManager
+        manager = PluginManager()
+        manager.message.connect(self._plugin_message)
+        for event, payload in self.plugin_events:
+            manager.host.fire(event, payload)
+        self.plugin_events.clear()
+        return manager
+
+    def _create_project_search(self):
+        from src.ui.search_replace import ProjectSearchPanel
+        return ProjectSearchPanel(
+            ".", index_provider=lambda: self.explorer_panel.widget.index if self.explorer_panel.widget else None,
+            editor_for_path=self.find_editor_for_path, open_match=self._open_search_match)
+
+    def _create_chat(self):
+        from src.ui.chat_ui import ChatUI
+        return ChatUI()
+
+    def _create_terminal(self):
+        from src.ui.terminal import TerminalWidget
+        return TerminalWidget(self.settings_manager.get("terminal_scrollback"))
+
+    @property
+    def file_explorer(self):
+        return self.explorer_panel.ensure()
+
+    @property
+    def plugin_manager(self):
+        return self.plugins_panel.ensure()
+
+    @property
+    def project_search(self):
+        return self.search_panel.ensure()
+
+    @property
+    def chat_widget(self):
+        return self.chat_panel.ensure()
+
+    @property
+    def terminal(self):
+        return self.terminal_panel.ensure()
+
+    def _open_file_in_tab(self, file_path):
+        """Add a new tab and stream the file into it; files above the size threshold open read-only."""
+        from src.ui.large_file_viewer import LargeFileViewer
+        if os.path.getsize(file_path) >= self.settings_manager.get("large_file_mb") * 1024 * 1024:
+            viewer = LargeFileViewer(file_path)
+            viewer.progress.connect(self.status_bar.showMessage)
+            self.add_tab(viewer, file_path)
+            return
+        editor = CodeEditor()
+        editor.load_file(file_path)
+        editor.loaded.connect(lambda path: self.status_bar.showMessage(f"Opened: {path}"))
+        self.add_tab(editor, file_path)
+        self.file_watcher.watch_file(file_path)
+        self.status_bar.showMessage(f"Loading: {file_path}")
+        self.fire_plugin_event("opened", file_path)
+        language = language_for_path(file_path)
+        if language:
+            self.fire_plugin_event(f"onLanguage:{language}", language)
+
+    def fire_plugin_event(self, event, payload=None):
+        """Deliver an editor event to plugins; opening or saving files must not build the plugin panel."""
+        if self.plugins_panel.widget is None:
+            self.plugin_events.append((event, payload))
+        else:
+            self.plugins_panel.widget.host.fire(event, payload)
+
+    def open_command_palette(self):
+        """Pick a plugin command by name and run it through the plugin host."""
+        manager = self.plugin_manager
+        commands = sorted(manager.host.commands())
+        if not commands:
+            self.status_bar.showMessage("No plugin commands available")
+            return
+        command, ok = QInputDialog.getItem(self, "Command Palette", "Run command:", commands, 0, False)
+        if ok and command:
+            manager.run_command(command)
+
+    def _index_project_words(self, index):
+        """Collect identifiers from the project's source files for completion."""
+        from src.ui.completer import ProjectIndexWorker
+        self.start_services()
+        if self.project_index_worker is not None:
+            self.project_index_worker.cancel()
+            self.project_index_worker.wait()
+        self.project_index_worker = ProjectIndexWorker(self.completion_engine.project, index)
+        self.project_index_worker.start()
+
+    def _lint_project(self, index):
+        """Lint the project's Python files in the background, reusing cached results."""
+        from src.ui.diagnostics import ProjectLintWorker
+        self.start_services()
+        if self.project_lint_worker is not None:
+            self.project_lint_worker.requestInterruption()
+            self.project_lint_worker.wait()
+        self.project_lint_worker = ProjectLintWorker(index, self.lint_cache)
+        self.project_lint_worker.lint_finished.connect(
+            lambda files, problems, analysed: self.status_bar.showMessage(
+                f"Linted {files} files ({analysed} analysed): {problems} problems"))
+        self.project_lint_worker.lint_failed.connect(
+            lambda message: self.status_bar.showMessage(f"Project lint failed: {message}"))
+        self.project_lint_worker.start()
+
+    def _index_project_symbols(self, index):
+        """Refresh the persistent symbol index; unchanged files are not parsed again."""
+        from src.ai.refactor import SymbolIndex
+        from src.ui.navigation import SymbolIndexWorker
+        if self.symbol_index is None:
+            self.symbol_index = SymbolIndex("config/symbols.db", ".")
+        if self.symbol_index_worker is not None:
+            self.symbol_index_worker.requestInterruption()
+            self.symbol_index_worker.wait()
+        self.symbol_index_worker = SymbolIndexWorker(self.symbol_index, index)
+        self.symbol_index_worker.index_finished.connect(
+            lambda parsed, files: self.status_bar.showMessage(f"Indexed symbols in {files} files ({parsed} parsed)"))
+        self.symbol_index_worker.start()
+
+    def _symbol_position(self):
+        """Return (path, line, column) under the cursor of the current Python editor, re-indexing its text."""
+        editor = self.get_current_editor()
+        if not isinstance(editor, CodeEditor) or not editor.file_path or \
+                language_for_path(editor.file_path) != "python":
+            self.status_bar.showMessage("Symbol navigation needs a saved Python file")
+            return None
+        if self.symbol_index is None:
+            self.status_bar.showMessage("The symbol index is still loading")
+            return None
+        self.symbol_index.update_source(editor.file_path, editor.toPlainText())
+        cursor = editor.textCursor()
+        return editor.file_path, cursor.blockNumber(), char_index(cursor.block().text(), cursor.positionInBlock())
+
+    def go_to_definition(self):
+        """Jump to the definition of the symbol under the cursor."""
+        position = self._symbol_position()
+        if position is None:
+            return
+        from src.ui.navigation import locations_to_matches
+        locations = self.symbol_index.definitions(*position)
+        if not locations:
+            self.status_bar.showMessage("No definition found")
+        elif len(locations) == 1:
+            matches = locations_to_matches(locations, self.find_editor_for_path)
+            for path, (match,) in matches.items():
+                self._open_search_match(path, match)
+        else:
+            self._show_locations("Definitions", locations)
+
+    def find_references(self):
+        """List every reference to the symbol under the cursor in the Search panel."""
+        position = self._symbol_position()
+        if position is None:
+            return
+        locations = self.symbol_index.references(*position)
+        if not locations:
+            self.status_bar.showMessage("No references found")
+            return
+        self._show_locations("References", locations)
+
+    def _show_locations(self, title, locations):
+        from src.ui.navigation import locations_to_matches
+        self.project_search.show_results(title, locations_to_matches(locations, self.find_editor_for_path))
+        self.left_panel.setCurrentWidget(self.search_panel)
+
+    def rename_symbol(self):
+        """Rename the symbol under the cursor across the project as one batch."""
+        position = self._symbol_position()
+        if position is None:
+            return
+        found = self.symbol_index.name_at(*position)
+        if found is None:
+            self.status_bar.showMessage("No symbol under the cursor")
+            return
+        new_name, ok = QInputDialog.getText(self, "Rename Symbol", f"Rename '{found[0]}' to:", text=found[0])
+        if not ok or not new_name or new_name == found[0]:
+            return
+        from src.ui.navigation import apply_rename
+        try:
+            edits = self.symbol_index.rename_edits(*position, new_name)
+            changed = apply_rename(edits, self.find_editor_for_path)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "Rename Symbol", f"Rename failed: {e}")
+            return
+        count = sum(len(file_edits) for file_edits in edits.values())
+        self.status_bar.showMessage(f"Renamed {count} occurrences in {len(changed)} files")
+        for path in changed:
+            editor = self.find_editor_for_path(path)
+            if editor is not None:
+                self.symbol_index.update_source(path, editor.toPlainText())
+        self.symbol_index.update([path for path in changed if self.find_editor_for_path(path) is None], prune=False)
+
+    def _plugin_message(self, name, kind, payload):
+        """Show plugin status posts in the status bar."""
+        if kind == "status":
+            self.status_bar.showMessage(f"[{name}] {payload}")
 
     def _create_toolbar(self):
         """Create toolbar."""
@@ -131,8 +372,87 @@ class MainWindow(QMainWindow):
         search_replace_action.triggered.connect(self.open_search_replace)
         toolbar.addAction(search_replace_action)
 
+        # Find in Files Action
+        find_in_files_action = QAction("Find in Files", self)
+        find_in_files_action.setShortcut("Ctrl+Shift+F")
+        find_in_files_action.triggered.connect(self.open_project_search)
+        toolbar.addAction(find_in_files_action)
+
+        # Symbol Navigation Actions
+        definition_action = QAction("Go to Definition", self)
+        definition_action.setShortcut("F12")
+        definition_action.triggered.connect(self.go_to_definition)
+        self.addAction(definition_action)
+
+        references_action = QAction("Find References", self)
+        references_action.setShortcut("Shift+F12")
+        references_action.triggered.connect(self.find_references)
+        self.addAction(references_action)
+
+        rename_action = QAction("Rename Symbol", self)
+        rename_action.setShortcut("F2")
+        rename_action.triggered.connect(self.rename_symbol)
+        toolbar.addAction(rename_action)
+
+        # Plugin commands, dispatched through the plugin host
+        palette_action = QAction("Command Palette", self)
+        palette_action.setShortcut("Ctrl+Shift+P")
+        palette_action.triggered.connect(self.open_command_palette)
+        self.addAction(palette_action)
+
+        # Performance instrumentation, idle until the HUD is shown or a trace is recorded
+        self.perf_hud_action = QAction("Performance HUD", self)
+        self.perf_hud_action.setShortcut("Ctrl+Alt+P")
+        self.perf_hud_action.setCheckable(True)
+        self.perf_hud_action.toggled.connect(self.show_perf_hud)
+        self.addAction(self.perf_hud_action)
+
+        self.record_trace_action = QAction("Record Trace", self)
+        self.record_trace_action.setShortcut("Ctrl+Alt+R")
+        self.record_trace_action.triggered.connect(self.toggle_trace_recording)
+        self.addAction(self.record_trace_action)
+
         self.addToolBar(toolbar)
 
+    def show_perf_hud(self, visible):
+        """Show or hide the performance HUD dock; slots are timed only while it is shown."""
+        if visible and self.perf_dock is None:
+            from src.ui.perf_hud import PerfHud
+            self.perf_hud = PerfHud()
+            self.perf_hud.record_requested.connect(self.toggle_trace_recording)
+            self.perf_dock = QDockWidget("Performance", self)
+            self.perf_dock.setFeatures(QDockWidget.DockWidgetMovable | QDockWidget.DockWidgetFloatable)
+            self.perf_dock.setWidget(self.perf_hud)
+            self.addDockWidget(Qt.RightDockWidgetArea, self.perf_dock)
+        if self.perf_dock is None:
+            return
+        self.perf_dock.setVisible(visible)
+        if visible:
+            self.perf_hud.start()
+        else:
+            self.perf_hud.stop()
+        self.settings_manager.set("perf_hud", visible)
+
+    def toggle_trace_recording(self):
+        """Start recording a trace, or stop and save it as trace_event JSON for Perfetto or chrome://tracing."""
+        if monitor.trace is None:
+            self.perf_hud_action.setChecked(True)  # The HUD's heartbeat records event-loop lag too
+            monitor.start_trace()
+            self.status_bar.showMessage("Recording trace...")
+        else:
+            path, _ = QFileDialog.getSaveFileName(self, "Save Trace", "trace.json", "Trace Event JSON (*.json)")
+            if path:
+                count = monitor.stop_trace(path)
+                self.status_bar.showMessage(f"Wrote {count:,} trace events to {path}")
+            else:
+                monitor.trace = None
+                self.status_bar.showMessage("Trace discarded")
+            if not self.perf_hud_action.isChecked():
+                monitor.disable()
+        recording = monitor.trace is not None
+        self.record_trace_action.setText("Stop Recording" if recording else "Record Trace")
+        self.perf_hud.set_recording(recording)
+
     def new_file(self):
         """Create a new file."""
         editor = CodeEditor()
@@ -142,39 +462,90 @@ class MainWindow(QMainWindow):
         """Open file and display in new tab."""
         file_name, _ = QFileDialog.getOpenFileName(self, "Open File", "", "All Files (*)")
         if file_name:
-            with open(file_name, 'r') as f:
-                content = f.read()
-            editor = CodeEditor()
-            editor.setPlainText(content)
-            self.add_tab(editor, file_name)
+            self._open_file_in_tab(file_name)
 
     def open_markdown_preview(self):
-        """Open Markdown editor with live preview."""
-        editor = CodeEditor()
-        preview = QTextBrowser()
-
-        def update_preview():
-            markdown_text = editor.toPlainText()
-            html_content = markdown_text.replace("#", "<h1>").replace("**", "<b>")
-            preview.setHtml(html_content)
-
-        editor.textChanged.connect(update_preview)
-        self.add_tab(editor, "Markdown Editor")
-        self.add_tab(preview, "Markdown Preview")
+        """Preview the current Markdown file, or open a new Markdown editor with a live preview."""
+        from src.ui.markdown_preview import MarkdownPreview, MarkdownRenderWorker
+        if self.markdown_worker is None:
+            self.markdown_worker = MarkdownRenderWorker()
+            self.markdown_worker.start()
+        editor = self.get_current_editor()
+        if isinstance(editor, CodeEditor) and editor.file_path and language_for_path(editor.file_path) == "markdown":
+            title = f"Preview: {os.path.basename(editor.file_path)}"
+        else:
+            editor = CodeEditor()
+            self.add_tab(editor, "Markdown Editor")
+            title = "Markdown Preview"
+        self.add_tab(MarkdownPreview(editor, self.markdown_worker), title)
 
     def open_search_replace(self):
         """Open Search & Replace dialog."""
+        from src.ui.search_replace import SearchReplaceDialog
         editor = self.get_current_editor()
-        if editor:
+        if isinstance(editor, CodeEditor):
             dialog = SearchReplaceDialog(editor)
             dialog.exec_()
 
+    def open_project_search(self):
+        """Show the project-wide search panel."""
+        self.left_panel.setCurrentWidget(self.search_panel)
+        self.project_search.search_input.setFocus()
+
+    def _open_search_match(self, file_path, match):
+        """Open a search hit and place the cursor on it."""
+        from src.ui.large_file_viewer import LargeFileViewer
+        editor = self.find_editor_for_path(file_path)
+        if editor is None:
+            self._open_file_in_tab(file_path)
+            editor = self.get_current_editor()
+            if isinstance(editor, LargeFileViewer):
+                editor.go_to_line(match.line + 1)
+                return
+            editor.loaded.connect(lambda _: self._select_match(editor, match))
+        else:
+            self.tabs.setCurrentWidget(editor.parentWidget())
+            self._select_match(editor, match)
+
+    def _select_match(self, editor, match):
+        block = editor.document().findBlockByNumber(match.line)
+        text = block.text()
+        start = block.position() + utf16_len(text[:match.column])
+        cursor = editor.textCursor()
+        cursor.setPosition(start)
+        cursor.setPosition(start + utf16_len(text[match.column:match.column + match.length]), cursor.KeepAnchor)
+        editor.setTextCursor(cursor)
+
+    def find_editor_for_path(self, file_path):
+        """Return the open editor showing `file_path`, restoring its tab if it is hibernated."""
+        target = os.path.abspath(file_path)
+        for editor in self.open_editors():
+            if editor.file_path and os.path.abspath(editor.file_path) == target:
+                return editor
+        container = self.tab_manager.container_for_path(file_path)
+        if container is not None:
+            return self.tab_manager.restore(container)
+        return None
+
+    def _attach_editor(self, editor):
+        """Add completion and background linting to an editor."""
+        from src.ui.completer import CompletionController
+        from src.ui.diagnostics import LintController
+        self.start_services()
+        editor.set_font_size(self.settings_manager.get("font_size"))
+        editor.set_undo_memory(self.settings_manager.get("undo_memory_mb"))
+        CompletionController(editor, self.completion_worker)
+        LintController(editor, self.lint_cache).message.connect(self.status_bar.showMessage)
+
     def add_tab(self, widget, title):
         """Add a new tab."""
+        if isinstance(widget, CodeEditor):
+            self._attach_editor(widget)
         container = QWidget()
         layout = QVBoxLayout(container)
         layout.addWidget(widget)
         self.tabs.addTab(container, title)
+        self.tab_manager.register(container)
         self.tabs.setCurrentWidget(container)
 
     def confirm_tab_close(self, index):
@@ -182,7 +553,57 @@ class MainWindow(QMainWindow):
         reply = QMessageBox.question(self, "Close Tab", "Do you want to close this tab?",
                                      QMessageBox.Yes | QMessageBox.No)
         if reply == QMessageBox.Yes:
+            container = self.tabs.widget(index)
+            path = self._tab_path(container)
+            viewer = container.layout().itemAt(0).widget()
+            if isinstance(viewer, CodeEditor):
+                viewer.close_journal()
+            else:
+                from src.ui.large_file_viewer import LargeFileViewer
+                if isinstance(viewer, LargeFileViewer):
+                    viewer.close_file()
+            self.tab_manager.forget(container)
+            if path:
+                self.fire_plugin_event("closed", path)
             self.tabs.removeTab(index)
+            if path and not any(self._tab_path(self.tabs.widget(i)) == path for i in range(self.tabs.count())):
+                self.file_watcher.unwatch_file(path)
+
+    def _tab_path(self, container):
+        editor = self.tab_manager.editor_in(container)
+        if editor is not None:
+            return editor.file_path
+        state = self.tab_manager.hibernated.get(container)
+        return state.path if state is not None else None
+
+    def _files_changed(self, paths):
+        """Reload tabs whose files changed on disk, unless they have unsaved edits."""
+        reloaded, kept = 0, []
+        for path in paths:
+            if not os.path.isfile(path):
+                continue  # Deleted, or mid-replace; a later batch brings it back
+            target = os.path.abspath(path)
+            for editor in self.open_editors():
+                if not editor.file_path or os.path.abspath(editor.file_path) != target:
+                    continue
+                if editor.is_loading():
+                    editor.load_file(path)  # Restart the stream from the new file
+                    reloaded += 1
+                elif editor.document().isModified():
+                    kept.append(os.path.basename(path))
+                elif path not in self.autosave.in_flight:  # Our own save landing
+                    try:
+                        reloaded += editor.reload_from_disk() > 0
+                    except (OSError, UnicodeDecodeError) as e:
+                        self.status_bar.showMessage(f"Reload failed: {path}: {e}")
+            try:
+                reloaded += self.tab_manager.reload_hibernated(path)
+            except (OSError, UnicodeDecodeError):
+                pass
+        if kept:
+            self.status_bar.showMessage(f"Changed on disk, kept unsaved edits: {', '.join(kept)}")
+        elif reloaded:
+            self.status_bar.showMessage(f"Reloaded {reloaded} files changed on disk")
 
     def get_current_editor(self):
         """Get the current editor."""
@@ -193,20 +614,111 @@ class MainWindow(QMainWindow):
 
     def start_autosave(self):
         """Start autosave."""
+        from src.ui.autosave import AutosaveService
+        self.autosave = AutosaveService(self)
+        self.autosave.status.connect(self.status_bar.showMessage)
+        self.autosave.saved.connect(lambda path: self.fire_plugin_event("saved", path))
+        interval = self.settings_manager.get("autosave_interval")
         self.autosave_timer = QTimer(self)
         self.autosave_timer.timeout.connect(self.autosave_tabs)
-        self.autosave_timer.start(30000)
+        self.autosave_timer.start(int(interval * 1000))
+
+    def _observe_settings(self):
+        """Apply setting changes live, including edits made to the settings file outside the editor."""
+        settings = self.settings_manager
+        settings.observe("font_size", self._font_size_changed)
+        settings.observe("autosave_interval", self._autosave_interval_changed)
+        settings.observe("terminal_scrollback", self._scrollback_changed)
+        settings.observe("tab_memory_budget_mb", self._memory_budget_changed)
+        settings.observe("undo_memory_mb", self._undo_memory_changed)
+
+        self.settings_reload = QTimer(self)
+        self.settings_reload.setSingleShot(True)
+        self.settings_reload.setInterval(100)  # Editors often write a file in several steps
+        self.settings_reload.timeout.connect(self._reload_settings)
+        # The folder is watched too: an atomic replace drops the file from the watcher
+        self.settings_watcher = QFileSystemWatcher(self)
+        self._watch_settings_file()
+        self.settings_watcher.fileChanged.connect(self.settings_reload.start)
+        self.settings_watcher.directoryChanged.connect(self.settings_reload.start)
+
+    def _watch_settings_file(self):
+        path = self.settings_manager.config_path
+        for watched in (path, os.path.dirname(path) or "."):
+            if os.path.exists(watched) and watched not in self.settings_watcher.files() + \
+                    self.settings_watcher.directories():
+                self.settings_watcher.addPath(watched)
+
+    def _reload_settings(self):
+        self._watch_settings_file()
+        changed = self.settings_manager.reload_if_changed()
+        if changed:
+            self.status_bar.showMessage(f"Settings reloaded: {', '.join(sorted(changed))}")
+
+    def _autosave_interval_changed(self, key, seconds):
+        if self.autosave is not None:
+            self.autosave_timer.setInterval(int(seconds * 1000))
+
+    def _font_size_changed(self, key, size):
+        for editor in self.open_editors():
+            editor.set_font_size(size)
+
+    def _scrollback_changed(self, key, lines):
+        if self.terminal_panel.widget is not None:
+            self.terminal.set_scrollback(lines)
+
+    def _undo_memory_changed(self, key, megabytes):
+        for editor in self.open_editors():
+            editor.set_undo_memory(megabytes)
+
+    def _memory_budget_changed(self, key, megabytes):
+        self.tab_manager.budget.budget_bytes = int(megabytes * 1024 * 1024)
+        self.tab_manager.refresh()
+
+    def open_editors(self):
+        """Return the CodeEditor of every open tab."""
+        editors = []
+        for i in range(self.tabs.count()):
+            editor = self.tabs.widget(i).layout().itemAt(0).widget()
+            if isinstance(editor, CodeEditor):
+                editors.append(editor)
+        return editors
 
+    @timed("autosave_tabs")
     def autosave_tabs(self):
-        """Autosave open tabs."""
-        for i in range(self.tabs.count()):
-            widget = self.tabs.widget(i)
-            editor = widget.layout().itemAt(0).widget()
-            file_path = self.tabs.tabText(i)
-            if file_path != "Untitled":
-                with open(file_path, "w") as f:
-                    f.write(editor.toPlainText())
-                self.status_bar.showMessage(f"Autosaved: {file_path}")
+        """Autosave modified tabs in the background."""
+        self.autosave.save_modified(self.open_editors())
+
+    def closeEvent(self, event):
+        """Flush pending autosaves before the window closes."""
+        self.settings_manager.flush()
+        if self.autosave is not None:
+            self.autosave_tabs()
+            self.autosave.shutdown()
+        for editor in self.open_editors():
+            editor.close_journal()  # Undo history survives the restart
+        if self.plugins_panel.widget is not None:
+            self.plugin_manager.shutdown()
+        if self.project_index_worker is not None:
+            self.project_index_worker.cancel()
+            self.project_index_worker.wait()
+        if self.completion_worker is not None:
+            self.completion_worker.stop()
+        if self.project_lint_worker is not None:
+            self.project_lint_worker.requestInterruption()
+            self.project_lint_worker.wait()
+        if self.lint_cache is not None:
+            self.lint_cache.save()
+        if self.symbol_index_worker is not None:
+            self.symbol_index_worker.requestInterruption()
+            self.symbol_index_worker.wait()
+        if self.symbol_index is not None:
+            self.symbol_index.close()
+        if self.markdown_worker is not None:
+            self.markdown_worker.stop()
+        if self.chat_panel.widget is not None:
+            self.chat_widget.shutdown()
+        super().closeEvent(event)
 
 if __name__ == "__main__":
     import sys
@@ -0,0 +1,263 @@
+# src/ui/markdown.py
+
+import html
+import re
+from collections import OrderedDict
+
+CACHE_SIZE = 4096  # Rendered blocks kept; a long README has a few hundred
+
+FENCE = re.compile(r"^ {0,3}(`{3,}|~{3,})\s*([\w+#.-]*)")
+HEADING = re.compile(r"^ {0,3}(#{1,6})(?:[ \t]+(.*?))?(?:[ \t]+#+)?[ \t]*$")
+RULE = re.compile(r"^ {0,3}([-*_])(?:[ \t]*\1){2,}[ \t]*$")
+SETEXT = re.compile(r"^ {0,3}(=+|-+)[ \t]*$")
+LIST_ITEM = re.compile(r"^( {0,3})([-*+]|\d{1,9}[.)])([ \t]+|$)")
+QUOTE = re.compile(r"^ {0,3}> ?")
+TABLE_SEPARATOR = re.compile(r"^ {0,3}\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?\s*$")
+
+CODE_SPAN = re.compile(r"(`+)(.+?)\1", re.S)
+ESCAPED = re.compile(r"\\([\\`*_{}\[\]()#+\-.!|~<>])")
+IMAGE = re.compile(r"!\[([^\]]*)\]\(([^)\s]+)(?:\s+&quot;(.*?)&quot;)?\)")
+LINK = re.compile(r"\[([^\]]+)\]\(([^)\s]+)(?:\s+&quot;(.*?)&quot;)?\)")
+AUTOLINK = re.compile(r"&lt;((?:https?|ftp|mailto):[^\s&]+)&gt;")
+STRONG = re.compile(r"(\*\*|__)(?=\S)(.+?)(?<=\S)\1")
+EMPHASIS = re.compile(r"(?<![\w*])(\*|_)(?=\S)(.+?)(?<=\S)\1(?![\w*])")
+STRIKE = re.compile(r"~~(?=\S)(.+?)(?<=\S)~~")
+
+
+def _starts_block(line):
+    """True when `line` interrupts a paragraph."""
+    return bool(FENCE.match(line) or HEADING.match(line) or RULE.match(line) or QUOTE.match(line)
+                or LIST_ITEM.match(line))
+
+
+def _list_kind(match):
+    """Ordered items and each bullet character start separate lists."""
+    marker = match.group(2)
+    return "ordered" if marker[0].isdigit() else marker
+
+
+def split_blocks(text):
+    """Split Markdown into top-level block sources (headings, paragraphs, lists, fences...).
+
+    Each block renders independently, so an edit only invalidates the
+    blocks whose source text changed.
+    """
+    lines = text.split("\n")
+    blocks = []
+    i, count = 0, len(lines)
+    while i < count:
+        line = lines[i]
+        if not line.strip():
+            i += 1
+            continue
+        start = i
+        fence = FENCE.match(line)
+        if fence:
+            marker = fence.group(1)
+            i += 1
+            while i < count and not lines[i].lstrip().startswith(marker):
+                i += 1
+            i = min(i + 1, count)  # Include the closing fence
+        elif HEADING.match(line) or RULE.match(line):
+            i += 1
+        elif line.startswith("    ") or line.startswith("\t"):
+            while i < count and (not lines[i].strip() or lines[i].startswith("    ") or lines[i].startswith("\t")):
+                i += 1
+            while i > start and not lines[i - 1].strip():
+                i -= 1
+        elif QUOTE.match(line):
+            i += 1
+            while i < count and lines[i].strip() and (QUOTE.match(lines[i]) or not _starts_block(lines[i])):
+                i += 1
+        elif LIST_ITEM.match(line):
+            kind = _list_kind(LIST_ITEM.match(line))
+            i += 1
+            while i < count:
+                current = lines[i]
+                if current.strip():
+                    item = LIST_ITEM.match(current)
+                    if item and not item.group(1) and _list_kind(item) != kind:
+                        break
+                    if item or current.startswith(" ") or current.startswith("\t") \
+                            or not _starts_block(current):
+                        i += 1
+                        continue
+                    break
+                # A blank line continues the list only if more items or indented content follow
+                following = i + 1
+                while following < count and not lines[following].strip():
+                    following += 1
+                item = LIST_ITEM.match(lines[following]) if following < count else None
+                if (item and (item.group(1) or _list_kind(item) == kind)) or \
+                        (following < count and lines[following].startswith("  ")):
+                    i = following
+                    continue
+                break
+        else:
+            i += 1
+            while i < count and lines[i].strip() and not _starts_block(lines[i]) and not SETEXT.match(lines[i]):
+                i += 1
+            if i < count and SETEXT.match(lines[i]):
+                i += 1  # "Title\n===" and "Title\n---" are headings, not a paragraph and a rule
+        blocks.append("\n".join(lines[start:i]))
+    return blocks
+
+
+def render_inline(text):
+    """Render inline Markdown (code, links, images, emphasis) of already split text."""
+    parts = []
+    position = 0
+    for match in CODE_SPAN.finditer(text):
+        parts.append(_inline_text(text[position:match.start()]))
+        parts.append(f"<code>{html.escape(match.group(2).strip(), quote=False)}</code>")
+        position = match.end()
+    parts.append(_inline_text(text[position:]))
+    return "".join(parts)
+
+
+def _inline_text(text):
+    escapes = []
+
+    def keep(match):
+        escapes.append(html.escape(match.group(1)))
+        return f"\0{len(escapes) - 1}\0"
+
+    text = html.escape(ESCAPED.sub(keep, text))
+    text = IMAGE.sub(lambda m: f'<img src="{m.group(2)}" alt="{m.group(1)}"'
+                               + (f' title="{m.group(3)}"' if m.group(3) else "") + "/>", text)
+    text = LINK.sub(lambda m: f'<a href="{m.group(2)}"' + (f' title="{m.group(3)}"' if m.group(3) else "")
+                              + f">{m.group(1)}</a>", text)
+    text = AUTOLINK.sub(r'<a href="\1">\1</a>', text)
+    text = STRONG.sub(r"<b>\2</b>", text)
+    text = EMPHASIS.sub(r"<i>\2</i>", text)
+    text = STRIKE.sub(r"<s>\1</s>", text)
+    text = re.sub(r" {2,}\n", "<br/>\n", text)
+    return re.sub("\0(\\d+)\0", lambda m: escapes[int(m.group(1))], text)
+
+
+def _dedent(lines, width):
+    return [line[width:] if line[:width].strip() == "" else line.lstrip() for line in lines]
+
+
+def _is_paragraph(block):
+    first = block.split("\n")[0]
+    return not (_starts_block(first) or first.startswith("    ") or first.startswith("\t")
+                or SETEXT.match(block.split("\n")[-1]) and "\n" in block)
+
+
+def _render_list(lines):
+    first = LIST_ITEM.match(lines[0])
+    ordered = first.group(2)[0].isdigit()
+    base = len(first.group(1))
+    items = []
+    for line in lines:
+        match = LIST_ITEM.match(line)
+        if match and len(match.group(1)) <= base + 1:
+            width = match.end() if match.group(3) else len(line)
+            items.append([line[width:]])
+            items[-1].append(width)
+        elif items:
+            items[-1].insert(-1, line)
+    rendered = []
+    for item in items:
+        width = item.pop()
+        content = "\n".join([item[0]] + _dedent(item[1:], width))
+        checkbox = ""
+        if content.startswith(("[ ] ", "[x] ", "[X] ")):
+            checkbox = "&#9745; " if content[1] in "xX" else "&#9744; "
+            content = content[4:]
+        tight = "\n\n" not in content.strip()
+        # Paragraphs of tight items are rendered without a <p> wrapper
+        body = "".join(render_inline(block) if tight and _is_paragraph(block) else render_block(block)
+                       for block in split_blocks(content))
+        rendered.append(f"<li>{checkbox}{body}</li>")
+    if ordered:
+        start = int(first.group(2)[:-1])
+        return (f'<ol start="{start}">' if start != 1 else "<ol>") + "".join(rendered) + "</ol>"
+    return "<ul>" + "".join(rendered) + "</ul>"
+
+
+def _table_row(line, cell):
+    cells = line.strip()
+    if cells.startswith("|"):
+        cells = cells[1:]
+    if cells.endswith("|"):
+        cells = cells[:-1]
+    return "<tr>" + "".join(f"<{cell}>{render_inline(part.strip())}</{cell}>" for part in cells.split("|")) + "</tr>"
+
+
+def render_block(block):
+    """Render one block returned by split_blocks as HTML."""
+    lines = block.split("\n")
+    first = lines[0]
+    fence = FENCE.match(first)
+    if fence:
+        body = lines[1:-1] if len(lines) > 1 and lines[-1].lstrip().startswith(fence.group(1)) else lines[1:]
+        language = f' class="language-{html.escape(fence.group(2))}"' if fence.group(2) else ""
+        return f"<pre><code{language}>{html.escape(chr(10).join(body), quote=False)}</code></pre>"
+    heading = HEADING.match(first)
+    if heading and len(lines) == 1:
+        level = len(heading.group(1))
+        return f"<h{level}>{render_inline(heading.group(2) or '')}</h{level}>"
+    if RULE.match(first) and len(lines) == 1:
+        return "<hr/>"
+    if first.startswith("    ") or first.startswith("\t"):
+        code = "\n".join(line[4:] if line.startswith("    ") else line[1:] for line in lines)
+        return f"<pre><code>{html.escape(code, quote=False)}</code></pre>"
+    if QUOTE.match(first):
+        inner = "\n".join(QUOTE.sub("", line, count=1) for line in lines)
+        return "<blockquote>" + "".join(render_block(part) for part in split_blocks(inner)) + "</blockquote>"
+    if LIST_ITEM.match(first):
+        return _render_list(lines)
+    if len(lines) >= 2 and "|" in first and TABLE_SEPARATOR.match(lines[1]):
+        rows = [_table_row(first, "th")] + [_table_row(line, "td") for line in lines[2:]]
+        return "<table border=\"1\" cellpadding=\"4\" cellspacing=\"0\">" + "".join(rows) + "</table>"
+    setext = SETEXT.match(lines[-1]) if len(lines) >= 2 else None
+    if setext:
+        level = 1 if setext.group(1)[0] == "=" else 2
+        return f"<h{level}>{render_inline(chr(10).join(lines[:-1]).strip())}</h{level}>"
+    return f"<p>{render_inline(block.strip())}</p>"
+
+
+def diff_blocks(old, new):
+    """Return (start, old_end, new_end): old[start:old_end] must become new[start:new_end]."""
+    start = 0
+    limit = min(len(old), len(new))
+    while start < limit and old[start] == new[start]:
+        start += 1
+    old_end, new_end = len(old), len(new)
+    while old_end > start and new_end > start and old[old_end - 1] == new[new_end - 1]:
+        old_end -= 1
+        new_end -= 1
+    return start, old_end, new_end
+
+
+class MarkdownRenderer:
+    """Renders Markdown block by block, caching each block's HTML by its source.
+
+    Reference-style links and footnotes need the whole document and are
+    left as text; everything else renders from the block alone.
+    """
+    def __init__(self, cache_size=CACHE_SIZE):
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self.rendered = 0  # Cache misses, i.e. blocks actually rendered
+
+    def render_blocks(self, text):
+        """Return [(block source, html)] for `text`, rendering only uncached blocks."""
+        cache = self._cache
+        result = []
+        for block in split_blocks(text):
+            rendered = cache.get(block)
+            if rendered is None:
+                rendered = cache[block] = render_block(block)
+                self.rendered += 1
+                if len(cache) > self.cache_size:
+                    cache.popitem(last=False)
+            else:
+                cache.move_to_end(block)
+            result.append((block, rendered))
+        return result
+
+    def render(self, text):
+        return "".join(rendered for _, rendered in self.render_blocks(text))
@@ -0,0 +1,117 @@
+# src/ui/markdown_preview.py
+
+import threading
+from PyQt5.QtWidgets import QTextBrowser
+from PyQt5.QtCore import QThread, QTimer, pyqtSignal
+from PyQt5.QtGui import QTextCursor, QTextFrameFormat
+from src.ui.markdown import MarkdownRenderer, diff_blocks
+
+PREVIEW_DEBOUNCE_MS = 150  # Idle time after the last keystroke before re-rendering
+
+
+class RenderRequest:
+    """The text of one preview at the moment it was submitted."""
+    __slots__ = ("owner", "text")
+
+    def __init__(self, owner, text):
+        self.owner = owner
+        self.text = text
+
+
+class MarkdownRenderWorker(QThread):
+    """Renders Markdown off the GUI thread; only each preview's newest request is served.
+
+    One worker serves every preview, so the per-block HTML cache is shared.
+    """
+    rendered = pyqtSignal(object, object)  # RenderRequest, [(block source, html)]
+
+    def __init__(self, renderer=None):
+        super().__init__()
+        self.renderer = renderer or MarkdownRenderer()
+        self._condition = threading.Condition()
+        self._requests = {}  # owner -> newest RenderRequest
+        self._stopping = False
+
+    def submit(self, request):
+        with self._condition:
+            self._requests[request.owner] = request  # An unserved older request is simply replaced
+            self._condition.notify()
+
+    def run(self):
+        while True:
+            with self._condition:
+                while not self._requests and not self._stopping:
+                    self._condition.wait()
+                if self._stopping:
+                    return
+                requests, self._requests = self._requests, {}
+            for request in requests.values():
+                self.rendered.emit(request, self.renderer.render_blocks(request.text))
+
+    def stop(self):
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        self.wait()
+
+
+class MarkdownPreview(QTextBrowser):
+    """Live preview of an editor that patches only the blocks whose source changed.
+
+    Every Markdown block is shown in its own QTextFrame. When a render
+    arrives, the frames between the unchanged prefix and suffix are replaced
+    in one edit block, so the rest of the document keeps its layout and the
+    scroll position stays where the reader left it.
+    """
+    def __init__(self, editor, worker):
+        super().__init__()
+        self.editor = editor
+        self.editor.keep_alive = True
+        self.worker = worker
+        self.sources = []  # Block sources currently shown
+        self.frames = []  # The QTextFrame showing each of them
+        self._pending = None
+        self.frame_format = QTextFrameFormat()
+        self.frame_format.setMargin(0)
+        self.frame_format.setPadding(0)
+        self.setOpenExternalLinks(True)
+
+        self.debounce = QTimer(self)
+        self.debounce.setSingleShot(True)
+        self.debounce.setInterval(PREVIEW_DEBOUNCE_MS)
+        self.debounce.timeout.connect(self.request)
+        editor.textChanged.connect(self.debounce.start)
+        worker.rendered.connect(self._patch)
+        self.request()
+
+    def request(self):
+        self._pending = RenderRequest(id(self), self.editor.toPlainText())
+        self.worker.submit(self._pending)
+
+    def _patch(self, request, blocks):
+        if request is not self._pending:
+            return  # Another preview's render, or superseded by a newer one
+        sources = [source for source, _ in blocks]
+        start, old_end, new_end = diff_blocks(self.sources, sources)
+        if start == old_end == new_end:
+            return
+        scroll = self.verticalScrollBar().value()
+        cursor = QTextCursor(self.document())
+        cursor.beginEditBlock()
+        for frame in self.frames[start:old_end]:
+            # A frame occupies one position before and after its contents
+            cursor.setPosition(frame.firstPosition() - 1)
+            cursor.setPosition(frame.lastPosition() + 1, QTextCursor.KeepAnchor)
+            cursor.removeSelectedText()
+        position = self.frames[start - 1].lastPosition() + 1 if start else 0
+        inserted = []
+        for _, html in blocks[start:new_end]:
+            cursor.setPosition(position)
+            frame = cursor.insertFrame(self.frame_format)
+            cursor.insertHtml(html)
+            inserted.append(frame)
+            position = frame.lastPosition() + 1
+        cursor.endEditBlock()
+        self.frames[start:old_end] = inserted
+        self.sources = sources
+        self.verticalScrollBar().setValue(scroll)
@@ -0,0 +1,137 @@
+# src/ui/multi_cursor.py
+
+from src.ui.text_units import utf16_len
+
+
+class CursorSet:
+    """Sorted set of carets and selections that are edited together.
+
+    Each cursor is an (anchor, position) pair of document offsets. Cursors
+    are kept sorted and cursors that overlap, or meet where one of them is
+    empty, are merged, so selections never intersect. An edit is computed
+    for every cursor in one pass: the resulting (start, end, text) edits
+    come back first to last, and the new cursor offsets are derived from a
+    running shift rather than by moving each cursor through the document.
+    """
+    def __init__(self, anchor=0, position=0):
+        self.cursors = [(anchor, position)]
+        self.primary = 0  # Index of the cursor the editor's own QTextCursor follows
+
+    def __len__(self):
+        return len(self.cursors)
+
+    def primary_cursor(self):
+        return self.cursors[self.primary]
+
+    def set(self, cursors, primary=0):
+        """Replace the cursors, sorting and merging them; `primary` indexes into `cursors`."""
+        order = sorted(range(len(cursors)), key=lambda i: min(cursors[i]))
+        merged = []
+        new_primary = 0
+        for i in order:
+            anchor, position = cursors[i]
+            start, end = min(anchor, position), max(anchor, position)
+            if merged:
+                last_anchor, last_position = merged[-1]
+                last_start, last_end = min(last_anchor, last_position), max(last_anchor, last_position)
+                if start < last_end or (start == last_end and (start == end or last_start == last_end)):
+                    end = max(end, last_end)
+                    merged[-1] = (last_start, end) if last_anchor <= last_position else (end, last_start)
+                    if i == primary:
+                        new_primary = len(merged) - 1
+                    continue
+            if i == primary:
+                new_primary = len(merged)
+            merged.append((anchor, position))
+        self.cursors = merged
+        self.primary = new_primary
+
+    def add(self, anchor, position):
+        """Add a cursor and make it the primary one."""
+        self.set(self.cursors + [(anchor, position)], len(self.cursors))
+
+    def selections(self):
+        """(start, end) of every cursor, first to last."""
+        return [(min(cursor), max(cursor)) for cursor in self.cursors]
+
+    def in_range(self, first, last):
+        """Cursors that touch the offsets first..last, for painting the visible ones only."""
+        cursors = self.cursors
+        low, high = 0, len(cursors)
+        while low < high:  # First cursor ending at or after `first`; ends are sorted too
+            middle = (low + high) // 2
+            if max(cursors[middle]) < first:
+                low = middle + 1
+            else:
+                high = middle
+        found = []
+        while low < len(cursors) and min(cursors[low]) <= last:
+            found.append(cursors[low])
+            low += 1
+        return found
+
+    def _apply(self, ranges, texts):
+        """Replace each (start, end) range with its text; return the edits and leave a caret after each."""
+        edits = []
+        cursors = []
+        shift = 0
+        for (start, end), text in zip(ranges, texts):
+            edits.append((start, end, text))
+            caret = start + shift + utf16_len(text)
+            cursors.append((caret, caret))
+            shift += utf16_len(text) - (end - start)
+        self.set(cursors, self.primary)
+        return edits
+
+    def insert(self, text):
+        """Replace every selection with `text`, or with one string per cursor when given a list."""
+        texts = text if isinstance(text, list) else [text] * len(self.cursors)
+        return self._apply(self.selections(), texts)
+
+    def delete(self, length, forward=False):
+        """Delete every selection, or the character before (after, if `forward`) each empty cursor.
+
+        `length` is the document length, so a caret at either end deletes
+        nothing instead of reaching outside the text.
+        """
+        ranges = []
+        previous_end = 0
+        for start, end in self.selections():
+            if start == end:
+                start, end = (start, min(start + 1, length)) if forward else (max(start - 1, 0), start)
+            start = max(start, previous_end)  # Two carets a character apart delete distinct characters
+            end = max(end, start)
+            ranges.append((start, end))
+            previous_end = end
+        return self._apply(ranges, [""] * len(ranges))
+
+    def move(self, target, select=False, collapse=None):
+        """Move every caret to target(position).
+
+        With `select` the anchors stay put and the selections grow. Without
+        it, a cursor holding a selection collapses to its start or end when
+        `collapse` is "start" or "end", the way Left and Right behave.
+        """
+        cursors = []
+        for anchor, position in self.cursors:
+            if not select and anchor != position and collapse is not None:
+                caret = min(anchor, position) if collapse == "start" else max(anchor, position)
+                cursors.append((caret, caret))
+                continue
+            position = target(position)
+            cursors.append((anchor if select else position, position))
+        self.set(cursors, self.primary)
+
+    def adjust(self, position, removed, added):
+        """Shift the cursors past a change made elsewhere that replaced `removed` characters with `added`."""
+        end = position + removed
+        delta = added - removed
+
+        def shift(offset):
+            if offset <= position:
+                return offset
+            if offset >= end:
+                return offset + delta
+            return min(offset, position + added)  # Inside the replaced text
+
+        self.set([(shift(anchor), shift(caret)) for anchor, caret in self.cursors], self.primary)
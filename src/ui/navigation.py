@@ -0,0 +1,78 @@
+# src/ui/navigation.py
+
+import os
+from PyQt5.QtCore import QThread, pyqtSignal
+from PyQt5.QtGui import QTextCursor
+from src.ai.refactor import apply_edits_to_files
+from src.ui.lexer import language_for_path
+from src.ui.search_engine import FileMatch
+from src.ui.text_units import utf16_len
+
+
+class SymbolIndexWorker(QThread):
+    """Brings the SymbolIndex up to date with the Python files of a FileIndex."""
+    index_finished = pyqtSignal(int, int)  # files re-parsed, files indexed
+
+    def __init__(self, symbol_index, file_index):
+        super().__init__()
+        self.symbol_index = symbol_index
+        self.file_index = file_index
+
+    def run(self):
+        root = self.file_index.root
+        paths = [os.path.join(root, self.file_index.path(file_id)) for file_id in range(len(self.file_index))]
+        paths = [path for path in paths if language_for_path(path) == "python"]
+        parsed = self.symbol_index.update(paths, self.isInterruptionRequested)
+        self.index_finished.emit(parsed, self.symbol_index.file_count())
+
+
+def apply_edits_to_editor(editor, edits):
+    """Apply (line, column, length, new_text) edits to an open editor as one undo step.
+
+    Columns and lengths count characters; they are mapped to the UTF-16
+    positions QTextCursor expects through the text of their block.
+    """
+    document = editor.document()
+    cursor = QTextCursor(document)
+    cursor.beginEditBlock()
+    for line, column, length, new_text in sorted(edits, reverse=True):
+        block = document.findBlockByNumber(line)
+        text = block.text()
+        position = block.position() + utf16_len(text[:column])
+        cursor.setPosition(position)
+        cursor.setPosition(position + utf16_len(text[column:column + length]), QTextCursor.KeepAnchor)
+        cursor.insertText(new_text)
+    cursor.endEditBlock()
+
+
+def apply_rename(edits, editor_for_path):
+    """Apply rename edits: open documents in place, every other file atomically on disk."""
+    in_editors = []
+    for path, file_edits in edits.items():
+        editor = editor_for_path(path)
+        if editor is not None:
+            apply_edits_to_editor(editor, file_edits)
+            in_editors.append(path)
+    return in_editors + apply_edits_to_files(edits, skip=set(in_editors))
+
+
+def locations_to_matches(locations, editor_for_path):
+    """Group Locations into {path: [FileMatch]} for the search results tree."""
+    grouped = {}
+    for location in locations:
+        grouped.setdefault(location.path, []).append(location)
+    results = {}
+    for path, group in grouped.items():
+        editor = editor_for_path(path)
+        if editor is not None:
+            lines = editor.toPlainText().split("\n")
+        else:
+            try:
+                with open(path, encoding="utf-8", errors="replace") as f:
+                    lines = f.read().splitlines()
+            except OSError:
+                continue
+        results[path] = [FileMatch(location.line, location.column, location.length,
+                                   lines[location.line][:200] if location.line < len(lines) else "")
+                         for location in group]
+    return results
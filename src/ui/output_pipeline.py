@@ -0,0 +1,79 @@
+# src/ui/output_pipeline.py
+
+import codecs
+from collections import deque
+
+DEFAULT_SCROLLBACK = 10000  # Lines kept by the terminal
+
+
+class OutputPipeline:
+    """Decodes process output incrementally and coalesces it for batched display.
+
+    Each stream has its own incremental UTF-8 decoder, so multi-byte characters
+    split across reads decode correctly. Decoded text queues until `take()` is
+    called, at most once per frame. If the widget falls behind, queued text is
+    trimmed to the scrollback size, because older lines would be discarded by
+    the widget anyway.
+    """
+    def __init__(self, max_lines=DEFAULT_SCROLLBACK, encoding="utf-8"):
+        self.max_lines = max_lines
+        self.encoding = encoding
+        self._decoders = {}
+        self._pending = deque()
+        self._pending_lines = 0
+        self.dropped_lines = 0
+        self.total_lines = 0
+
+    def _decoder(self, stream):
+        decoder = self._decoders.get(stream)
+        if decoder is None:
+            decoder = self._decoders[stream] = codecs.getincrementaldecoder(self.encoding)(errors="replace")
+        return decoder
+
+    def feed(self, data, stream="stdout"):
+        """Queue raw bytes read from `stream`."""
+        self._append(self._decoder(stream).decode(data))
+
+    def feed_text(self, text):
+        """Queue already-decoded text, such as an echoed command line."""
+        self._append(text)
+
+    def finish(self):
+        """Flush bytes held back by the decoders when the process exits."""
+        for decoder in self._decoders.values():
+            self._append(decoder.decode(b"", final=True))
+        self._decoders.clear()
+
+    def _append(self, text):
+        if not text:
+            return
+        newlines = text.count("\n")
+        self._pending.append(text)
+        self._pending_lines += newlines
+        self.total_lines += newlines
+        if self._pending_lines > 2 * self.max_lines:
+            self._trim()
+
+    def _trim(self):
+        """Keep only the last `max_lines` lines of queued text."""
+        text = "".join(self._pending)
+        cut = len(text)
+        for _ in range(self.max_lines + 1):
+            cut = text.rfind("\n", 0, cut)
+            if cut < 0:
+                return
+        self.dropped_lines += text.count("\n", 0, cut + 1)
+        self._pending = deque([text[cut + 1:]])
+        self._pending_lines = self.max_lines
+
+    def has_pending(self):
+        return bool(self._pending)
+
+    def take(self):
+        """Return and clear queued text, at most the last `max_lines` lines of it."""
+        if self._pending_lines > self.max_lines:
+            self._trim()
+        text = "".join(self._pending)
+        self._pending.clear()
+        self._pending_lines = 0
+        return text
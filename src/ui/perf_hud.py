@@ -0,0 +1,109 @@
+# src/ui/perf_hud.py
+
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTreeWidget, QTreeWidgetItem, QPlainTextEdit
+)
+from PyQt5.QtCore import QTimer, pyqtSignal
+from PyQt5.QtGui import QColor, QPainter
+from src.ui.perf_monitor import monitor
+
+REFRESH_MS = 500  # How often the HUD redraws while visible
+GRAPH_MAX_MS = 100  # Frame time at the top of the graph
+
+
+class FrameGraph(QWidget):
+    """Bar graph of recent gaps between event-loop heartbeats."""
+    def __init__(self, monitor):
+        super().__init__()
+        self.monitor = monitor
+        self.setMinimumHeight(60)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor(30, 30, 30))
+        frames = list(self.monitor.frames)[-self.width():]
+        height = self.height()
+        budget = height - int(height * self.monitor.heartbeat_ms / GRAPH_MAX_MS)
+        painter.setPen(QColor(90, 90, 90))
+        painter.drawLine(0, budget, self.width(), budget)
+        for x, ms in enumerate(frames):
+            bar = min(height, int(height * ms / GRAPH_MAX_MS))
+            slow = ms - self.monitor.heartbeat_ms >= self.monitor.slow_ms
+            painter.setPen(QColor(230, 80, 60) if slow else QColor(90, 200, 120))
+            painter.drawLine(x, height, x, height - bar)
+
+
+class PerfHud(QWidget):
+    """Live frame times, the costliest instrumented slots and recent slow calls.
+
+    Showing the HUD enables the shared PerfMonitor and starts the event-loop
+    heartbeat; closing it stops both, so nothing is measured otherwise.
+    """
+    record_requested = pyqtSignal()
+
+    def __init__(self, monitor=monitor):
+        super().__init__()
+        self.monitor = monitor
+        self.heartbeat = QTimer(self)
+        self.heartbeat.setInterval(monitor.heartbeat_ms)
+        self.heartbeat.timeout.connect(monitor.beat)
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(REFRESH_MS)
+        self.refresh_timer.timeout.connect(self.refresh)
+
+        self.summary = QLabel()
+        self.graph = FrameGraph(monitor)
+        self.offenders = QTreeWidget()
+        self.offenders.setHeaderLabels(["Slot", "Calls", "Total ms", "Mean ms", "Max ms"])
+        self.offenders.setRootIsDecorated(False)
+        self.slow_calls = QPlainTextEdit()
+        self.slow_calls.setReadOnly(True)
+        self.slow_calls.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.record_button = QPushButton("Record Trace")
+        self.record_button.clicked.connect(self.record_requested)
+        reset_button = QPushButton("Reset")
+        reset_button.clicked.connect(self.reset)
+
+        buttons = QHBoxLayout()
+        buttons.addWidget(self.record_button)
+        buttons.addWidget(reset_button)
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.summary)
+        layout.addWidget(self.graph)
+        layout.addWidget(self.offenders)
+        layout.addWidget(QLabel("Slow calls"))
+        layout.addWidget(self.slow_calls)
+        layout.addLayout(buttons)
+
+    def start(self):
+        self.monitor.enable()
+        self.heartbeat.start()
+        self.refresh_timer.start()
+        self.refresh()
+
+    def stop(self):
+        self.heartbeat.stop()
+        self.refresh_timer.stop()
+        if self.monitor.trace is None:
+            self.monitor.disable()
+
+    def reset(self):
+        self.monitor.reset()
+        self.refresh()
+
+    def set_recording(self, recording):
+        self.record_button.setText("Stop Recording" if recording else "Record Trace")
+
+    def refresh(self):
+        p50, p95, longest = self.monitor.frame_summary()
+        self.summary.setText(f"Frame p50 {p50:.1f} ms, p95 {p95:.1f} ms, max {longest:.1f} ms")
+        self.graph.update()
+        self.offenders.clear()
+        for name, calls, total, mean, longest in self.monitor.top():
+            QTreeWidgetItem(self.offenders, [name, str(calls), f"{total:.1f}", f"{mean:.2f}", f"{longest:.1f}"])
+        lines = []
+        for name, ms, samples in reversed(self.monitor.slow_calls):
+            lines.append(f"{ms:.0f} ms  {name}")
+            for count, stack in samples:
+                lines.append(f"    {count} samples: " + " > ".join(stack[-4:]))
+        self.slow_calls.setPlainText("\n".join(lines))
@@ -0,0 +1,204 @@
+# src/ui/perf_monitor.py
+
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from src.fileio import atomic_write
+
+HEARTBEAT_MS = 16  # Expected gap between event-loop heartbeats, one frame
+SLOW_CALL_MS = 50  # Calls and event-loop stalls at least this long are captured with stack samples
+SAMPLE_INTERVAL_MS = 5  # How often the sampler thread looks at a blocked GUI thread
+STACK_DEPTH = 12  # Innermost frames kept per stack sample
+FRAME_SAMPLES = 600  # Heartbeat intervals kept for the HUD, about ten seconds
+MAX_SLOW_CALLS = 200
+MAX_TRACE_EVENTS = 1_000_000  # Recording stops growing past this, roughly 200 MB of JSON
+
+
+def _stack(frame):
+    """Compact innermost-last "file:line function" entries for a frame."""
+    return tuple(f"{os.path.basename(entry.filename)}:{entry.lineno} {entry.name}"
+                 for entry in traceback.extract_stack(frame, limit=STACK_DEPTH))
+
+
+def _stack_args(samples):
+    """trace_event args showing sampled stacks outermost first, most frequent first."""
+    if not samples:
+        return {}
+    return {"stacks": [f"{count}x " + " > ".join(stack) for count, stack in samples]}
+
+
+class PerfMonitor:
+    """Opt-in timings for the GUI thread.
+
+    Hot slots are wrapped with `timed(name)`; while the monitor is disabled
+    the wrapper costs one attribute check. Enabled, it keeps per-name call
+    statistics, the gaps between event-loop heartbeats (fed by `beat`), and
+    the slow calls and stalls together with stack samples that a background
+    thread takes of the GUI thread while it is blocked. Between
+    `start_trace` and `stop_trace` every timed call and stall is also kept
+    as a Chrome trace_event, for chrome://tracing or ui.perfetto.dev.
+    """
+    def __init__(self, slow_ms=SLOW_CALL_MS, heartbeat_ms=HEARTBEAT_MS, clock=time.perf_counter):
+        self.enabled = False
+        self.slow_ms = slow_ms
+        self.heartbeat_ms = heartbeat_ms
+        self.clock = clock
+        self.stats = {}  # name -> [calls, total seconds, max seconds]
+        self.frames = deque(maxlen=FRAME_SAMPLES)  # Milliseconds between heartbeats
+        self.slow_calls = deque(maxlen=MAX_SLOW_CALLS)  # (name, ms, [(count, stack)])
+        self.trace = None  # Trace events while recording
+        self.last_beat = None
+        self._call_started = None  # Start of the outermost timed call in progress
+        self._depth = 0
+        self._samples = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._main_thread = None
+
+    def enable(self):
+        """Start collecting on the calling (GUI) thread."""
+        if self.enabled:
+            return
+        self._main_thread = threading.get_ident()
+        self.last_beat = self.clock()
+        self.enabled = True
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample_loop, name="perf-sampler", daemon=True)
+        self._thread.start()
+
+    def disable(self):
+        self.enabled = False
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def reset(self):
+        self.stats.clear()
+        self.frames.clear()
+        self.slow_calls.clear()
+
+    def call(self, name, function, args, kwargs):
+        """Run `function` and record how long it took under `name`."""
+        started = self.clock()
+        outermost = self._depth == 0
+        if outermost:
+            self._call_started = started
+        self._depth += 1
+        try:
+            return function(*args, **kwargs)
+        finally:
+            self._depth -= 1
+            elapsed = self.clock() - started
+            if outermost:
+                self._call_started = None
+            self._record(name, started, elapsed, outermost)
+
+    def _record(self, name, started, elapsed, outermost):
+        stat = self.stats.get(name)
+        if stat is None:
+            stat = self.stats[name] = [0, 0.0, 0.0]
+        stat[0] += 1
+        stat[1] += elapsed
+        if elapsed > stat[2]:
+            stat[2] = elapsed
+        samples = None
+        if outermost and elapsed * 1000 >= self.slow_ms:
+            samples = self._take_samples()
+            self.slow_calls.append((name, elapsed * 1000, samples))
+        if self.trace is not None:
+            self._trace_event({"name": name, "cat": "slot", "ph": "X", "ts": started * 1e6, "dur": elapsed * 1e6,
+                               "args": _stack_args(samples)})
+
+    def beat(self):
+        """Record one event-loop heartbeat; a late one is a stall the loop could not service."""
+        now = self.clock()
+        if self.last_beat is not None:
+            gap = (now - self.last_beat) * 1000
+            self.frames.append(gap)
+            lag = gap - self.heartbeat_ms
+            self._trace_event({"name": "event loop lag", "ph": "C", "ts": now * 1e6, "args": {"ms": max(lag, 0.0)}})
+            if lag >= self.slow_ms:
+                samples = self._take_samples()
+                self.slow_calls.append(("event loop stall", lag, samples))
+                self._trace_event({"name": "event loop stall", "cat": "lag", "ph": "X",
+                                   "ts": self.last_beat * 1e6, "dur": gap * 1000, "args": _stack_args(samples)})
+            else:
+                self._take_samples()  # Samples from a stall that a timed call already reported
+        self.last_beat = now
+
+    def _blocked(self, now):
+        """True while the GUI thread is in a slow call or has missed its heartbeat."""
+        started = self._call_started
+        if started is not None and (now - started) * 1000 >= self.slow_ms:
+            return True
+        last_beat = self.last_beat
+        return last_beat is not None and (now - last_beat) * 1000 >= self.heartbeat_ms + self.slow_ms
+
+    def _sample_loop(self):
+        while not self._stop.wait(SAMPLE_INTERVAL_MS / 1000):
+            if self._blocked(self.clock()):
+                frame = sys._current_frames().get(self._main_thread)
+                if frame is not None:
+                    stack = _stack(frame)
+                    with self._lock:
+                        self._samples.append(stack)
+
+    def _take_samples(self):
+        """The stacks sampled since the last call, most frequent first."""
+        with self._lock:
+            samples, self._samples = self._samples, []
+        return [(count, stack) for stack, count in Counter(samples).most_common(3)]
+
+    def _trace_event(self, event):
+        if self.trace is not None and len(self.trace) < MAX_TRACE_EVENTS:
+            event["pid"] = os.getpid()
+            event["tid"] = self._main_thread
+            self.trace.append(event)
+
+    def start_trace(self):
+        self.trace = []
+
+    def stop_trace(self, path):
+        """Write the recorded events as trace_event JSON to `path`; return how many were written."""
+        events, self.trace = self.trace or [], None
+        metadata = [{"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": self._main_thread,
+                     "args": {"name": "GUI thread"}}]
+        atomic_write(path, lambda f: json.dump({"traceEvents": metadata + events, "displayTimeUnit": "ms"}, f))
+        return len(events)
+
+    def top(self, count=10):
+        """(name, calls, total ms, mean ms, max ms) for the names with the most total time."""
+        rows = [(name, calls, total * 1000, total * 1000 / calls, longest * 1000)
+                for name, (calls, total, longest) in self.stats.items()]
+        rows.sort(key=lambda row: row[2], reverse=True)
+        return rows[:count]
+
+    def frame_summary(self):
+        """(p50, p95, max) milliseconds between heartbeats."""
+        if not self.frames:
+            return 0.0, 0.0, 0.0
+        ordered = sorted(self.frames)
+        return (ordered[len(ordered) // 2], ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+                ordered[-1])
+
+
+monitor = PerfMonitor()
+
+
+def timed(name):
+    """Decorator recording each call in `monitor` under `name` while it is enabled."""
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not monitor.enabled:
+                return function(*args, **kwargs)
+            return monitor.call(name, function, args, kwargs)
+        return wrapper
+    return decorate
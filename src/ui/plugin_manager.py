@@ -1,13 +1,29 @@
 # src/ui/plugin_manager.py
 
-import os
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QListWidget, QPushButton
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QListWidget, QListWidgetItem, QPushButton
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
+from src.plugins.manager import PluginHost
+
+STATS_REFRESH_MS = 1000
+
+
+def _command_outcome(command, future):
+    error = future.exception()
+    if error is not None:
+        return f"{command} failed: {error}"
+    result = future.result()
+    return f"{command}: {result}" if result is not None else f"{command} done"
 
 class PluginManager(QWidget):
     """Plugin manager to load and display available plugins."""
-    def __init__(self, plugin_folder="src/plugins"):
+    message = pyqtSignal(str, str, object)  # plugin name, kind, payload
+
+    def __init__(self, plugin_folder="src/plugins", index_path="config/plugin_index.json"):
         super().__init__()
         self.plugin_folder = plugin_folder
+        self.host = PluginHost(plugin_folder, index_path)
+        # Plugin posts may arrive on a worker reader thread; the signal hops to the GUI thread
+        self.host.listeners.append(self.message.emit)
 
         self.plugin_list = QListWidget()
         self.load_plugins()
@@ -15,16 +31,60 @@ class PluginManager(QWidget):
         reload_button = QPushButton("Reload Plugins")
         reload_button.clicked.connect(self.load_plugins)
 
+        disable_button = QPushButton("Disable Selected")
+        disable_button.clicked.connect(self.disable_selected)
+
         layout = QVBoxLayout()
         layout.addWidget(QLabel("Plugins"))
         layout.addWidget(self.plugin_list)
         layout.addWidget(reload_button)
+        layout.addWidget(disable_button)
         self.setLayout(layout)
 
+        # Refresh timings and restart hung plugin workers
+        self.stats_timer = QTimer(self)
+        self.stats_timer.timeout.connect(self.refresh)
+        self.stats_timer.start(STATS_REFRESH_MS)
+
     def load_plugins(self):
-        """Load plugins from the plugin folder."""
+        """Rescan the plugin index and activate plugins that run at startup."""
+        self.host.scan()
+        QTimer.singleShot(0, self.host.activate_startup)
+        self.refresh()
+
+    def refresh(self):
+        """Show each plugin's state, activation time and slowest callback."""
+        self.host.check_workers()
+        selected = self.plugin_list.currentItem()
+        selected_name = selected.data(Qt.UserRole) if selected else None
         self.plugin_list.clear()
-        for root, _, files in os.walk(self.plugin_folder):
-            for file in files:
-                if file.endswith(".py"):
-                    self.plugin_list.addItem(os.path.join(root, file))
+        for plugin in sorted(self.host.plugins.values(), key=lambda p: p.name):
+            stats = plugin.stats
+            text = f"{plugin.name} {plugin.version} - {plugin.state}"
+            if stats.activation_ms is not None:
+                text += f" (activated in {stats.activation_ms:.0f} ms, slowest call {stats.max_ms:.0f} ms)"
+            item = QListWidgetItem(text)
+            item.setData(Qt.UserRole, plugin.name)
+            if stats.last_error:
+                item.setToolTip(stats.last_error)
+            self.plugin_list.addItem(item)
+            if plugin.name == selected_name:
+                self.plugin_list.setCurrentItem(item)
+
+    def run_command(self, command, *args):
+        """Run a plugin command through the host; its outcome is reported as a status message."""
+        plugin = self.host.commands().get(command, "plugins")
+        future = self.host.execute_command(command, *args)
+        # The future may settle on a worker reader thread; `message` hops to the GUI thread
+        future.add_done_callback(lambda done: self.message.emit(plugin, "status", _command_outcome(command, done)))
+        return future
+
+    def disable_selected(self):
+        item = self.plugin_list.currentItem()
+        if item:
+            self.host.disable(item.data(Qt.UserRole))
+            self.refresh()
+
+    def shutdown(self):
+        self.stats_timer.stop()
+        self.host.shutdown()
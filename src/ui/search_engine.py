@@ -0,0 +1,297 @@
+# src/ui/search_engine.py
+
+import mmap
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from src.fileio import atomic_write
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+BINARY_SNIFF_BYTES = 8192  # A NUL byte in this prefix marks a file as binary
+MAX_MATCHES_PER_FILE = 1000
+MAX_LINE_PREVIEW = 300
+FILES_PER_TASK = 64  # Files searched per pool task, amortising IPC cost
+
+
+class SearchQuery:
+    """A literal or regex query with case and whole-word options.
+
+    Files are searched as bytes, where case folding, word boundaries and
+    character classes only know ASCII; queries that need them for
+    non-ASCII text run on the decoded text instead (see `needs_text`).
+    """
+    def __init__(self, pattern, regex=False, case_sensitive=True, whole_word=False):
+        self.pattern = pattern
+        self.regex = regex
+        self.case_sensitive = case_sensitive
+        self.whole_word = whole_word
+
+    def _source(self):
+        source = self.pattern if self.regex else re.escape(self.pattern)
+        if self.whole_word:
+            source = rf"\b(?:{source})\b"
+        return source
+
+    def compile(self):
+        """Return the compiled str pattern, used against editor text."""
+        return re.compile(self._source(), 0 if self.case_sensitive else re.IGNORECASE)
+
+    def compile_bytes(self):
+        """Return the compiled bytes pattern, used against memory-mapped files."""
+        return re.compile(self._source().encode("utf-8"), 0 if self.case_sensitive else re.IGNORECASE)
+
+    def needs_text(self):
+        """True when a bytes pattern would miss matches: non-ASCII text with case folding, words or regex classes."""
+        return not self.pattern.isascii() and (not self.case_sensitive or self.whole_word or self.regex)
+
+    def compile_for_files(self):
+        """Return the pattern to run against file contents: str when `needs_text`, bytes otherwise."""
+        return self.compile() if self.needs_text() else self.compile_bytes()
+
+    def template(self, replacement):
+        """Return `replacement` as a substitution template; literal queries escape backslashes."""
+        return replacement if self.regex else replacement.replace("\\", "\\\\")
+
+    def validate(self, replacement):
+        """Raise re.error if the pattern, or `replacement` as its template, is invalid."""
+        sre_parse.parse_template(self.template(replacement), self.compile())
+
+    def literal_prefilter(self):
+        """Return bytes every match must contain, or None when no cheap check exists."""
+        if not self.case_sensitive:
+            return None
+        if not self.regex:
+            return self.pattern.encode("utf-8") or None
+        try:
+            parsed = sre_parse.parse(self.pattern)
+        except re.error:
+            return None
+        if parsed.state.flags & sre_parse.SRE_FLAG_IGNORECASE:
+            return None
+        # Longest run of consecutive top-level literal characters
+        best, run = "", []
+        for op, value in list(parsed) + [(None, None)]:
+            if op == sre_parse.LITERAL:
+                run.append(chr(value))
+                continue
+            if len(run) > len(best):
+                best = "".join(run)
+            run = []
+        if any(op == sre_parse.BRANCH for op, _ in parsed):
+            return None
+        return best.encode("utf-8") or None
+
+
+class FileMatch:
+    """One match inside a file, with enough context to preview a replacement."""
+    __slots__ = ("line", "column", "length", "text")
+
+    def __init__(self, line, column, length, text):
+        self.line = line  # Zero-based line number
+        self.column = column  # Character offset inside the line
+        self.length = length  # Match length in characters
+        self.text = text  # The line, truncated for display
+
+    def __repr__(self):
+        return f"FileMatch({self.line}, {self.column}, {self.length})"
+
+
+def _is_binary(data):
+    return b"\0" in data[:BINARY_SNIFF_BYTES]
+
+
+def search_file(path, query, pattern=None, prefilter=None):
+    """Return the matches of `query` in one file, or [] for unreadable and binary files."""
+    if pattern is None:
+        pattern = query.compile_for_files()
+        prefilter = query.literal_prefilter()
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if _is_binary(data):
+                    return []
+                if prefilter is not None and data.find(prefilter) < 0:
+                    return []
+                if isinstance(pattern.pattern, str):
+                    return _collect_matches(data[:].decode("utf-8", errors="replace"), pattern)
+                return _collect_matches(data, pattern)
+    except (OSError, ValueError):
+        return []
+
+
+def _collect_matches(data, pattern):
+    """Return the FileMatches of `pattern` in `data`, which is bytes or already decoded text."""
+    if isinstance(data, str):
+        newline, decode = "\n", str
+    else:
+        newline, decode = b"\n", lambda chunk: chunk.decode("utf-8", errors="replace")
+    matches = []
+    line, counted_to, line_start = 0, 0, 0
+    for match in pattern.finditer(data):
+        start, end = match.span()
+        if start == end:
+            continue
+        if start >= counted_to:
+            line += data[counted_to:start].count(newline)
+            counted_to = start
+            line_start = data.rfind(newline, 0, start) + 1
+        line_end = data.find(newline, start)
+        if line_end < 0:
+            line_end = len(data)
+        prefix = decode(data[line_start:start])
+        matched = decode(data[start:end])
+        text = decode(data[line_start:line_end]).rstrip("\r")
+        matches.append(FileMatch(line, len(prefix), len(matched), text[:MAX_LINE_PREVIEW]))
+        if len(matches) >= MAX_MATCHES_PER_FILE:
+            break
+    return matches
+
+
+def search_files(paths, query):
+    """Pool task: search a batch of files, returning [(path, matches)] for files with hits."""
+    pattern = query.compile_for_files()
+    prefilter = query.literal_prefilter()
+    results = []
+    for path in paths:
+        matches = search_file(path, query, pattern, prefilter)
+        if matches:
+            results.append((path, matches))
+    return results
+
+
+def replace_in_file(path, query, replacement):
+    """Pool task: rewrite one file atomically with every match replaced; return the count."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if _is_binary(data):
+        return 0
+    if query.needs_text():
+        # surrogateescape carries invalid bytes through unchanged
+        text = data.decode("utf-8", errors="surrogateescape")
+        updated, count = query.compile().subn(query.template(replacement), text)
+        updated = updated.encode("utf-8", errors="surrogateescape")
+    else:
+        updated, count = query.compile_bytes().subn(query.template(replacement).encode("utf-8"), data)
+    if count:
+        atomic_write(path, lambda f: f.write(updated), binary=True, fsync=False)
+    return count
+
+
+def preview_line(query, match, replacement):
+    """Return the match's line with the replacement applied to that match only."""
+    pattern = query.compile()
+    template = query.template(replacement)
+    head, tail = match.text[:match.column], match.text[match.column:]
+    return head + pattern.sub(template, tail, count=1)
+
+
+def _utf16_offsets(text, positions):
+    """Convert sorted code-point offsets into the UTF-16 offsets Qt documents use."""
+    converted, extra, last = [], 0, 0
+    for position in positions:
+        extra += sum(1 for char in text[last:position] if ord(char) > 0xFFFF)
+        last = position
+        converted.append(position + extra)
+    return converted
+
+
+def find_spans(text, query, limit=None):
+    """Return [(start, end)] of the first `limit` non-empty matches in `text`, in UTF-16 code units."""
+    spans = []
+    for match in query.compile().finditer(text):
+        if match.start() != match.end():
+            spans.append(match.span())
+            if len(spans) == limit:
+                break
+    if spans and any(ord(char) > 0xFFFF for char in text):
+        flat = _utf16_offsets(text, [offset for span in spans for offset in span])
+        spans = list(zip(flat[::2], flat[1::2]))
+    return spans
+
+
+def compute_replacements(text, query, replacement):
+    """Return [(start, end, new_text)] for every match in `text`, in document order.
+
+    Offsets are in UTF-16 code units so they can be applied directly with a
+    QTextCursor; regex replacements expand group references per match.
+    """
+    pattern = query.compile()
+    edits = []
+    for match in pattern.finditer(text):
+        if match.start() == match.end():
+            continue
+        new_text = match.expand(replacement) if query.regex else replacement
+        edits.append((match.start(), match.end(), new_text))
+    if edits and any(ord(char) > 0xFFFF for char in text):
+        flat = _utf16_offsets(text, [offset for start, end, _ in edits for offset in (start, end)])
+        edits = [(flat[2 * i], flat[2 * i + 1], edit[2]) for i, edit in enumerate(edits)]
+    return edits
+
+
+class ProjectSearch:
+    """Fans a query out over a shared process pool and streams per-file results.
+
+    An instance serves one query over a fixed file list; cancelling drops
+    pending batches and stops delivery of results that are already in flight.
+    """
+    _pool = None
+
+    @classmethod
+    def pool(cls):
+        if cls._pool is None:
+            context = multiprocessing.get_context("spawn")  # Forking a threaded Qt process can deadlock
+            cls._pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 2, mp_context=context)
+        return cls._pool
+
+    def __init__(self, paths):
+        self.paths = list(paths)
+        self._cancelled = threading.Event()
+        self._futures = []
+
+    def search(self, query, on_result, should_stop=None):
+        """Call `on_result(path, matches)` as batches finish; return False if cancelled."""
+        pool = self.pool()
+        self._futures = [pool.submit(search_files, self.paths[i:i + FILES_PER_TASK], query)
+                         for i in range(0, len(self.paths), FILES_PER_TASK)]
+        for future in as_completed(self._futures):
+            if self._cancelled.is_set() or (should_stop is not None and should_stop()):
+                self.cancel()
+                return False
+            try:
+                batch = future.result()
+            except Exception:
+                continue
+            for path, matches in batch:
+                on_result(path, matches)
+        return True
+
+    def replace(self, paths, query, replacement):
+        """Apply a replacement to every file in `paths` in parallel; return {path: count}.
+
+        An invalid pattern or template raises re.error before any file is touched.
+        """
+        query.validate(replacement)
+        pool = self.pool()
+        futures = {pool.submit(replace_in_file, path, query, replacement): path for path in paths}
+        counts = {}
+        for future in as_completed(futures):
+            try:
+                counts[futures[future]] = future.result()
+            except OSError:
+                counts[futures[future]] = 0
+        return counts
+
+    def cancel(self):
+        """Stop delivering results and drop batches that have not started yet."""
+        self._cancelled.set()
+        for future in self._futures:
+            future.cancel()
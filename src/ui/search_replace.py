@@ -1,7 +1,110 @@
 # src/ui/search_replace.py
 
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLineEdit, QPushButton, QLabel, QTextEdit
-from PyQt5.QtCore import Qt
+import os
+import re
+import time
+from PyQt5.QtWidgets import (
+    QWidget, QDialog, QVBoxLayout, QHBoxLayout, QLineEdit, QPushButton, QLabel, QTextEdit, QCheckBox,
+    QTreeWidget, QTreeWidgetItem
+)
+from PyQt5.QtCore import Qt, QThread, QTimer, pyqtSignal
+from PyQt5.QtGui import QTextCursor
+from src.ui.file_index import FileIndex
+from src.ui.search_engine import (
+    MAX_MATCHES_PER_FILE, ProjectSearch, SearchQuery, compute_replacements, find_spans, preview_line
+)
+
+SEARCH_DEBOUNCE_MS = 250
+MAX_HIGHLIGHTED_MATCHES = 10000  # Search hits painted in one editor; the count reported is capped too
+
+def replace_all_in_editor(editor, query, replacement):
+    """Replace every match in place as one undo step; return (count, seconds).
+
+    Matches are computed once, then applied as ranged edits from the end of
+    the document backwards so earlier offsets stay valid. Only the touched
+    blocks are re-laid out and re-highlighted.
+    """
+    started = time.perf_counter()
+    edits = compute_replacements(editor.toPlainText(), query, replacement)
+    if edits:
+        scroll = (editor.horizontalScrollBar().value(), editor.verticalScrollBar().value())
+        cursor = QTextCursor(editor.document())
+        cursor.beginEditBlock()
+        for start, end, new_text in reversed(edits):
+            cursor.setPosition(start)
+            cursor.setPosition(end, QTextCursor.KeepAnchor)
+            cursor.insertText(new_text)
+        cursor.endEditBlock()
+        editor.horizontalScrollBar().setValue(scroll[0])
+        editor.verticalScrollBar().setValue(scroll[1])
+    return len(edits), time.perf_counter() - started
+
+
+class SearchOptions(QWidget):
+    """Regex, case and whole-word toggles shared by the search widgets."""
+    def __init__(self):
+        super().__init__()
+        self.regex_box = QCheckBox("Regex")
+        self.case_box = QCheckBox("Match Case")
+        self.word_box = QCheckBox("Whole Word")
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        for box in (self.regex_box, self.case_box, self.word_box):
+            layout.addWidget(box)
+
+    def query(self, pattern):
+        """Build a SearchQuery for `pattern` from the toggles."""
+        return SearchQuery(pattern, regex=self.regex_box.isChecked(),
+                           case_sensitive=self.case_box.isChecked(),
+                           whole_word=self.word_box.isChecked())
+
+
+def replace_all_message(search_term, replace_term, count, seconds):
+    """Format the status line reported after a replace-all."""
+    return f"Replaced {count} occurrences of '{search_term}' with '{replace_term}' in {seconds * 1000:.0f} ms"
+
+
+class SearchReplaceDialog(QDialog):
+    """Advanced Search & Replace Dialog."""
+    def __init__(self, editor):
+        super().__init__()
+        self.editor = editor
+        self.setWindowTitle("Search & Replace")
+        layout = QVBoxLayout()
+
+        self.search_input = QLineEdit(self)
+        self.search_input.setPlaceholderText("Search...")
+        layout.addWidget(self.search_input)
+
+        self.replace_input = QLineEdit(self)
+        self.replace_input.setPlaceholderText("Replace with...")
+        layout.addWidget(self.replace_input)
+
+        self.options = SearchOptions()
+        layout.addWidget(self.options)
+
+        replace_button = QPushButton("Replace All", self)
+        replace_button.clicked.connect(self.replace_all)
+        layout.addWidget(replace_button)
+
+        self.result_label = QLabel(self)
+        layout.addWidget(self.result_label)
+
+        self.setLayout(layout)
+
+    def replace_all(self):
+        """Replace all occurrences of the search text in place, as one undo step."""
+        search_text = self.search_input.text()
+        replace_text = self.replace_input.text()
+        if not search_text:
+            return
+        try:
+            count, seconds = replace_all_in_editor(self.editor, self.options.query(search_text), replace_text)
+        except Exception as e:
+            self.result_label.setText(f"Replace failed: {e}")
+            return
+        self.result_label.setText(replace_all_message(search_text, replace_text, count, seconds))
+
 
 class SearchReplaceWidget(QWidget):
     """Search & Replace widget for global and inline search."""
@@ -12,11 +115,21 @@ class SearchReplaceWidget(QWidget):
 
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("Search...")
-        self.search_input.textChanged.connect(self.search_text)
 
         self.replace_input = QLineEdit()
         self.replace_input.setPlaceholderText("Replace with...")
 
+        self.options = SearchOptions()
+
+        # Highlight shortly after the query stops changing
+        self.debounce = QTimer(self)
+        self.debounce.setSingleShot(True)
+        self.debounce.setInterval(SEARCH_DEBOUNCE_MS)
+        self.debounce.timeout.connect(self.search_text)
+        self.search_input.textChanged.connect(self.debounce.start)
+        for box in (self.options.regex_box, self.options.case_box, self.options.word_box):
+            box.toggled.connect(self.debounce.start)
+
         replace_button = QPushButton("Replace All")
         replace_button.clicked.connect(self.replace_all)
 
@@ -24,31 +137,275 @@ class SearchReplaceWidget(QWidget):
         layout.addWidget(QLabel("Search & Replace"))
         layout.addWidget(self.search_input)
         layout.addWidget(self.replace_input)
+        layout.addWidget(self.options)
         layout.addWidget(replace_button)
         self.setLayout(layout)
 
     def search_text(self):
-        """Highlight all occurrences of the search text."""
+        """Highlight all occurrences of the search text, leaving the cursor where it is."""
+        if not self.editor:
+            return
         search_term = self.search_input.text()
-        if self.editor and search_term:
-            cursor = self.editor.textCursor()
-            document = self.editor.document()
-
-            cursor.beginEditBlock()
-            cursor.movePosition(cursor.Start)
-            while not cursor.isNull() and not cursor.atEnd():
-                cursor = document.find(search_term, cursor)
-                if cursor.hasSelection():
-                    self.editor.setTextCursor(cursor)
-            cursor.endEditBlock()
+        if not search_term:
+            self.editor.set_search_matches([])
+            return
+        try:
+            spans = find_spans(self.editor.toPlainText(), self.options.query(search_term), MAX_HIGHLIGHTED_MATCHES)
+        except re.error as e:
+            self.status_bar.showMessage(f"Invalid pattern: {e}")
+            return
+        self.editor.set_search_matches(spans)
+        more = "+" if len(spans) == MAX_HIGHLIGHTED_MATCHES else ""
+        self.status_bar.showMessage(f"{len(spans)}{more} matches for '{search_term}'")
 
     def replace_all(self):
         """Replace all occurrences of the search text with the replacement text."""
         search_term = self.search_input.text()
         replace_term = self.replace_input.text()
 
-        if search_term and replace_term:
-            text = self.editor.toPlainText()
-            updated_text = text.replace(search_term, replace_term)
-            self.editor.setPlainText(updated_text)
-            self.status_bar.showMessage(f"Replaced all occurrences of '{search_term}' with '{replace_term}'")
+        if search_term and self.editor:
+            try:
+                count, seconds = replace_all_in_editor(self.editor, self.options.query(search_term), replace_term)
+            except Exception as e:
+                self.status_bar.showMessage(f"Replace failed: {e}")
+                return
+            self.status_bar.showMessage(replace_all_message(search_term, replace_term, count, seconds))
+
+
+class SearchWorker(QThread):
+    """Runs one project search off the GUI thread and streams per-file results."""
+    file_matched = pyqtSignal(str, object)
+    search_finished = pyqtSignal(bool)
+
+    def __init__(self, root_path, query, index=None):
+        super().__init__()
+        self.root_path = root_path
+        self.query = query
+        self.index = index
+        self.search = None
+
+    def run(self):
+        index = self.index or FileIndex.build(self.root_path, should_stop=self.isInterruptionRequested)
+        if index is None:
+            self.search_finished.emit(False)
+            return
+        paths = [os.path.join(self.root_path, index.path(file_id)) for file_id in range(len(index))]
+        self.search = ProjectSearch(paths)
+        completed = self.search.search(self.query, self.file_matched.emit,
+                                       should_stop=self.isInterruptionRequested)
+        self.search_finished.emit(completed)
+
+    def cancel(self):
+        self.requestInterruption()
+        if self.search is not None:
+            self.search.cancel()
+
+
+class ReplaceWorker(QThread):
+    """Applies a previewed replacement to files on disk in the process pool."""
+    replace_finished = pyqtSignal(object)
+    replace_failed = pyqtSignal(str)
+
+    def __init__(self, paths, query, replacement):
+        super().__init__()
+        self.paths = paths
+        self.query = query
+        self.replacement = replacement
+
+    def run(self):
+        try:
+            counts = ProjectSearch([]).replace(self.paths, self.query, self.replacement)
+        except re.error as e:
+            self.replace_failed.emit(str(e))
+            return
+        self.replace_finished.emit(counts)
+
+
+class ProjectSearchPanel(QWidget):
+    """Project-wide search with streamed results and a previewable batch replace."""
+    def __init__(self, root_path=".", index_provider=None, editor_for_path=None, open_match=None):
+        super().__init__()
+        self.root_path = root_path
+        self.index_provider = index_provider or (lambda: None)
+        self.editor_for_path = editor_for_path or (lambda path: None)
+        self.open_match = open_match
+        self.worker = None
+        self.replace_worker = None
+        self._retired_workers = set()  # Cancelled workers kept alive until their thread exits
+        self.match_count = 0
+
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Search in files...")
+        self.replace_input = QLineEdit()
+        self.replace_input.setPlaceholderText("Replace with...")
+        self.options = SearchOptions()
+
+        # Restart the search shortly after the query stops changing
+        self.debounce = QTimer(self)
+        self.debounce.setSingleShot(True)
+        self.debounce.setInterval(SEARCH_DEBOUNCE_MS)
+        self.debounce.timeout.connect(self.start_search)
+        self.search_input.textChanged.connect(self.debounce.start)
+        for box in (self.options.regex_box, self.options.case_box, self.options.word_box):
+            box.toggled.connect(self.debounce.start)
+
+        self.results = QTreeWidget()
+        self.results.setHeaderHidden(True)
+        self.results.itemDoubleClicked.connect(self._open_result)
+
+        preview_button = QPushButton("Preview Replace")
+        preview_button.clicked.connect(self.preview_replace)
+        apply_button = QPushButton("Replace in Files")
+        apply_button.clicked.connect(self.apply_replace)
+        self.status_label = QLabel()
+
+        buttons = QHBoxLayout()
+        buttons.addWidget(preview_button)
+        buttons.addWidget(apply_button)
+
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel("Search in Files"))
+        layout.addWidget(self.search_input)
+        layout.addWidget(self.replace_input)
+        layout.addWidget(self.options)
+        layout.addWidget(self.results)
+        layout.addLayout(buttons)
+        layout.addWidget(self.status_label)
+        self.setLayout(layout)
+
+    def current_query(self):
+        """Build a SearchQuery from the inputs."""
+        return self.options.query(self.search_input.text())
+
+    def cancel_search(self):
+        """Cancel the running search; its late results are ignored."""
+        if self.worker is not None:
+            self.worker.file_matched.disconnect()
+            self.worker.search_finished.disconnect()
+            self.worker.cancel()
+            worker = self.worker
+            self._retired_workers.add(worker)
+            worker.finished.connect(lambda: self._retired_workers.discard(worker))
+            self.worker = None
+
+    def start_search(self):
+        """Cancel any running search and start one for the current query."""
+        self.cancel_search()
+        self.results.clear()
+        self.match_count = 0
+        query = self.current_query()
+        if not query.pattern:
+            self.status_label.clear()
+            return
+        try:
+            query.compile()
+        except Exception as e:
+            self.status_label.setText(f"Invalid pattern: {e}")
+            return
+        self.worker = SearchWorker(self.root_path, query, self.index_provider())
+        self.worker.file_matched.connect(self._add_file_results)
+        self.worker.search_finished.connect(self._search_finished)
+        self.status_label.setText("Searching...")
+        self.worker.start()
+
+    def _add_file_results(self, path, matches):
+        """Append one file's matches to the results tree."""
+        # The search stops collecting a file's matches at the cap, so the preview may not show them all
+        count = f"{len(matches)}+" if len(matches) >= MAX_MATCHES_PER_FILE else str(len(matches))
+        file_item = QTreeWidgetItem(self.results, [f"{os.path.relpath(path, self.root_path)} ({count})"])
+        file_item.setData(0, Qt.UserRole, path)
+        file_item.setFlags(file_item.flags() | Qt.ItemIsUserCheckable)
+        file_item.setCheckState(0, Qt.Checked)
+        for match in matches:
+            child = QTreeWidgetItem(file_item, [f"{match.line + 1}: {match.text.strip()}"])
+            child.setData(0, Qt.UserRole, match)
+        self.match_count += len(matches)
+        self.status_label.setText(f"{self.match_count} matches in {self.results.topLevelItemCount()} files...")
+
+    def show_results(self, title, results):
+        """Replace the results tree with externally computed {path: [FileMatch]}, e.g. references."""
+        self.cancel_search()
+        self.results.clear()
+        self.match_count = 0
+        for path, matches in results.items():
+            self._add_file_results(path, matches)
+        for i in range(self.results.topLevelItemCount()):
+            self.results.topLevelItem(i).setExpanded(True)
+        self.status_label.setText(f"{title}: {self.match_count} in {self.results.topLevelItemCount()} files")
+
+    def _search_finished(self, completed):
+        if completed:
+            self.status_label.setText(f"{self.match_count} matches in {self.results.topLevelItemCount()} files")
+
+    def _open_result(self, item, column):
+        match = item.data(0, Qt.UserRole)
+        if self.open_match is not None and item.parent() is not None:
+            self.open_match(item.parent().data(0, Qt.UserRole), match)
+
+    def _checked_files(self):
+        return [self.results.topLevelItem(i) for i in range(self.results.topLevelItemCount())
+                if self.results.topLevelItem(i).checkState(0) == Qt.Checked]
+
+    def _truncated_files(self):
+        """Count the checked files whose match list stopped at MAX_MATCHES_PER_FILE."""
+        return sum(1 for file_item in self._checked_files() if file_item.childCount() >= MAX_MATCHES_PER_FILE)
+
+    def _check_replacement(self, query, replacement):
+        """Report an invalid pattern or replacement template in the status line; return True if valid."""
+        try:
+            query.validate(replacement)
+        except re.error as e:
+            self.status_label.setText(f"Invalid replacement: {e}")
+            return False
+        return True
+
+    def preview_replace(self):
+        """Show each matched line as it will read after the replacement."""
+        query, replacement = self.current_query(), self.replace_input.text()
+        if not self._check_replacement(query, replacement):
+            return
+        for file_item in self._checked_files():
+            for i in range(file_item.childCount()):
+                child = file_item.child(i)
+                match = child.data(0, Qt.UserRole)
+                child.setText(0, f"{match.line + 1}: {preview_line(query, match, replacement).strip()}")
+            file_item.setExpanded(True)
+        truncated = self._truncated_files()
+        if truncated:
+            self.status_label.setText(f"Preview shows the first {MAX_MATCHES_PER_FILE} matches of {truncated} "
+                                      f"files; Replace in Files replaces all of them")
+
+    def apply_replace(self):
+        """Apply the replacement to every checked file as one batch."""
+        query, replacement = self.current_query(), self.replace_input.text()
+        if not query.pattern or self.replace_worker is not None:
+            return
+        if not self._check_replacement(query, replacement):
+            return
+        paths, in_editors = [], {}
+        for file_item in self._checked_files():
+            path = file_item.data(0, Qt.UserRole)
+            editor = self.editor_for_path(path)
+            if editor is None:
+                paths.append(path)
+            else:
+                # Open documents are edited in place so their undo history survives
+                in_editors[path] = replace_all_in_editor(editor, query, replacement)[0]
+        self.replace_worker = ReplaceWorker(paths, query, replacement)
+        self.replace_worker.replace_finished.connect(
+            lambda counts: self._replace_finished({**counts, **in_editors}))
+        self.replace_worker.replace_failed.connect(self._replace_failed)
+        truncated = self._truncated_files()
+        beyond = f", including matches past the preview in {truncated} files" if truncated else ""
+        self.status_label.setText(f"Replacing in {len(paths)} files{beyond}...")
+        self.replace_worker.start()
+
+    def _replace_failed(self, message):
+        self.replace_worker = None
+        self.status_label.setText(f"Replace failed: {message}")
+
+    def _replace_finished(self, counts):
+        self.replace_worker = None
+        self.status_label.setText(
+            f"Replaced {sum(counts.values())} occurrences in {sum(1 for c in counts.values() if c)} files")
+        self.start_search()
@@ -0,0 +1,55 @@
+# src/ui/startup.py
+
+import json
+import time
+
+
+class StartupTimeline:
+    """Named startup phases measured from process start, reported as JSON.
+
+    Phases are contiguous: each `mark(name)` closes the phase that ran since
+    the previous mark. `note(name, ms)` records extra timings such as how
+    long each deferred panel took to build.
+    """
+    def __init__(self, started=None):
+        self.started = started if started is not None else time.perf_counter()
+        self.last = self.started
+        self.phases = []  # (name, start_ms, end_ms)
+        self.notes = {}
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.phases.append((name, (self.last - self.started) * 1000, (now - self.started) * 1000))
+        self.last = now
+
+    def note(self, name, ms):
+        self.notes[name] = ms
+
+    def phase_ms(self, name):
+        for phase, start, end in self.phases:
+            if phase == name:
+                return end - start
+        return None
+
+    def to_dict(self):
+        return {
+            "phases": [{"name": name, "start_ms": round(start, 3), "end_ms": round(end, 3),
+                        "duration_ms": round(end - start, 3)} for name, start, end in self.phases],
+            "total_ms": round(self.phases[-1][2], 3) if self.phases else 0.0,
+            "notes": {name: round(ms, 3) for name, ms in self.notes.items()},
+        }
+
+    def metrics(self):
+        """Flat {phase_ms: value} metrics in the shape tests/benchmarks.py compares."""
+        metrics = {f"{name}_ms": end - start for name, start, end in self.phases}
+        metrics["total_ms"] = self.phases[-1][2] if self.phases else 0.0
+        return metrics
+
+    def write(self, path=None):
+        """Write the timeline as JSON to `path`, or to stdout when no path is given."""
+        text = json.dumps(self.to_dict(), indent=2)
+        if path:
+            with open(path, "w") as f:
+                f.write(text + "\n")
+        else:
+            print(text, flush=True)
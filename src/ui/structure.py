@@ -0,0 +1,460 @@
+# src/ui/structure.py
+
+import random
+import re
+from src.ui.lexer import Lexer, NORMAL
+
+TAB_WIDTH = 4
+OPENERS = "([{"
+PAIRS = {"(": ")", "[": "]", "{": "}"}
+BRACKET = re.compile(r"[()\[\]{}]")
+
+# Only strings and comments matter for bracket matching, so these are much smaller than the highlighting lexers
+BRACKET_LEXERS = {
+    "python": Lexer(
+        [
+            ("comment", r"#.*"),
+            ("docstring_double", r'[rRbBuUfF]{0,2}"""'),
+            ("docstring_single", r"[rRbBuUfF]{0,2}'''"),
+            ("string", r'"(?:[^"\\]|\\.)*"?|\'(?:[^\'\\]|\\.)*\'?'),
+            ("bracket", r"[()\[\]{}]"),
+        ],
+        {
+            "docstring_double": (r'(?:[^"\\]|\\.|"(?!""))*"""', "string"),
+            "docstring_single": (r"(?:[^'\\]|\\.|'(?!''))*'''", "string"),
+        },
+    ),
+    "javascript": Lexer(
+        [
+            ("comment", r"//.*"),
+            ("block_comment", r"/\*"),
+            ("string", r'"(?:[^"\\]|\\.)*"?|\'(?:[^\'\\]|\\.)*\'?|`(?:[^`\\]|\\.)*`?'),
+            ("bracket", r"[()\[\]{}]"),
+        ],
+        {"block_comment": (r"\*/", "comment")},
+    ),
+}
+PLAIN_LINE = {"python": re.compile(r"[\"'#]"), "javascript": re.compile(r"[\"'`/]")}  # Lines that need the lexer
+NO_BRACKETS = ()
+
+
+class _Line:
+    """Treap node for one line, with subtree aggregates for fold and bracket queries.
+
+    `span` is the number of lines folded under this one, so it stays valid
+    when lines are inserted or removed elsewhere. `reach` is the furthest
+    fold end in the subtree relative to its first line; `sdelta` and `slow`
+    are the bracket depth change and the lowest depth reached across it.
+    """
+    __slots__ = ("indent", "span", "state", "brackets", "delta", "low",
+                 "priority", "left", "right", "size", "reach", "sdelta", "slow")
+
+    def __init__(self, indent, state, brackets):
+        self.indent = indent  # -1 for a blank line
+        self.span = 0
+        self.state = state  # Lexer state at the end of the line
+        self.brackets = brackets  # ((column, char), ...) outside strings and comments
+        depth = low = 0
+        for _, char in brackets:
+            depth += 1 if char in OPENERS else -1
+            low = min(low, depth)
+        self.delta = depth
+        self.low = low
+        self.priority = random.random()
+        self.left = None
+        self.right = None
+        _update(self)
+
+
+def _size(node):
+    return node.size if node else 0
+
+
+def _update(node):
+    left, right = node.left, node.right
+    left_size = left.size if left else 0
+    node.size = left_size + 1 + (right.size if right else 0)
+    reach = left.reach if left else -1
+    if node.span:
+        reach = max(reach, left_size + node.span)
+    if right and right.reach >= 0:
+        reach = max(reach, left_size + 1 + right.reach)
+    node.reach = reach
+    left_delta = left.sdelta if left else 0
+    node.sdelta = left_delta + node.delta + (right.sdelta if right else 0)
+    node.slow = min(left.slow if left else 0, left_delta + node.low,
+                    left_delta + node.delta + (right.slow if right else 0))
+    return node
+
+
+def _merge(left, right):
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        return _update(left)
+    right.left = _merge(left, right.left)
+    return _update(right)
+
+
+def _split(node, count):
+    """Split a treap into its first `count` lines and the rest."""
+    if node is None:
+        return None, None
+    if count <= _size(node.left):
+        left, node.left = _split(node.left, count)
+        return left, _update(node)
+    node.right, right = _split(node.right, count - _size(node.left) - 1)
+    return _update(node), right
+
+
+def _build(nodes):
+    """Treap over `nodes` in order, in linear time (Cartesian tree on the priorities)."""
+    stack = []
+    for node in nodes:
+        last = None
+        while stack and stack[-1].priority < node.priority:
+            last = _update(stack.pop())
+        node.left = last
+        if stack:
+            stack[-1].right = node
+        stack.append(node)
+    for node in reversed(stack):
+        _update(node)
+    return stack[0] if stack else None
+
+
+def _node_at(node, line):
+    while node is not None:
+        left_size = _size(node.left)
+        if line < left_size:
+            node = node.left
+        elif line == left_size:
+            return node
+        else:
+            line -= left_size + 1
+            node = node.right
+    raise IndexError(line)
+
+
+def _fold_region(nodes, after):
+    """Set the fold spans of freshly parsed `nodes`, which are followed by the treap `after`."""
+    count, total = len(nodes), len(nodes) + _size(after)
+    for start in range(count - 1, -1, -1):
+        node = nodes[start]
+        if node.indent < 0:
+            node.span = 0
+            continue
+        line, end = start + 1, start
+        while line < total:
+            other = nodes[line] if line < count else _node_at(after, line - count)
+            if other.indent < 0:
+                line += 1
+                continue
+            if other.indent <= node.indent:
+                break
+            end = line + other.span  # Skip a nested fold in one step
+            line = end + 1
+        node.span = end - start
+
+
+def measure_indent(text):
+    """Indentation width of a line with tabs expanded, or -1 if it is blank."""
+    stripped = text.lstrip()
+    if not stripped:
+        return -1
+    return len(text[:len(text) - len(stripped)].expandtabs(TAB_WIDTH))
+
+
+class StructureIndex:
+    """Indentation folds and bracket structure of a document, updated line range by line range.
+
+    Lines are nodes of an implicit treap augmented as an interval tree:
+    fold ranges are stored as spans and found by stabbing queries, and
+    bracket partners by descending on depth aggregates, all in O(log n).
+    `replace_lines` re-parses only the edited lines (plus following lines
+    whose string or comment state changed) and recomputes only the folds
+    that can reach the edit. `text_of(line)` returns the current text of a
+    line and is used when a state change runs past the edited range.
+    """
+    def __init__(self, language=None, text_of=None):
+        self.lexer = BRACKET_LEXERS.get(language)
+        self.plain_line = PLAIN_LINE.get(language)
+        self.text_of = text_of
+        self.root = None
+
+    def __len__(self):
+        return _size(self.root)
+
+    def _parse(self, text, state):
+        """Return a _Line for `text` starting in lexer `state`."""
+        if self.lexer is None:
+            return _Line(measure_indent(text), NORMAL, NO_BRACKETS)
+        if state == NORMAL and not self.plain_line.search(text):
+            brackets = tuple((match.start(), match.group()) for match in BRACKET.finditer(text))
+            return _Line(measure_indent(text), NORMAL, brackets or NO_BRACKETS)
+        tokens, state = self.lexer.tokenize(text, state)
+        brackets = tuple((start, text[start]) for start, _, kind in tokens if kind == "bracket")
+        return _Line(measure_indent(text), state, brackets or NO_BRACKETS)
+
+    def _node(self, line):
+        return _node_at(self.root, line)
+
+    # Editing
+
+    def replace_lines(self, first, count, texts):
+        """Replace `count` lines at `first` with the lines in `texts`."""
+        before, rest = _split(self.root, first)
+        old, after = _split(rest, count)
+        state = self._last(before).state if before is not None else NORMAL
+        old_nodes = list(self._iter(old))
+        end_state = old_nodes[-1].state if old_nodes else state
+        nodes = []
+        for text in texts:
+            node = self._parse(text, state)
+            nodes.append(node)
+            state = node.state
+
+        # A string or comment opened or closed here: re-parse following lines until states agree again
+        line = first + len(nodes)
+        reparsed = []
+        while after is not None and state != end_state and self.text_of is not None:
+            head, after = _split(after, 1)
+            end_state = head.state
+            node = self._parse(self.text_of(line + len(reparsed)), state)
+            node.span = head.span
+            reparsed.append(node)
+            state = node.state
+        for node in reparsed:
+            _update(node)
+
+        same_shape = len(nodes) == len(old_nodes) and all(
+            new.indent == previous.indent for new, previous in zip(nodes, old_nodes))
+        region = nodes + reparsed
+        if same_shape:
+            for new, previous in zip(nodes, old_nodes):  # Typing within lines leaves every fold as it was
+                new.span = previous.span
+        else:
+            _fold_region(region, after)
+        self.root = _merge(_merge(before, _build(region)), after)
+        if not same_shape:
+            indents = [node.indent for node in nodes if node.indent >= 0]
+            self._refold_enclosing(first, len(nodes), len(old_nodes), min(indents) if indents else None)
+
+    def truncate(self, count):
+        """Drop every line from `count` on."""
+        if count < len(self):
+            self.replace_lines(count, len(self) - count, [])
+
+    def _refold_enclosing(self, first, count, old_count, lowest):
+        """Recompute the folds that start before the replaced lines and could reach into them.
+
+        `lowest` is the smallest indentation among the new lines. A fold
+        that ran past the old lines and is deeper-indented than none of the
+        new ones just grows or shrinks with the line count.
+        """
+        previous = first - 1
+        while previous >= 0 and self._node(previous).indent < 0:
+            previous -= 1
+        if previous < 0:
+            return
+        # Folds are nested, so the chain runs from the innermost outwards and each resumes where the last ended
+        chain = [start for start, _ in self.folds_containing(previous)] + [previous]
+        resume, end = first, previous
+        for start in reversed(chain):
+            node = self._node(start)
+            if node.span and start + node.span >= first + old_count and (lowest is None or lowest > node.indent):
+                span = node.span + count - old_count
+            else:
+                span = self._compute_span(start, max(resume, start + 1), max(end, start))
+            self._set_span(start, span)
+            resume, end = start + span + 1, start + span
+
+    def _compute_span(self, start, resume, end):
+        """Fold span of `start`, scanning from line `resume` with `end` the last line known to be inside."""
+        indent = self._node(start).indent
+        if indent < 0:
+            return 0
+        line, total = resume, len(self)
+        while line < total:
+            node = self._node(line)
+            if node.indent < 0:
+                line += 1
+                continue
+            if node.indent <= indent:
+                break
+            end = line + node.span  # Skip a nested fold in one step
+            line = end + 1
+        return end - start
+
+    def _set_span(self, line, span):
+        def visit(node, line):
+            left_size = _size(node.left)
+            if line < left_size:
+                visit(node.left, line)
+            elif line > left_size:
+                visit(node.right, line - left_size - 1)
+            else:
+                node.span = span
+            _update(node)
+        if self._node(line).span != span:
+            visit(self.root, line)
+
+    def _last(self, node):
+        while node.right is not None:
+            node = node.right
+        return node
+
+    def _iter(self, node):
+        stack = []
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node
+            node = node.right
+
+    # Folds
+
+    def indent(self, line):
+        return self._node(line).indent
+
+    def span(self, line):
+        """Number of lines folded under `line`; 0 if it starts no fold."""
+        return self._node(line).span
+
+    def spans(self, first, last):
+        """Spans of lines `first` to `last` - 1 in one walk."""
+        result = []
+
+        def collect(node, base):
+            if node is None or base >= last or base + node.size <= first:
+                return
+            collect(node.left, base)
+            position = base + _size(node.left)
+            if first <= position < last:
+                result.append(node.span)
+            collect(node.right, position + 1)
+        collect(self.root, 0)
+        return result
+
+    def folds_containing(self, line):
+        """(start, end) of every fold that starts before `line` and covers it, outermost first."""
+        found = []
+
+        def stab(node, base):
+            if node is None or node.reach < 0 or base + node.reach < line or base >= line:
+                return
+            stab(node.left, base)
+            position = base + _size(node.left)
+            if position < line and node.span and position + node.span >= line:
+                found.append((position, position + node.span))
+            stab(node.right, position + 1)
+        stab(self.root, 0)
+        return found
+
+    def enclosing_fold(self, line):
+        """The innermost fold that covers `line`, or that starts on it; None at top level."""
+        if 0 <= line < len(self) and self.span(line):
+            return line, line + self.span(line)
+        folds = self.folds_containing(line)
+        return folds[-1] if folds else None
+
+    # Brackets
+
+    def brackets(self, line):
+        return self._node(line).brackets
+
+    def _depth_before(self, line):
+        """Bracket depth at the start of `line`."""
+        node, depth = self.root, 0
+        while node is not None:
+            left_size = _size(node.left)
+            if line <= left_size:
+                node = node.left
+            else:
+                depth += (node.left.sdelta if node.left else 0) + node.delta
+                line -= left_size + 1
+                node = node.right
+        return depth
+
+    def _first_reaching(self, start, target):
+        """First line from `start` on where the depth drops to `target` or below."""
+        def find(node, base, depth):
+            if node is None or base + node.size <= start or depth + node.slow > target:
+                return None
+            found = find(node.left, base, depth)
+            if found is not None:
+                return found
+            left_delta = node.left.sdelta if node.left else 0
+            position = base + _size(node.left)
+            if position >= start and depth + left_delta + node.low <= target:
+                return position
+            return find(node.right, position + 1, depth + left_delta + node.delta)
+        return find(self.root, 0, 0)
+
+    def _last_reaching(self, end, target):
+        """Last line before `end` where the depth drops to `target` or below."""
+        def find(node, base, depth):
+            if node is None or base >= end or depth + node.slow > target:
+                return None
+            left_delta = node.left.sdelta if node.left else 0
+            position = base + _size(node.left)
+            found = find(node.right, position + 1, depth + left_delta + node.delta)
+            if found is not None:
+                return found
+            if position < end and depth + left_delta + node.low <= target:
+                return position
+            return find(node.left, base, depth)
+        return find(self.root, 0, 0)
+
+    def match_bracket(self, line, column):
+        """(line, column) of the bracket paired with the one at `line`, `column`; None if unmatched.
+
+        Pairs are found by depth, so a mismatched pair such as `(]` is still
+        returned; `is_pair` tells whether the two characters belong together.
+        """
+        brackets = self.brackets(line)
+        index = next((i for i, (col, _) in enumerate(brackets) if col == column), None)
+        if index is None:
+            return None
+        depths = [self._depth_before(line)]
+        for _, char in brackets:
+            depths.append(depths[-1] + (1 if char in OPENERS else -1))
+        if brackets[index][1] in OPENERS:
+            target = depths[index]
+            for i in range(index + 1, len(brackets)):
+                if depths[i + 1] <= target:
+                    return line, brackets[i][0]
+            found = self._first_reaching(line + 1, target)
+            if found is None:
+                return None
+            depth = self._depth_before(found)
+            for col, char in self.brackets(found):
+                depth += 1 if char in OPENERS else -1
+                if depth <= target:
+                    return found, col
+            return None
+        target = depths[index + 1]
+        for i in range(index - 1, -1, -1):
+            if depths[i] <= target:
+                return line, brackets[i][0]
+        found = self._last_reaching(line, target)
+        if found is None:
+            return None
+        depth = self._depth_before(found)
+        candidate = None
+        for col, char in self.brackets(found):
+            if depth <= target:
+                candidate = col
+            depth += 1 if char in OPENERS else -1
+        return (found, candidate) if candidate is not None else None
+
+
+def is_pair(opener, closer):
+    if opener not in OPENERS:
+        opener, closer = closer, opener
+    return PAIRS.get(opener) == closer
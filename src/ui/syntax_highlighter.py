@@ -1,36 +1,102 @@
 from PyQt5.QtGui import QSyntaxHighlighter, QTextCharFormat, QColor, QFont
-from PyQt5.QtCore import QRegularExpression
+from src.ui.lexer import lexer_for, NORMAL
+from src.ui.perf_monitor import timed
+from src.ui.text_units import utf16_len
+
+VIEWPORT_MARGIN = 50  # Blocks around the viewport that are always formatted eagerly
+DEFERRED = 1 << 16  # Block state flag: the block is not formatted yet; the lower bits hold the lexer state
+
+
+def _format(color, bold=False, italic=False):
+    fmt = QTextCharFormat()
+    fmt.setForeground(QColor(color))
+    if bold:
+        fmt.setFontWeight(QFont.Bold)
+    fmt.setFontItalic(italic)
+    return fmt
+
 
 class MultiLanguageHighlighter(QSyntaxHighlighter):
-    """Syntax Highlighter for multiple programming languages."""
+    """Syntax Highlighter for multiple programming languages.
+
+    Only blocks within VIEWPORT_MARGIN of the viewport are tokenized and
+    formatted. Any other block that is new or still unformatted only has
+    its end state worked out, through the lexer's cheap `end_state`, and
+    is flagged DEFERRED in its block state; it is formatted when it comes
+    near the viewport. Nothing is cached per block, so memory stays flat
+    however large the document is.
+    """
     def __init__(self, document, language="python"):
         super().__init__(document)
         self.language = language
+        self.viewport_range = None  # (first, last) block numbers, or None to format everything
+        self._forced_block = -1
         self.setup_rules()
 
     def setup_rules(self):
         """Define syntax rules for the selected language."""
-        self.rules = []
+        self.lexer = lexer_for(self.language)
+        self.formats = {
+            "keyword": _format("blue", bold=True),
+            "builtin": _format("darkMagenta"),
+            "decorator": _format("darkYellow"),
+            "string": _format("darkGreen"),
+            "comment": _format("gray", italic=True),
+            "number": _format("darkCyan"),
+            "heading": _format("blue", bold=True),
+            "quote": _format("gray", italic=True),
+            "code": _format("darkRed"),
+            "emphasis": _format("black", italic=True),
+            "link": _format("darkCyan"),
+        }
 
-        keyword_format = QTextCharFormat()
-        keyword_format.setForeground(QColor("blue"))
-        keyword_format.setFontWeight(QFont.Bold)
+    @timed("highlighter.highlightBlock")
+    def highlightBlock(self, text):
+        """Apply highlighting rules to the given block of text."""
+        previous = self.previousBlockState()
+        start_state = previous & ~DEFERRED if previous >= 0 else NORMAL
+        # The state still stored is the one from this block's last pass: -1 for a new block
+        stored = self.currentBlockState()
+        number = self.currentBlock().blockNumber()
+        if (number != self._forced_block and not self._near_viewport(number)
+                and (stored < 0 or stored & DEFERRED)):
+            # The state only changes, making Qt revisit the next block, if the lexer state did
+            self.setCurrentBlockState(self.lexer.end_state(text, start_state) | DEFERRED)
+            return
 
-        # Define keywords based on language
-        if self.language == "python":
-            keywords = ["def", "class", "if", "else", "return", "for", "while", "import"]
-        elif self.language == "javascript":
-            keywords = ["function", "const", "let", "var", "if", "else", "return", "import", "export"]
-        else:  # Markdown
-            keywords = ["# ", "## ", "### ", "```", "*", "**"]
+        # A formatted block stays formatted wherever it is: deferring it would change its
+        # state and make Qt walk on through every following block
+        tokens, end_state = self.lexer.tokenize(text, start_state)
+        self.setCurrentBlockState(end_state)
+        formats = self.formats
+        wide = utf16_len(text) != len(text)  # Token offsets count characters, setFormat counts UTF-16 units
+        for start, length, kind in tokens:
+            fmt = formats.get(kind)
+            if fmt is not None:
+                if wide:
+                    start, length = utf16_len(text[:start]), utf16_len(text[start:start + length])
+                self.setFormat(start, length, fmt)
 
-        # Compile regular expressions for keywords
-        self.rules = [(QRegularExpression(rf'\b{kw}\b'), keyword_format) for kw in keywords]
+    def _near_viewport(self, number):
+        if self.viewport_range is None:
+            return True
+        first, last = self.viewport_range
+        return first - VIEWPORT_MARGIN <= number <= last + VIEWPORT_MARGIN
 
-    def highlightBlock(self, text):
-        """Apply highlighting rules to the given block of text."""
-        for pattern, fmt in self.rules:
-            match = pattern.globalMatch(text)
-            while match.hasNext():
-                m = match.next()
-                self.setFormat(m.capturedStart(), m.capturedLength(), fmt)
+    def set_viewport_range(self, first, last):
+        """Record the visible block range and format anything in it that was deferred."""
+        self.viewport_range = (first, last)
+        document = self.document()
+        block = document.findBlockByNumber(max(0, first - VIEWPORT_MARGIN))
+        while block.isValid() and block.blockNumber() <= last + VIEWPORT_MARGIN:
+            state = block.userState()
+            if state >= 0 and state & DEFERRED:
+                self._rehighlight_now(block)  # Qt goes on to the next block while its state changes
+            block = block.next()
+
+    def _rehighlight_now(self, block):
+        self._forced_block = block.blockNumber()
+        try:
+            self.rehighlightBlock(block)
+        finally:
+            self._forced_block = -1
@@ -0,0 +1,167 @@
+# src/ui/tab_manager.py
+
+import os
+from PyQt5.QtWidgets import QLabel
+from PyQt5.QtCore import QObject, Qt, QTimer, pyqtSignal
+from src.ui.editor import CodeEditor
+from src.ui.hibernation import DEFAULT_BUDGET_MB, HibernatedTab, TabBudget, estimate_editor_bytes, format_bytes
+from src.ui.text_buffer import TextBuffer
+
+BUDGET_CHECK_MS = 5000  # Live editors grow as files stream in and text is typed
+
+
+class TabManager(QObject):
+    """Keeps the editors of a QTabWidget within a memory budget.
+
+    Each tab is a container widget holding one editor. When the estimated
+    size of the live editors exceeds the budget, the least recently used
+    background tabs are hibernated: their text is compressed into a
+    HibernatedTab together with cursor, scroll and modified state, and the
+    editor widget is destroyed. Selecting a hibernated tab rebuilds its
+    editor before it is shown.
+    """
+    status = pyqtSignal(str)
+
+    def __init__(self, tabs, attach_editor, before_hibernate=None, budget_mb=DEFAULT_BUDGET_MB):
+        super().__init__(tabs)
+        self.tabs = tabs
+        self.attach_editor = attach_editor  # Adds completion and linting to a restored editor
+        self.before_hibernate = before_hibernate or (lambda editor: None)
+        self.budget = TabBudget(int(budget_mb * 1024 * 1024))
+        self.hibernated = {}  # container -> HibernatedTab
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(BUDGET_CHECK_MS)
+        tabs.currentChanged.connect(self._current_changed)
+
+    def editor_in(self, container):
+        """Return the live CodeEditor of a tab container, or None."""
+        widget = container.layout().itemAt(0).widget() if container is not None else None
+        return widget if isinstance(widget, CodeEditor) else None
+
+    def register(self, container):
+        editor = self.editor_in(container)
+        if editor is not None:
+            self.budget.touch(container, self._estimate(editor))
+
+    def forget(self, container):
+        """Drop a closed tab, including any hibernated text it had."""
+        self.budget.remove(container)
+        self.hibernated.pop(container, None)
+
+    def container_for_path(self, path):
+        """Return the hibernated tab showing `path`, if any."""
+        target = os.path.abspath(path)
+        for container, state in self.hibernated.items():
+            if state.path and os.path.abspath(state.path) == target:
+                return container
+        return None
+
+    def _estimate(self, editor):
+        document = editor.document()
+        return estimate_editor_bytes(document.characterCount(), document.blockCount())
+
+    def _current_changed(self, index):
+        container = self.tabs.widget(index)
+        if container is None:
+            return
+        if container in self.hibernated:
+            self.restore(container)
+        self.register(container)
+        self.enforce()
+        self.show_status()
+
+    def refresh(self):
+        """Re-estimate live editors, hibernate over budget and report usage."""
+        for i in range(self.tabs.count()):
+            container = self.tabs.widget(i)
+            editor = self.editor_in(container)
+            if editor is not None:
+                self.budget.update(container, self._estimate(editor))
+        self.enforce()
+        self.show_status()
+
+    def _can_hibernate(self, container):
+        editor = self.editor_in(container)
+        return editor is not None and not editor.is_loading() and not editor.keep_alive
+
+    def enforce(self):
+        keep = {self.tabs.currentWidget()}
+        keep.update(container for container in self.budget.keys() if not self._can_hibernate(container))
+        for container in self.budget.victims(keep):
+            self.hibernate(container)
+
+    def hibernate(self, container):
+        """Compress a tab's text and state, and replace its editor with a placeholder."""
+        editor = self.editor_in(container)
+        self.before_hibernate(editor)
+        document = editor.document()
+        cursor = editor.textCursor()
+        self.hibernated[container] = HibernatedTab(
+            editor.file_path, editor.toPlainText(), editor.buffer.encoding, cursor.position(), cursor.anchor(),
+            (editor.horizontalScrollBar().value(), editor.verticalScrollBar().value()),
+            document.isModified(), editor.journal.undo_count())
+        editor.close_journal()
+        self.budget.remove(container)
+
+        placeholder = QLabel("Hibernated to save memory; select the tab to restore it.")
+        placeholder.setAlignment(Qt.AlignCenter)
+        layout = container.layout()
+        layout.removeWidget(editor)
+        layout.addWidget(placeholder)
+        editor.setParent(None)
+        editor.deleteLater()  # The buffer's memory map is released with it
+
+    def restore(self, container):
+        """Rebuild a hibernated tab's editor in place and return it."""
+        state = self.hibernated.pop(container)
+        editor = CodeEditor()
+        editor.file_path = state.path
+        editor.buffer.encoding = state.encoding
+        self.attach_editor(editor)
+        editor.load_text(state.text())
+        editor.document().setModified(state.modified)
+        cursor = editor.textCursor()
+        cursor.setPosition(min(state.anchor, state.characters))
+        cursor.setPosition(min(state.cursor, state.characters), cursor.KeepAnchor)
+        editor.setTextCursor(cursor)
+
+        layout = container.layout()
+        placeholder = layout.itemAt(0).widget()
+        layout.removeWidget(placeholder)
+        placeholder.deleteLater()
+        layout.addWidget(editor)
+        # Scroll ranges are only valid once the restored document has been laid out
+        QTimer.singleShot(0, lambda: (editor.horizontalScrollBar().setValue(state.scroll[0]),
+                                      editor.verticalScrollBar().setValue(state.scroll[1])))
+        self.budget.touch(container, self._estimate(editor))
+        return editor
+
+    def reload_hibernated(self, path):
+        """Replace the stored text of an unmodified hibernated tab whose file changed on disk."""
+        container = self.container_for_path(path)
+        state = self.hibernated.get(container)
+        if state is None or state.modified:
+            return False
+        buffer = TextBuffer.from_file(path, state.encoding)
+        text = buffer.text()
+        buffer.close()
+        if text == state.text():
+            return False
+        self.hibernated[container] = HibernatedTab(
+            state.path, text, state.encoding, min(state.cursor, len(text)), min(state.anchor, len(text)),
+            state.scroll, False, state.undo_steps)
+        return True
+
+    def show_status(self):
+        """Show the current tab's estimate and the totals against the budget."""
+        container = self.tabs.currentWidget()
+        if container is None:
+            return
+        hibernated = sum(state.size() for state in self.hibernated.values())
+        self.status.emit(
+            f"Tab: {format_bytes(self.budget.estimate(container))} | "
+            f"{len(self.budget)} live: {format_bytes(self.budget.total())} of "
+            f"{format_bytes(self.budget.budget_bytes)} | "
+            f"{len(self.hibernated)} hibernated: {format_bytes(hibernated)}")
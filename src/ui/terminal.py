@@ -1,18 +1,32 @@
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QPlainTextEdit, QLineEdit
 from PyQt5.QtCore import Qt, QProcess, QTimer
+from PyQt5.QtGui import QTextCursor
+from src.ui.output_pipeline import OutputPipeline, DEFAULT_SCROLLBACK
+from src.ui.perf_monitor import timed
+
+FRAME_MS = 16  # Output is appended at most once per frame
+
 
 class TerminalWidget(QWidget):
     """A terminal widget to run shell commands."""
-    def __init__(self):
+    def __init__(self, max_lines=DEFAULT_SCROLLBACK):
         super().__init__()
 
         self.process = QProcess(self)
+        self.pipeline = OutputPipeline(max_lines)
+
+        # Connect the output handlers once; reconnecting per command stacks them
+        self.process.readyReadStandardOutput.connect(self.display_output)
+        self.process.readyReadStandardError.connect(self.display_error)
+        self.process.finished.connect(self._process_finished)
 
         # Create output and input areas
         self.output_area = QPlainTextEdit()
         self.output_area.setReadOnly(True)
         self.output_area.setStyleSheet("background-color: #1e1e1e; color: #d4d4d4;")
         self.output_area.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.output_area.setMaximumBlockCount(max_lines)  # Ring-buffer scrollback
+        self.output_area.setUndoRedoEnabled(False)
 
         self.input_area = QLineEdit()
         self.input_area.setPlaceholderText("Enter command...")
@@ -22,25 +36,66 @@ class TerminalWidget(QWidget):
         layout.addWidget(self.output_area)
         layout.addWidget(self.input_area)
 
+        # Coalesce output into one append per frame
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(FRAME_MS)
+        self.flush_timer.timeout.connect(self.flush_output)
+
         # Focus on input when the terminal opens
         QTimer.singleShot(0, self.input_area.setFocus)
 
+    def set_scrollback(self, max_lines):
+        """Change how many lines of output are kept."""
+        self.pipeline.max_lines = max_lines
+        self.output_area.setMaximumBlockCount(max_lines)
+
     def run_command(self):
         """Execute a shell command."""
         command = self.input_area.text().strip()
-        if command:
-            self.output_area.appendPlainText(f"$ {command}")
+        if not command:
+            return
+        if self.process.state() != QProcess.NotRunning:
+            self.pipeline.feed_text("A command is already running\n")
+        else:
+            self.pipeline.feed_text(f"$ {command}\n")
             self.process.start(command)
-            self.process.readyReadStandardOutput.connect(self.display_output)
-            self.process.readyReadStandardError.connect(self.display_error)
             self.input_area.clear()
+        self._schedule_flush()
 
+    @timed("terminal.display_output")
     def display_output(self):
-        """Show standard output."""
-        output = self.process.readAllStandardOutput().data().decode().strip()
-        self.output_area.appendPlainText(output)
+        """Queue standard output."""
+        self.pipeline.feed(self.process.readAllStandardOutput().data(), "stdout")
+        self._schedule_flush()
 
     def display_error(self):
-        """Show error output."""
-        error = self.process.readAllStandardError().data().decode().strip()
-        self.output_area.appendPlainText(f"Error: {error}")
+        """Queue error output."""
+        self.pipeline.feed(self.process.readAllStandardError().data(), "stderr")
+        self._schedule_flush()
+
+    def _process_finished(self, exit_code, exit_status):
+        self.display_output()
+        self.display_error()
+        self.pipeline.finish()
+        if exit_code:
+            self.pipeline.feed_text(f"[exit code {exit_code}]\n")
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        if not self.flush_timer.isActive():
+            self.flush_timer.start()
+
+    @timed("terminal.flush_output")
+    def flush_output(self):
+        """Append everything queued since the last frame in a single edit."""
+        text = self.pipeline.take()
+        if not text:
+            return
+        scrollbar = self.output_area.verticalScrollBar()
+        follow = scrollbar.value() == scrollbar.maximum()
+        cursor = QTextCursor(self.output_area.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(text)
+        if follow:
+            scrollbar.setValue(scrollbar.maximum())
@@ -0,0 +1,386 @@
+# src/ui/text_buffer.py
+
+import mmap
+import os
+import random
+from collections import OrderedDict
+from src.ui.text_units import char_index, utf16_len
+
+CHUNK_SIZE = 64 * 1024  # Bytes of the original file decoded at a time
+ADD_BLOCK_LIMIT = 4096  # Longest typing run merged into a single add source
+DECODED_CACHE_SIZE = 8  # Decoded original chunks kept around for reads
+
+
+class _OriginalChunk:
+    """A byte range of the original file, decoded lazily on read."""
+    __slots__ = ("start", "end")
+
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+
+
+class _Piece:
+    """Treap node describing a run of text inside one source."""
+    __slots__ = ("source", "start", "length", "wide", "priority", "left", "right", "size", "wide_size")
+
+    def __init__(self, source, start, length, wide=0):
+        self.source = source
+        self.start = start
+        self.length = length
+        self.wide = wide  # Characters outside the BMP, which take two UTF-16 units
+        self.priority = random.random()
+        self.left = None
+        self.right = None
+        self.size = length
+        self.wide_size = wide
+
+
+def _size(node):
+    return node.size if node else 0
+
+
+def _wide_size(node):
+    return node.wide_size if node else 0
+
+
+def _wide(text):
+    return utf16_len(text) - len(text)
+
+
+def _update(node):
+    left, right = node.left, node.right
+    size, wide_size = node.length, node.wide
+    if left is not None:
+        size += left.size
+        wide_size += left.wide_size
+    if right is not None:
+        size += right.size
+        wide_size += right.wide_size
+    node.size = size
+    node.wide_size = wide_size
+    return node
+
+
+def _merge(left, right):
+    """Concatenate two treaps, keeping heap order on priorities."""
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        return _update(left)
+    right.left = _merge(left, right.left)
+    return _update(right)
+
+
+def _split(node, offset, read):
+    """Split a treap into the first `offset` characters and the rest; `read` returns a source's text."""
+    if node is None:
+        return None, None
+    left_size = _size(node.left)
+    if offset <= left_size:
+        left, node.left = _split(node.left, offset, read)
+        return left, _update(node)
+    if offset >= left_size + node.length:
+        node.right, right = _split(node.right, offset - left_size - node.length, read)
+        return _update(node), right
+
+    # The split point falls inside this piece: cut it in two
+    cut = offset - left_size
+    head_wide = _wide(read(node.source)[node.start:node.start + cut]) if node.wide else 0
+    tail = _Piece(node.source, node.start + cut, node.length - cut, node.wide - head_wide)
+    node.wide = head_wide
+    tail.right = node.right
+    node.length = cut
+    node.right = None
+    return _update(node), _update(tail)
+
+
+class BufferSnapshot:
+    """Immutable view of a buffer revision that can be streamed from any thread.
+
+    Taking a snapshot only copies the piece list; add sources are immutable
+    strings and original chunks are read straight from the shared map.
+    """
+    def __init__(self, pieces, mmap_view, encoding):
+        self._pieces = pieces
+        self._mmap = mmap_view
+        self._encoding = encoding
+
+    def iter_chunks(self):
+        decoded = {}
+        for source, start, length in self._pieces:
+            if not isinstance(source, str):
+                text = decoded.get(id(source))
+                if text is None:
+                    raw = self._mmap[source.start:source.end]
+                    text = raw.decode(self._encoding, errors="replace")
+                    text = text.replace("\r\n", "\n").replace("\r", "\n")
+                    decoded = {id(source): text}
+                source = text
+            yield source[start:start + length]
+
+    def write_to(self, stream):
+        for chunk in self.iter_chunks():
+            stream.write(chunk)
+
+
+class TextBuffer:
+    """Piece table over a memory-mapped original file plus an append-only add buffer.
+
+    Pieces live in an implicit treap ordered by document offset, so inserts and
+    deletes are O(log n) in the number of pieces. The original file is never
+    copied: its pieces reference byte chunks that are decoded on demand.
+    Offsets count characters; each piece also counts its characters outside
+    the BMP, so the UTF-16 positions Qt reports convert in O(log n).
+
+    The QTextDocument of an editor still holds its own full copy of the
+    text, so the buffer makes saves and edits cheap rather than saving
+    memory; files past the `large_file_mb` setting go to the read-only
+    LargeFileViewer instead.
+    """
+    def __init__(self, text=""):
+        self.encoding = "utf-8"
+        self._sources = []
+        self._root = None
+        self._file = None
+        self._mmap = None
+        self._decoded = OrderedDict()
+        self._line_count = None
+        if text:
+            self.insert(0, text)
+
+    @classmethod
+    def from_file(cls, path, encoding="utf-8"):
+        """Create a buffer backed by `path` without reading it into memory."""
+        buffer = cls()
+        buffer.encoding = encoding
+        buffer._file = open(path, "rb")
+        if os.fstat(buffer._file.fileno()).st_size == 0:
+            return buffer
+        buffer._mmap = mmap.mmap(buffer._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        root = None
+        start, total = 0, len(buffer._mmap)
+        while start < total:
+            end = buffer._chunk_boundary(start, start + CHUNK_SIZE)
+            source = len(buffer._sources)
+            buffer._sources.append(_OriginalChunk(start, end))
+            text = buffer._read_source(source)
+            if text:
+                root = _merge(root, _Piece(source, 0, len(text), _wide(text)))
+            start = end
+        buffer._root = root
+        buffer._decoded.clear()
+        return buffer
+
+    def _chunk_boundary(self, start, end):
+        """Move a chunk end back so it never splits a UTF-8 sequence or a CRLF pair.
+
+        The end never moves back to `start`: a chunk of nothing but
+        continuation bytes, which is not UTF-8 anyway, is cut at `end`.
+        """
+        data = self._mmap
+        if end >= len(data):
+            return len(data)
+        boundary = end
+        while boundary > start and data[boundary] & 0xC0 == 0x80:
+            boundary -= 1
+        if boundary - 1 > start and data[boundary - 1] == 0x0D:
+            boundary -= 1
+        return boundary if boundary > start else end
+
+    def _read_source(self, source):
+        """Return the text of a source, decoding original chunks through a small cache."""
+        chunk = self._sources[source]
+        if isinstance(chunk, str):
+            return chunk
+        text = self._decoded.get(source)
+        if text is None:
+            raw = self._mmap[chunk.start:chunk.end]
+            text = raw.decode(self.encoding, errors="replace")
+            # Match the universal newline handling of text-mode open()
+            text = text.replace("\r\n", "\n").replace("\r", "\n")
+            self._decoded[source] = text
+            if len(self._decoded) > DECODED_CACHE_SIZE:
+                self._decoded.popitem(last=False)
+        else:
+            self._decoded.move_to_end(source)
+        return text
+
+    def __len__(self):
+        return _size(self._root)
+
+    def insert(self, offset, text):
+        """Insert `text` at character `offset`."""
+        if not text:
+            return
+        offset = max(0, min(offset, len(self)))
+        self._line_count = None
+        left, right = _split(self._root, offset, self._read_source)
+        if left is not None and self._extend_tail(left, text):
+            self._root = _merge(left, right)
+            return
+        self._sources.append(text)
+        piece = _Piece(len(self._sources) - 1, 0, len(text), _wide(text))
+        self._root = _merge(_merge(left, piece), right)
+
+    def _extend_tail(self, node, text):
+        """Grow the last piece in place when typing continues a fresh add source."""
+        path = []
+        while node.right is not None:
+            path.append(node)
+            node = node.right
+        source = self._sources[node.source]
+        if (not isinstance(source, str) or node.source != len(self._sources) - 1
+                or node.start + node.length != len(source)
+                or len(source) + len(text) > ADD_BLOCK_LIMIT):
+            return False
+        self._sources[node.source] = source + text
+        node.length += len(text)
+        node.wide += _wide(text)
+        _update(node)
+        for parent in reversed(path):
+            _update(parent)
+        return True
+
+    def delete(self, offset, length):
+        """Remove `length` characters starting at `offset`."""
+        if length <= 0 or offset >= len(self):
+            return
+        self._line_count = None
+        left, rest = _split(self._root, offset, self._read_source)
+        _, right = _split(rest, length, self._read_source)
+        self._root = _merge(left, right)
+
+    def replace(self, offset, length, text):
+        """Replace a range of characters with `text`."""
+        self.delete(offset, length)
+        self.insert(offset, text)
+
+    def utf16_length(self):
+        """Length of the buffer in UTF-16 code units, the unit of QTextDocument positions."""
+        return len(self) + _wide_size(self._root)
+
+    def to_utf16(self, offset):
+        """Convert a character offset into a UTF-16 position."""
+        offset = max(0, min(offset, len(self)))
+        node, units = self._root, 0
+        if _wide_size(node) == 0:
+            return offset
+        while node is not None:
+            left_size = _size(node.left)
+            if offset < left_size:
+                node = node.left
+                continue
+            units += left_size + _wide_size(node.left)
+            offset -= left_size
+            if offset <= node.length:
+                if node.wide:
+                    text = self._read_source(node.source)
+                    return units + utf16_len(text[node.start:node.start + offset])
+                return units + offset
+            units += node.length + node.wide
+            offset -= node.length
+            node = node.right
+        return units
+
+    def from_utf16(self, position):
+        """Convert a UTF-16 position into a character offset, rounding down inside a surrogate pair."""
+        position = max(0, position)
+        node, offset = self._root, 0
+        if _wide_size(node) == 0:
+            return min(position, len(self))
+        while node is not None:
+            left_units = _size(node.left) + _wide_size(node.left)
+            if position < left_units:
+                node = node.left
+                continue
+            offset += _size(node.left)
+            position -= left_units
+            if position < node.length + node.wide:
+                if node.wide:
+                    text = self._read_source(node.source)
+                    return offset + char_index(text[node.start:node.start + node.length], position)
+                return offset + position
+            offset += node.length
+            position -= node.length + node.wide
+            node = node.right
+        return offset
+
+    def replace_utf16(self, position, removed, text):
+        """Replace `removed` UTF-16 units at UTF-16 `position` with `text`; return the text removed."""
+        start = self.from_utf16(position)
+        end = self.from_utf16(position + removed) if removed > 0 else start
+        old = self.text(start, end) if end > start else ""
+        self.delete(start, end - start)
+        self.insert(start, text)
+        return old
+
+    def iter_chunks(self, start=0, end=None):
+        """Yield the text between `start` and `end` piece by piece."""
+        end = len(self) if end is None else min(end, len(self))
+        stack, node, position = [], self._root, 0
+        while (stack or node is not None) and position < end:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            piece_start, piece_end = position, position + node.length
+            position = piece_end
+            if piece_end > start:
+                lo = max(start, piece_start) - piece_start
+                hi = min(end, piece_end) - piece_start
+                text = self._read_source(node.source)
+                yield text[node.start + lo:node.start + hi]
+            node = node.right
+
+    def text(self, start=0, end=None):
+        """Return a slice of the buffer as a single string."""
+        return "".join(self.iter_chunks(start, end))
+
+    def line_count(self):
+        """Return the number of lines, counted once per revision by streaming the pieces."""
+        if self._line_count is None:
+            self._line_count = 1 + sum(chunk.count("\n") for chunk in self.iter_chunks())
+        return self._line_count
+
+    def piece_count(self):
+        """Return the number of pieces in the table."""
+        count, stack = 0, [self._root] if self._root else []
+        while stack:
+            node = stack.pop()
+            count += 1
+            stack.extend(child for child in (node.left, node.right) if child is not None)
+        return count
+
+    def snapshot(self):
+        """Return a BufferSnapshot of the current revision in O(pieces)."""
+        pieces, stack, node = [], [], self._root
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            pieces.append((self._sources[node.source], node.start, node.length))
+            node = node.right
+        return BufferSnapshot(pieces, self._mmap, self.encoding)
+
+    def write_to(self, stream):
+        """Stream the buffer contents into a text-mode file object."""
+        for chunk in self.iter_chunks():
+            stream.write(chunk)
+
+    def close(self):
+        """Release the memory map of the original file and drop all pieces."""
+        self._root = None
+        self._sources = []
+        self._decoded.clear()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,17 @@
+# src/ui/text_units.py
+
+def utf16_len(text):
+    """Length of `text` in UTF-16 code units, the unit Qt document positions count in."""
+    if text.isascii():
+        return len(text)
+    return len(text.encode("utf-16-le")) // 2
+
+
+def char_index(text, units):
+    """Index into `text` of the character at UTF-16 offset `units`, rounding down inside a surrogate pair."""
+    if text.isascii():
+        return min(units, len(text))
+    encoded = text.encode("utf-16-le")[:units * 2]
+    if len(encoded) >= 2 and 0xD8 <= encoded[-1] <= 0xDB:
+        encoded = encoded[:-2]  # A lone high surrogate: the offset falls inside a pair
+    return len(encoded.decode("utf-16-le"))
@@ -0,0 +1,360 @@
+# src/ui/undo_journal.py
+
+import hashlib
+import json
+import os
+import struct
+import time
+import zlib
+from collections import deque
+from src.fileio import atomic_write
+from src.ui.text_units import utf16_len
+
+JOURNAL_DIR = "config/undo"
+JOURNAL_VERSION = 1
+DEFAULT_MEMORY_MB = 8  # Per document, used when config/settings.json has no undo_memory_mb
+SPILL_STEPS = 256  # Oldest steps written out together as one compressed frame
+TYPING_RUN_SECONDS = 1.0  # Keystrokes further apart start a new undo step
+TYPING_RUN_CHARS = 256  # Longest typing run merged into one step
+DELTA_BYTES = 160  # List, two string headers and an int per delta
+COMPRESSION_LEVEL = 1  # Fast: spilling runs on the GUI thread
+TRAILER = struct.Struct("<I")
+
+
+def journal_key(path):
+    """File name stem of the journal for the document at `path`."""
+    return hashlib.sha1(os.path.abspath(path).encode("utf-8", "surrogatepass")).hexdigest()[:20]
+
+
+def text_digest(chunks):
+    """Content hash of a document given as an iterable of text chunks."""
+    digest = hashlib.blake2b(digest_size=16)
+    for chunk in chunks:
+        digest.update(chunk.encode("utf-8", "surrogatepass"))
+    return digest.hexdigest()
+
+
+def _step_bytes(step):
+    return sum(DELTA_BYTES + len(removed) + len(inserted) for _, removed, inserted in step)
+
+
+def _rebase_step(step, position, removed, inserted):
+    """Move an edit of `removed` units at `position`, made after `step`, to before it.
+
+    The deltas of `step` are shifted to apply after the edit. Return the
+    edit's position before the step, or None, leaving the step as it was,
+    when the edit overlaps one of its deltas.
+    """
+    before = []
+    for delta in reversed(step):
+        start, end = delta[0], delta[0] + utf16_len(delta[2])
+        if position + removed <= start:
+            before.append(delta)  # The edit lies before this delta, which moves with it
+        elif position >= end:
+            position += utf16_len(delta[1]) - utf16_len(delta[2])
+        else:
+            return None
+    for delta in before:
+        delta[0] += inserted - removed
+    return position
+
+
+class _FrameStack:
+    """Stack of compressed frames in one file; a length trailer after each frame lets the top be popped."""
+    def __init__(self, path):
+        self.path = path
+
+    def push(self, steps):
+        data = zlib.compress(json.dumps(steps).encode("ascii"), COMPRESSION_LEVEL)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "ab") as f:
+            f.write(data + TRAILER.pack(len(data)))
+
+    def pop(self):
+        """Remove and return the top frame's steps, or None when the stack is empty."""
+        try:
+            f = open(self.path, "r+b")
+        except FileNotFoundError:
+            return None
+        with f:
+            end = f.seek(0, os.SEEK_END)
+            if end < TRAILER.size:
+                return None
+            f.seek(end - TRAILER.size)
+            length, = TRAILER.unpack(f.read(TRAILER.size))
+            start = end - TRAILER.size - length
+            f.seek(start)
+            steps = json.loads(zlib.decompress(f.read(length)))
+            f.truncate(start)
+        return steps
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class UndoJournal:
+    """Undo history of one document, bounded in memory and kept on disk.
+
+    A step is a list of [offset, removed, inserted] deltas, applied in
+    order. Consecutive single-character typing, backspacing or deleting is
+    merged into one step. Recent steps stay in memory, so undo and redo of
+    them is a deque pop; once the history outgrows `memory_cap` bytes the
+    oldest steps are spilled, SPILL_STEPS at a time, to compressed frame
+    stacks under JOURNAL_DIR keyed by the document's path, and read back a
+    frame at a time when undo reaches them. `save` writes the rest out with
+    a digest of the text, and `restore` takes the history back only if the
+    reopened document still has that digest. A journal without a path
+    drops its oldest steps instead of spilling them. Edits made elsewhere,
+    such as a collaborator's, are not steps: `rebase` shifts the history
+    past them instead.
+    """
+    def __init__(self, path=None, memory_cap=DEFAULT_MEMORY_MB * 1024 * 1024, folder=JOURNAL_DIR,
+                 clock=time.monotonic):
+        self.path = path
+        self.memory_cap = memory_cap
+        self.clock = clock
+        self.undo_steps = deque()  # Oldest first
+        self.redo_steps = []  # Next redo last
+        self.memory = 0  # Estimated bytes of the steps in memory
+        self.disk_undo = 0  # Steps in the undo frames on disk
+        self.disk_redo = 0
+        self.saved_at = 0  # undo_count() when the document was last saved, or -1 if that state is gone
+        self._run = None  # (kind, time) of a typing run the last step can still absorb
+        self._undo_file = self._redo_file = self._state_path = None
+        if path is not None:
+            stem = os.path.join(folder, journal_key(path))
+            self._undo_file = _FrameStack(stem + ".undo")
+            self._redo_file = _FrameStack(stem + ".redo")
+            self._state_path = stem + ".json"
+
+    def undo_count(self):
+        return self.disk_undo + len(self.undo_steps)
+
+    def redo_count(self):
+        return self.disk_redo + len(self.redo_steps)
+
+    def can_undo(self):
+        return self.undo_count() > 0
+
+    def can_redo(self):
+        return self.redo_count() > 0
+
+    def is_saved(self):
+        return self.undo_count() == self.saved_at
+
+    def mark_saved(self):
+        self.saved_at = self.undo_count()
+
+    def set_memory_cap(self, memory_cap):
+        self.memory_cap = memory_cap
+        self._enforce_cap()
+
+    def seal(self):
+        """Stop the last step from absorbing further typing."""
+        self._run = None
+
+    def record(self, offset, removed, inserted):
+        """Record one change: `removed` was replaced by `inserted` at `offset`."""
+        # Changes are often reported with unchanged text on either side
+        prefix = 0
+        limit = min(len(removed), len(inserted))
+        while prefix < limit and removed[prefix] == inserted[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < limit - prefix and removed[-1 - suffix] == inserted[-1 - suffix]:
+            suffix += 1
+        if prefix or suffix:
+            offset += utf16_len(removed[:prefix])
+            removed = removed[prefix:len(removed) - suffix]
+            inserted = inserted[prefix:len(inserted) - suffix]
+        if not removed and not inserted:
+            return
+        if self._merge(offset, removed, inserted):
+            return
+        self.record_step([[offset, removed, inserted]])
+        if len(removed) + len(inserted) == 1 and "\n" not in removed + inserted:
+            self._run = ("insert" if inserted else "delete", self.clock())
+
+    def _merge(self, offset, removed, inserted):
+        """Extend the typing run in the last step with a one-character change, if it continues it."""
+        now = self.clock()
+        if self._run is None or now - self._run[1] > TYPING_RUN_SECONDS or not self.undo_steps:
+            return False
+        if self.saved_at == self.undo_count():
+            return False  # The saved state must stay reachable
+        if len(removed) + len(inserted) != 1 or "\n" in removed + inserted:
+            return False
+        delta = self.undo_steps[-1][0]
+        if len(delta[1]) + len(delta[2]) >= TYPING_RUN_CHARS:
+            return False
+        if inserted and self._run[0] == "insert" and offset == delta[0] + utf16_len(delta[2]):
+            delta[2] += inserted
+        elif removed and self._run[0] == "delete" and not delta[2] and offset + utf16_len(removed) == delta[0]:
+            delta[0] = offset
+            delta[1] = removed + delta[1]  # Backspace
+        elif removed and self._run[0] == "delete" and not delta[2] and offset == delta[0]:
+            delta[1] += removed  # Forward delete
+        else:
+            return False
+        self._run = (self._run[0], now)
+        self.memory += 1
+        return True
+
+    def record_step(self, deltas):
+        """Record several changes, applied in order, as one undo step."""
+        self._run = None
+        if self.saved_at > self.undo_count():
+            self.saved_at = -1  # The saved state was in the redo history being dropped
+        self._drop_redo()
+        self.undo_steps.append(deltas)
+        self.memory += _step_bytes(deltas)
+        self._enforce_cap()
+
+    def rebase(self, offset, removed, inserted):
+        """Shift the history past an edit that is not undoable here; return how many old steps it cost.
+
+        The edit replaced `removed` units at `offset` with `inserted` units.
+        Steps are rebased newest first, as if the edit had happened before
+        them; the first step that overlaps it, and everything older, is
+        dropped, as is history on disk, which cannot be rebased in place.
+        Redo history is dropped, like after any other edit.
+        """
+        self._run = None
+        self.saved_at = -1  # The saved text lacks this edit, so no step gets back to it
+        self._drop_redo()
+        position, kept = offset, 0
+        for step in reversed(self.undo_steps):
+            position = _rebase_step(step, position, removed, inserted)
+            if position is None:
+                break
+            kept += 1
+        dropped = len(self.undo_steps) - kept + self.disk_undo
+        while len(self.undo_steps) > kept:
+            self.memory -= _step_bytes(self.undo_steps.popleft())
+        if self.disk_undo:
+            self._undo_file.clear()
+            self.disk_undo = 0
+        return dropped
+
+    def _drop_redo(self):
+        self.memory -= sum(_step_bytes(step) for step in self.redo_steps)
+        self.redo_steps = []
+        if self.disk_redo:
+            self._redo_file.clear()
+            self.disk_redo = 0
+
+    def _enforce_cap(self):
+        """Spill (or drop) the oldest steps until the history fits; the newest step always stays."""
+        while self.memory > self.memory_cap and len(self.undo_steps) > 1:
+            batch = []
+            while len(batch) < SPILL_STEPS and len(self.undo_steps) > 1 and self.memory > self.memory_cap // 2:
+                step = self.undo_steps.popleft()
+                self.memory -= _step_bytes(step)
+                batch.append(step)
+            if self._undo_file is not None:
+                self._undo_file.push(batch)
+                self.disk_undo += len(batch)
+            elif self.saved_at >= 0:
+                self.saved_at = self.saved_at - len(batch) if self.saved_at >= len(batch) else -1
+        while self.memory > self.memory_cap and len(self.redo_steps) > 1 and self._redo_file is not None:
+            count = min(SPILL_STEPS, len(self.redo_steps) - 1)
+            batch, self.redo_steps = self.redo_steps[:count], self.redo_steps[count:]
+            self.memory -= sum(_step_bytes(step) for step in batch)
+            self._redo_file.push(batch)
+            self.disk_redo += len(batch)
+
+    def undo(self):
+        """Return the deltas of the step to undo, moving it to the redo history; None if there is none."""
+        self._run = None
+        if not self.undo_steps and self.disk_undo:
+            steps = self._undo_file.pop()
+            self.disk_undo -= len(steps)
+            self.undo_steps.extend(steps)
+            self.memory += sum(_step_bytes(step) for step in steps)
+        if not self.undo_steps:
+            return None
+        step = self.undo_steps.pop()
+        self.redo_steps.append(step)
+        self._enforce_cap()
+        return step
+
+    def redo(self):
+        """Return the deltas of the step to redo, moving it back to the undo history; None if there is none."""
+        self._run = None
+        if not self.redo_steps and self.disk_redo:
+            steps = self._redo_file.pop()
+            self.disk_redo -= len(steps)
+            self.redo_steps = steps
+            self.memory += sum(_step_bytes(step) for step in steps)
+        if not self.redo_steps:
+            return None
+        step = self.redo_steps.pop()
+        self.undo_steps.append(step)
+        self._enforce_cap()
+        return step
+
+    def save(self, digest):
+        """Write the whole history to disk for a document whose text has `digest`."""
+        if self.path is None:
+            return
+        if not self.can_undo() and not self.can_redo():
+            self.discard()
+            return
+        os.makedirs(os.path.dirname(self._state_path) or ".", exist_ok=True)
+        if self.undo_steps:
+            self._undo_file.push(list(self.undo_steps))
+            self.disk_undo += len(self.undo_steps)
+        if self.redo_steps:
+            self._redo_file.push(self.redo_steps)
+            self.disk_redo += len(self.redo_steps)
+        self.undo_steps = deque()
+        self.redo_steps = []
+        self.memory = 0
+        state = {"version": JOURNAL_VERSION, "path": os.path.abspath(self.path), "digest": digest,
+                 "undo": self.disk_undo, "redo": self.disk_redo, "saved_at": self.saved_at}
+        atomic_write(self._state_path, lambda f: json.dump(state, f), fsync=False)
+
+    def saved_digest(self):
+        """Digest recorded by the last `save`, or None if there is no saved history."""
+        if self._state_path is None:
+            return None
+        try:
+            with open(self._state_path) as f:
+                return json.load(f).get("digest")
+        except (OSError, ValueError):
+            return None
+
+    def restore(self, digest):
+        """Take back the saved history if it was saved for a document with `digest`; return True if so."""
+        if self._state_path is None:
+            return False
+        try:
+            with open(self._state_path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = None
+        if (state is None or state.get("version") != JOURNAL_VERSION or state.get("digest") != digest
+                or state.get("path") != os.path.abspath(self.path)):
+            self.discard()
+            return False
+        # The frames now change with every spill and undo; without a state file a crash leaves nothing stale
+        os.remove(self._state_path)
+        self.disk_undo = state["undo"]
+        self.disk_redo = state["redo"]
+        self.saved_at = state["saved_at"]
+        return True
+
+    def discard(self):
+        """Forget the history on disk."""
+        if self._state_path is None:
+            return
+        self._undo_file.clear()
+        self._redo_file.clear()
+        self.disk_undo = self.disk_redo = 0
+        try:
+            os.remove(self._state_path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,492 @@
+"""Headless benchmarks for the editor hot paths.
+
+Run from the repository root:
+
+    python -m tests.benchmarks --output bench.json --baseline baseline.json
+
+Qt runs on the offscreen platform unless QT_QPA_PLATFORM is already set.
+Results are written as JSON; with --baseline, any metric that is worse than
+the stored value by more than --tolerance is reported and the exit status
+is 1, so CI can fail on regressions.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+BENCHMARKS = {}
+DEFAULT_TOLERANCE = 0.25  # Allowed relative slowdown before a metric counts as a regression
+LOWER_IS_BETTER = ("_seconds", "_ms", "_bytes")  # Metric name suffixes used when comparing
+HIGHER_IS_BETTER = ("_per_sec",)
+
+
+def benchmark(name):
+    """Register a benchmark; it receives the run options and returns {metric: value}."""
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Return (benchmark, metric, baseline, current) for every regressed metric."""
+    regressions = []
+    for name, metrics in results.items():
+        expected = baseline.get(name, {})
+        for metric, value in metrics.items():
+            reference = expected.get(metric)
+            if not reference or not isinstance(value, (int, float)):
+                continue
+            if metric.endswith(HIGHER_IS_BETTER):
+                regressed = value < reference * (1 - tolerance)
+            elif metric.endswith(LOWER_IS_BETTER):
+                regressed = value > reference * (1 + tolerance)
+            else:
+                continue  # Counts such as replacements are context, not scores
+            if regressed:
+                regressions.append((name, metric, reference, value))
+    return regressions
+
+
+def rss_bytes():
+    """Current resident set size, falling back to the peak where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def python_source(size):
+    """Return roughly `size` characters of plausible Python source."""
+    rng = random.Random(size)
+    snippets = [
+        "def handler_{n}(value, *args, **kwargs):\n",
+        "    \"\"\"Process value number {n}.\"\"\"\n",
+        "    result = compute(value, {n}) + 0x{n:x}  # running total\n",
+        "    if result > {n} and not kwargs.get('strict'):\n",
+        "        return f'value {{result}} exceeds {n}'\n",
+        "    for item in range({n}):\n",
+        "        result += len(str(item)) * 3.5\n",
+        "    return result\n",
+        "\n",
+        "@decorator\nclass Model{n}(Base):\n    name = \"model_{n}\"\n\n",
+    ]
+    parts, total, n = [], 0, 0
+    while total < size:
+        line = rng.choice(snippets).format(n=n)
+        parts.append(line)
+        total += len(line)
+        n += 1
+    return "".join(parts)
+
+
+def _app():
+    from PyQt5.QtWidgets import QApplication
+    return QApplication.instance() or QApplication(sys.argv[:1])
+
+
+def _editor(text="", width=900, height=700):
+    from src.ui.editor import CodeEditor
+    editor = CodeEditor()
+    editor.resize(width, height)
+    editor.show()
+    if text:
+        editor.setPlainText(text)
+    _app().processEvents()
+    return editor
+
+
+def _wait(predicate, app, timeout=600):
+    deadline = time.perf_counter() + timeout
+    while not predicate():
+        if time.perf_counter() > deadline:
+            raise TimeoutError("benchmark step did not finish")
+        app.processEvents()
+
+
+@benchmark("editor_open")
+def bench_editor_open(options):
+    """Open time and resident memory growth for files of each requested size."""
+    app = _app()
+    metrics = {}
+    for megabytes in options.sizes:
+        path = os.path.join(options.workdir, f"open_{megabytes}mb.py")
+        if not os.path.exists(path):
+            block = python_source(1 << 20)
+            with open(path, "w") as f:
+                for _ in range(megabytes):
+                    f.write(block)
+        before = rss_bytes()
+        editor = _editor()
+        loaded = []
+        editor.loaded.connect(loaded.append)
+        started = time.perf_counter()
+        editor.load_file(path)
+        _wait(lambda: loaded, app)
+        metrics[f"open_{megabytes}mb_seconds"] = time.perf_counter() - started
+        metrics[f"open_{megabytes}mb_rss_bytes"] = rss_bytes() - before
+        editor.close()
+        editor.deleteLater()
+        app.processEvents()
+    return metrics
+
+
+@benchmark("highlighter")
+def bench_highlighter(options):
+    """Full-document highlighting throughput with every block formatted."""
+    app = _app()
+    text = python_source(options.highlight_chars)
+    editor = _editor(text)
+    highlighter = editor.highlighter
+    highlighter.viewport_range = None
+    started = time.perf_counter()
+    highlighter.rehighlight()
+    elapsed = time.perf_counter() - started
+    lines = editor.blockCount()
+    editor.close()
+    app.processEvents()
+    return {
+        "rehighlight_seconds": elapsed,
+        "lines_per_sec": lines / elapsed,
+        "chars_per_sec": len(text) / elapsed,
+    }
+
+
+@benchmark("line_number_paint")
+def bench_line_number_paint(options):
+    """Cost of scrolling one page and repainting the line number gutter."""
+    app = _app()
+    editor = _editor(python_source(4 << 20))
+    scrollbar = editor.verticalScrollBar()
+    rng = random.Random(1)
+    scroll_samples, paint_samples = [], []
+    for _ in range(options.frames):
+        target = rng.randint(0, scrollbar.maximum())
+        started = time.perf_counter()
+        scrollbar.setValue(target)
+        app.processEvents()
+        scroll_samples.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        editor.line_number_area.repaint()
+        paint_samples.append(time.perf_counter() - started)
+    editor.close()
+    app.processEvents()
+    return {
+        "scroll_p50_ms": percentile(scroll_samples, 0.5) * 1000,
+        "scroll_p95_ms": percentile(scroll_samples, 0.95) * 1000,
+        "gutter_paint_p50_ms": percentile(paint_samples, 0.5) * 1000,
+        "gutter_paint_p95_ms": percentile(paint_samples, 0.95) * 1000,
+    }
+
+
+@benchmark("keypress_latency")
+def bench_keypress_latency(options):
+    """Time from a key event to the repainted viewport, midway through a large file."""
+    from PyQt5.QtCore import Qt
+    from PyQt5.QtGui import QTextCursor
+    from PyQt5.QtTest import QTest
+    app = _app()
+    editor = _editor(python_source(2 << 20))
+    cursor = editor.textCursor()
+    cursor.setPosition(editor.document().characterCount() // 2)
+    cursor.movePosition(QTextCursor.EndOfLine)
+    editor.setTextCursor(cursor)
+    editor.setFocus()
+    app.processEvents()
+    samples = []
+    for index in range(options.frames):
+        key = Qt.Key_Backspace if index % 5 == 4 else Qt.Key_A
+        started = time.perf_counter()
+        QTest.keyClick(editor, key)
+        editor.viewport().repaint()
+        editor.line_number_area.repaint()
+        samples.append(time.perf_counter() - started)
+    editor.close()
+    app.processEvents()
+    return {
+        "keypress_p50_ms": percentile(samples, 0.5) * 1000,
+        "keypress_p95_ms": percentile(samples, 0.95) * 1000,
+    }
+
+
+@benchmark("replace_all")
+def bench_replace_all(options):
+    """Replace-all of a common identifier in an open editor."""
+    from src.ui.search_engine import SearchQuery
+    from src.ui.search_replace import replace_all_in_editor
+    app = _app()
+    editor = _editor(python_source(options.replace_chars))
+    count, seconds = replace_all_in_editor(editor, SearchQuery("result"), "outcome")
+    editor.close()
+    app.processEvents()
+    return {"replace_all_seconds": seconds, "replacements": count,
+            "replacements_per_sec": count / seconds}
+
+
+@benchmark("multi_cursor")
+def bench_multi_cursor(options):
+    """Keystroke latency with a caret at the end of every line, one undo step per key."""
+    from PyQt5.QtCore import Qt
+    from PyQt5.QtTest import QTest
+    app = _app()
+    editor = _editor("\n".join(f"    value_{n} = compute({n})" for n in range(options.cursors)))
+    document = editor.document()
+    block = document.begin()
+    ends = []
+    while block.isValid():
+        ends.append((block.position() + block.length() - 1,) * 2)
+        block = block.next()
+    editor.set_cursors(ends)
+    editor.setFocus()
+    app.processEvents()
+    steps = editor.journal.undo_count()
+    samples = []
+    for index in range(options.frames):
+        key = Qt.Key_Backspace if index % 5 == 4 else Qt.Key_A
+        started = time.perf_counter()
+        QTest.keyClick(editor, key)
+        editor.viewport().repaint()
+        samples.append(time.perf_counter() - started)
+    undo_steps = editor.journal.undo_count() - steps
+    editor.close()
+    app.processEvents()
+    return {
+        "cursors": len(ends),
+        "multi_keypress_p50_ms": percentile(samples, 0.5) * 1000,
+        "multi_keypress_p95_ms": percentile(samples, 0.95) * 1000,
+        "undo_steps_per_key": undo_steps / options.frames,
+    }
+
+
+def _synthetic_tree(root, files):
+    """Create `files` empty files spread over two levels of folders."""
+    marker = os.path.join(root, f".tree_{files}")
+    if os.path.exists(marker):
+        return
+    per_dir = 100
+    for number in range(files):
+        folder = os.path.join(root, f"pkg{number // (per_dir * 50):03d}", f"mod{number // per_dir:05d}")
+        if number % per_dir == 0:
+            os.makedirs(folder, exist_ok=True)
+        open(os.path.join(folder, f"file_{number}.py"), "w").close()
+    open(marker, "w").close()
+
+
+@benchmark("file_explorer")
+def bench_file_explorer(options):
+    """Tree population and fuzzy-index build over a synthetic project."""
+    from src.ui.file_explorer import FileExplorer
+    from src.ui.file_index import FileIndex
+    app = _app()
+    root = os.path.join(options.workdir, "tree")
+    _synthetic_tree(root, options.files)
+
+    explorer = FileExplorer(lambda path: None)
+    explorer.resize(300, 800)
+    explorer.show()
+    started = time.perf_counter()
+    explorer.model.set_root_path(root)
+    top = explorer.model.index(0, 0)
+    explorer.tree.expand(top)
+    _wait(lambda: explorer.model.rowCount(top), app)
+    first = explorer.model.index(0, 0, top)
+    explorer.tree.expand(first)
+    app.processEvents()
+    _wait(lambda: not explorer.model.requested, app)  # Listings now arrive from the lister thread
+    expand_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    index = FileIndex.build(root)
+    build_seconds = time.perf_counter() - started
+    query_samples = []
+    for text in ("file_9", "mod00042", "f123py", "pkg001/mod"):
+        started = time.perf_counter()
+        index.query(text)
+        query_samples.append(time.perf_counter() - started)
+    explorer.close()
+    app.processEvents()
+    return {
+        "expand_seconds": expand_seconds,
+        "index_build_seconds": build_seconds,
+        "index_files_per_sec": len(index) / build_seconds,
+        "query_max_ms": max(query_samples) * 1000,
+    }
+
+
+@benchmark("branch_switch")
+def bench_branch_switch(options):
+    """Tree and open-tab updates after a checkout-like rewrite of every file in a listed tree."""
+    from src.fileio import atomic_write
+    from src.ui.editor import CodeEditor
+    from src.ui.file_explorer import FileExplorer
+    from src.ui.file_watcher import FileWatcher
+    app = _app()
+    root = os.path.join(options.workdir, "branch")
+    files = []
+    for number in range(options.switch_files):
+        folder = os.path.join(root, f"mod{number // 100:03d}")
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"file_{number}.py")
+        with open(path, "w") as f:
+            f.write(python_source(2000))
+        files.append(path)
+
+    watcher = FileWatcher()
+    explorer = FileExplorer(lambda path: None, watcher)
+    explorer.model.set_root_path(root)
+    top = explorer.model.index(0, 0)
+    explorer.model.fetchMore(top)
+    _wait(lambda: explorer.model.rowCount(top), app)
+    for row in range(explorer.model.rowCount(top)):
+        explorer.model.fetchMore(explorer.model.index(row, 0, top))
+    _wait(lambda: not explorer.model.requested, app)
+    editors = []
+    for path in files[::max(1, len(files) // 20)]:
+        editor = CodeEditor()
+        editor.load_file(path)
+        _wait(lambda: not editor.is_loading(), app)
+        watcher.watch_file(path)
+        editors.append(editor)
+    app.processEvents()
+
+    changed = {}
+    watcher.folders_changed.connect(explorer.refresh_folders)
+    watcher.files_changed.connect(lambda paths: changed.update(
+        (editor.file_path, editor.reload_from_disk()) for editor in editors if editor.file_path in paths))
+    started = time.perf_counter()
+    for number, path in enumerate(files):
+        with open(path) as f:
+            lines = f.read().splitlines(keepends=True)
+        lines[number % len(lines)] = "changed = True\n"
+        atomic_write(path, lambda f: f.writelines(lines))
+        if number % 10 == 0:  # A new file next to every tenth one
+            open(path + ".new", "w").close()
+    rewrite_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    gaps = []
+    last = started
+    while len(changed) < len(editors) or explorer.model.rowCount(explorer.model.index(0, 0, top)) < 110:
+        app.processEvents()
+        now = time.perf_counter()
+        gaps.append(now - last)
+        last = now
+        if now - started > 60:
+            raise TimeoutError("watcher did not deliver the changes")
+    return {"rewrite_seconds": rewrite_seconds, "update_seconds": time.perf_counter() - started,
+            "max_frame_ms": max(gaps) * 1000, "tabs_reloaded": len(changed)}
+
+
+@benchmark("terminal_flood")
+def bench_terminal_flood(options):
+    """Lines/sec through the terminal pipeline into the output widget."""
+    from src.ui.terminal import TerminalWidget
+    app = _app()
+    terminal = TerminalWidget()
+    terminal.resize(900, 300)
+    terminal.show()
+    payload = b"".join(b"line %d of a noisy build log with some padding\n" % n
+                       for n in range(options.flood_lines))
+    started = time.perf_counter()
+    for offset in range(0, len(payload), 4096):
+        terminal.pipeline.feed(payload[offset:offset + 4096])
+        if offset % (64 * 4096) == 0:
+            terminal.flush_output()  # Stand-in for the per-frame timer
+            app.processEvents()
+    terminal.pipeline.finish()
+    terminal.flush_output()
+    app.processEvents()
+    elapsed = time.perf_counter() - started
+    blocks = terminal.output_area.blockCount()
+    terminal.close()
+    app.processEvents()
+    return {"flood_seconds": elapsed, "lines_per_sec": options.flood_lines / elapsed,
+            "scrollback_blocks": blocks}
+
+
+@benchmark("startup")
+def bench_startup(options):
+    """Per-phase startup timeline of a fresh editor process, via main.py --profile-startup."""
+    import subprocess
+    output = os.path.join(options.workdir, "startup.json")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, os.path.join(root, "main.py"), f"--profile-startup={output}"],
+                   cwd=root, check=True, timeout=120)
+    with open(output) as f:
+        timeline = json.load(f)
+    metrics = {f"{phase['name']}_ms": phase["duration_ms"] for phase in timeline["phases"]}
+    metrics["total_ms"] = timeline["total_ms"]
+    return metrics
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", nargs="*", choices=sorted(BENCHMARKS), help="benchmarks to run")
+    parser.add_argument("--sizes", default="1,10,100", help="file sizes in MB for editor_open")
+    parser.add_argument("--files", type=int, default=100000, help="files in the synthetic tree")
+    parser.add_argument("--frames", type=int, default=200, help="samples for latency benchmarks")
+    parser.add_argument("--highlight-chars", type=int, default=2 << 20)
+    parser.add_argument("--replace-chars", type=int, default=4 << 20)
+    parser.add_argument("--flood-lines", type=int, default=500000)
+    parser.add_argument("--cursors", type=int, default=10000, help="carets for multi_cursor")
+    parser.add_argument("--switch-files", type=int, default=5000, help="files rewritten by branch_switch")
+    parser.add_argument("--workdir", help="reuse generated fixtures from this folder")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--baseline", help="compare against results stored at this path")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    options = parser.parse_args(argv)
+    options.sizes = [int(size) for size in options.sizes.split(",") if size]
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    cleanup = options.workdir is None
+    options.workdir = options.workdir or tempfile.mkdtemp(prefix="lol-bench-")
+    os.makedirs(options.workdir, exist_ok=True)
+
+    results = {}
+    try:
+        for name in options.only or BENCHMARKS:
+            started = time.perf_counter()
+            results[name] = BENCHMARKS[name](options)
+            print(f"{name} ({time.perf_counter() - started:.1f}s)")
+            for metric, value in results[name].items():
+                print(f"  {metric}: {value:,.3f}" if isinstance(value, float) else f"  {metric}: {value:,}")
+    finally:
+        if cleanup:
+            shutil.rmtree(options.workdir, ignore_errors=True)
+
+    report = {
+        "meta": {"python": platform.python_version(), "platform": platform.platform(),
+                 "time": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "results": results,
+    }
+    if options.output:
+        with open(options.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if options.baseline:
+        with open(options.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline.get("results", baseline), options.tolerance)
+        for name, metric, reference, value in regressions:
+            print(f"REGRESSION {name}.{metric}: {reference:,.3f} -> {value:,.3f}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
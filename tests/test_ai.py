@@ -0,0 +1,282 @@
+import random
+import time
+
+import pytest
+
+from src.ai.completion import CompletionEngine, DocumentIndex, ProjectIndex, prefix_at
+
+
+def test_line_deltas_keep_the_index_consistent():
+    rng = random.Random(5)
+    lines = [f"value_{n} = other_{n % 7}" for n in range(200)]
+    index = DocumentIndex("\n".join(lines))
+    for _ in range(500):
+        first = rng.randrange(len(lines))
+        removed = rng.randint(0, min(3, len(lines) - first))
+        new_lines = [f"name_{rng.randrange(50)} + value_{rng.randrange(50)}" for _ in range(rng.randint(0, 3))]
+        lines[first:first + removed] = new_lines
+        index.update_lines(first, removed, new_lines)
+    fresh = DocumentIndex("\n".join(lines))
+    assert index.words.counts == fresh.words.counts
+    assert index.words.words == fresh.words.words
+
+
+def test_ranking_prefers_frequent_and_nearby_words():
+    lines = ["result_total = 1"] * 20 + [""] * 400 + ["result_local = 2", "res"]
+    document = DocumentIndex("\n".join(lines))
+    project = ProjectIndex()
+    project.add_text("other.py", "result_remote = result_remote + 1")
+    engine = CompletionEngine(project)
+
+    words = [item.word for item in engine.complete(document, "res", line=len(lines) - 1)]
+    assert words[0] == "result_local"  # One line away beats twenty uses far away
+    assert set(words) == {"result_local", "result_total", "result_remote"}
+    assert [item.word for item in engine.complete(document, "res", line=0)][0] == "result_total"
+    assert engine.complete(document, "r") == []
+
+
+def test_prefix_extraction():
+    assert prefix_at("    self.val", 12) == "val"
+    assert prefix_at("x = 12ab", 8) == ""
+    assert prefix_at("foo_bar(", 7) == "foo_bar"
+
+
+def test_keystroke_to_completion_latency_on_large_file():
+    """Benchmark: one keystroke (line re-index + ranked lookup) on a 50k-line file."""
+    rng = random.Random(11)
+    names = [f"{rng.choice(['get', 'set', 'load', 'parse'])}_{rng.choice(['user', 'item', 'node'])}_{n}"
+             for n in range(5000)]
+    lines = [f"    {rng.choice(names)} = {rng.choice(names)}({rng.choice(names)})" for _ in range(50000)]
+    started = time.perf_counter()
+    document = DocumentIndex("\n".join(lines))
+    build = time.perf_counter() - started
+    engine = CompletionEngine()
+
+    samples = []
+    line = 25000
+    typed = ""
+    for char in "get_user_1" * 3:
+        typed = typed + char if len(typed) < 10 else char
+        started = time.perf_counter()
+        document.update_lines(line, 1, [f"    x = {typed}"])
+        engine.complete(document, typed, line)
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    p95 = samples[int(len(samples) * 0.95)]
+    print(f"completion: 50k-line index built in {build * 1000:.0f} ms, "
+          f"keystroke p50 {samples[len(samples) // 2] * 1000:.2f} ms, p95 {p95 * 1000:.2f} ms")
+    assert p95 < 0.016
+
+
+LINT_SOURCE = '''import os
+import sys
+
+
+def first(items=[]):
+    total = 0
+    return len(items) + missing_name
+
+
+def second(value):
+    if value == None:
+        return sys.argv
+'''
+
+
+def test_linter_reports_common_problems():
+    from src.ai.linter import LintSession
+    codes = [(d.line, d.code) for d in LintSession().lint(LINT_SOURCE)]
+    assert codes == [(0, "F401"), (4, "B006"), (5, "F841"), (6, "F821"), (10, "E711")]
+    assert [d.code for d in LintSession().lint("def broken(:\n")] == ["E999"]
+
+
+def test_linter_keeps_statements_on_one_line_apart_and_survives_deep_nesting(tmp_path):
+    from src.ai.linter import LintSession, lint_files
+    session = LintSession()
+    assert [(d.column, d.code) for d in session.lint("s = 1; y = nope\n")] == [(11, "F821")]
+    assert [(d.column, d.code) for d in session.lint("y = nope; s = 1\n")] == [(4, "F821")]
+    assert [(d.column, d.end_column) for d in session.lint("s = '\u00e9\U0001F600'; nope\n")] == [(10, 14)]
+
+    path = tmp_path / "generated.py"
+    path.write_text("x = 1" + "+1" * 20000 + "\n")
+    (_, _, diagnostics), = lint_files([str(path)])
+    assert [item[4] for item in diagnostics] == ["E999"]
+
+
+def test_linter_reanalyses_only_changed_definitions():
+    from src.ai.linter import LintSession
+    session = LintSession()
+    session.lint(LINT_SOURCE)
+    analysed = session.analysed
+
+    # Lines inserted above shift every definition, but none of them changed
+    diagnostics = session.lint("# header\n\n" + LINT_SOURCE)
+    assert session.analysed == analysed
+    assert [d.line for d in diagnostics][:2] == [2, 6]
+
+    session.lint(LINT_SOURCE.replace("return sys.argv", "return sys.argv[1:]"))
+    assert session.analysed == analysed + 1
+
+
+def test_project_lint_uses_the_persistent_cache(tmp_path):
+    from src.ai.linter import LintCache, ProjectLinter
+    paths = []
+    for n in range(40):
+        path = tmp_path / f"module_{n}.py"
+        path.write_text(LINT_SOURCE if n % 2 else "import os\nprint(os.sep)\n")
+        paths.append(str(path))
+    cache_path = str(tmp_path / "cache.json")
+
+    results = {}
+    cache = LintCache(cache_path)
+    assert ProjectLinter(cache).lint(paths, results.__setitem__) == 40
+    cache.save()
+    assert sum(len(d) for d in results.values()) == 20 * 5
+
+    (tmp_path / "module_0.py").write_text("import sys\n")
+    reopened = LintCache(cache_path)
+    rerun = {}
+    assert ProjectLinter(reopened).lint(paths, rerun.__setitem__) == 1
+    assert [d.code for d in rerun[paths[0]]] == ["F401"]
+    assert rerun[paths[1]] == results[paths[1]]
+
+
+MODELS_SOURCE = '''class Widget:
+    size = 3
+
+    def render(self, scale):
+        return self.size * scale
+
+
+def make_widget():
+    return Widget()
+'''
+
+VIEWS_SOURCE = '''from .models import Widget
+from . import models
+
+
+def show(widget):
+    other = models.make_widget()
+    return widget.render(2), other, Widget.size
+'''
+
+
+def _symbol_project(tmp_path):
+    from src.ai.refactor import SymbolIndex
+    package = tmp_path / "pkg"
+    package.mkdir()
+    (package / "__init__.py").write_text("")
+    (package / "models.py").write_text(MODELS_SOURCE)
+    (package / "views.py").write_text(VIEWS_SOURCE)
+    paths = [str(package / name) for name in ("__init__.py", "models.py", "views.py")]
+    index = SymbolIndex(str(tmp_path / "symbols.db"), str(tmp_path))
+    return index, paths
+
+
+def test_symbol_index_resolves_definitions_and_references(tmp_path):
+    from src.ai.refactor import apply_edits_to_files
+    index, (_, models, views) = _symbol_project(tmp_path)
+    assert index.update([_, models, views]) == 3
+
+    (definition,) = index.definitions(views, 6, 38)  # Widget in Widget.size
+    assert (definition.path, definition.line, definition.column) == (models, 0, 6)
+    (definition,) = index.definitions(views, 6, 45)  # size in Widget.size
+    assert (definition.line, definition.column, definition.kind) == (1, 4, "attribute")
+    (definition,) = index.definitions(views, 5, 20)  # models.make_widget
+    assert (definition.path, definition.line) == (models, 7)
+    assert [(l.path, l.line) for l in index.references(models, 1, 4)] == [(models, 1), (models, 4), (views, 6)]
+
+    apply_edits_to_files(index.rename_edits(models, 0, 6, "Gadget"))
+    assert "class Gadget:" in open(models).read() and "return Gadget()" in open(models).read()
+    assert open(views).read().startswith("from .models import Gadget\n")
+    assert "Gadget.size" in open(views).read()
+    index.close()
+
+
+JOBS_SOURCE = '''import subprocess
+
+
+class Job:
+    def run(self):
+        return subprocess.run(["true"])
+
+    def again(self):
+        return self.run()
+
+
+class Retry(Job):
+    def run(self):
+        return super().run()
+
+
+class Other:
+    def run(self):
+        return self.run
+'''
+
+
+def test_member_rename_only_touches_the_class_family(tmp_path):
+    from src.ai.refactor import SymbolIndex, apply_edits_to_files
+    jobs = tmp_path / "jobs.py"
+    jobs.write_text(JOBS_SOURCE)
+    main = tmp_path / "main.py"
+    main.write_text("import subprocess\nfrom jobs import Job\n\nJob.run(Job())\nsubprocess.run(['ls'])\n")
+    index = SymbolIndex(str(tmp_path / "symbols.db"), str(tmp_path))
+    index.update([str(jobs), str(main)])
+
+    (definition,) = index.definitions(str(jobs), 13, 23)  # run in super().run()
+    assert (definition.line, definition.column) == (4, 8)
+    with pytest.raises(ValueError):
+        index.rename_edits(str(main), 4, 12, "call")  # subprocess.run: which of the three run methods?
+    apply_edits_to_files(index.rename_edits(str(jobs), 4, 8, "execute"))
+    assert jobs.read_text() == JOBS_SOURCE.replace("def run", "def execute", 2).replace(
+        "self.run()", "self.execute()").replace("super().run()", "super().execute()")
+    assert main.read_text() == "import subprocess\nfrom jobs import Job\n\nJob.execute(Job())\nsubprocess.run(['ls'])\n"
+    index.close()
+
+
+def test_symbol_index_only_reparses_changed_files(tmp_path):
+    from src.ai.refactor import SymbolIndex
+    index, paths = _symbol_project(tmp_path)
+    index.update(paths)
+    index.close()
+
+    reopened = SymbolIndex(str(tmp_path / "symbols.db"), str(tmp_path))
+    assert reopened.update(paths) == 0
+    with open(paths[1], "a") as f:
+        f.write("\n\ndef helper():\n    return make_widget()\n")
+    assert reopened.update(paths) == 1
+    assert len(reopened.references(paths[1], 7, 5)) == 3  # Definition, the old call and the new one
+    assert reopened.update(paths[1:]) == 0 and reopened.file_count() == 2
+
+    with open(paths[2], "w") as f:
+        f.write("x = 1" + "+1" * 20000 + "\n")  # Too deep for ast: indexed like a syntax error
+    assert reopened.update(paths[1:]) == 1 and reopened.file_count() == 2
+    reopened.close()
+
+
+def test_symbol_queries_on_a_large_project(tmp_path):
+    from src.ai.refactor import SymbolIndex
+    paths = []
+    for n in range(300):
+        path = tmp_path / f"module_{n}.py"
+        path.write_text(f"from module_{(n + 1) % 300} import make_widget\n"
+                        + MODELS_SOURCE.replace("Widget", f"Widget{n}") * 20)
+        paths.append(str(path))
+    index = SymbolIndex(str(tmp_path / "symbols.db"), str(tmp_path))
+    started = time.perf_counter()
+    index.update(paths)
+    build = time.perf_counter() - started
+
+    samples = []
+    for n in range(200):
+        started = time.perf_counter()
+        index.definitions(paths[n % 300], 0, 30)
+        index.references(paths[n % 300], 4, 20)
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    p95 = samples[int(len(samples) * 0.95)]
+    print(f"symbols: 300 files indexed in {build * 1000:.0f} ms, query p95 {p95 * 1000:.2f} ms")
+    assert p95 < 0.05
+    index.close()
@@ -0,0 +1,363 @@
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+from src.collab.crdt import TextCRDT, decode_update
+from src.collab.sync import RelayServer, SyncClient
+
+
+def _connected_replicas(count):
+    replicas = [TextCRDT(client_id) for client_id in range(1, count + 1)]
+    inboxes = [[] for _ in replicas]
+    for index, replica in enumerate(replicas):
+        replica.on_update(lambda update, sender=index: [
+            inbox.append(update) for target, inbox in enumerate(inboxes) if target != sender])
+    return replicas, inboxes
+
+
+def test_concurrent_edits_converge_with_out_of_order_delivery():
+    rng = random.Random(3)
+    replicas, inboxes = _connected_replicas(3)
+    for _ in range(600):
+        replica = rng.choice(replicas)
+        if rng.random() < 0.65 or not len(replica):
+            replica.insert(rng.randint(0, len(replica)), rng.choice(["a", "bc", "xyz", "\n"]))
+        else:
+            position = rng.randrange(len(replica))
+            replica.delete(position, rng.randint(1, min(4, len(replica) - position)))
+        if rng.random() < 0.3:
+            target = rng.randrange(len(replicas))
+            rng.shuffle(inboxes[target])
+            for update in inboxes[target]:
+                replicas[target].apply_update(update)
+            inboxes[target].clear()
+    for replica, inbox in zip(replicas, inboxes):
+        for update in inbox:
+            replica.apply_update(update)
+    assert len({replica.text() for replica in replicas}) == 1
+    assert not any(replica.has_pending() for replica in replicas)
+
+
+def test_remote_events_mirror_the_document():
+    local, remote = TextCRDT(1), TextCRDT(2)
+    mirror = []
+
+    def apply(kind, position, value):
+        text = "".join(mirror)
+        text = text[:position] + value + text[position:] if kind == "insert" else text[:position] + text[position + value:]
+        mirror[:] = [text]
+
+    remote.observe(apply)
+    local.on_update(remote.apply_update)
+    local.insert(0, "hello world")
+    local.delete(5, 6)
+    local.insert(5, ", there")
+    assert "".join(mirror) == remote.text() == "hello, there"
+
+
+def test_typing_runs_are_merged_and_tombstones_compacted():
+    doc = TextCRDT(1)
+    for index, char in enumerate("typing a long run of text"):
+        doc.insert(index, char)
+    assert doc.item_count() == 1
+
+    for _ in range(10):
+        doc.delete(3, 1)  # Backspacing one character at a time splits the run
+    assert doc.text() == "typ run of text"
+    doc.gc()
+    assert doc.item_count() == 3
+
+
+def test_state_vector_sync_sends_only_missing_structs():
+    first, second = TextCRDT(1), TextCRDT(2)
+    first.insert(0, "shared base")
+    second.apply_update(first.encode_state_as_update())
+    first.insert(11, " plus more")
+
+    delta = first.encode_state_as_update(second.encode_state_vector())
+    structs, _ = decode_update(delta)
+    assert [struct[5] for struct in structs] == [" plus more"]
+    second.apply_update(delta)
+    assert second.text() == first.text() == "shared base plus more"
+
+
+def _synthetic_trace(ops, seed=42):
+    """Typing-session-shaped trace: mostly sequential typing, ~10% backspaces, rare cursor jumps."""
+    rng = random.Random(seed)
+    length = cursor = 0
+    trace = []
+    while len(trace) < ops:
+        roll = rng.random()
+        if roll < 0.02 and length:
+            cursor = rng.randint(0, length)
+        elif roll < 0.12 and cursor:
+            trace.append((cursor - 1, 1, ""))
+            cursor -= 1
+            length -= 1
+            continue
+        trace.append((cursor, 0, rng.choice("abcdefghijklmnopqrstuvwxyz    \n")))
+        cursor += 1
+        length += 1
+    return trace
+
+
+def _load_trace():
+    """Use a real trace from CRDT_TRACE (editing-traces JSON format) when available."""
+    path = os.environ.get("CRDT_TRACE")
+    if not path:
+        return _synthetic_trace(260000), None
+    with open(path) as f:
+        data = json.load(f)
+    trace = [tuple(patch) for txn in data["txns"] for patch in txn["patches"]]
+    return trace, data.get("endContent")
+
+
+def _deep_size(doc):
+    size = sys.getsizeof(doc._blocks) + sum(sys.getsizeof(b.items) for b in doc._blocks)
+    for block in doc._blocks:
+        for item in block.items:
+            size += sys.getsizeof(item) + sys.getsizeof(item.content)
+            size += sum(sys.getsizeof(ref) for ref in (item.origin, item.right_origin) if ref)
+    for starts in doc._client_starts.values():
+        size += 2 * sys.getsizeof(starts)
+    return size
+
+
+def test_trace_replay_benchmark():
+    """Benchmark: replay an editing trace and report ops/sec, memory and encoded size."""
+    trace, expected = _load_trace()
+    doc = TextCRDT(1)
+    started = time.perf_counter()
+    for position, deleted, inserted in trace:
+        if deleted:
+            doc.delete(position, deleted)
+        if inserted:
+            doc.insert(position, inserted)
+    elapsed = time.perf_counter() - started
+    doc.gc()
+    encoded = doc.encode_state_as_update()
+
+    replica = TextCRDT(2)
+    replica.apply_update(encoded)
+    print(f"crdt trace: {len(trace)} ops, {len(trace) / elapsed:,.0f} ops/sec, "
+          f"{doc.item_count()} items, ~{_deep_size(doc) / 1e6:.1f} MB, "
+          f"{len(encoded) / 1e3:.0f} KB encoded for {len(doc)} chars")
+    assert replica.text() == doc.text()
+    if expected is not None:
+        assert doc.text() == expected
+    assert len(trace) / elapsed > 20000
+
+
+async def _wait_for(predicate, timeout=5.0):
+    deadline = time.perf_counter() + timeout
+    while not predicate():
+        assert time.perf_counter() < deadline, "timed out waiting for sync"
+        await asyncio.sleep(0.005)
+
+
+def test_relay_sync_converges_and_resumes_after_reconnect():
+    async def run():
+        relay = RelayServer(compress=True)
+        port = await relay.start()
+        first, second = TextCRDT(1), TextCRDT(2)
+        clients = [SyncClient(doc, "notes.txt", port=port, flush_interval=0.005) for doc in (first, second)]
+        for client in clients:
+            client.start()
+            await client.synced.wait()
+
+        first.insert(0, "hello " * 200)
+        second.insert(0, "world ")
+        await _wait_for(lambda: first.text() == second.text() and len(first) == 1206)
+
+        clients[1].drop_connection()
+        sent_before = clients[1].stats.bytes_sent
+        second.insert(0, "offline ")
+        await _wait_for(lambda: first.text() == second.text())
+        assert first.text().startswith("offline ")
+        # The resumed session carries the handshake and the offline edit, not the whole document
+        assert clients[1].stats.bytes_sent - sent_before < 200
+
+        for client in clients:
+            await client.close()
+        await relay.close()
+
+    asyncio.run(run())
+
+
+def test_relay_drops_malformed_frames_and_peers_that_fall_behind():
+    from src.collab import sync
+
+    async def run():
+        relay = RelayServer()
+        port = await relay.start()
+        first, second = TextCRDT(1), TextCRDT(2)
+        corrupt = []
+
+        def flaky(update):
+            if corrupt:
+                corrupt.pop()
+                raise ValueError("corrupt update")  # What a malformed payload raises while decoding
+            second.apply_update(update)
+
+        clients = [SyncClient(first, "notes.txt", port=port, flush_interval=0.005),
+                   SyncClient(second, "notes.txt", port=port, flush_interval=0.005, apply_remote=flaky)]
+        for client in clients:
+            client.start()
+            await client.synced.wait()
+
+        # A frame the relay cannot decode is dropped without ending that connection
+        _, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(sync.encode_frame(sync.MSG_HELLO, b"\x09notes.txt\x00"))
+        writer.write(sync.encode_frame(sync.MSG_UPDATE, b"\x01\x01\x7f"))
+        await writer.drain()
+        await _wait_for(lambda: relay.stats.frames_dropped == 1)
+        assert len(relay.peers["notes.txt"]) == 3
+        writer.close()
+
+        corrupt.append(True)
+        first.insert(0, "lost ")  # The client drops it, but keeps the session open
+        await _wait_for(lambda: clients[1].stats.frames_dropped == 1)
+        received = clients[1].stats.frames_received
+        first.insert(5, "kept")
+        await _wait_for(lambda: clients[1].stats.frames_received > received)
+        assert not clients[1]._task.done() and second.text() == ""  # "kept" waits for what was dropped
+
+        clients[1].drop_connection()  # The handshake fetches what was dropped
+        await _wait_for(lambda: second.text() == first.text() == "lost kept")
+
+        for client in clients:
+            await client.close()
+        await relay.close()
+
+    asyncio.run(run())
+
+    class StalledWriter:
+        def __init__(self):
+            self.aborted = False
+            self.transport = self
+
+        def write(self, frame):
+            pass
+
+        async def drain(self):
+            await asyncio.Event().wait()  # The peer never reads
+
+        def abort(self):
+            self.aborted = True
+
+        def close(self):
+            pass
+
+    async def stall():
+        peer = sync._Peer(StalledWriter())
+        results = [peer.send(b"frame") for _ in range(sync.PEER_QUEUE_FRAMES + 1)]
+        assert results[-1] is False and all(results[:-1])
+        assert peer.writer.aborted
+        peer.close()
+
+    asyncio.run(stall())
+
+
+def test_frames_are_size_limited_and_a_bad_handshake_reconnects(monkeypatch):
+    import zlib
+    import pytest
+    from src.collab import sync
+    monkeypatch.setattr(sync, "MAX_FRAME_BYTES", 1024)
+
+    async def read(data):
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        return await sync.read_frame(reader)
+
+    async def limits():
+        with pytest.raises(ConnectionError):
+            await read(sync._HEADER.pack(4096, sync.MSG_UPDATE, 0))  # Never buffered
+        bomb = zlib.compress(b"\0" * 4096)
+        with pytest.raises(ValueError):
+            await read(sync._HEADER.pack(len(bomb), sync.MSG_UPDATE, 1) + bomb)
+        with pytest.raises(zlib.error):
+            await read(sync._HEADER.pack(3, sync.MSG_UPDATE, 1) + b"bad")
+        assert (await read(sync.encode_frame(sync.MSG_ACK, b"a" * 1000, compress=True)))[1] == b"a" * 1000
+
+    asyncio.run(limits())
+
+    async def handshake():
+        replies = [sync._HEADER.pack(3, sync.MSG_SYNC, 1) + b"bad"]  # Then a real relay answers
+
+        async def relay(reader, writer):
+            if replies:
+                await sync.read_frame(reader)
+                writer.write(replies.pop())
+                await writer.drain()
+                await asyncio.sleep(0.2)
+                writer.close()
+            else:
+                await real._handle(reader, writer)
+
+        real = sync.RelayServer()
+        server = await asyncio.start_server(relay, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        client = SyncClient(TextCRDT(1), "notes.txt", port=port, flush_interval=0.005)
+        client.start()
+        await asyncio.wait_for(client.synced.wait(), 5)
+        assert not client._task.done()
+        await client.close()
+        server.close()
+        await real.close()
+
+    asyncio.run(handshake())
+
+
+def test_multi_client_propagation_benchmark():
+    """Benchmark: several clients typing through the relay; report latency and bandwidth."""
+    async def run():
+        relay = RelayServer()
+        port = await relay.start()
+        sent_at, latencies = {}, []
+
+        def receiver(doc):
+            def apply(update):
+                now = time.perf_counter()
+                structs, _ = decode_update(update)
+                for struct in structs:
+                    started = sent_at.get((struct[0], struct[1]))
+                    if started is not None:
+                        latencies.append(now - started)
+                doc.apply_update(update)
+            return apply
+
+        docs = [TextCRDT(client_id) for client_id in range(1, 6)]
+        clients = [SyncClient(doc, "load", port=port, apply_remote=receiver(doc)) for doc in docs]
+        for client in clients:
+            client.start()
+            await client.synced.wait()
+
+        rng = random.Random(9)
+        started = time.perf_counter()
+        edits = 0
+        for _ in range(100):
+            for doc in docs:
+                sent_at[(doc.client, doc.state.get(doc.client, 0))] = time.perf_counter()
+                doc.insert(rng.randint(0, len(doc)), rng.choice("abcdef"))
+                edits += 1
+            await asyncio.sleep(0.002)
+        await _wait_for(lambda: len({doc.text() for doc in docs}) == 1 and len(docs[0]) == edits)
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        wire = sum(client.stats.bytes_sent + client.stats.bytes_received for client in clients)
+        print(f"sync load: {len(docs)} clients, {edits} edits in {elapsed:.2f}s, "
+              f"p50 {latencies[len(latencies) // 2] * 1000:.1f} ms, "
+              f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:.1f} ms, "
+              f"{wire / edits:.0f} bytes/edit on the wire")
+        assert latencies[int(len(latencies) * 0.95)] < 0.5
+
+        for client in clients:
+            await client.close()
+        await relay.close()
+
+    asyncio.run(run())
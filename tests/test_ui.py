@@ -0,0 +1,985 @@
+import os
+import random
+import re
+import time
+
+import pytest
+
+from src.fileio import atomic_write
+from src.ui.file_index import FileIndex
+from src.ui.lexer import NORMAL, lexer_for
+from src.ui.output_pipeline import OutputPipeline
+from src.ui.search_engine import (
+    ProjectSearch, SearchQuery, compute_replacements, preview_line, search_file
+)
+from src.ui.text_buffer import TextBuffer
+
+
+@pytest.fixture(scope="module")
+def qt_app():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    widgets = pytest.importorskip("PyQt5.QtWidgets")
+    return widgets.QApplication.instance() or widgets.QApplication([])
+
+
+def test_text_buffer_matches_string_model():
+    rng = random.Random(7)
+    buffer, expected = TextBuffer("hello"), "hello"
+    for _ in range(3000):
+        if rng.random() < 0.6 or not expected:
+            offset = rng.randint(0, len(expected))
+            text = rng.choice(["a", "bc", "\n", "xyz"])
+            buffer.insert(offset, text)
+            expected = expected[:offset] + text + expected[offset:]
+        else:
+            offset = rng.randint(0, len(expected) - 1)
+            length = rng.randint(1, 5)
+            buffer.delete(offset, length)
+            expected = expected[:offset] + expected[offset + length:]
+    assert buffer.text() == expected
+    assert buffer.text(10, 200) == expected[10:200]
+    assert buffer.line_count() == expected.count("\n") + 1
+
+
+def test_text_buffer_applies_utf16_positions_around_astral_characters(tmp_path):
+    from src.ui.text_units import utf16_len
+    buffer = TextBuffer("a\U0001F600bc\nxyz")
+    assert buffer.utf16_length() == 9 and buffer.to_utf16(2) == 3 and buffer.from_utf16(3) == 2
+    assert buffer.replace_utf16(4, 0, "Q") == ""  # Typed between "b" and "c" in the document
+    assert buffer.text() == "a\U0001F600bQc\nxyz"
+    assert buffer.replace_utf16(1, 3, "") == "\U0001F600b"
+    assert buffer.text() == "aQc\nxyz"
+
+    # Model the document as UTF-16 code units, the way Qt counts
+    rng = random.Random(3)
+    path = tmp_path / "wide.txt"
+    path.write_text("\U0001F600 h\u00e9llo \U0001F680\n" * 5000, encoding="utf-8")
+    buffer = TextBuffer.from_file(str(path))
+    units = path.read_text(encoding="utf-8").encode("utf-16-le")
+    for _ in range(2000):
+        text = rng.choice(["a", "\U0001F389", "\u00e9\n", ""])
+        position = buffer.to_utf16(rng.randint(0, len(buffer)))
+        removed = utf16_len(buffer.text(buffer.from_utf16(position), buffer.from_utf16(position) + rng.randint(0, 3)))
+        old = buffer.replace_utf16(position, removed, text)
+        assert old.encode("utf-16-le") == units[position * 2:(position + removed) * 2]
+        units = units[:position * 2] + text.encode("utf-16-le") + units[(position + removed) * 2:]
+    assert buffer.text() == units.decode("utf-16-le") and buffer.utf16_length() == len(units) // 2
+    buffer.close()
+
+
+def test_text_buffer_maps_original_file(tmp_path):
+    path = tmp_path / "big.txt"
+    data = "héllo wörld\r\n" * 20000
+    path.write_bytes(data.encode("utf-8"))
+    expected = data.replace("\r\n", "\n")
+
+    buffer = TextBuffer.from_file(str(path))
+    assert len(buffer) == len(expected)
+    buffer.insert(100, "X")
+    buffer.delete(70000, 10)
+    expected = expected[:100] + "X" + expected[100:]
+    expected = expected[:70000] + expected[70010:]
+    assert "".join(buffer.iter_chunks()) == expected
+    buffer.close()
+
+    # Continuation bytes with no lead byte cannot be cut on a character boundary
+    path.write_bytes(b"\x80" * 200000)
+    buffer = TextBuffer.from_file(str(path))
+    assert len(buffer) == 200000 and set(buffer.text()) == {"\ufffd"}
+    buffer.close()
+
+
+def test_text_buffer_merges_typing_runs():
+    buffer = TextBuffer()
+    for index, char in enumerate("typing a long run"):
+        buffer.insert(index, char)
+    assert buffer.piece_count() == 1
+
+
+def test_lexer_carries_docstring_state_across_blocks():
+    lexer = lexer_for("python")
+    tokens, state = lexer.tokenize('def f():  """Start of a docstring')
+    assert tokens[0] == (0, 3, "keyword") and state != NORMAL
+    tokens, state = lexer.tokenize("def inside the docstring", state)
+    assert tokens == [(0, 24, "string")] and state != NORMAL
+    tokens, state = lexer.tokenize('end""" + 1', state)
+    assert tokens[0] == (0, 6, "string") and state == NORMAL
+
+
+def test_lexer_tracks_markdown_fences():
+    lexer = lexer_for("markdown")
+    _, state = lexer.tokenize("```python")
+    tokens, state = lexer.tokenize("# not a heading", state)
+    assert tokens == [(0, 15, "code")]
+    _, state = lexer.tokenize("```", state)
+    tokens, state = lexer.tokenize("# Heading", state)
+    assert tokens == [(0, 9, "heading")] and state == NORMAL
+
+
+def test_lexer_end_state_agrees_with_tokenize():
+    blocks = {
+        "python": ["x = 1", 'def f():  """Start', "inside", 'end""" + 1', "s = '\"\"\"'", "'''a''' '''b"],
+        "javascript": ["let a = 1;", "/* open", "still */ b = 2;", "c = '/*' /* x */", "/*"],
+        "markdown": ["# Title", "```python", "# code", "```", "text with ``` inline"],
+    }
+    for language, lines in blocks.items():
+        lexer = lexer_for(language)
+        state = NORMAL
+        for line in lines:
+            end_state = lexer.tokenize(line, state)[1]
+            assert lexer.end_state(line, state) == end_state, (language, line)
+            state = end_state
+
+
+def test_highlighter_formats_only_near_the_viewport(qt_app):
+    from src.ui.editor import CodeEditor
+    from src.ui.syntax_highlighter import DEFERRED, VIEWPORT_MARGIN
+
+    editor = CodeEditor()
+    lines = ["x = 1"] * 500
+    lines[10] = 'x = """open'
+    lines[400] = 'close""" + 1'
+    editor.setPlainText("\n".join(lines))
+    document = editor.document()
+    block = document.findBlockByNumber
+
+    assert block(5).userState() == NORMAL and block(5).layout().formats()
+    # Off-screen blocks carry their lexer state but no formats
+    far = 300
+    assert far > VIEWPORT_MARGIN + 10
+    assert block(far).userState() == 1 | DEFERRED and not block(far).layout().formats()
+    assert block(401).userState() == NORMAL | DEFERRED
+
+    editor.highlighter.set_viewport_range(far - 5, far + 5)
+    assert block(far).userState() == 1 and block(far).layout().formats()
+    assert block(200).userState() & DEFERRED
+
+
+def test_utf16_units_map_to_character_indexes():
+    from src.ui.text_units import char_index, utf16_len
+    text = "a\U0001F600b\u00e9c"
+    assert utf16_len(text) == 6 and utf16_len("abc") == 3
+    assert [char_index(text, units) for units in range(7)] == [0, 1, 1, 2, 3, 4, 5]
+    assert char_index(text, 99) == len(text)
+
+
+def test_file_index_honours_gitignore_and_ranks_matches(tmp_path):
+    (tmp_path / ".gitignore").write_text("build/\n*.log\n")
+    (tmp_path / "src" / "ui").mkdir(parents=True)
+    (tmp_path / "build").mkdir()
+    (tmp_path / "src" / "ui" / "file_explorer.py").write_text("")
+    (tmp_path / "src" / "ui" / "editor.py").write_text("")
+    (tmp_path / "build" / "file_explorer.py").write_text("")
+    (tmp_path / "debug.log").write_text("")
+
+    index = FileIndex.build(str(tmp_path))
+    paths = sorted(index.path(file_id) for file_id in range(len(index)))
+    assert paths == [".gitignore", "src/ui/editor.py", "src/ui/file_explorer.py"]
+    assert index.query("fxpl")[0][1] == "src/ui/file_explorer.py"
+    assert index.query("editor")[0][1] == "src/ui/editor.py"
+    assert index.query("ui/edi")[0][1] == "src/ui/editor.py"
+    assert index.query("zzz") == []
+
+    # The directory part filters before results are cut to the limit
+    for number in range(30):
+        (tmp_path / "src" / f"pkg{number}").mkdir()
+        (tmp_path / "src" / f"pkg{number}" / "editor.py").write_text("")
+    index = FileIndex.build(str(tmp_path))
+    assert [path for _, path in index.query("ui/editor", limit=5)] == ["src/ui/editor.py"]
+    assert len(index.query("editor", limit=5)) == 5
+
+
+def _process_until(app, predicate, timeout=10):
+    deadline = time.perf_counter() + timeout
+    while not predicate():
+        assert time.perf_counter() < deadline, "timed out waiting for the event loop"
+        app.processEvents()
+        time.sleep(0.005)
+
+
+def test_file_system_model_lists_folders_off_the_gui_thread(qt_app, tmp_path):
+    from src.ui.file_explorer import FileSystemModel
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "b.py").write_text("")
+    model = FileSystemModel()
+    top = model.set_root_path(str(tmp_path))
+
+    assert model.canFetchMore(top)
+    model.fetchMore(top)
+    assert model.rowCount(top) == 0 and not model.canFetchMore(top)  # Listed in the background
+    _process_until(qt_app, lambda: model.rowCount(top) == 2)
+    assert [model.index(row, 0, top).internalPointer().is_dir for row in range(2)] == [False, True]
+
+    (tmp_path / "a.py").write_text("")
+    refreshed = []
+    model.folder_refreshed.connect(refreshed.append)
+    assert model.refresh_folder(str(tmp_path))
+    _process_until(qt_app, lambda: refreshed)
+    assert [model.data(model.index(row, 0, top)) for row in range(3)] == ["a.py", "b.py", "pkg"]
+
+
+def test_search_file_reports_lines_and_skips_binaries(tmp_path):
+    source = tmp_path / "a.py"
+    source.write_text("import os\ndef main():\n    return os.getcwd()  # os\n")
+    binary = tmp_path / "b.bin"
+    binary.write_bytes(b"os\0os")
+
+    matches = search_file(str(source), SearchQuery("os", whole_word=True))
+    assert [(m.line, m.column) for m in matches] == [(0, 7), (2, 11), (2, 26)]
+    assert search_file(str(binary), SearchQuery("os")) == []
+    assert SearchQuery(r"def\s+main", regex=True).literal_prefilter() == b"main"
+    assert preview_line(SearchQuery("os"), matches[1], "pathlib") == "    return pathlib.getcwd()  # os"
+
+
+def test_file_search_folds_case_beyond_ascii(tmp_path):
+    from src.ui.search_engine import find_spans, replace_in_file
+    source = tmp_path / "a.txt"
+    source.write_bytes("CAFÉ café\n\U0001F600 Straße\n".encode("utf-8") + b"\xff\n")
+
+    query = SearchQuery("café", case_sensitive=False)
+    assert query.needs_text() and not SearchQuery("cafe", case_sensitive=False).needs_text()
+    assert [(m.line, m.column, m.length) for m in search_file(str(source), query)] == [(0, 0, 4), (0, 5, 4)]
+    assert [m.column for m in search_file(str(source), SearchQuery("straße", case_sensitive=False))] == [2]
+    assert find_spans("\U0001F600 café CAFÉ", query) == [(3, 7), (8, 12)]
+    assert find_spans("café CAFÉ", query, limit=1) == [(0, 4)]
+
+    assert replace_in_file(str(source), query, "tea") == 2
+    assert source.read_bytes() == "tea tea\n\U0001F600 Straße\n".encode("utf-8") + b"\xff\n"
+
+
+def test_project_search_streams_and_replaces(tmp_path):
+    paths = []
+    for i in range(5):
+        path = tmp_path / f"f{i}.txt"
+        path.write_text(f"foo {i}\nbar\nfoo\n" if i % 2 == 0 else "nothing\n")
+        paths.append(str(path))
+
+    found = {}
+    search = ProjectSearch(paths)
+    assert search.search(SearchQuery("foo"), lambda path, matches: found.update({path: matches}))
+    assert sorted(found) == [paths[0], paths[2], paths[4]]
+
+    counts = search.replace(sorted(found), SearchQuery("fo+", regex=True), "baz")
+    assert set(counts.values()) == {2}
+    assert (tmp_path / "f2.txt").read_text() == "baz 2\nbar\nbaz\n"
+
+    with pytest.raises(re.error):
+        search.replace(sorted(found), SearchQuery("(ba)z", regex=True), "\\9")  # No group 9
+    assert (tmp_path / "f2.txt").read_text() == "baz 2\nbar\nbaz\n"
+    SearchQuery("(ba)z").validate("\\9")  # Literal replacements have no group references
+
+
+def test_compute_replacements_supports_options_and_utf16_offsets():
+    text = "Foo foo food\n\U0001F600 foo"
+    assert compute_replacements(text, SearchQuery("foo", whole_word=True), "x") == [
+        (4, 7, "x"), (16, 19, "x")]
+    edits = compute_replacements(text, SearchQuery("foo", case_sensitive=False), "x")
+    assert [start for start, _, _ in edits] == [0, 4, 8, 16]
+    edits = compute_replacements(text, SearchQuery(r"f(o+)d", regex=True), r"\1")
+    assert edits == [(8, 12, "oo")]
+
+
+def test_snapshot_survives_later_edits_and_atomic_write(tmp_path):
+    path = tmp_path / "doc.txt"
+    path.write_text("line one\nline two\n")
+    os.chmod(path, 0o640)
+    buffer = TextBuffer.from_file(str(path))
+    buffer.insert(0, "# ")
+    snapshot = buffer.snapshot()
+    buffer.delete(0, 10)
+
+    atomic_write(str(path), snapshot.write_to)
+    assert path.read_text() == "# line one\nline two\n"
+    assert os.stat(path).st_mode & 0o777 == 0o640
+    assert os.listdir(tmp_path) == ["doc.txt"]
+
+
+def test_output_pipeline_decodes_split_utf8_and_bounds_scrollback():
+    pipeline = OutputPipeline(max_lines=3)
+    data = "héllo → wörld\n".encode("utf-8")
+    for i in range(len(data)):
+        pipeline.feed(data[i:i + 1])
+    assert pipeline.take() == "héllo → wörld\n"
+
+    for i in range(10):
+        pipeline.feed(f"line {i}\n".encode())
+    assert pipeline.take().splitlines() == ["line 7", "line 8", "line 9"]
+    assert pipeline.dropped_lines == 7
+
+
+def test_output_pipeline_throughput():
+    """Benchmark: sustained lines/sec for a pytest -v style flood in 4 KB reads."""
+    line = "tests/test_module.py::test_case_名前 PASSED                      [ 42%]\n".encode("utf-8")
+    payload = line * 200000
+    pipeline = OutputPipeline(max_lines=10000)
+    started = time.perf_counter()
+    for offset in range(0, len(payload), 4096):
+        pipeline.feed(payload[offset:offset + 4096])
+        if offset % (4096 * 64) == 0:
+            pipeline.take()  # Roughly one UI frame per 64 reads
+    pipeline.finish()
+    pipeline.take()
+    lines_per_second = pipeline.total_lines / (time.perf_counter() - started)
+    print(f"terminal pipeline: {lines_per_second:,.0f} lines/sec")
+    assert pipeline.total_lines == 200000
+    assert lines_per_second > 100000
+
+
+def test_benchmark_baseline_comparison():
+    from tests.benchmarks import compare
+    baseline = {"highlighter": {"lines_per_sec": 1000.0, "rehighlight_seconds": 1.0},
+                "replace_all": {"replacements": 10}}
+    current = {"highlighter": {"lines_per_sec": 700.0, "rehighlight_seconds": 1.1},
+               "replace_all": {"replacements": 99}}
+    assert compare(current, baseline, tolerance=0.25) == [("highlighter", "lines_per_sec", 1000.0, 700.0)]
+
+
+PLUGIN_SOURCE = '''
+MANIFEST = {{"name": "{name}", "version": "0.1", "activation_events": {events!r}, "isolated": {isolated}}}
+import time
+activations = []
+
+def activate(api):
+    activations.append(1)
+    api.register_command("{name}.echo", lambda value: value)
+    api.register_command("{name}.pid", lambda: __import__("os").getpid())
+    api.on("saved", lambda path: time.sleep({delay}))
+'''
+
+
+def _write_plugin(folder, name, events, isolated=False, delay=0):
+    path = folder / f"{name}.py"
+    path.write_text(PLUGIN_SOURCE.format(name=name, events=events, isolated=isolated, delay=delay))
+    return path
+
+
+def test_plugin_index_is_cached_and_activation_is_lazy(tmp_path, monkeypatch):
+    from src.plugins import manager
+    folder = tmp_path / "plugins"
+    folder.mkdir()
+    _write_plugin(folder, "lazy", ["onCommand:lazy.echo"])
+    (folder / "helper.py").write_text("VALUE = 1\n")
+    index_path = str(tmp_path / "index.json")
+
+    host = manager.PluginHost(str(folder), index_path)
+    assert [plugin.name for plugin in host.scan()] == ["lazy"]
+    assert host.plugins["lazy"].state == "inactive"
+
+    parsed = []
+    monkeypatch.setattr(manager, "read_manifest", lambda path: parsed.append(path))
+    assert [plugin.name for plugin in manager.PluginHost(str(folder), index_path).scan()] == ["lazy"]
+    assert parsed == []  # Unchanged files come from the index without being parsed
+
+    host.fire("saved", "x.py")
+    assert host.plugins["lazy"].state == "inactive"
+    assert host.execute_command("lazy.echo", 42).result() == 42
+    assert host.plugins["lazy"].state == "active"
+    assert host.plugins["lazy"].stats.activation_ms is not None
+
+
+def test_plugin_panel_runs_commands_and_reports_the_outcome(qt_app, tmp_path):
+    from src.ui.plugin_manager import PluginManager
+    folder = tmp_path / "plugins"
+    folder.mkdir()
+    _write_plugin(folder, "lazy", ["onCommand:lazy.echo"])
+    panel = PluginManager(str(folder), str(tmp_path / "index.json"))
+    messages = []
+    panel.message.connect(lambda *message: messages.append(message))
+
+    assert panel.run_command("lazy.echo", 42).result() == 42
+    panel.run_command("lazy.missing")
+    assert messages == [("plugins", "status", "lazy.echo: 42"),
+                        ("plugins", "status", "lazy.missing failed: No active plugin provides lazy.missing")]
+    panel.shutdown()
+
+
+def test_slow_plugins_are_throttled_then_disabled(tmp_path, monkeypatch):
+    from src.plugins import manager
+    monkeypatch.setattr(manager, "CALLBACK_BUDGET_MS", 1)
+    folder = tmp_path / "plugins"
+    folder.mkdir()
+    _write_plugin(folder, "slow", ["*"], delay=0.005)
+    host = manager.PluginHost(str(folder), str(tmp_path / "index.json"))
+    host.scan()
+    host.activate_startup()
+
+    for _ in range(manager.THROTTLE_STRIKES):
+        host.fire("saved", "x.py")
+    assert host.plugins["slow"].state == "throttled"
+    calls = host.plugins["slow"].stats.calls
+    host.fire("saved", "x.py")
+    assert host.plugins["slow"].stats.calls == calls  # Dropped inside the throttle interval
+
+    monkeypatch.setattr(manager, "THROTTLE_INTERVAL", 0)
+    for _ in range(manager.DISABLE_STRIKES):
+        host.fire("saved", "x.py")
+    assert host.plugins["slow"].state == "disabled"
+    assert host.execute_command("slow.echo", 1).exception() is not None
+
+
+def test_isolated_plugin_runs_in_a_worker_process(tmp_path):
+    from src.plugins.manager import PluginHost
+    folder = tmp_path / "plugins"
+    folder.mkdir()
+    _write_plugin(folder, "remote", ["onCommand:remote.pid"], isolated=True)
+    host = PluginHost(str(folder), str(tmp_path / "index.json"), worker_count=1)
+    host.scan()
+    try:
+        pid = host.execute_command("remote.pid").result(10)
+        assert pid != os.getpid()
+        assert host.execute_command("remote.echo", "hi").result(10) == "hi"
+        assert host.plugins["remote"].stats.calls == 2
+    finally:
+        host.shutdown()
+
+
+def test_isolated_activation_does_not_block_the_caller(tmp_path):
+    from src.plugins.manager import PluginHost
+    folder = tmp_path / "plugins"
+    folder.mkdir()
+    _write_plugin(folder, "background", ["onEvent:saved"], isolated=True)
+    host = PluginHost(str(folder), str(tmp_path / "index.json"), worker_count=1)
+    host.scan()
+    try:
+        started = time.perf_counter()
+        host.fire("saved", "x.py")
+        assert time.perf_counter() - started < 0.5  # Returns before the worker has even imported the plugin
+        plugin = host.plugins["background"]
+        assert plugin.state == "activating"
+        assert plugin.activation.result(10) is True
+        deadline = time.perf_counter() + 10
+        while plugin.stats.calls == 0 and time.perf_counter() < deadline:
+            time.sleep(0.01)
+        assert plugin.stats.calls == 1  # The event that triggered activation is delivered afterwards
+    finally:
+        host.shutdown()
+
+
+def test_startup_timeline_and_profile_flag(tmp_path):
+    import json
+    from main import profile_output
+    from src.ui.startup import StartupTimeline
+    assert profile_output(["main.py"]) == (False, None)
+    assert profile_output(["main.py", "--profile-startup"]) == (True, None)
+    assert profile_output(["main.py", "--profile-startup=out.json"]) == (True, "out.json")
+
+    timeline = StartupTimeline()
+    for phase in ("import", "construct", "first_paint"):
+        time.sleep(0.002)
+        timeline.mark(phase)
+    timeline.note("panel_explorer", 1.5)
+    path = tmp_path / "startup.json"
+    timeline.write(str(path))
+    report = json.loads(path.read_text())
+    assert [phase["name"] for phase in report["phases"]] == ["import", "construct", "first_paint"]
+    assert all(phase["duration_ms"] >= 2 for phase in report["phases"])
+    assert report["phases"][1]["start_ms"] == report["phases"][0]["end_ms"]
+    assert report["total_ms"] == report["phases"][-1]["end_ms"]
+    assert set(timeline.metrics()) == {"import_ms", "construct_ms", "first_paint_ms", "total_ms"}
+
+
+MARKDOWN_SOURCE = '''Title
+=====
+
+Some *emphasis*, **bold**, `a < b` and [a link](https://example.com).
+
+- first
+- [x] done
+  - nested
+
+```python
+if a < b:
+    pass
+```
+
+> quoted **text**
+
+| a | b |
+|---|---|
+| 1 | 2 |
+'''
+
+
+def test_markdown_blocks_render_to_html():
+    from src.ui.markdown import render_block, split_blocks
+    blocks = split_blocks(MARKDOWN_SOURCE)
+    assert len(blocks) == 6
+    html = [render_block(block) for block in blocks]
+    assert html[0] == "<h1>Title</h1>"
+    assert html[1] == ('<p>Some <i>emphasis</i>, <b>bold</b>, <code>a &lt; b</code> and '
+                       '<a href="https://example.com">a link</a>.</p>')
+    assert html[2] == "<ul><li>first</li><li>&#9745; done<ul><li>nested</li></ul></li></ul>"
+    assert html[3] == '<pre><code class="language-python">if a &lt; b:\n    pass</code></pre>'
+    assert html[4] == "<blockquote><p>quoted <b>text</b></p></blockquote>"
+    assert html[5].count("<tr>") == 2 and "<th>a</th>" in html[5]
+
+
+def test_markdown_renderer_only_renders_changed_blocks():
+    from src.ui.markdown import MarkdownRenderer, diff_blocks
+    renderer = MarkdownRenderer()
+    document = "\n".join([MARKDOWN_SOURCE] * 200)
+    before = renderer.render_blocks(document)
+    rendered = renderer.rendered
+    assert rendered == 6  # Repeated blocks share cache entries
+
+    edited = document.replace("Some *emphasis*", "Some *more emphasis*", 1)
+    after = renderer.render_blocks(edited)
+    assert renderer.rendered == rendered + 1
+    start, old_end, new_end = diff_blocks([s for s, _ in before], [s for s, _ in after])
+    assert (start, old_end, new_end) == (1, 2, 2)
+
+    started = time.perf_counter()
+    renderer.render_blocks(edited + "\n\nOne more paragraph.\n")
+    elapsed = time.perf_counter() - started
+    print(f"markdown: {len(after)} blocks re-split with one new block in {elapsed * 1000:.2f} ms")
+    assert renderer.rendered == rendered + 2
+    assert elapsed < 0.1
+
+
+def test_tab_budget_hibernates_least_recently_used_tabs():
+    from src.ui.hibernation import HibernatedTab, TabBudget, estimate_editor_bytes
+    budget = TabBudget(budget_bytes=3 * estimate_editor_bytes(100000, 2000))
+    for name in ("a", "b", "c", "d", "e"):
+        budget.touch(name, estimate_editor_bytes(100000, 2000))
+    budget.touch("a")  # Recently viewed again
+    assert budget.victims(keep={"e"}) == ["b", "c"]
+    assert budget.victims(keep={"b", "e"}) == ["c", "d"]
+    budget.remove("b")
+    budget.remove("c")
+    assert budget.victims() == []
+
+    text = "def handler(value):\n    return value * 2\n" * 50000
+    state = HibernatedTab("/tmp/x.py", text, cursor=120, anchor=100, scroll=(0, 40),
+                          modified=True, undo_steps=7)
+    assert state.text() == text and state.characters == len(text)
+    assert state.size() < len(text) // 20
+    assert (state.cursor, state.anchor, state.scroll, state.modified, state.undo_steps) == (120, 100, (0, 40), True, 7)
+
+
+def test_chat_log_pages_messages_from_disk(tmp_path):
+    from src.ui.chat_history import ChatLog
+    path = str(tmp_path / "chat.jsonl")
+    log = ChatLog(path, page_size=16, cached_pages=4)
+    started = time.perf_counter()
+    for n in range(20000):
+        log.append("You" if n % 2 else "Assistant", f"message {n} with some **markdown** ü")
+    append_seconds = time.perf_counter() - started
+    log.close()
+    with open(path, "ab") as f:
+        f.write(b'{"role": "Assistant", "text": "cut off')  # A crash in the middle of a write
+
+    reopened = ChatLog(path, page_size=16, cached_pages=4)
+    assert len(reopened) == 20000
+    started = time.perf_counter()
+    for n in range(19999, -1, -1):  # Scrolling all the way up
+        message = reopened.message(n)
+    scroll_seconds = time.perf_counter() - started
+    assert (message.index, message.role, message.text) == (0, "Assistant", "message 0 with some **markdown** ü")
+    assert reopened.message(12345).text.startswith("message 12345 ")
+    assert len(reopened._pages) <= 4
+    reopened.append("You", "after recovery")
+    assert reopened.message(20000).text == "after recovery"
+    print(f"chat log: 20k appends in {append_seconds * 1000:.0f} ms, full scroll-back in {scroll_seconds * 1000:.0f} ms")
+    reopened.close()
+
+
+def test_settings_are_typed_observable_and_saved_once(tmp_path, monkeypatch):
+    import json
+    import src.settings_manager as settings_module
+    from src.settings_manager import SettingsManager
+    path = tmp_path / "settings.json"
+    path.write_text('{"font_size": "14", "autosave_interval": "soon", "custom": true}')
+    settings = SettingsManager(str(path), save_delay=0.1)
+    assert settings.get("font_size") == 14
+    assert settings.get("autosave_interval") == 30  # Unusable values fall back to the default
+    assert settings.get("terminal_scrollback") == 10000 and settings.get("custom") is True
+
+    writes = []
+    monkeypatch.setattr(settings_module, "atomic_write",
+                        lambda *args, **kwargs: writes.append(1) or atomic_write(*args, **kwargs))
+    seen = []
+    settings.observe("font_size", lambda key, value: seen.append(value))
+    for size in range(15, 35):
+        settings.set("font_size", size)
+    settings.set("font_size", 34)  # Unchanged: no notification
+    assert seen == list(range(15, 35))
+    assert json.loads(path.read_text())["font_size"] == "14"  # Nothing written while changes keep coming
+
+    deadline = time.time() + 5
+    while not writes and time.time() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.2)
+    assert writes == [1]  # Twenty changes, one write
+    assert json.loads(path.read_text())["font_size"] == 34
+    assert settings.reload_if_changed() == {}  # Our own write is not an external edit
+
+    path.write_text(json.dumps({"font_size": 40, "autosave_interval": 5}))
+    assert settings.reload_if_changed() == {"font_size": 40, "autosave_interval": 5}
+    assert seen[-1] == 40 and settings.get("autosave_interval") == 5
+
+
+def test_folder_and_text_diffs_touch_only_what_changed():
+    from src.ui.file_diff import diff_entries, text_edits
+    old = sorted((f"f{n:04d}.py", f"./f{n:04d}.py", False) for n in range(5000))
+    new = [entry for entry in old if not entry[0].startswith("f01")] + [("f0123x.py", "./f0123x.py", False)]
+    new = sorted(new + [("f2000.py", "./f2000.py", True)])  # A file replaced by a folder of the same name
+    new.remove(("f2000.py", "./f2000.py", False))
+    started = time.perf_counter()
+    removed, inserted = diff_entries(old, new)
+    assert time.perf_counter() - started < 0.5
+    assert removed == [(2000, 2000), (100, 199)]
+    rows = list(old)
+    for first, last in removed:
+        del rows[first:last + 1]
+    for first, run in inserted:
+        rows[first:first] = run
+    assert rows == new and sum(len(run) for _, run in inserted) == 2
+
+    def apply(text, edits):
+        for offset, length, replacement in edits:
+            text = text[:offset] + replacement + text[offset + length:]
+        return text
+
+    old_text = "".join(f"line {n}\n" for n in range(20000))
+    lines = old_text.splitlines(keepends=True)
+    lines[10] = "changed\n"
+    del lines[5000:5003]
+    lines.insert(15000, "inserted\nlines\n")
+    new_text = "".join(lines) + "tail without newline"
+    edits = text_edits(old_text, new_text)
+    assert apply(old_text, edits) == new_text
+    assert len(edits) == 4 and [edit[0] for edit in edits] == sorted((edit[0] for edit in edits), reverse=True)
+    assert text_edits(old_text, old_text) == []
+    rng = random.Random(3)
+    for _ in range(50):
+        a = "".join(rng.choice(["x\n", "y\n", "z", "\n"]) for _ in range(rng.randrange(30)))
+        b = "".join(rng.choice(["x\n", "y\n", "z", "\n"]) for _ in range(rng.randrange(30)))
+        assert apply(a, text_edits(a, b)) == b
+
+
+def test_line_index_reads_lines_while_indexing_and_follows_growth(tmp_path):
+    from src.ui.line_index import MAX_LINE_BYTES, LineIndex
+    path = tmp_path / "big.log"
+    lines = [f"{n} request handled in {n % 97} ms" for n in range(100000)]
+    lines[500] = "x" * (MAX_LINE_BYTES + 100)
+    path.write_bytes(("\r\n".join(lines[:50000]) + "\n" + "\n".join(lines[50000:])).encode())
+    index = LineIndex(str(path), stride=16)
+    index.scan(64 * 1024)
+    assert not index.complete and 100 < index.line_count() < 5000
+    assert index.lines(0, 3) == lines[:3]  # Readable before the rest is indexed
+    steps = 1
+    while not index.scan(64 * 1024):
+        steps += 1
+    assert steps > 10 and index.line_count() == len(lines)
+    assert len(index.offsets) == (len(lines) - 1) // 16 + 1  # The last line has no newline
+    for number in random.Random(1).sample(range(len(lines)), 200):
+        if number != 500:
+            assert index.line(number) == lines[number]
+    assert len(index.line(500)) == MAX_LINE_BYTES
+    assert index.lines(len(lines) - 2, 10) == lines[-2:]
+
+    with open(path, "ab") as f:
+        f.write(b"\nappended 1\nappended 2")
+    assert index.refresh() and not index.complete
+    index.scan()
+    assert index.line_count() == len(lines) + 2 and index.lines(len(lines), 2) == ["appended 1", "appended 2"]
+    path.write_bytes(b"rotated\n")
+    assert index.refresh()
+    index.scan()
+    assert index.line_count() == 1 and index.line(0) == "rotated"
+    index.close()
+
+
+def _reference_spans(lines):
+    from src.ui.structure import measure_indent
+    indents = [measure_indent(line) for line in lines]
+    spans = []
+    for start, indent in enumerate(indents):
+        end = start
+        for row in range(start + 1, len(lines)):
+            if indents[row] < 0:
+                continue
+            if indents[row] <= indent:
+                break
+            end = row
+        spans.append(0 if indent < 0 else end - start)
+    return spans
+
+
+def test_structure_index_tracks_folds_and_brackets_through_edits():
+    from src.ui.structure import StructureIndex
+    pieces = ["def f(a, b):", "    x = [1, 2,", "        3]", "    if x:", "        return (x)", "",
+              "    '''doc (", ")'''", "class C:", "    pass", "  y = {", "}", "# (comment", "s = ')'"]
+    rng = random.Random(5)
+    for _ in range(60):
+        lines = [rng.choice(pieces) for _ in range(rng.randrange(25))]
+        index = StructureIndex("python", lambda n: lines[n])
+        index.replace_lines(0, 0, list(lines))
+        for _ in range(10):
+            first = rng.randrange(len(lines) + 1)
+            count = rng.randrange(min(4, len(lines) - first) + 1)
+            new = [rng.choice(pieces) for _ in range(rng.randrange(4))]
+            lines[first:first + count] = new
+            index.replace_lines(first, count, new)
+            assert len(index) == len(lines) and index.spans(0, len(lines)) == _reference_spans(lines)
+
+    lines = ["def f(a, b):", "    x = [1, 2,", "        3]", "    '''doc (", "    )'''", "    return (x)", "y = 1"]
+    index = StructureIndex("python", lambda n: lines[n])
+    index.replace_lines(0, 0, lines)
+    assert index.span(0) == 5 and index.folds_containing(2) == [(0, 5), (1, 2)]
+    assert index.match_bracket(1, 8) == (2, 9) and index.match_bracket(2, 9) == (1, 8)
+    assert index.match_bracket(5, 11) == (5, 13)  # The bracket in the docstring is skipped
+    lines[1:3] = ["    x = [1, 2, 3]"]
+    index.replace_lines(1, 2, lines[1:2])
+    assert index.span(0) == 4 and index.match_bracket(1, 8) == (1, 16)
+
+
+def test_cursor_set_merges_and_edits_every_cursor_in_one_pass():
+    from src.ui.multi_cursor import CursorSet
+    cursors = CursorSet(9, 9)
+    for anchor, position in [(2, 5), (4, 7), (0, 0), (9, 9), (12, 10)]:
+        cursors.add(anchor, position)
+    assert cursors.cursors == [(0, 0), (2, 7), (9, 9), (12, 10)] and cursors.primary == 3
+
+    text = "abcdefghijklmnop"
+    for start, end, new in reversed(cursors.insert("X")):
+        text = text[:start] + new + text[end:]
+    assert text == "XabXhiXjXmnop" and cursors.cursors == [(1, 1), (4, 4), (7, 7), (9, 9)]
+    for start, end, new in reversed(cursors.delete(len(text))):
+        text = text[:start] + new + text[end:]
+    assert text == "abhijmnop" and cursors.cursors == [(0, 0), (2, 2), (4, 4), (5, 5)]
+    cursors.move(lambda position: max(position - 1, 0))
+    assert cursors.cursors == [(0, 0), (1, 1), (3, 3), (4, 4)]  # The first caret could not move left
+    cursors.adjust(2, 0, 5)
+    assert cursors.cursors == [(0, 0), (1, 1), (8, 8), (9, 9)]
+    assert cursors.in_range(2, 8) == [(8, 8)]
+
+    lines = ["line %d" % n for n in range(10000)]
+    text = "\n".join(lines)
+    ends, offset = [], 0
+    for line in lines:
+        offset += len(line)
+        ends.append((offset, offset))
+        offset += 1
+    cursors.set(ends)
+    started = time.perf_counter()
+    edits = cursors.insert(";")
+    assert time.perf_counter() - started < 0.5 and len(edits) == 10000
+    assert cursors.cursors[1] == (len(lines[0]) + len(lines[1]) + 3,) * 2
+
+
+def test_perf_monitor_times_slots_samples_stalls_and_writes_a_trace(tmp_path):
+    import json
+    from src.ui import perf_monitor
+    from src.ui.perf_monitor import PerfMonitor, timed
+
+    @timed("test.slow_slot")
+    def slow_slot(seconds):
+        time.sleep(seconds)
+        return seconds
+
+    monitor = perf_monitor.monitor
+    assert not monitor.enabled and slow_slot(0) == 0 and not monitor.stats  # Disabled: nothing recorded
+    monitor.slow_ms = 20
+    monitor.enable()
+    try:
+        monitor.start_trace()
+        monitor.beat()
+        assert slow_slot(0.08) == 0.08
+        slow_slot(0)
+        monitor.beat()
+        count = monitor.stop_trace(str(tmp_path / "trace.json"))
+    finally:
+        monitor.disable()
+        monitor.slow_ms = perf_monitor.SLOW_CALL_MS
+    name, calls, total, _, longest = monitor.top()[0]
+    assert name == "test.slow_slot" and calls == 2 and longest >= 80
+    slow = [call for call in monitor.slow_calls if call[0] == "test.slow_slot"]
+    assert slow and any("slow_slot" in frame for _, stack in slow[0][2] for frame in stack)
+    assert monitor.frames and monitor.frame_summary()[2] >= 80
+
+    events = json.loads((tmp_path / "trace.json").read_text())["traceEvents"]
+    assert count == len(events) - 1  # Plus the thread name
+    spans = [event for event in events if event["ph"] == "X" and event["name"] == "test.slow_slot"]
+    assert len(spans) == 2 and spans[0]["dur"] >= 80000 and spans[0]["args"]["stacks"]
+    assert any(event["ph"] == "C" for event in events)
+    monitor.reset()
+
+    idle = PerfMonitor()
+    assert idle.top() == [] and idle.frame_summary() == (0.0, 0.0, 0.0)
+
+
+def _apply_deltas(text, deltas):
+    for offset, old, new in deltas:
+        assert text[offset:offset + len(old)] == old
+        text = text[:offset] + new + text[offset + len(old):]
+    return text
+
+
+def test_undo_journal_merges_typing_spills_to_disk_and_survives_reopen(tmp_path):
+    from src.ui.undo_journal import UndoJournal, text_digest
+    now = [0.0]
+    journal = UndoJournal(None, clock=lambda: now[0])
+    text = ""
+    for char in "hello":
+        journal.record(len(text), "", char)
+        text += char
+    journal.record(4, "o", "")  # Backspace continues as a new run
+    journal.record(3, "l", "")
+    now[0] += 5
+    journal.record(3, "", "p")  # Too late to merge
+    assert journal.undo_count() == 3 and journal.undo() == [[3, "", "p"]]
+    assert journal.undo() == [[3, "lo", ""]] and journal.undo() == [[0, "", "hello"]] and journal.undo() is None
+
+    path = str(tmp_path / "doc.py")
+    folder = str(tmp_path / "undo")
+    journal = UndoJournal(path, memory_cap=4096, folder=folder)
+    journal.restore(text_digest([""]))
+    rng = random.Random(3)
+    text, history = "", [""]
+    for _ in range(400):
+        offset = rng.randrange(len(text) + 1)
+        removed = text[offset:offset + rng.randrange(4)]
+        inserted = "".join(rng.choice("ab\n") for _ in range(rng.randrange(1, 30)))
+        if inserted == removed:
+            continue
+        journal.record(offset, removed, inserted)
+        journal.seal()
+        text = text[:offset] + inserted + text[offset + len(removed):]
+        history.append(text)
+    assert journal.disk_undo > 0 and journal.memory <= 4096 + 200
+    for step in range(100):
+        deltas = journal.undo()
+        text = _apply_deltas(text, [(offset, new, old) for offset, old, new in reversed(deltas)])
+        assert text == history[-2 - step]
+    text = _apply_deltas(text, journal.redo())
+    assert text == history[-100]
+
+    digest = text_digest([text])
+    journal.save(digest)
+    reopened = UndoJournal(path, memory_cap=4096, folder=folder)
+    assert reopened.restore(digest) and (reopened.undo_count(), reopened.redo_count()) == (301, 99)
+    deltas = reopened.undo()
+    while deltas is not None:
+        text = _apply_deltas(text, [(offset, new, old) for offset, old, new in reversed(deltas)])
+        deltas = reopened.undo()
+    assert text == "" and reopened.redo_count() == 400
+
+    reopened.save(text_digest([text]))
+    stale = UndoJournal(path, folder=folder)
+    assert not stale.restore(text_digest(["changed on disk"])) and stale.saved_digest() is None
+
+
+def test_undo_journal_round_trips_utf16_offsets_past_astral_characters():
+    from src.ui.text_units import utf16_len
+    from src.ui.undo_journal import UndoJournal
+    original = "a\U0001F600bc\nxyz"
+    document = TextBuffer(original)
+    journal = UndoJournal(None, clock=lambda: 0.0)
+
+    def change(position, removed, inserted):
+        """What the editor's contentsChange handler does with a Qt change."""
+        journal.record(position, document.replace_utf16(position, removed, inserted), inserted)
+
+    def apply(deltas):
+        """What the editor does with a step it undoes or redoes."""
+        for offset, old, new in deltas:
+            assert document.replace_utf16(offset, utf16_len(old), new) == old
+
+    change(4, 0, "Q")
+    change(5, 0, "\U0001F389")
+    change(7, 0, "R")
+    change(7, 1, "")  # Backspace over "R"
+    change(1, 2, "")  # The emoji selected and deleted
+    assert document.text() == "abQ\U0001F389c\nxyz"
+    edited = document.text()
+    while journal.can_undo():
+        apply([(offset, new, old) for offset, old, new in reversed(journal.undo())])
+    assert document.text() == original
+    while journal.can_redo():
+        apply(journal.redo())
+    assert document.text() == edited
+
+
+def test_undo_journal_rebases_past_foreign_edits():
+    from src.ui.undo_journal import UndoJournal
+    journal = UndoJournal(None, clock=lambda: 0.0)
+    journal.record(3, "", "X")  # abc -> abcX
+    journal.record_step([[0, "a", "A"]])  # -> AbcX
+    journal.undo()
+    journal.redo()
+    text = "> Abc--X"  # A collaborator inserted "> " at 0, then "--" at 5
+    assert journal.rebase(0, 0, 2) == 0 and journal.rebase(5, 0, 2) == 0
+    assert not journal.can_redo() and not journal.is_saved()
+    for expected in ("> abc--X", "> abc--"):
+        (offset, removed, inserted), = journal.undo()
+        assert text[offset:offset + len(inserted)] == inserted
+        text = text[:offset] + removed + text[offset + len(inserted):]
+        assert text == expected
+
+    journal = UndoJournal(None)
+    journal.record_step([[0, "", "mine"]])
+    journal.record_step([[4, "", " too"]])
+    assert journal.rebase(8, 0, 1) == 0  # Typing after both steps costs nothing
+    assert journal.rebase(2, 4, 0) == 2 and not journal.can_undo()  # Overlapping both steps drops them
+
+
+def test_editor_reload_while_loading_restarts_the_stream(qt_app, tmp_path, monkeypatch):
+    from src.ui import editor as editor_module
+    monkeypatch.setattr(editor_module, "LOAD_BATCH_CHARS", 64 * 1024)
+    first, second = tmp_path / "first.txt", tmp_path / "second.txt"
+    first.write_text("first line\n" * 50000)
+    second.write_text("second line\n" * 30000)
+
+    editor = editor_module.CodeEditor()
+    loaded = []
+    editor.loaded.connect(loaded.append)
+    editor.load_file(str(first))
+    qt_app.processEvents()
+    assert editor.is_loading()
+    editor.load_file(str(second))  # Batches queued for the first load must not run on
+    _process_until(qt_app, lambda: not editor.is_loading())
+    for _ in range(20):
+        qt_app.processEvents()
+    assert loaded == [str(second)]
+    assert editor.toPlainText() == second.read_text() == editor.buffer.text()
+
+
+def test_editor_undo_skips_a_collaborator_edit(qt_app):
+    from PyQt5.QtGui import QTextCursor
+    from src.collab.binding import EditorBinding
+    from src.collab.crdt import TextCRDT
+    from src.ui.editor import CodeEditor
+
+    replicas = [TextCRDT(1), TextCRDT(2)]
+    replicas[0].on_update(replicas[1].apply_update)
+    replicas[1].on_update(replicas[0].apply_update)
+    mine, theirs = CodeEditor(), CodeEditor()
+    bindings = [EditorBinding(mine, replicas[0]), EditorBinding(theirs, replicas[1])]
+
+    cursor = mine.textCursor()
+    cursor.insertText("mine")
+    cursor = theirs.textCursor()
+    cursor.movePosition(QTextCursor.End)
+    cursor.insertText(" \U0001F600 theirs")
+    assert mine.toPlainText() == "mine \U0001F600 theirs"
+
+    mine.undo()  # Removes only this editor's own typing
+    assert mine.toPlainText() == theirs.toPlainText() == replicas[0].text() == " \U0001F600 theirs"
+    mine.redo()
+    assert theirs.toPlainText() == "mine \U0001F600 theirs"
+    theirs.undo()
+    assert mine.toPlainText() == "mine" and len(bindings) == 2
+
+
+def test_editor_set_plain_text_starts_a_fresh_history(qt_app):
+    from src.ui.editor import CodeEditor
+    editor = CodeEditor()
+    editor.textCursor().insertText("typed")
+    editor.setPlainText("fresh")
+    assert not editor.journal.can_undo()
+    editor.undo()  # Neither the typing nor the replacement itself can be undone
+    assert editor.toPlainText() == "fresh"
+    editor.textCursor().insertText("more ")
+    editor.undo()
+    assert editor.toPlainText() == "fresh"